@@ -3,33 +3,91 @@ Agente de IA que procesa lenguaje natural y genera respuestas
 utilizando Groq AI para entender las consultas del usuario.
 """
 
-from groq import Groq
+from groq import Groq, APIStatusError
 from typing import Dict, List, Optional, Any
 from loguru import logger
 import json
+import time
+
+from ai.dispatcher import LLMDispatcher, LLMPriority, LLMSaturatedError
+from ai.response_cache import ResponseCache
+from ai.usage import LLMCallUsage
 
 
 class AIAgent:
     """Agente de IA para procesar consultas en lenguaje natural con Groq"""
     
+    # Intenciones que el clasificador puede devolver
+    INTENTS = (
+        "consultar_tickets",
+        "buscar_ticket",
+        "buscar_tickets_similares",
+        "consultar_tendencia",
+        "consultar_inventario",
+        "buscar_equipo",
+        "generar_reporte",
+        "consulta_general",
+    )
+    
+    # Intención agregada cuando la consulta combina varias intenciones
+    MULTI_INTENT = "consulta_multiple"
+    MAX_INTENTS = 3
+    
     def __init__(
         self,
         groq_api_key: str,
-        groq_model: str = "llama-3.3-70b-versatile"
+        groq_model: str = "llama-3.3-70b-versatile",
+        dispatcher: Optional[LLMDispatcher] = None,
+        priority: LLMPriority = LLMPriority.INTERACTIVE,
+        classifier_model: Optional[str] = None,
+        generator_model: Optional[str] = None,
+        chat_model: Optional[str] = None,
+        classifier_min_confidence: float = 0.7,
+        response_cache: Optional[ResponseCache] = None,
+        base_url: Optional[str] = None,
+        request_timeout: Optional[float] = None
     ):
         """
         Inicializa el agente de IA con Groq
         
         Args:
             groq_api_key: Clave API de Groq
-            groq_model: Modelo de Groq a usar
+            groq_model: Modelo grande por defecto (y de respaldo del clasificador)
+            dispatcher: Cola compartida de llamadas al LLM (opcional)
+            priority: Carril de prioridad de las llamadas de este agente
+            classifier_model: Modelo para clasificar intenciones (por defecto groq_model)
+            generator_model: Modelo para redactar respuestas con datos (por defecto groq_model)
+            chat_model: Modelo para el chat general (por defecto groq_model)
+            classifier_min_confidence: Confianza mínima del clasificador antes de reintentar con groq_model
+            response_cache: Caché compartida de respuestas generadas (opcional)
+            base_url: URL alternativa compatible con Groq (p. ej. el stub local de pruebas de carga)
+            request_timeout: Tiempo máximo por llamada HTTP a Groq, en segundos (None = por defecto del cliente)
         """
         if not groq_api_key:
             raise ValueError("groq_api_key es requerido")
         
-        self.client = Groq(api_key=groq_api_key)
+        client_options: Dict[str, Any] = {"api_key": groq_api_key}
+        if base_url:
+            client_options["base_url"] = base_url
+        if request_timeout:
+            client_options["timeout"] = request_timeout
+        self.client = Groq(**client_options)
         self.model = groq_model
-        logger.info(f"AIAgent inicializado con Groq (modelo: {groq_model})")
+        self.classifier_model = classifier_model or groq_model
+        self.generator_model = generator_model or groq_model
+        self.chat_model = chat_model or groq_model
+        self.classifier_min_confidence = classifier_min_confidence
+        self.response_cache = response_cache
+        self.last_response_cached = False
+        self.usage: List[LLMCallUsage] = []
+        self.dispatcher = dispatcher
+        self.priority = priority
+        if base_url:
+            logger.info(f"🔀 AIAgent apuntando a {base_url}")
+        logger.info(
+            f"AIAgent inicializado con Groq (clasificador: {self.classifier_model}, "
+            f"generador: {self.generator_model}, chat: {self.chat_model})"
+        )
         
         # Professional system prompt for the agent (bilingual: Spanish/English)
         self.system_prompt = """Eres un asistente de IA profesional para el sistema GLPI IT Service Management.
@@ -46,9 +104,11 @@ Cuando un usuario hace una solicitud, debes:
 Intenciones disponibles:
 - "consultar_tickets": Ver lista de tickets o estadísticas
 - "buscar_ticket": Buscar un ticket específico por ID
-- "consultar_inventario": Ver inventario de computadoras
-- "buscar_equipo": Buscar una computadora específica
-- "generar_reporte": Generar reportes
+- "buscar_tickets_similares": Buscar tickets parecidos a un problema descrito (parámetro "texto")
+- "consultar_tendencia": Evolución del volumen de tickets en el tiempo: abiertos/resueltos/cerrados, backlog y tiempo de resolución (parámetros "periodo": "dia" | "semana", "dias": número de días hacia atrás)
+- "consultar_inventario": Ver inventario (computadoras, monitores, impresoras, equipos de red, teléfonos y periféricos); parámetros opcionales "tipo", "estado" y "ubicacion"
+- "buscar_equipo": Buscar una computadora por nombre, número de serie, fabricante, modelo o usuario (tolera errores de tecleo)
+- "generar_reporte": Generar reportes (parámetros "tipo": "tickets" | "inventario", "periodo": "semanal" | "mensual")
 - "consulta_general": Preguntas generales sobre GLPI
 
 Formato de respuesta JSON:
@@ -57,10 +117,17 @@ Formato de respuesta JSON:
     "parametros": {
         "clave": "valor"
     },
+    "intenciones": [
+        {"intencion": "tipo_intencion", "parametros": {"clave": "valor"}}
+    ],
     "respuesta_usuario": "mensaje de confirmación profesional",
     "confianza": 0.95
 }
 
+"intenciones" lista TODAS las intenciones de la consulta (máximo 3), en el orden en que
+aparecen; "intencion" y "parametros" repiten la primera. Si la consulta pide una sola
+cosa, "intenciones" tiene un único elemento.
+
 Ejemplos:
 
 Usuario: "¿Cuántos tickets hay abiertos actualmente?"
@@ -98,6 +165,44 @@ Respuesta:
     "confianza": 0.99
 }
 
+Usuario: "¿Hay tickets parecidos a este problema de impresora que no imprime?"
+Respuesta:
+{
+    "intencion": "buscar_tickets_similares",
+    "parametros": {
+        "texto": "impresora no imprime"
+    },
+    "respuesta_usuario": "Buscando tickets similares.",
+    "confianza": 0.95
+}
+
+Usuario: "Dame el total de tickets abiertos y cuántas computadoras hay en mantenimiento"
+Respuesta:
+{
+    "intencion": "consultar_tickets",
+    "parametros": {
+        "status": "open"
+    },
+    "intenciones": [
+        {"intencion": "consultar_tickets", "parametros": {"status": "open"}},
+        {"intencion": "consultar_inventario", "parametros": {"estado": "mantenimiento"}}
+    ],
+    "respuesta_usuario": "Consultando tickets abiertos e inventario en mantenimiento.",
+    "confianza": 0.94
+}
+
+Usuario: "¿Cómo ha evolucionado el volumen de tickets este mes?"
+Respuesta:
+{
+    "intencion": "consultar_tendencia",
+    "parametros": {
+        "periodo": "dia",
+        "dias": 30
+    },
+    "respuesta_usuario": "Calculando la evolución de tickets de los últimos 30 días.",
+    "confianza": 0.95
+}
+
 Usuario: "Show me open tickets" (English)
 Respuesta:
 {
@@ -124,25 +229,26 @@ Sé preciso y extrae todos los parámetros relevantes. Acepta consultas en espa
         try:
             logger.info(f"🤔 Procesando consulta: {user_query}")
             
-            # Enviar consulta a Groq
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": user_query}
-                ],
-                temperature=0.3,
-                max_tokens=500,
-                response_format={"type": "json_object"}
-            )
-            
-            # Extraer respuesta
-            content = response.choices[0].message.content
-            result = json.loads(content)
+            # Primero el modelo pequeño; si su salida no es válida o duda, el grande
+            try:
+                result = self._classify(user_query, self.classifier_model)
+                if self.classifier_model != self.model and result.get("confianza", 0.0) < self.classifier_min_confidence:
+                    logger.info(
+                        f"↩️ Confianza baja del clasificador ({result.get('confianza')}), reintentando con {self.model}"
+                    )
+                    result = self._classify(user_query, self.model)
+            except (ValueError, TypeError, APIStatusError) as e:
+                # APIStatusError cubre el 400 json_validate_failed de Groq
+                if self.classifier_model == self.model:
+                    raise
+                logger.warning(f"↩️ Salida inválida del clasificador {self.classifier_model} ({e}), reintentando con {self.model}")
+                result = self._classify(user_query, self.model)
             
             logger.info(f"✅ Intención identificada: {result.get('intencion')}")
             return result
             
+        except LLMSaturatedError:
+            raise
         except Exception as e:
             logger.error(f"❌ Error al procesar consulta: {e}")
             return {
@@ -152,6 +258,68 @@ Sé preciso y extrae todos los parámetros relevantes. Acepta consultas en espa
                 "confianza": 0.0
             }
     
+    def _classify(self, user_query: str, model: str) -> Dict[str, Any]:
+        """
+        Clasifica la consulta con el modelo indicado y valida el JSON devuelto
+        
+        Args:
+            user_query: Pregunta del usuario
+            model: Modelo de Groq a usar
+            
+        Returns:
+            Diccionario con intención, parámetros, respuesta y confianza
+            
+        Raises:
+            ValueError: Si la respuesta no es JSON válido o no tiene el formato esperado
+        """
+        response = self._complete(
+            "understand_query",
+            model=model,
+            messages=[
+                {"role": "system", "content": self.system_prompt},
+                {"role": "user", "content": user_query}
+            ],
+            temperature=0.3,
+            max_tokens=500,
+            response_format={"type": "json_object"}
+        )
+        
+        result = json.loads(response.choices[0].message.content)
+        if not isinstance(result, dict) or result.get("intencion") not in self.INTENTS:
+            raise ValueError(f"intención no reconocida: {result.get('intencion') if isinstance(result, dict) else result}")
+        
+        result["confianza"] = float(result.get("confianza", 0.0))
+        if not isinstance(result.get("parametros"), dict):
+            result["parametros"] = {}
+        result["intenciones"] = self._normalize_intents(result)
+        return result
+    
+    def _normalize_intents(self, result: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Lista de intenciones válidas y sin duplicados, empezando por la principal
+        
+        Args:
+            result: JSON devuelto por el clasificador
+            
+        Returns:
+            Lista de {"intencion", "parametros"} (al menos la intención principal)
+        """
+        intents = [{"intencion": result["intencion"], "parametros": result["parametros"]}]
+        seen = {(result["intencion"], json.dumps(result["parametros"], sort_keys=True, default=str))}
+        
+        extra = result.get("intenciones")
+        for item in extra if isinstance(extra, list) else []:
+            if not isinstance(item, dict) or item.get("intencion") not in self.INTENTS:
+                continue
+            params = item.get("parametros") if isinstance(item.get("parametros"), dict) else {}
+            key = (item["intencion"], json.dumps(params, sort_keys=True, default=str))
+            if key in seen:
+                continue
+            seen.add(key)
+            intents.append({"intencion": item["intencion"], "parametros": params})
+        
+        return intents[:self.MAX_INTENTS]
+    
     def generate_response(
         self,
         user_query: str,
@@ -174,11 +342,35 @@ Sé preciso y extrae todos los parámetros relevantes. Acepta consultas en espa
             data_summary = data
             total_count = None
             
+            # Consulta con varias intenciones: un resumen compacto por cada parte
+            if intention == self.MULTI_INTENT and isinstance(data, dict) and "resultados" in data:
+                data_summary = [
+                    {
+                        "intencion": part.get("intencion"),
+                        "parametros": part.get("parametros"),
+                        "datos": self._compact_summary(part.get("data"))
+                    }
+                    for part in data["resultados"]
+                ]
+                
+                context_prompt = f"""User Query: "{user_query}"
+
+The question combines several requests. GLPI data retrieved for each one:
+{json.dumps(data_summary, indent=2, ensure_ascii=False, default=str)}
+
+Response Requirements:
+1. Answer EVERY part of the question in a single, well-structured response in Spanish
+2. Use one short section per request, in the order they were asked
+3. If a part has no data ("datos": null), say that information could not be retrieved
+4. Minimal emoji use (max 2-3 total)
+5. Keep a professional business tone"""
+            
             # CASO ESPECIAL: Si hay estadísticas, usar SOLO las estadísticas
-            if isinstance(data, dict) and "stats" in data and data.get("stats"):
+            elif isinstance(data, dict) and "stats" in data and data.get("stats"):
                 total_count = data.get("total", 0)
                 showing_count = data.get("showing", 0)
                 stats = data["stats"]
+                data_summary = {"total": total_count, "showing": showing_count, "stats": stats}
                 
                 logger.info(f"📊 Generando respuesta con estadísticas: {showing_count}/{total_count} tickets")
                 
@@ -284,8 +476,20 @@ GLPI Data Retrieved:
 
 Provide a clear, professional response in Spanish."""
 
-            response = self.client.chat.completions.create(
-                model=self.model,
+            # Misma intención, consulta y datos resumidos => mismo texto
+            self.last_response_cached = False
+            cache_key = None
+            if self.response_cache is not None:
+                cache_key = self.response_cache.make_key(intention, user_query, data_summary)
+                cached = self.response_cache.get(cache_key)
+                if cached is not None:
+                    logger.info(f"⚡ Respuesta servida desde caché ({intention})")
+                    self.last_response_cached = True
+                    return cached
+
+            response = self._complete(
+                "generate_response",
+                model=self.generator_model,
                 messages=[
                     {"role": "system", "content": "You are a professional GLPI assistant providing clear, accurate, and business-appropriate information. Keep responses concise and well-structured."},
                     {"role": "user", "content": context_prompt}
@@ -294,8 +498,13 @@ Provide a clear, professional response in Spanish."""
                 max_tokens=800
             )
             
-            return response.choices[0].message.content
+            text = response.choices[0].message.content
+            if cache_key is not None and text:
+                self.response_cache.set(cache_key, text)
+            return text
             
+        except LLMSaturatedError:
+            raise
         except Exception as e:
             logger.error(f"❌ Error al generar respuesta: {e}")
             return "Lo siento, hubo un error al procesar la información."
@@ -326,8 +535,9 @@ Provide a clear, professional response in Spanish."""
             
             messages.append({"role": "user", "content": user_query})
             
-            response = self.client.chat.completions.create(
-                model=self.model,
+            response = self._complete(
+                "chat",
+                model=self.chat_model,
                 messages=messages,
                 temperature=0.7,
                 max_tokens=500
@@ -335,10 +545,159 @@ Provide a clear, professional response in Spanish."""
             
             return response.choices[0].message.content
             
+        except LLMSaturatedError:
+            raise
         except Exception as e:
             logger.error(f"❌ Error en chat: {e}")
             return "Lo siento, hubo un error al procesar tu mensaje."
     
+    def ping(self, timeout: float = 5.0) -> bool:
+        """
+        Comprueba que Groq responde listando los modelos
+        
+        No genera texto ni ocupa un turno en la cola de LLM: sirve para
+        sondas de salud aunque la cola esté llena de consultas.
+        
+        Args:
+            timeout: Tiempo máximo de la petición, en segundos
+            
+        Returns:
+            True si Groq respondió
+        """
+        try:
+            self.client.with_options(timeout=timeout, max_retries=0).models.list()
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ Groq no responde: {e}")
+            return False
+    
+    def consume_usage(self) -> List[LLMCallUsage]:
+        """
+        Devuelve el uso acumulado desde la última lectura y lo reinicia
+        
+        Returns:
+            Lista de llamadas al LLM con tokens y latencia
+        """
+        calls, self.usage = self.usage, []
+        return calls
+    
+    def _complete(self, operation: str, model: Optional[str] = None, **kwargs) -> Any:
+        """
+        Ejecuta una llamada de chat completion registrando tokens y latencia
+        
+        Args:
+            operation: Nombre de la operación (understand_query, generate_response, chat)
+            model: Modelo a usar (por defecto el modelo grande)
+            **kwargs: Argumentos para chat.completions.create
+            
+        Returns:
+            Respuesta de Groq
+            
+        Raises:
+            LLMSaturatedError: Si la cola está saturada o Groq limita la tasa
+        """
+        model = model or self.model
+        if self.dispatcher is None:
+            return self._call_llm(operation, model, **kwargs)
+        
+        estimated = self._estimate_tokens(kwargs)
+        with self.dispatcher.slot(self.priority, estimated) as reservation:
+            response = self._call_llm(operation, model, **kwargs)
+            # Del propio response: `self.usage` puede haberse consumido desde otro hilo
+            used = LLMCallUsage.from_response(operation, model, response, 0.0).total_tokens
+            self.dispatcher.settle(reservation, used or estimated)
+            return response
+    
+    def _call_llm(self, operation: str, model: str, **kwargs) -> Any:
+        """Llamada directa a Groq, traduciendo los errores de capacidad"""
+        started = time.perf_counter()
+        try:
+            response = self.client.chat.completions.create(model=model, **kwargs)
+        except APIStatusError as e:
+            status_code = getattr(e, "status_code", None)
+            if status_code not in (429, 503):
+                raise
+            retry_after = float(e.response.headers.get("retry-after", 5) or 5)
+            logger.warning(f"⚠️ Groq sin capacidad ({status_code}) en {operation}, reintentar en {retry_after}s")
+            raise LLMSaturatedError("Servicio de IA temporalmente saturado", retry_after, status_code=503)
+        latency_ms = (time.perf_counter() - started) * 1000
+        
+        call = LLMCallUsage.from_response(operation, model, response, latency_ms)
+        self.usage.append(call)
+        logger.debug(
+            f"🧮 {operation}: {call.prompt_tokens}+{call.completion_tokens} tokens en {call.latency_ms:.0f} ms"
+        )
+        return response
+    
+    @staticmethod
+    def _estimate_tokens(kwargs: Dict[str, Any]) -> int:
+        """Estimación aproximada (~4 caracteres por token) para reservar presupuesto"""
+        prompt_chars = sum(len(m.get("content") or "") for m in kwargs.get("messages", []))
+        return prompt_chars // 4 + kwargs.get("max_tokens", 0)
+    
+    def _compact_summary(self, data: Any) -> Any:
+        """Versión reducida de unos datos de GLPI para incluir en un prompt combinado"""
+        if isinstance(data, dict) and data.get("stats"):
+            return {"total": data.get("total", 0), "stats": data["stats"]}
+        if isinstance(data, dict) and isinstance(data.get("tickets"), list):
+            return {"total": data.get("total", 0), "primeros_5_tickets": data["tickets"][:5]}
+        if isinstance(data, list) and len(data) > 5:
+            return {"total": len(data), "primeros_5": data[:5]}
+        return data
+    
+    def template_response(self, data: Any, intention: str) -> str:
+        """
+        Respuesta de plantilla (sin LLM) cuando la generación no llega a tiempo
+        
+        Args:
+            data: Datos obtenidos de GLPI
+            intention: Intención identificada
+            
+        Returns:
+            Resumen breve construido directamente a partir de los datos
+        """
+        if intention == self.MULTI_INTENT and isinstance(data, dict) and "resultados" in data:
+            return "\n\n".join(
+                self.template_response(part.get("data"), part.get("intencion"))
+                if part.get("data") is not None else "No fue posible obtener los datos de esta parte de la consulta."
+                for part in data["resultados"]
+            )
+        if isinstance(data, dict) and data.get("tipo") == "tendencia":
+            totals, resolve = data["totals"], data["time_to_resolve"]
+            text = (
+                f"Entre {data['date_from']} y {data['date_to']} se abrieron {totals['opened']} tickets, "
+                f"se resolvieron {totals['solved']} y se cerraron {totals['closed']}. "
+                f"El backlog pasó de {data['backlog_start']} a {data['backlog_end']} tickets."
+            )
+            if resolve.get("mean_hours") is not None:
+                text += f" Tiempo de resolución: media {resolve['mean_hours']} h, mediana {resolve['median_hours']} h."
+            return text
+        if isinstance(data, dict) and data.get("stats"):
+            total = data.get("total", 0)
+            return (
+                f"Hay {total} tickets en el sistema. Distribución por estado:\n"
+                f"{self._format_stats_section(data['stats'].get('por_estado', {}))}"
+            )
+        if isinstance(data, dict) and isinstance(data.get("tickets"), list):
+            lines = [f"  • #{t.get('id')} {t.get('name', '')}" for t in data["tickets"][:10]]
+            return f"Se encontraron {data.get('total', len(data['tickets']))} tickets:\n" + "\n".join(lines)
+        if isinstance(data, dict) and isinstance(data.get("equipos"), list):
+            if not data["equipos"]:
+                return "No se encontró ningún equipo que coincida con la búsqueda."
+            lines = [
+                f"  • {e.get('name')} ({e.get('manufacturer') or 'sin fabricante'} {e.get('model') or ''}".rstrip()
+                + f") - serie {e.get('serial_number') or 'N/D'}, {e.get('location') or 'sin ubicación'}"
+                for e in data["equipos"][:10]
+            ]
+            return f"Se encontraron {data['total']} equipos:\n" + "\n".join(lines)
+        if isinstance(data, dict) and data.get("id") is not None:
+            return f"Ticket #{data.get('id')}: {data.get('name', '')}"
+        if isinstance(data, list):
+            return f"Se encontraron {len(data)} resultados para tu consulta."
+        if intention == "consulta_general":
+            return "No pude generar una respuesta a tiempo. Por favor, intenta de nuevo."
+        return "Se obtuvieron los datos solicitados, pero no fue posible redactar el resumen a tiempo."
+    
     def _format_stats_section(self, stats_dict: Dict[str, int]) -> str:
         """Format statistics section in a professional, readable way."""
         if not stats_dict:
@@ -0,0 +1,212 @@
+"""
+Despachador de llamadas al LLM: limita la concurrencia global, aplica un
+presupuesto de tokens por minuto, prioriza las consultas interactivas y
+rechaza rápidamente cuando la cola está saturada.
+"""
+
+from collections import deque
+from contextlib import contextmanager
+from enum import IntEnum
+from itertools import count
+from threading import Condition
+from typing import Deque, Dict, Iterator, List, Any
+import heapq
+import math
+import time
+
+
+class LLMPriority(IntEnum):
+    """Carriles de prioridad (menor valor = se atiende antes)"""
+
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+class LLMSaturatedError(Exception):
+    """El LLM no puede atender la llamada ahora; el cliente debe reintentar"""
+
+    def __init__(self, message: str, retry_after: float, status_code: int = 429):
+        super().__init__(message)
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.status_code = status_code
+
+
+class LLMDispatcher:
+    """Cola con prioridad, límite de concurrencia y presupuesto de tokens/minuto"""
+
+    WINDOW_SECONDS = 60.0
+
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        tokens_per_minute: int = 0,
+        max_queue_size: int = 32,
+        max_wait_seconds: float = 10.0
+    ):
+        """
+        Inicializa el despachador
+
+        Args:
+            max_concurrency: Llamadas simultáneas permitidas hacia el LLM
+            tokens_per_minute: Presupuesto de tokens por minuto (0 = sin límite)
+            max_queue_size: Llamadas en espera antes de rechazar con 429
+            max_wait_seconds: Tiempo máximo de espera en cola
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.tokens_per_minute = tokens_per_minute
+        self.max_queue_size = max_queue_size
+        self.max_wait_seconds = max_wait_seconds
+
+        self._cond = Condition()
+        self._queue: List[tuple] = []
+        self._seq = count()
+        self._in_flight = 0
+        self._window: Deque[List[float]] = deque()
+
+        self._wait_samples: Deque[float] = deque(maxlen=1000)
+        self._service_samples: Deque[float] = deque(maxlen=200)
+        self._dispatched = 0
+        self._rejected = 0
+        self._timed_out = 0
+
+    @contextmanager
+    def slot(self, priority: LLMPriority = LLMPriority.INTERACTIVE, estimated_tokens: int = 0) -> Iterator[List[float]]:
+        """
+        Reserva un turno para llamar al LLM
+
+        Args:
+            priority: Carril de prioridad
+            estimated_tokens: Tokens estimados (se reservan en el presupuesto)
+
+        Yields:
+            Reserva del presupuesto (ajustar con `settle` al conocer el uso real)
+
+        Raises:
+            LLMSaturatedError: Si la cola está llena o se agotó el tiempo de espera
+        """
+        reservation = self._acquire(priority, estimated_tokens)
+        started = time.monotonic()
+        try:
+            yield reservation
+        finally:
+            self._release(time.monotonic() - started)
+
+    def _acquire(self, priority: LLMPriority, estimated_tokens: int) -> List[float]:
+        """Espera turno en la cola y reserva tokens del presupuesto"""
+        enqueued = time.monotonic()
+        deadline = enqueued + self.max_wait_seconds
+
+        with self._cond:
+            if len(self._queue) >= self.max_queue_size:
+                self._rejected += 1
+                raise LLMSaturatedError("Cola de LLM saturada", self._estimate_retry_after())
+
+            entry = (int(priority), next(self._seq))
+            heapq.heappush(self._queue, entry)
+
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._expire_window(now)
+
+                    if self._queue[0] == entry and self._in_flight < self.max_concurrency:
+                        budget_wait = self._budget_wait(estimated_tokens, now)
+                        if budget_wait == 0:
+                            break
+                    else:
+                        budget_wait = None
+
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._timed_out += 1
+                        raise LLMSaturatedError(
+                            "Tiempo de espera agotado en la cola de LLM",
+                            budget_wait or self._estimate_retry_after()
+                        )
+                    self._cond.wait(min(remaining, budget_wait) if budget_wait else remaining)
+            except BaseException:
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                self._cond.notify_all()
+                raise
+
+            heapq.heappop(self._queue)
+            self._in_flight += 1
+            self._dispatched += 1
+            reservation = [now, float(estimated_tokens)]
+            self._window.append(reservation)
+            self._wait_samples.append(now - enqueued)
+            self._cond.notify_all()
+            return reservation
+
+    def settle(self, reservation: List[float], actual_tokens: int) -> None:
+        """Sustituye la estimación reservada por los tokens realmente consumidos"""
+        with self._cond:
+            reservation[1] = float(actual_tokens)
+            self._cond.notify_all()
+
+    def _release(self, service_seconds: float) -> None:
+        """Libera el turno y despierta a los que esperan"""
+        with self._cond:
+            self._in_flight -= 1
+            self._service_samples.append(service_seconds)
+            self._cond.notify_all()
+
+    def _expire_window(self, now: float) -> None:
+        """Descarta del presupuesto las reservas con más de un minuto"""
+        while self._window and now - self._window[0][0] >= self.WINDOW_SECONDS:
+            self._window.popleft()
+
+    def _budget_wait(self, estimated_tokens: int, now: float) -> float:
+        """Segundos hasta que el presupuesto admita la llamada (0 = ya)"""
+        if self.tokens_per_minute <= 0 or not self._window:
+            return 0
+        if self._window_tokens() + estimated_tokens <= self.tokens_per_minute:
+            return 0
+        return max(0.05, self._window[0][0] + self.WINDOW_SECONDS - now)
+
+    def _window_tokens(self) -> int:
+        """Tokens reservados o consumidos en el último minuto"""
+        return int(sum(tokens for _, tokens in self._window))
+
+    def _estimate_retry_after(self) -> float:
+        """Estimación de cuándo se liberará la cola"""
+        avg_service = (
+            sum(self._service_samples) / len(self._service_samples)
+            if self._service_samples else 2.0
+        )
+        return avg_service * (len(self._queue) / self.max_concurrency + 1)
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Métricas de la cola: ocupación, presupuesto y tiempos de espera
+
+        Returns:
+            Diccionario serializable con las métricas actuales
+        """
+        with self._cond:
+            self._expire_window(time.monotonic())
+            waits = sorted(self._wait_samples)
+
+            def percentile(p: float) -> float:
+                if not waits:
+                    return 0.0
+                return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 2)
+
+            return {
+                "in_flight": self._in_flight,
+                "queued": len(self._queue),
+                "max_concurrency": self.max_concurrency,
+                "max_queue_size": self.max_queue_size,
+                "tokens_last_minute": self._window_tokens(),
+                "tokens_per_minute": self.tokens_per_minute,
+                "dispatched": self._dispatched,
+                "rejected": self._rejected,
+                "timed_out": self._timed_out,
+                "queue_wait_ms": {
+                    "avg": round(sum(waits) / len(waits) * 1000, 2) if waits else 0.0,
+                    "p50": percentile(0.50),
+                    "p95": percentile(0.95),
+                    "max": round(waits[-1] * 1000, 2) if waits else 0.0
+                }
+            }
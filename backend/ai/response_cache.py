@@ -0,0 +1,93 @@
+"""
+Caché de respuestas narrativas del LLM, indexada por intención, consulta
+normalizada y una huella estable de los datos resumidos.
+"""
+
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple
+import hashlib
+import json
+import re
+import time
+import unicodedata
+
+
+_NON_WORD_RE = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_query(query: str) -> str:
+    """Minúsculas, sin acentos ni signos, espacios colapsados"""
+    folded = unicodedata.normalize("NFKD", query.lower())
+    folded = "".join(c for c in folded if not unicodedata.combining(c))
+    return _NON_WORD_RE.sub(" ", folded).strip()
+
+
+def fingerprint(data: Any) -> str:
+    """Hash estable (independiente del orden de claves) de los datos enviados al LLM"""
+    payload = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Caché LRU con TTL para textos generados"""
+
+    def __init__(self, ttl_seconds: float = 180, max_entries: int = 256):
+        """
+        Inicializa la caché
+
+        Args:
+            ttl_seconds: Vida de cada entrada (0 = caché desactivada)
+            max_entries: Máximo de entradas antes de descartar las menos usadas
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str, str], Tuple[float, str]]" = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(intention: str, user_query: str, data_summary: Any) -> Tuple[str, str, str]:
+        """Construye la clave (intención, consulta normalizada, huella de datos)"""
+        return (intention or "", normalize_query(user_query), fingerprint(data_summary))
+
+    def get(self, key: Tuple[str, str, str]) -> Optional[str]:
+        """Devuelve el texto cacheado si existe y no ha expirado"""
+        if self.ttl_seconds <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Tuple[str, str, str], text: str) -> None:
+        """Guarda un texto generado"""
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, text)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Vacía la caché"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Entradas y tasa de aciertos"""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0
+        }
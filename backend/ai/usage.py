@@ -0,0 +1,107 @@
+"""
+Contabilidad de uso de LLM: tokens y latencia por llamada, y contadores
+en memoria por usuario y día para aplicar cuotas sin consultar la BD.
+"""
+
+from dataclasses import dataclass, asdict
+from datetime import date
+from threading import Lock
+from typing import Dict, List, Optional, Tuple, Any
+
+
+@dataclass
+class LLMCallUsage:
+    """Uso de una llamada individual al LLM"""
+
+    operation: str
+    model: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latency_ms: float = 0.0
+
+    @property
+    def total_tokens(self) -> int:
+        """Tokens totales consumidos por la llamada"""
+        return self.prompt_tokens + self.completion_tokens
+
+    @classmethod
+    def from_response(cls, operation: str, model: str, response: Any, latency_ms: float) -> "LLMCallUsage":
+        """Construye el registro a partir del campo `usage` de una respuesta de Groq"""
+        usage = getattr(response, "usage", None)
+        return cls(
+            operation=operation,
+            model=model,
+            prompt_tokens=int(getattr(usage, "prompt_tokens", 0) or 0),
+            completion_tokens=int(getattr(usage, "completion_tokens", 0) or 0),
+            latency_ms=round(latency_ms, 2)
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convierte el registro a diccionario"""
+        result = asdict(self)
+        result["total_tokens"] = self.total_tokens
+        return result
+
+
+def summarize_usage(calls: List[LLMCallUsage]) -> Dict[str, Any]:
+    """
+    Agrega una lista de llamadas en un resumen serializable
+
+    Args:
+        calls: Llamadas realizadas durante una petición
+
+    Returns:
+        Diccionario con totales y el detalle por llamada
+    """
+    prompt_tokens = sum(c.prompt_tokens for c in calls)
+    completion_tokens = sum(c.completion_tokens for c in calls)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "latency_ms": round(sum(c.latency_ms for c in calls), 2),
+        "calls": [c.to_dict() for c in calls]
+    }
+
+
+class UsageMeter:
+    """Contadores de tokens por usuario y día, mantenidos en memoria"""
+
+    def __init__(self):
+        self._counters: Dict[Tuple[int, date], int] = {}
+        self._lock = Lock()
+
+    def is_loaded(self, user_id: int, day: Optional[date] = None) -> bool:
+        """Indica si ya existe un contador para el usuario en el día dado"""
+        return (user_id, day or date.today()) in self._counters
+
+    def load(self, user_id: int, tokens: int, day: Optional[date] = None) -> None:
+        """Inicializa el contador (p. ej. desde la tabla de agregados tras un reinicio)"""
+        with self._lock:
+            self._counters.setdefault((user_id, day or date.today()), int(tokens))
+
+    def add(self, user_id: int, tokens: int, day: Optional[date] = None) -> int:
+        """Suma tokens al contador del usuario y devuelve el total del día"""
+        key = (user_id, day or date.today())
+        with self._lock:
+            self._prune(key[1])
+            self._counters[key] = self._counters.get(key, 0) + int(tokens)
+            return self._counters[key]
+
+    def get(self, user_id: int, day: Optional[date] = None) -> int:
+        """Tokens consumidos por el usuario en el día"""
+        return self._counters.get((user_id, day or date.today()), 0)
+
+    def has_quota(self, user_id: int, daily_quota: int) -> bool:
+        """Comprueba si el usuario aún tiene cuota (0 = sin límite)"""
+        return daily_quota <= 0 or self.get(user_id) < daily_quota
+
+    def _prune(self, today: date) -> None:
+        """Descarta contadores de días anteriores"""
+        stale = [key for key in self._counters if key[1] < today]
+        for key in stale:
+            del self._counters[key]
+
+
+# Instancia global compartida por todas las peticiones del proceso
+usage_meter = UsageMeter()
@@ -5,11 +5,16 @@ from fastapi import APIRouter, Depends, HTTPException, status, Header
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel
-from datetime import datetime, timezone
+from datetime import datetime
 
 from auth.database import get_db
 from auth.models import Conversation, Message, MessageRole, User, AuditLog
 from auth.jwt_auth import get_current_user as get_current_user_jwt
+from services.conversation_service import add_conversation_message
+from services.dashboard_stats import dashboard_stats_cache
+from services.user_stats import (
+    record_conversation_archived, record_conversation_created, record_conversation_deleted
+)
 
 router = APIRouter(prefix="/api/v1/conversations", tags=["conversations"])
 
@@ -28,6 +33,9 @@ class MessageResponse(BaseModel):
     content: str
     created_at: datetime
     tokens_used: int
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    latency_ms: Optional[float] = None
 
     class Config:
         from_attributes = True
@@ -123,8 +131,10 @@ def create_conversation(
             title=conversation_data.title
         )
         db.add(conversation)
+        record_conversation_created(db, current_user.id)
         db.commit()
         db.refresh(conversation)
+        dashboard_stats_cache.on_conversation_created(current_user.id)
         
         # Log action
         audit = AuditLog(
@@ -222,7 +232,10 @@ def get_conversation(
             role=msg.role.value,
             content=msg.content,
             created_at=msg.created_at,
-            tokens_used=msg.tokens_used or 0
+            tokens_used=msg.tokens_used or 0,
+            prompt_tokens=msg.prompt_tokens,
+            completion_tokens=msg.completion_tokens,
+            latency_ms=msg.latency_ms
         ) for msg in messages]
     )
 
@@ -249,26 +262,19 @@ def add_message(
                 detail=MSG_CONVERSATION_NOT_FOUND
             )
         
-        # Create message
-        message = Message(
-            conversation_id=conversation_id,
-            role=MessageRole(message_data.role),
-            content=message_data.content
-        )
-        db.add(message)
-        
-        # Update conversation timestamp
-        conversation.updated_at = datetime.now(timezone.utc)
-        
-        db.commit()
-        db.refresh(message)
+        # LLM usage is never taken from the client: /query and /chat store
+        # the assistant reply with its measured usage when given a conversation_id
+        message = add_conversation_message(db, conversation, MessageRole(message_data.role), message_data.content)
         
         return MessageResponse(
             id=message.id,
             role=message.role.value,
             content=message.content,
             created_at=message.created_at,
-            tokens_used=message.tokens_used or 0
+            tokens_used=message.tokens_used or 0,
+            prompt_tokens=message.prompt_tokens,
+            completion_tokens=message.completion_tokens,
+            latency_ms=message.latency_ms
         )
     except HTTPException:
         raise
@@ -306,11 +312,16 @@ def update_conversation(
     if update_data.title is not None:
         conversation.title = update_data.title
     
+    archived_changed = update_data.is_archived is not None and update_data.is_archived != conversation.is_archived
     if update_data.is_archived is not None:
         conversation.is_archived = update_data.is_archived
     
+    if archived_changed:
+        record_conversation_archived(db, current_user.id, conversation.is_archived)
     db.commit()
     db.refresh(conversation)
+    if archived_changed:
+        dashboard_stats_cache.on_conversation_archived(current_user.id, conversation.is_archived)
     
     message_count = db.query(Message).filter(Message.conversation_id == conversation.id).count()
     
@@ -352,7 +363,9 @@ def delete_conversation(
     )
     db.add(audit)
     
+    record_conversation_deleted(db, conversation)
     db.delete(conversation)
     db.commit()
+    dashboard_stats_cache.on_conversation_deleted(current_user.id)
     
     return None
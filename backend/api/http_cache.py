@@ -0,0 +1,67 @@
+"""
+Validación condicional (ETag / If-None-Match) para los endpoints que la app
+consulta periódicamente.
+
+El ETag se obtiene del contador de versión de datos cuando existe un espejo
+local (no hace falta construir ni serializar la respuesta para contestar 304),
+o de un hash del cuerpo ya serializado en caso contrario.
+"""
+
+from typing import Any, Optional
+import hashlib
+import json
+import uuid
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+
+
+# Obliga al cliente a revalidar siempre, pero le permite reutilizar su copia
+CACHE_CONTROL = "private, no-cache"
+
+# Distinto en cada proceso: un contador de versión reiniciado o de otro worker no repite ETags
+_PROCESS_EPOCH = uuid.uuid4().hex
+
+
+def make_etag(*parts: Any) -> str:
+    """ETag fuerte a partir de una versión de datos y los parámetros de la petición"""
+    digest = hashlib.sha256(json.dumps([_PROCESS_EPOCH, *parts], sort_keys=True, default=str).encode("utf-8"))
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Comprueba If-None-Match (lista separada por comas, * o etiquetas débiles)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in candidates
+
+
+def not_modified(etag: str) -> Response:
+    """Respuesta 304 sin cuerpo"""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+def json_response(payload: Any, if_none_match: Optional[str] = None, etag: Optional[str] = None) -> Response:
+    """
+    Serializa la respuesta con su ETag (o 304 si el cliente ya la tiene)
+
+    Args:
+        payload: Datos de la respuesta
+        if_none_match: Cabecera If-None-Match de la petición
+        etag: ETag ya calculado por versión; si falta, se usa el hash del cuerpo
+    """
+    body = json.dumps(
+        jsonable_encoder(payload), ensure_ascii=False, separators=(",", ":"), allow_nan=False
+    ).encode("utf-8")
+    if etag is None:
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    )
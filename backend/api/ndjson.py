@@ -0,0 +1,105 @@
+"""
+Respuestas NDJSON (un objeto JSON por línea) para los listados grandes.
+
+Los registros se convierten y se escriben lote a lote a medida que llegan
+(p. ej. página a página desde GLPI), sin construir la lista completa ni el
+cuerpo entero en memoria: el primer byte sale con el primer lote y la
+memoria máxima depende del tamaño del lote, no del total de resultados.
+"""
+
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+import json
+
+from fastapi.responses import StreamingResponse
+from loguru import logger
+
+from api.http_cache import CACHE_CONTROL
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Registros por fragmento al recorrer listas que ya están en memoria
+BATCH_SIZE = 500
+
+
+def wants_ndjson(accept: Optional[str]) -> bool:
+    """Comprueba si la cabecera Accept pide application/x-ndjson (con q > 0)"""
+    if not accept:
+        return False
+    for media_range in accept.split(","):
+        media_type, *params = (part.strip() for part in media_range.split(";"))
+        if media_type.lower() != NDJSON_MEDIA_TYPE:
+            continue
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    return float(value) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
+
+
+def batched(records: Iterable[Any], size: int = BATCH_SIZE) -> Iterator[List[Any]]:
+    """Agrupa un iterable en listas de `size` elementos"""
+    iterator = iter(records)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def encode_line(record: Dict[str, Any]) -> bytes:
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8") + b"\n"
+
+
+def ndjson_lines(
+    batches: Iterable[Iterable[Dict[str, Any]]],
+    map_record: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+    on_close: Optional[Callable[[], Any]] = None
+) -> Iterator[bytes]:
+    """
+    Codifica cada lote como un fragmento de líneas JSON
+
+    Si la fuente falla a mitad de la respuesta (el estado HTTP ya se envió),
+    la última línea es {"error": "..."} para que el cliente sepa que el
+    listado está incompleto.
+    """
+    try:
+        for batch in batches:
+            if map_record is not None:
+                batch = map(map_record, batch)
+            chunk = b"".join(encode_line(record) for record in batch)
+            if chunk:
+                yield chunk
+    except Exception as e:
+        logger.error(f"❌ Error generando respuesta NDJSON: {e}")
+        yield encode_line({"error": str(e)})
+    finally:
+        if on_close is not None:
+            on_close()
+
+
+def ndjson_response(
+    batches: Iterable[Iterable[Dict[str, Any]]],
+    map_record: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+    etag: Optional[str] = None,
+    total: Optional[int] = None,
+    on_close: Optional[Callable[[], Any]] = None
+) -> StreamingResponse:
+    """
+    Respuesta NDJSON en streaming
+
+    Args:
+        batches: Lotes de registros (una página de GLPI, o trozos de una lista en memoria)
+        map_record: Conversión de cada registro antes de codificarlo
+        etag: ETag por versión de datos, si la fuente lo tiene
+        total: Número total de registros, si se conoce de antemano (X-Total-Count)
+        on_close: Se llama al terminar o cortarse la respuesta (p. ej. cerrar la sesión de GLPI)
+    """
+    headers = {"Cache-Control": CACHE_CONTROL, "Vary": "Accept", "X-Accel-Buffering": "no"}
+    if etag is not None:
+        headers["ETag"] = etag
+    if total is not None:
+        headers["X-Total-Count"] = str(total)
+    return StreamingResponse(ndjson_lines(batches, map_record, on_close), media_type=NDJSON_MEDIA_TYPE, headers=headers)
@@ -0,0 +1,173 @@
+"""
+Reports Routes - Exportación de reportes completos de GLPI (CSV / XLSX)
+"""
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Header, Query, status
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from sqlalchemy.orm import Session
+from typing import Optional
+from datetime import date, datetime
+from loguru import logger
+
+from auth.database import get_db
+from auth.models import User
+from auth.jwt_auth import get_current_user as get_current_user_jwt
+from integrations.glpi_client import GLPIClient
+from services.report_export import REPORT_TYPES, resolve_columns, iter_report_rows, stream_csv, stream_xlsx
+from services.report_scheduler import REPORT_DEFINITIONS, get_latest_report, report_scheduler
+from config import settings
+
+router = APIRouter(prefix="/api/v1/reports", tags=["reports"])
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def get_current_user(
+    authorization: str = Header(None),
+    db: Session = Depends(get_db)
+) -> User:
+    """Get current authenticated user from Bearer token"""
+    if not authorization:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated"
+        )
+
+    try:
+        scheme, token = authorization.split()
+        if scheme.lower() != "bearer":
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid authentication scheme"
+            )
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authorization header"
+        )
+
+    user = get_current_user_jwt(db, token)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token"
+        )
+
+    return user
+
+
+@router.get("/export")
+def export_report(
+    type: str = Query("tickets", description="Tipo de reporte: tickets o inventario"),
+    format: str = Query("csv", description="Formato: csv o xlsx"),
+    columns: Optional[str] = Query(None, description="Columnas separadas por comas (por defecto las principales)"),
+    date_from: Optional[date] = Query(None, description="Fecha mínima (YYYY-MM-DD)"),
+    date_to: Optional[date] = Query(None, description="Fecha máxima (YYYY-MM-DD)"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Exporta un reporte completo de tickets o inventario
+
+    El archivo se genera en streaming mientras se recorren las páginas de GLPI,
+    por lo que el consumo de memoria no depende del número de filas. El
+    inventario incluye todos los tipos de activo (computadoras, monitores,
+    impresoras, equipos de red, teléfonos y periféricos).
+    """
+    if format not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Formato no soportado: {format}")
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from no puede ser posterior a date_to")
+
+    try:
+        selected = resolve_columns(type, columns)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    available = REPORT_TYPES[type][1]
+    header = [available[column][0] for column in selected]
+
+    glpi = GLPIClient(
+        url=settings.glpi_url,
+        app_token=settings.glpi_app_token,
+        user_token=settings.glpi_user_token
+    )
+    rows = iter_report_rows(glpi, type, selected, date_from, date_to)
+    body = stream_csv(header, rows) if format == "csv" else stream_xlsx(header, rows, sheet_name=type.capitalize())
+
+    filename = f"reporte_{type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{format}"
+    logger.info(f"📤 Exportando {type} en {format} para {current_user.username} (columnas: {','.join(selected)})")
+
+    # La sesión de GLPI se cierra al terminar la respuesta aunque el cliente se vaya
+    # antes de leer el cuerpo (el generador solo la cierra si llega a recorrerse)
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        background=BackgroundTask(glpi.kill_session)
+    )
+
+
+@router.get("/materialized")
+def list_materialized_reports(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Reportes programados con su última versión materializada"""
+    reports = []
+    for key, definition in REPORT_DEFINITIONS.items():
+        latest = get_latest_report(db, key)
+        reports.append({
+            "key": key,
+            "description": definition.description,
+            "report_type": definition.report_type,
+            "period_days": definition.period_days,
+            "refresh_minutes": definition.refresh_minutes,
+            "latest_version": latest.version if latest else None,
+            "computed_at": latest.computed_at.isoformat() if latest and latest.computed_at else None,
+            "duration_ms": latest.duration_ms if latest else None
+        })
+    return {"reports": reports}
+
+
+@router.get("/materialized/{report_key}")
+def get_materialized_report(
+    report_key: str,
+    version: Optional[int] = Query(None, ge=1, description="Versión concreta (por defecto la última)"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Sirve la última versión materializada de un reporte (sin consultar GLPI)"""
+    if report_key not in REPORT_DEFINITIONS:
+        raise HTTPException(status_code=404, detail=f"Reporte no definido: {report_key}")
+
+    report = get_latest_report(db, report_key, version=version)
+    if report is None:
+        raise HTTPException(status_code=404, detail="El reporte aún no se ha calculado")
+
+    return {
+        "key": report.report_key,
+        "version": report.version,
+        "computed_at": report.computed_at.isoformat() if report.computed_at else None,
+        "duration_ms": report.duration_ms,
+        "params": report.params,
+        "result": report.result
+    }
+
+
+@router.post("/materialized/{report_key}/refresh", status_code=status.HTTP_202_ACCEPTED)
+def refresh_materialized_report(
+    report_key: str,
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_current_user)
+):
+    """Encola el recálculo inmediato de un reporte (solo administradores)"""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Solo administradores")
+    if report_key not in REPORT_DEFINITIONS:
+        raise HTTPException(status_code=404, detail=f"Reporte no definido: {report_key}")
+
+    background_tasks.add_task(report_scheduler.refresh, report_key)
+    return {"key": report_key, "status": "scheduled"}
@@ -2,8 +2,12 @@
 Endpoints de la API REST
 """
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header, Request, status
+from sqlalchemy.orm import Session
+from typing import Optional, Set
 from loguru import logger
+import asyncio
+import time
 
 from api.schemas import (
     QueryRequest,
@@ -15,11 +19,39 @@ from api.schemas import (
 from services.agent_service import AgentService
 from integrations.glpi_client import GLPIClient
 from ai.agent import AIAgent
+from ai.dispatcher import LLMDispatcher, LLMPriority, LLMSaturatedError
+from ai.response_cache import ResponseCache
+from auth.database import get_db, get_db_session
+from auth.models import MessageRole, User
+from auth.jwt_auth import get_current_user as get_current_user_jwt
+from services.conversation_service import add_conversation_message, get_user_conversation
+from services.usage_service import check_token_quota, record_llm_usage
 from config import settings
 
 
 router = APIRouter()
 
+# Cola global de llamadas al LLM (compartida por todas las peticiones)
+llm_dispatcher = LLMDispatcher(
+    max_concurrency=settings.llm_max_concurrency,
+    tokens_per_minute=settings.llm_tokens_per_minute,
+    max_queue_size=settings.llm_max_queue_size,
+    max_wait_seconds=settings.llm_max_queue_wait
+)
+
+# Caché de respuestas generadas (por intención, consulta y huella de datos)
+response_cache = ResponseCache(
+    ttl_seconds=settings.response_cache_ttl_seconds,
+    max_entries=settings.response_cache_max_entries
+)
+
+
+# Plazo de cada sonda de /health (GLPI y Groq), en segundos
+HEALTH_PROBE_TIMEOUT = 5.0
+
+# Tareas que recogen el uso de LLM de etapas abandonadas (referencia hasta que terminen)
+_late_usage_tasks: Set[asyncio.Task] = set()
+
 
 # Dependencias
 def get_glpi_client() -> GLPIClient:
@@ -31,26 +63,165 @@ def get_glpi_client() -> GLPIClient:
     )
 
 
-def get_ai_agent():
-    """Obtiene una instancia del agente de IA con Groq"""
+def build_ai_agent(priority: LLMPriority) -> AIAgent:
+    """Crea un agente de IA con Groq cuyas llamadas van por el carril indicado"""
     return AIAgent(
         groq_api_key=settings.groq_api_key,
-        groq_model=settings.groq_model
+        groq_model=settings.groq_model,
+        dispatcher=llm_dispatcher,
+        priority=priority,
+        classifier_model=settings.groq_classifier_model,
+        generator_model=settings.groq_generator_model,
+        chat_model=settings.groq_chat_model,
+        classifier_min_confidence=settings.classifier_min_confidence,
+        response_cache=response_cache,
+        base_url=settings.groq_base_url,
+        request_timeout=max(settings.classify_timeout_seconds, settings.generate_timeout_seconds)
     )
 
 
+def get_ai_agent() -> AIAgent:
+    """Obtiene una instancia del agente de IA para peticiones de usuario"""
+    return build_ai_agent(LLMPriority.INTERACTIVE)
+
+
 def get_agent_service(
     glpi_client: GLPIClient = Depends(get_glpi_client),
     ai_agent: AIAgent = Depends(get_ai_agent)
 ) -> AgentService:
     """Crea una instancia del servicio de agente"""
-    return AgentService(glpi_client, ai_agent)
+    return AgentService(
+        glpi_client,
+        ai_agent,
+        query_timeout=settings.query_timeout_seconds,
+        classify_timeout=settings.classify_timeout_seconds,
+        glpi_timeout=settings.glpi_timeout_seconds,
+        generate_timeout=settings.generate_timeout_seconds
+    )
+
+
+def saturated_exception(error: LLMSaturatedError) -> HTTPException:
+    """Convierte la saturación del LLM en un 429/503 con Retry-After"""
+    return HTTPException(
+        status_code=error.status_code,
+        detail=str(error),
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
+
+async def run_until_disconnected(http_request: Request, coro, poll_seconds: float = 0.5):
+    """
+    Ejecuta una corrutina y la cancela si el cliente cierra la conexión
+    
+    Raises:
+        HTTPException: 499 si el cliente se desconectó antes de terminar
+    """
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_seconds)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                task.cancel()
+                logger.info("🔌 Cliente desconectado, consulta cancelada")
+                raise HTTPException(status_code=499, detail="Cliente desconectado")
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+def record_late_usage(agent_service: AgentService, user_id: int, intent: Optional[str]) -> None:
+    """
+    Registra en segundo plano el uso de LLM que llega después de responder
+    
+    Una etapa que vence o se cancela sigue en su hilo hasta que Groq responde;
+    sus tokens se suman al agregado del usuario cuando termina.
+    """
+    if not agent_service.has_abandoned_stages:
+        return
+    
+    async def run():
+        usage = await agent_service.consume_late_usage(
+            timeout=max(settings.classify_timeout_seconds, settings.generate_timeout_seconds)
+        )
+        if usage.get("calls"):
+            logger.info(f"🧮 Uso de LLM tardío registrado: {usage['total_tokens']} tokens ({intent})")
+            with get_db_session() as db:
+                await asyncio.to_thread(record_llm_usage, db, user_id, intent, usage, False)
+    
+    task = asyncio.create_task(run())
+    _late_usage_tasks.add(task)
+    task.add_done_callback(_late_usage_tasks.discard)
+
+
+def get_optional_user(authorization: Optional[str], db: Session) -> Optional[User]:
+    """Obtiene el usuario autenticado si se envió un Bearer token válido"""
+    if not authorization:
+        return None
+    
+    try:
+        scheme, token = authorization.split()
+        if scheme.lower() != "bearer":
+            return None
+        return get_current_user_jwt(db, token)
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo resolver el usuario del token: {e}")
+        return None
+
+
+def check_quota(db: Session, user: Optional[User]) -> None:
+    """
+    Aplica la cuota diaria de tokens del usuario (contadores en memoria)
+
+    Raises:
+        HTTPException: 429 si la cuota está agotada
+    """
+    if user and not check_token_quota(db, user.id, settings.llm_daily_token_quota):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Has alcanzado tu cuota diaria de tokens de IA"
+        )
+
+
+def store_assistant_message(
+    db: Session,
+    user: Optional[User],
+    conversation_id: Optional[int],
+    content: str,
+    usage: dict
+) -> Optional[int]:
+    """
+    Guarda la respuesta en la conversación del usuario con el uso medido aquí
+
+    Los tokens de los mensajes (y de user_stats) salen solo del resultado de
+    la petición, nunca de lo que envía el cliente. Un fallo al guardar no
+    impide devolver la respuesta.
+
+    Returns:
+        ID del mensaje guardado, o None si no se guardó
+    """
+    if not user or conversation_id is None:
+        return None
+    try:
+        conversation = get_user_conversation(db, user.id, conversation_id)
+        if not conversation:
+            logger.warning(f"⚠️ Conversación {conversation_id} no encontrada para el usuario {user.id}")
+            return None
+        return add_conversation_message(db, conversation, MessageRole.assistant, content, usage).id
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ Error guardando la respuesta en la conversación {conversation_id}: {e}")
+        return None
 
 
 @router.post("/query", response_model=QueryResponse, tags=["Agent"])
 async def process_query(
     request: QueryRequest,
-    agent_service: AgentService = Depends(get_agent_service)
+    http_request: Request,
+    agent_service: AgentService = Depends(get_agent_service),
+    authorization: str = Header(None),
+    db: Session = Depends(get_db)
 ):
     """
     Procesa una consulta en lenguaje natural
@@ -64,40 +235,93 @@ async def process_query(
     - "Muéstrame las computadoras del inventario"
     - "Dame un reporte de tickets del mes"
     """
+    user = None
+    intention = "cancelled"
     try:
         logger.info(f"📨 Recibida consulta: {request.query}")
         
-        result = await agent_service.process_query(
-            user_query=request.query,
-            user_id=request.user_id
+        user = get_optional_user(authorization, db)
+        check_quota(db, user)
+        
+        result = await run_until_disconnected(
+            http_request,
+            agent_service.process_query(user_query=request.query, user_id=request.user_id)
         )
         
-        return QueryResponse(**result)
+        # Registrar uso de LLM por usuario, día e intención
+        intention = result.get("intention")
+        usage = result.get("usage") or {}
+        if user and usage.get("calls"):
+            record_llm_usage(db, user.id, intention, usage)
         
+        message_id = store_assistant_message(db, user, request.conversation_id, result.get("message", ""), usage)
+        return QueryResponse(**result, message_id=message_id)
+        
+    except HTTPException:
+        raise
+    except LLMSaturatedError as e:
+        logger.warning(f"⚠️ /query rechazada por saturación del LLM: {e}")
+        usage = agent_service.consume_usage()
+        if user and usage.get("calls"):
+            record_llm_usage(db, user.id, "saturated", usage)
+        raise saturated_exception(e)
     except Exception as e:
         logger.error(f"❌ Error en /query: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if user:
+            record_late_usage(agent_service, user.id, intention)
 
 
 @router.post("/chat", response_model=ChatResponse, tags=["Agent"])
 async def chat(
     request: ChatRequest,
-    agent_service: AgentService = Depends(get_agent_service)
+    agent_service: AgentService = Depends(get_agent_service),
+    authorization: str = Header(None),
+    db: Session = Depends(get_db)
 ):
     """
     Chat simple con el agente (sin consultar GLPI)
     
-    Útil para preguntas generales sobre GLPI o el sistema.
+    Útil para preguntas generales sobre GLPI o el sistema. Con usuario
+    autenticado cuenta para su cuota y su uso diario, igual que /query.
     """
+    user = None
     try:
-        response = agent_service.chat_simple(request.message)
-        return ChatResponse(response=response)
+        user = get_optional_user(authorization, db)
+        check_quota(db, user)
+        
+        response = await asyncio.to_thread(agent_service.chat_simple, request.message)
         
+        usage = agent_service.consume_usage()
+        if user and usage.get("calls"):
+            record_llm_usage(db, user.id, "chat", usage)
+        
+        message_id = store_assistant_message(db, user, request.conversation_id, response, usage)
+        return ChatResponse(response=response, usage=usage, message_id=message_id)
+        
+    except HTTPException:
+        raise
+    except LLMSaturatedError as e:
+        logger.warning(f"⚠️ /chat rechazado por saturación del LLM: {e}")
+        usage = agent_service.consume_usage()
+        if user and usage.get("calls"):
+            record_llm_usage(db, user.id, "saturated", usage)
+        raise saturated_exception(e)
     except Exception as e:
         logger.error(f"❌ Error en /chat: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def probe_glpi(glpi_client: GLPIClient) -> bool:
+    """Abre y cierra una sesión de GLPI dentro del plazo de la sonda"""
+    glpi_client.deadline = time.monotonic() + HEALTH_PROBE_TIMEOUT
+    glpi_ok = glpi_client.init_session()
+    if glpi_ok:
+        glpi_client.kill_session()
+    return glpi_ok
+
+
 @router.get("/health", response_model=HealthResponse, tags=["System"])
 async def health_check(
     glpi_client: GLPIClient = Depends(get_glpi_client),
@@ -106,20 +330,16 @@ async def health_check(
     """
     Verifica el estado del sistema
     
-    Comprueba la conexión con GLPI y la disponibilidad de Groq AI.
+    Comprueba la conexión con GLPI y la disponibilidad de Groq AI. Las dos
+    sondas corren en hilos, en paralelo y con plazo propio; la de Groq lista
+    los modelos en lugar de pedir una respuesta, así que no espera turno en
+    la cola de LLM ni consume tokens aunque la cola esté saturada.
     """
     try:
-        # Verificar GLPI
-        glpi_ok = glpi_client.init_session()
-        if glpi_ok:
-            glpi_client.kill_session()
-        
-        # Verificar Groq AI (intento simple)
-        groq_ok = True
-        try:
-            ai_agent.chat("test")
-        except Exception:
-            groq_ok = False
+        glpi_ok, groq_ok = await asyncio.gather(
+            asyncio.to_thread(probe_glpi, glpi_client),
+            asyncio.to_thread(ai_agent.ping, HEALTH_PROBE_TIMEOUT)
+        )
         
         status = "healthy" if (glpi_ok and groq_ok) else "degraded"
         
@@ -138,6 +358,18 @@ async def health_check(
         )
 
 
+@router.get("/llm/metrics", tags=["System"])
+async def llm_metrics():
+    """
+    Métricas de la cola de llamadas al LLM
+    
+    Incluye llamadas en curso y en espera, consumo de tokens del último
+    minuto, rechazos, tiempos de espera en cola (promedio, p50, p95, máximo)
+    y aciertos de la caché de respuestas.
+    """
+    return {**llm_dispatcher.metrics(), "response_cache": response_cache.stats()}
+
+
 @router.get("/", tags=["System"])
 async def root():
     """Endpoint raíz - Información de la API"""
@@ -149,6 +381,7 @@ async def root():
             "POST /query": "Procesar consulta en lenguaje natural",
             "POST /chat": "Chat simple con el agente",
             "GET /health": "Estado del sistema",
+            "GET /llm/metrics": "Métricas de la cola de llamadas al LLM",
             "GET /docs": "Documentación interactiva (Swagger)"
         }
     }
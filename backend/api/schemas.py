@@ -10,6 +10,9 @@ class QueryRequest(BaseModel):
     """Modelo para solicitudes de consulta"""
     query: str = Field(..., description="Consulta del usuario en lenguaje natural")
     user_id: Optional[int] = Field(None, description="ID del usuario en GLPI")
+    conversation_id: Optional[int] = Field(
+        None, description="Conversación del usuario autenticado donde guardar la respuesta"
+    )
     
     class Config:
         json_schema_extra = {
@@ -20,6 +23,38 @@ class QueryRequest(BaseModel):
         }
 
 
+class LLMCallUsage(BaseModel):
+    """Uso de una llamada individual al LLM"""
+    operation: str = Field(..., description="Operación (understand_query, generate_response, chat)")
+    model: str = Field(..., description="Modelo utilizado")
+    prompt_tokens: int = Field(0, description="Tokens de entrada")
+    completion_tokens: int = Field(0, description="Tokens generados")
+    total_tokens: int = Field(0, description="Tokens totales")
+    latency_ms: float = Field(0.0, description="Latencia de la llamada en milisegundos")
+
+
+class LLMUsage(BaseModel):
+    """Resumen del uso de LLM de una petición"""
+    prompt_tokens: int = Field(0, description="Tokens de entrada")
+    completion_tokens: int = Field(0, description="Tokens generados")
+    total_tokens: int = Field(0, description="Tokens totales")
+    latency_ms: float = Field(0.0, description="Latencia acumulada de las llamadas al LLM")
+    calls: List[LLMCallUsage] = Field(default_factory=list, description="Detalle por llamada")
+
+
+class ResponseMetadata(BaseModel):
+    """Tiempos por etapa y datos de procesamiento de una consulta"""
+    processing_time_ms: float = Field(..., description="Tiempo total de procesamiento")
+    tokens_used: Optional[int] = Field(None, description="Tokens consumidos en la consulta")
+    model_version: Optional[str] = Field(None, description="Modelo que redactó la respuesta")
+    confidence_score: Optional[float] = Field(None, description="Confianza de la clasificación")
+    stage_timings_ms: Dict[str, float] = Field(
+        default_factory=dict,
+        description="Duración de cada etapa (classification, glpi, generation)"
+    )
+    cache_hit: bool = Field(False, description="La respuesta se sirvió desde la caché")
+
+
 class QueryResponse(BaseModel):
     """Modelo para respuestas de consulta"""
     success: bool = Field(..., description="Indica si la consulta fue exitosa")
@@ -27,6 +62,10 @@ class QueryResponse(BaseModel):
     data: Optional[Any] = Field(None, description="Datos obtenidos de GLPI")
     intention: str = Field(..., description="Intención identificada")
     confidence: Optional[float] = Field(None, description="Nivel de confianza (0-1)")
+    cached: bool = Field(False, description="Indica si el texto se sirvió desde la caché de respuestas")
+    usage: Optional["LLMUsage"] = Field(None, description="Tokens y latencia de las llamadas al LLM")
+    metadata: Optional[ResponseMetadata] = Field(None, description="Tiempos por etapa de la consulta")
+    message_id: Optional[int] = Field(None, description="Mensaje del asistente guardado en la conversación")
     
     class Config:
         json_schema_extra = {
@@ -35,7 +74,23 @@ class QueryResponse(BaseModel):
                 "message": "Tienes 5 tickets abiertos actualmente...",
                 "data": [],
                 "intention": "consultar_tickets",
-                "confidence": 0.95
+                "confidence": 0.95,
+                "cached": False,
+                "usage": {
+                    "prompt_tokens": 1450,
+                    "completion_tokens": 320,
+                    "total_tokens": 1770,
+                    "latency_ms": 2310.5,
+                    "calls": []
+                },
+                "metadata": {
+                    "processing_time_ms": 3120.4,
+                    "tokens_used": 1770,
+                    "model_version": "llama-3.3-70b-versatile",
+                    "confidence_score": 0.95,
+                    "stage_timings_ms": {"classification": 410.2, "glpi": 780.9, "generation": 1920.1},
+                    "cache_hit": False
+                }
             }
         }
 
@@ -43,6 +98,9 @@ class QueryResponse(BaseModel):
 class ChatRequest(BaseModel):
     """Modelo para chat simple"""
     message: str = Field(..., description="Mensaje del usuario")
+    conversation_id: Optional[int] = Field(
+        None, description="Conversación del usuario autenticado donde guardar la respuesta"
+    )
     
     class Config:
         json_schema_extra = {
@@ -55,6 +113,8 @@ class ChatRequest(BaseModel):
 class ChatResponse(BaseModel):
     """Modelo para respuesta de chat"""
     response: str = Field(..., description="Respuesta del agente")
+    usage: Optional[LLMUsage] = Field(None, description="Tokens y latencia de las llamadas al LLM")
+    message_id: Optional[int] = Field(None, description="Mensaje del asistente guardado en la conversación")
     
     class Config:
         json_schema_extra = {
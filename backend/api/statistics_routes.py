@@ -7,11 +7,12 @@ from sqlalchemy import func, text
 from typing import Dict, Any
 from pydantic import BaseModel
 from datetime import datetime, timedelta, timezone
-import json
 
 from auth.database import get_db
-from auth.models import User, Conversation, Message, StatisticsCache
+from auth.models import User, Conversation, Message, StatisticsCache, LLMUsageDaily
 from auth.jwt_auth import get_current_user as get_current_user_jwt
+from services.dashboard_stats import dashboard_stats_cache
+from services.user_stats import get_dashboard_stats, stats_version
 
 router = APIRouter(prefix="/api/v1/statistics", tags=["statistics"])
 
@@ -70,44 +71,6 @@ def get_current_user(
     return user
 
 
-def get_cached_stats(db: Session, user_id: int, stat_key: str) -> Dict[str, Any]:
-    """Get cached statistics if available and not expired"""
-    cache = db.query(StatisticsCache).filter(
-        StatisticsCache.user_id == user_id,
-        StatisticsCache.stat_key == stat_key,
-        StatisticsCache.expires_at > datetime.now(timezone.utc)
-    ).first()
-    
-    if cache:
-        return json.loads(cache.stat_value)
-    
-    return None
-
-
-def cache_stats(db: Session, user_id: int, stat_key: str, stat_value: Dict[str, Any], ttl_minutes: int = 15):
-    """Cache statistics for specified TTL"""
-    cache = db.query(StatisticsCache).filter(
-        StatisticsCache.user_id == user_id,
-        StatisticsCache.stat_key == stat_key
-    ).first()
-    
-    expires_at = datetime.now(timezone.utc) + timedelta(minutes=ttl_minutes)
-    
-    if cache:
-        cache.stat_value = json.dumps(stat_value)
-        cache.expires_at = expires_at
-    else:
-        cache = StatisticsCache(
-            user_id=user_id,
-            stat_key=stat_key,
-            stat_value=json.dumps(stat_value),
-            expires_at=expires_at
-        )
-        db.add(cache)
-    
-    db.commit()
-
-
 # =====================================================
 # ENDPOINTS
 # =====================================================
@@ -117,79 +80,22 @@ def get_dashboard_statistics(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get comprehensive dashboard statistics for current user"""
+    """
+    Get comprehensive dashboard statistics for current user
+
+    Read from the user's user_stats row (counters kept current by the
+    conversation write routes), behind an in-process LRU. A hit is checked
+    against the row's version, so writes handled by other workers are seen.
+    """
     try:
-        # Check cache first
-        cached = get_cached_stats(db, current_user.id, "dashboard")
+        version = stats_version(db, current_user.id) if dashboard_stats_cache.check_version else None
+        cached = dashboard_stats_cache.get(current_user.id, version)
         if cached:
             return DashboardStats(**cached)
         
-        # Calculate statistics
-        today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
-        
-        # Total conversations
-        total_conversations = db.query(func.count(Conversation.id)).filter(
-            Conversation.user_id == current_user.id
-        ).scalar()
-        
-        # Active conversations
-        active_conversations = db.query(func.count(Conversation.id)).filter(
-            Conversation.user_id == current_user.id,
-            Conversation.is_archived == False
-        ).scalar()
-        
-        # Archived conversations
-        archived_conversations = db.query(func.count(Conversation.id)).filter(
-            Conversation.user_id == current_user.id,
-            Conversation.is_archived == True
-        ).scalar()
-        
-        # Total messages
-        total_messages = db.query(func.count(Message.id)).join(Conversation).filter(
-            Conversation.user_id == current_user.id
-        ).scalar()
-        
-        # Total tokens used
-        total_tokens = db.query(func.sum(Message.tokens_used)).join(Conversation).filter(
-            Conversation.user_id == current_user.id
-        ).scalar() or 0
-        
-        # Today's conversations
-        conversations_today = db.query(func.count(Conversation.id)).filter(
-            Conversation.user_id == current_user.id,
-            Conversation.created_at >= today_start
-        ).scalar()
-        
-        # Today's messages
-        messages_today = db.query(func.count(Message.id)).join(Conversation).filter(
-            Conversation.user_id == current_user.id,
-            Message.created_at >= today_start
-        ).scalar()
-        
-        # Average messages per conversation
-        avg_messages = total_messages / total_conversations if total_conversations > 0 else 0
-        
-        # Last activity
-        last_message = db.query(Message).join(Conversation).filter(
-            Conversation.user_id == current_user.id
-        ).order_by(Message.created_at.desc()).first()
-        
-        last_activity = last_message.created_at.isoformat() if last_message else None
-        
-        stats_dict = {
-            "total_conversations": total_conversations or 0,
-            "active_conversations": active_conversations or 0,
-            "archived_conversations": archived_conversations or 0,
-            "total_messages": total_messages or 0,
-            "total_tokens_used": int(total_tokens),
-            "conversations_today": conversations_today or 0,
-            "messages_today": messages_today or 0,
-            "average_messages_per_conversation": round(avg_messages, 2),
-            "last_activity": last_activity or "Never"
-        }
-        
-        # Cache for 15 minutes
-        cache_stats(db, current_user.id, "dashboard", stats_dict, ttl_minutes=15)
+        generation = dashboard_stats_cache.generation(current_user.id)
+        stats_dict, version = get_dashboard_stats(db, current_user.id)
+        dashboard_stats_cache.set(current_user.id, stats_dict, generation, version)
         
         return DashboardStats(**stats_dict)
     except Exception as e:
@@ -265,6 +171,53 @@ def get_messages_by_hour(
     return {"distribution": distribution}
 
 
+@router.get("/llm-usage")
+def get_llm_usage(
+    days: int = 30,
+    all_users: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get LLM token and latency usage per day and intent (admins may include all users)"""
+    
+    start_date = (datetime.now(timezone.utc) - timedelta(days=days)).date()
+    
+    query = db.query(
+        LLMUsageDaily.user_id,
+        LLMUsageDaily.usage_date,
+        LLMUsageDaily.intent,
+        LLMUsageDaily.request_count,
+        LLMUsageDaily.llm_calls,
+        LLMUsageDaily.prompt_tokens,
+        LLMUsageDaily.completion_tokens,
+        LLMUsageDaily.total_latency_ms
+    ).filter(
+        LLMUsageDaily.usage_date >= start_date
+    )
+    
+    if not (all_users and current_user.is_admin):
+        query = query.filter(LLMUsageDaily.user_id == current_user.id)
+    
+    rows = query.order_by(LLMUsageDaily.usage_date, LLMUsageDaily.intent).all()
+    
+    usage = [
+        {
+            "user_id": row.user_id,
+            "date": row.usage_date.isoformat(),
+            "intent": row.intent,
+            "requests": row.request_count,
+            "llm_calls": row.llm_calls,
+            "prompt_tokens": row.prompt_tokens,
+            "completion_tokens": row.completion_tokens,
+            "total_tokens": row.prompt_tokens + row.completion_tokens,
+            "avg_latency_ms": round(row.total_latency_ms / row.request_count, 2) if row.request_count else 0
+        }
+        for row in rows
+    ]
+    
+    return {"usage": usage}
+
+
 @router.delete("/cache")
 def clear_statistics_cache(
     db: Session = Depends(get_db),
@@ -277,5 +230,6 @@ def clear_statistics_cache(
     ).delete()
     
     db.commit()
+    dashboard_stats_cache.invalidate(current_user.id)
     
     return {"message": "Statistics cache cleared"}
@@ -1,11 +1,22 @@
-from fastapi import APIRouter, Depends, Query, Header, HTTPException, status
+from fastapi import APIRouter, Depends, Query, Header, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import Optional, Dict, List
-from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Iterator, Optional, Dict, List, Tuple
+from datetime import date, datetime, timedelta
+import asyncio
+import hmac
+import json
 from auth.database import get_db
 from auth.models import User
 from auth.jwt_auth import get_current_user as get_current_user_jwt
 from integrations.glpi_client import GLPIClient
+from services.ticket_search import ticket_search_index
+from services.ticket_columns import TicketColumns
+from services.ticket_timeline import PERIODS, ticket_timeline
+from services.ticket_changes import RESET, TicketChange, ticket_change_feed
+from services.ticket_detail import ticket_detail_service
+from api.http_cache import make_etag, etag_matches, not_modified, json_response
+from api.ndjson import batched, ndjson_response, wants_ndjson
 from config import settings
 from loguru import logger
 
@@ -84,72 +95,500 @@ def map_glpi_ticket_to_frontend(ticket: Dict) -> Dict:
         "due_date": ticket.get("time_to_resolve")
     }
 
+# Frontend filter values -> GLPI codes
+STATUS_CODES = {"new": {1}, "assigned": {2}, "in_progress": {3}, "pending": {4}, "solved": {5}, "closed": {6}}
+PRIORITY_CODES = {"very_low": {1}, "low": {2}, "medium": {3}, "high": {4}, "very_high": {5, 6}}
+
+# Default window and maximum number of buckets for the timeline
+TIMELINE_DEFAULT_DAYS = {"day": 30, "week": 84}
+TIMELINE_MAX_BUCKETS = 400
+
+# Seconds between SSE keep-alive comments
+CHANGE_FEED_KEEPALIVE_SECONDS = 15
+
+# Retry-After while the ticket mirror loads for routes that can only be answered from it
+MIRROR_LOADING_RETRY_AFTER = 15
+
+# Sort option -> GLPI field
+SORT_FIELDS = {"date": "date", "date_mod": "date_mod", "priority": "priority", "status": "status", "id": "id"}
+
+# GLPI search engine (/search/Ticket), used for filtered lists while the mirror loads:
+# search option id -> ticket field, sort option -> search option id
+TICKET_SEARCH_OPTIONS = {
+    2: "id", 1: "name", 21: "content", 12: "status", 3: "priority", 7: "itilcategories_id_friendlyname",
+    15: "date", 19: "date_mod", 18: "time_to_resolve", 22: "users_id_recipient_friendlyname",
+    5: "users_id_assign_friendlyname"
+}
+SORT_SEARCH_OPTIONS = {"date": 15, "date_mod": 19, "priority": 3, "status": 12, "id": 2}
+# Frontend priority filter -> GLPI search value (negative = "at least": -5 matches 5 and 6)
+PRIORITY_SEARCH_VALUES = {"very_low": 1, "low": 2, "medium": 3, "high": 4, "very_high": -5}
+GLPI_SEARCH_PAGE_SIZE = 500
+
+
+def ticket_category(ticket: Dict) -> str:
+    """Category name, whether GLPI expanded the dropdown in place or as *_friendlyname"""
+    category = ticket.get("itilcategories_id_friendlyname") or ticket.get("itilcategories_id")
+    return category if isinstance(category, str) else ""
+
+
+def mirror_filter(
+    status_filter: Optional[str],
+    priority: Optional[str],
+    category: Optional[str]
+) -> Optional[Callable[[Dict], bool]]:
+    """Predicate for the status/priority/category filters (None = no filter)"""
+    checks = []
+    if status_filter:
+        status_codes = STATUS_CODES.get(status_filter, set())
+        checks.append(lambda t: t.get("status") in status_codes)
+    if priority:
+        priority_codes = PRIORITY_CODES.get(priority, set())
+        checks.append(lambda t: t.get("priority") in priority_codes)
+    if category and category.lower() != "sin categoría":
+        needle = category.lower()
+        checks.append(lambda t: needle in ticket_category(t).lower())
+    if not checks:
+        return None
+    if len(checks) == 1:
+        return checks[0]
+    return lambda t: all(check(t) for check in checks)
+
+
+def page_from_mirror(
+    status_filter: Optional[str],
+    priority: Optional[str],
+    category: Optional[str],
+    search: Optional[str],
+    sort: Optional[str],
+    descending: bool,
+    offset: int,
+    limit: Optional[int]
+) -> Tuple[List[Dict], int]:
+    """Filter, sort and slice the local ticket mirror (limit None = all); returns (page, total)"""
+    matches = mirror_filter(status_filter, priority, category)
+    if not search:
+        # Presorted mirror order: no copy or sort of the whole mirror per page
+        return ticket_search_index.page(SORT_FIELDS[sort or "date_mod"], descending, offset, limit, matches)
+
+    # Relevance (BM25) first, then tickets that only contain the text as a prefix or fragment
+    docs = [doc for doc, _ in ticket_search_index.search(search, limit=None)]
+    docs += ticket_search_index.search_substring(search, exclude={doc["id"] for doc in docs})
+    if matches is not None:
+        docs = [t for t in docs if matches(t)]
+
+    # Without an explicit sort, keep relevance order
+    if sort:
+        field = SORT_FIELDS[sort]
+        present = [t for t in docs if t.get(field) is not None]
+        missing = [t for t in docs if t.get(field) is None]
+        present.sort(key=lambda t: t[field], reverse=descending)
+        docs = present + missing
+
+    return docs[offset:None if limit is None else offset + limit], len(docs)
+
+
+def glpi_ticket_criteria(
+    status_filter: Optional[str],
+    priority: Optional[str],
+    category: Optional[str],
+    search: Optional[str]
+) -> Dict[str, Any]:
+    """The list filters as criteria[...] parameters for GLPI's search engine"""
+    criteria: List[Dict[str, Any]] = []
+    if status_filter:
+        criteria.append({"field": 12, "searchtype": "equals", "value": min(STATUS_CODES.get(status_filter, {0}))})
+    if priority:
+        criteria.append({"field": 3, "searchtype": "equals", "value": PRIORITY_SEARCH_VALUES.get(priority, 0)})
+    if category and category.lower() != "sin categoría":
+        criteria.append({"field": 7, "searchtype": "contains", "value": category})
+    if search:
+        # Title or description contains the text
+        criteria.append({"criteria": [
+            {"field": 1, "searchtype": "contains", "value": search},
+            {"link": "OR", "field": 21, "searchtype": "contains", "value": search}
+        ]})
+
+    params: Dict[str, Any] = {}
+
+    def flatten(items: List[Dict[str, Any]], prefix: str) -> None:
+        for i, item in enumerate(items):
+            key = f"{prefix}[{i}]"
+            if i:
+                params[f"{key}[link]"] = item.get("link", "AND")
+            for name in ("field", "searchtype", "value"):
+                if name in item:
+                    params[f"{key}[{name}]"] = item[name]
+            if "criteria" in item:
+                flatten(item["criteria"], f"{key}[criteria]")
+
+    flatten(criteria, "criteria")
+    return params
+
+
+def ticket_from_search_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Ticket fields from a GLPI search engine row (keys are search option ids)"""
+    ticket = {field: row.get(str(option)) for option, field in TICKET_SEARCH_OPTIONS.items()}
+    for field in ("id", "status", "priority"):
+        value = ticket.get(field)
+        if isinstance(value, str) and value.isdigit():
+            ticket[field] = int(value)
+    return ticket
+
+
+def page_from_glpi_search(
+    glpi: GLPIClient,
+    criteria: Dict[str, Any],
+    sort: Optional[str],
+    descending: bool,
+    offset: int,
+    limit: int
+) -> Tuple[List[Dict], int]:
+    """One filtered page from GLPI's search engine; returns (page, total)"""
+    result = glpi.search_page(
+        "Ticket", criteria, list(TICKET_SEARCH_OPTIONS),
+        start=offset, limit=limit,
+        sort=SORT_SEARCH_OPTIONS[sort or "date_mod"],
+        order="DESC" if descending else "ASC"
+    )
+    return [ticket_from_search_row(row) for row in result["rows"]], result["total"]
+
+
+def iter_glpi_search(
+    glpi: GLPIClient,
+    criteria: Dict[str, Any],
+    sort: Optional[str],
+    descending: bool
+) -> Iterator[List[Dict]]:
+    """Every ticket matching the criteria, page by page from GLPI's search engine"""
+    start = 0
+    while True:
+        tickets, total = page_from_glpi_search(glpi, criteria, sort, descending, start, GLPI_SEARCH_PAGE_SIZE)
+        if not tickets:
+            break
+        yield tickets
+        start += len(tickets)
+        if start >= total:
+            break
+
+
+def stream_tickets(
+    status_filter: Optional[str],
+    priority: Optional[str],
+    category: Optional[str],
+    search: Optional[str],
+    sort: Optional[str],
+    descending: bool,
+    if_none_match: Optional[str]
+):
+    """
+    Every matching ticket as NDJSON, one frontend ticket per line (no pagination)
+
+    Tickets are mapped and encoded batch by batch: from the local mirror when
+    it is loaded, otherwise straight off GLPI's page iterator (or its search
+    engine, with filters) while the mirror loads in the background.
+    """
+    glpi = get_glpi_client()
+    if ticket_search_index.is_warm:
+        ticket_search_index.refresh(glpi)
+        etag = make_etag(
+            "tickets-ndjson", ticket_search_index.version,
+            status_filter, priority, category, search, sort, descending
+        )
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        docs, total = page_from_mirror(status_filter, priority, category, search, sort, descending, 0, None)
+        logger.info(f"✅ Retransmitiendo {total} tickets (mirror, NDJSON)")
+        return ndjson_response(batched(docs), map_glpi_ticket_to_frontend, etag=etag, total=total)
+
+    if any((status_filter, priority, category, search)):
+        criteria = glpi_ticket_criteria(status_filter, priority, category, search)
+        pages = iter_glpi_search(glpi, criteria, sort, descending)
+    else:
+        pages = glpi.iter_pages("Ticket", {
+            "sort": SORT_FIELDS[sort or "date_mod"],
+            "order": "DESC" if descending else "ASC"
+        })
+    ticket_search_index.refresh_in_background(get_glpi_client())
+    logger.info("✅ Retransmitiendo tickets desde GLPI (NDJSON)")
+    return ndjson_response(pages, map_glpi_ticket_to_frontend, on_close=glpi.kill_session)
+
+
 # Get real GLPI data
 @router.get("/")
 def get_tickets(
-    status: Optional[str] = Query(None),
+    status_filter: Optional[str] = Query(None, alias="status"),
     priority: Optional[str] = Query(None),
     category: Optional[str] = Query(None),
     search: Optional[str] = Query(None),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=200),
+    sort: Optional[str] = Query(None, description="date, date_mod, priority, status o id (por defecto date_mod)"),
+    order: str = Query("desc", description="asc o desc"),
     authorization: str = Header(None),
+    accept: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
-    """Get all tickets from GLPI with optional filters"""
+    """
+    Get one page of tickets with optional filters and sorting
+
+    Served from the local ticket mirror once it is loaded; until then,
+    pages are read straight from GLPI with range/sort/order (filtered ones
+    through GLPI's search engine) while the mirror loads in the background.
+    Answers 304 when If-None-Match carries the current ETag. With
+    `Accept: application/x-ndjson` every matching ticket is streamed instead
+    of one page.
+    """
+    # Authenticate user
+    get_user_from_token(authorization, db)
+
+    if sort is not None and sort not in SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"sort debe ser uno de: {', '.join(SORT_FIELDS)}")
+    if order.lower() not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order debe ser asc o desc")
+    descending = order.lower() == "desc"
+    offset = (page - 1) * page_size
+
+    try:
+        if wants_ndjson(accept):
+            return stream_tickets(status_filter, priority, category, search, sort, descending, if_none_match)
+        
+        glpi = get_glpi_client()
+        filtered = any((status_filter, priority, category, search))
+
+        etag = None
+        if ticket_search_index.is_warm:
+            # Espejo local: sincronización incremental por date_mod
+            ticket_search_index.refresh(glpi)
+            etag = make_etag(
+                "tickets", ticket_search_index.version,
+                status_filter, priority, category, search, page, page_size, sort, descending
+            )
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+            glpi_tickets, total = page_from_mirror(
+                status_filter, priority, category, search, sort, descending, offset, page_size
+            )
+            source = "mirror"
+        elif filtered:
+            # Espejo aún vacío: página filtrada por el motor de búsqueda de GLPI
+            glpi_tickets, total = page_from_glpi_search(
+                glpi, glpi_ticket_criteria(status_filter, priority, category, search),
+                sort, descending, offset, page_size
+            )
+            source = "glpi"
+            ticket_search_index.refresh_in_background(get_glpi_client())
+        else:
+            # Espejo aún vacío: página directa de GLPI y carga del espejo en segundo plano
+            glpi_response = glpi.get_tickets_page(
+                start=offset,
+                limit=page_size,
+                sort=SORT_FIELDS[sort or "date_mod"],
+                order="DESC" if descending else "ASC"
+            )
+            glpi_tickets, total = glpi_response["tickets"], glpi_response["total"]
+            source = "glpi"
+            ticket_search_index.refresh_in_background(get_glpi_client())
+
+        logger.info(f"✅ Página {page} de tickets ({source}): {len(glpi_tickets)} de {total}")
+        return json_response({
+            "items": [map_glpi_ticket_to_frontend(t) for t in glpi_tickets],
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+            "pages": (total + page_size - 1) // page_size,
+            "sort": sort or ("relevance" if search and source == "mirror" else "date_mod"),
+            "order": "desc" if descending else "asc",
+            "source": source
+        }, if_none_match, etag)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Error obteniendo tickets: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al obtener tickets de GLPI: {str(e)}"
+        )
+
+
+@router.get("/search")
+def search_tickets(
+    q: str = Query(..., min_length=2, description="Texto a buscar en título, contenido y categoría"),
+    limit: int = Query(20, ge=1, le=100),
+    authorization: str = Header(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Search tickets by relevance (BM25) using the local inverted index
+
+    While the index is still loading (in the background, never inside the
+    request) the search goes to GLPI's search engine: a "contains" on title
+    and description, newest first, without a relevance score.
+    """
     # Authenticate user
     get_user_from_token(authorization, db)
     
     try:
-        # Get GLPI client and fetch tickets
         glpi = get_glpi_client()
-        logger.info("🔄 Llamando a glpi.get_tickets()...")
-        glpi_response = glpi.get_tickets(limit=1000)  # Limit to 1000 for performance
-        logger.info(f"📦 Respuesta de GLPI: type={type(glpi_response)}, keys={list(glpi_response.keys()) if isinstance(glpi_response, dict) else 'not a dict'}")
-        glpi_tickets = glpi_response.get("tickets", [])
-        
-        logger.info(f"📋 Obtenidos {len(glpi_tickets)} tickets de GLPI")
-        
-        # Convert to frontend format
-        tickets = [map_glpi_ticket_to_frontend(t) for t in glpi_tickets]
+        if ticket_search_index.is_warm:
+            ticket_search_index.refresh(glpi)
+            results = ticket_search_index.search(q, limit=limit)
+            source = "mirror"
+        else:
+            ticket_search_index.refresh_in_background()
+            try:
+                tickets, _ = page_from_glpi_search(
+                    glpi, glpi_ticket_criteria(None, None, None, q), "date_mod", True, 0, limit
+                )
+            finally:
+                glpi.kill_session()
+            results = [(ticket, None) for ticket in tickets]
+            source = "glpi"
         
-        # Apply filters
-        if status:
-            tickets = [t for t in tickets if t["status"] == status]
-        if priority:
-            tickets = [t for t in tickets if t["priority"] == priority]
-        if category and category.lower() != "sin categoría":
-            tickets = [t for t in tickets if category.lower() in t["category"].lower()]
-        if search:
-            search_lower = search.lower()
-            tickets = [
-                t for t in tickets 
-                if search_lower in t["title"].lower() or 
-                   search_lower in t["description"].lower() or
-                   search_lower in t["category"].lower()
-            ]
-        
-        logger.info(f"✅ Devolviendo {len(tickets)} tickets después de filtros")
-        return tickets
+        logger.info(f"🔎 Búsqueda '{q}' ({source}): {len(results)} resultados")
+        return {
+            "query": q,
+            "total": len(results),
+            "results": [
+                {**map_glpi_ticket_to_frontend(ticket), "score": score}
+                for ticket, score in results
+            ],
+            "source": source
+        }
         
     except Exception as e:
-        logger.error(f"❌ Error obteniendo tickets: {e}")
+        logger.error(f"❌ Error buscando tickets: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error al obtener tickets de GLPI: {str(e)}"
+            detail=f"Error al buscar tickets: {str(e)}"
         )
 
 
+def change_event(change: TicketChange) -> str:
+    """SSE frame with the fields of the frontend ticket that changed"""
+    payload: Dict[str, Any] = {"op": change.op, "id": change.ticket_id}
+    if change.new is not None:
+        new = map_glpi_ticket_to_frontend(change.new)
+        old = map_glpi_ticket_to_frontend(change.old) if change.old is not None else {}
+        payload["fields"] = {
+            key: value for key, value in new.items()
+            if change.old is None or old.get(key) != value
+        }
+    data = json.dumps(payload, ensure_ascii=False, default=str)
+    return f"id: {ticket_change_feed.epoch}-{change.seq}\nevent: ticket\ndata: {data}\n\n"
+
+
+def parse_last_event_id(last_event_id: Optional[str]) -> Tuple[Optional[int], bool]:
+    """(sequence, same process) from a Last-Event-ID of the form <epoch>-<seq>"""
+    if not last_event_id:
+        return None, True
+    epoch, _, seq = last_event_id.rpartition("-")
+    if epoch != ticket_change_feed.epoch or not seq.isdigit():
+        return None, False
+    return int(seq), True
+
+
+@router.get("/changes")
+async def stream_ticket_changes(
+    request: Request,
+    last_event_id: Optional[str] = Header(None),
+    authorization: str = Header(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Server-Sent Events feed of ticket changes (id and changed fields)
+
+    One shared poller syncs the local mirror by date_mod; clients patch their
+    lists with these deltas instead of re-downloading. A "reset" event means
+    the client must reload (missed events or a slow consumer).
+    """
+    # Authenticate user
+    get_user_from_token(authorization, db)
+    
+    last_seq, same_process = parse_last_event_id(last_event_id)
+    subscriber, replay = ticket_change_feed.subscribe(last_seq)
+    _, queue = subscriber
+    
+    async def events() -> AsyncIterator[str]:
+        try:
+            yield f"retry: 5000\nevent: ready\ndata: {json.dumps({'last_id': f'{ticket_change_feed.epoch}-{ticket_change_feed.last_seq}'})}\n\n"
+            if replay is None or not same_process:
+                yield "event: reset\ndata: {}\n\n"
+            else:
+                for change in replay:
+                    yield change_event(change)
+            
+            while not await request.is_disconnected():
+                try:
+                    change = await asyncio.wait_for(queue.get(), timeout=CHANGE_FEED_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if change is RESET:
+                    yield "event: reset\ndata: {}\n\n"
+                    break
+                yield change_event(change)
+        finally:
+            ticket_change_feed.unsubscribe(subscriber)
+    
+    logger.info(f"📡 Cliente suscrito al feed de tickets ({ticket_change_feed.subscriber_count} activos)")
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/changes/webhook", status_code=status.HTTP_202_ACCEPTED)
+def ticket_webhook(x_webhook_secret: Optional[str] = Header(None)):
+    """
+    GLPI webhook: triggers an immediate date_mod sync instead of waiting for the next poll
+
+    The request reaches one worker; the signal is fanned out to the other
+    workers' feeds through the ticket_feed_signals row.
+    """
+    secret = settings.glpi_webhook_secret
+    if not secret:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Webhook no configurado")
+    if not x_webhook_secret or not hmac.compare_digest(x_webhook_secret, secret):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Secreto de webhook inválido")
+    
+    ticket_change_feed.signal()
+    return {"status": "scheduled"}
+
+
 @router.get("/{ticket_id}")
 def get_ticket(
     ticket_id: int,
+    expand: bool = Query(False, description="Incluir seguimientos, tareas, solución, elementos y actores"),
     authorization: str = Header(None),
     db: Session = Depends(get_db)
 ):
-    """Get a specific ticket by ID from GLPI"""
+    """Get a specific ticket by ID from GLPI (optionally with its followups, tasks, solutions, items and actors)"""
     # Authenticate user
     get_user_from_token(authorization, db)
     
     try:
         glpi = get_glpi_client()
+        
+        if expand:
+            detail = ticket_detail_service.get(glpi, ticket_id)
+            if not detail:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Ticket no encontrado"
+                )
+            return {
+                **map_glpi_ticket_to_frontend(detail["ticket"]),
+                "followups": detail["followups"],
+                "tasks": detail["tasks"],
+                "solution": detail["solutions"][-1] if detail["solutions"] else None,
+                "linked_items": detail["items"],
+                "actors": detail["actors"],
+                "partial": detail["partial"]
+            }
+        
         ticket = glpi.get_ticket_by_id(ticket_id)
         
         if not ticket:
@@ -170,41 +609,43 @@ def get_ticket(
         )
 
 
+def summarize_tickets(columns: TicketColumns) -> Dict:
+    """Count tickets by status bucket and high priority"""
+    return {
+        "total": len(columns),
+        "new": columns.count("status", STATUS_CODES["new"]),
+        "in_progress": columns.count("status", STATUS_CODES["assigned"] | STATUS_CODES["in_progress"]),
+        "pending": columns.count("status", STATUS_CODES["pending"]),
+        "solved": columns.count("status", STATUS_CODES["solved"]),
+        "closed": columns.count("status", STATUS_CODES["closed"]),
+        "high_priority": columns.count("priority", PRIORITY_CODES["high"] | PRIORITY_CODES["very_high"])
+    }
+
+
 @router.get("/stats/summary")
 def get_ticket_stats(
     authorization: str = Header(None),
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
-    """Get ticket statistics from GLPI"""
+    """Get ticket statistics (from the local mirror once loaded, otherwise from GLPI)"""
     # Authenticate user
     get_user_from_token(authorization, db)
     
     try:
         glpi = get_glpi_client()
-        glpi_response = glpi.get_tickets(limit=1000)
-        glpi_tickets = glpi_response.get("tickets", [])
-        
-        # Convert and count
-        tickets = [map_glpi_ticket_to_frontend(t) for t in glpi_tickets]
-        
-        total = len(tickets)
-        new_count = len([t for t in tickets if t["status"] == "new"])
-        in_progress = len([t for t in tickets if t["status"] in ["assigned", "in_progress"]])
-        solved = len([t for t in tickets if t["status"] == "solved"])
-        closed = len([t for t in tickets if t["status"] == "closed"])
-        pending = len([t for t in tickets if t["status"] == "pending"])
         
-        high_priority = len([t for t in tickets if t["priority"] in ["high", "very_high"]])
+        if ticket_search_index.is_warm:
+            ticket_search_index.refresh(glpi)
+            etag = make_etag("tickets_stats", ticket_search_index.version)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+            return json_response(summarize_tickets(ticket_search_index.columns()), if_none_match, etag)
         
-        return {
-            "total": total,
-            "new": new_count,
-            "in_progress": in_progress,
-            "pending": pending,
-            "solved": solved,
-            "closed": closed,
-            "high_priority": high_priority
-        }
+        glpi_response = glpi.get_tickets(limit=1000)
+        ticket_search_index.refresh_in_background(get_glpi_client())
+        columns = TicketColumns.from_tickets(glpi_response.get("tickets", []))
+        return json_response(summarize_tickets(columns), if_none_match)
         
     except Exception as e:
         logger.error(f"❌ Error obteniendo estadísticas: {e}")
@@ -212,3 +653,50 @@ def get_ticket_stats(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al obtener estadísticas: {str(e)}"
         )
+
+
+@router.get("/stats/timeline")
+def get_ticket_timeline(
+    period: str = Query("day", description="day o week"),
+    date_from: Optional[date] = Query(None, description="Primer día (por defecto 30 días o 12 semanas atrás)"),
+    date_to: Optional[date] = Query(None, description="Último día (por defecto hoy)"),
+    authorization: str = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """Opened/solved/closed tickets per day or week, backlog and time to resolve"""
+    # Authenticate user
+    get_user_from_token(authorization, db)
+    
+    if period not in PERIODS:
+        raise HTTPException(status_code=400, detail=f"period debe ser uno de: {', '.join(PERIODS)}")
+    date_to = date_to or date.today()
+    date_from = date_from or date_to - timedelta(days=TIMELINE_DEFAULT_DAYS[period] - 1)
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from no puede ser posterior a date_to")
+    if (date_to - date_from).days // (7 if period == "week" else 1) >= TIMELINE_MAX_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"El rango supera {TIMELINE_MAX_BUCKETS} periodos")
+    
+    if not ticket_search_index.is_warm:
+        # La serie sale del espejo: se carga en segundo plano y el cliente reintenta
+        ticket_search_index.refresh_in_background()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="El índice de tickets se está cargando",
+            headers={"Retry-After": str(MIRROR_LOADING_RETRY_AFTER)}
+        )
+    
+    try:
+        # La serie se actualiza con cada sincronización incremental del espejo
+        ticket_search_index.refresh(get_glpi_client())
+        etag = make_etag("tickets_timeline", ticket_search_index.version, period, date_from, date_to)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        return json_response(ticket_timeline.series(date_from, date_to, period), if_none_match, etag)
+        
+    except Exception as e:
+        logger.error(f"❌ Error obteniendo la evolución de tickets: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al obtener la evolución de tickets: {str(e)}"
+        )
@@ -2,7 +2,7 @@
 Database connection manager for SSO system using MariaDB
 """
 import pymysql
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from contextlib import contextmanager
@@ -57,6 +57,30 @@ def get_db_session():
         session.close()
 
 
+@contextmanager
+def advisory_lock(name: str, timeout: int = 0):
+    """
+    MariaDB named lock (GET_LOCK) shared by every process using the database
+    Usage:
+        with advisory_lock("report-scheduler") as acquired:
+            if acquired:
+                ...  # only one worker gets here at a time
+
+    Waits up to `timeout` seconds (by default it does not wait): yields False
+    if another connection still holds the lock. The lock lives on a dedicated
+    connection and is released on exit (or by the server if the process dies).
+    """
+    with engine.connect() as connection:
+        acquired = connection.execute(
+            text("SELECT GET_LOCK(:name, :timeout)"), {"name": name, "timeout": timeout}
+        ).scalar() == 1
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                connection.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": name})
+
+
 def get_db():
     """
     Dependency for FastAPI endpoints
@@ -1,7 +1,7 @@
 """
 SQLAlchemy models for Complete System
 """
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Enum, JSON
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Date, Text, ForeignKey, Enum, JSON, Float, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from auth.database import Base
@@ -147,6 +147,9 @@ class Message(Base):
     content = Column(Text, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     tokens_used = Column(Integer, default=0)
+    prompt_tokens = Column(Integer, nullable=True)
+    completion_tokens = Column(Integer, nullable=True)
+    latency_ms = Column(Float, nullable=True)
 
     # Relationships
     conversation = relationship("Conversation", back_populates="messages")
@@ -227,3 +230,79 @@ class StatisticsCache(Base):
 
     def __repr__(self):
         return f"<StatisticsCache(user_id={self.user_id}, key='{self.stat_key}')>"
+
+
+class LLMUsageDaily(Base):
+    __tablename__ = "llm_usage_daily"
+    __table_args__ = (UniqueConstraint("user_id", "usage_date", "intent", name="unique_usage"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey(USERS_ID_FK, ondelete="CASCADE"), nullable=False)
+    usage_date = Column(Date, nullable=False, index=True)
+    intent = Column(String(50), nullable=False, default="unknown")
+    request_count = Column(Integer, nullable=False, default=0)
+    llm_calls = Column(Integer, nullable=False, default=0)
+    prompt_tokens = Column(Integer, nullable=False, default=0)
+    completion_tokens = Column(Integer, nullable=False, default=0)
+    total_latency_ms = Column(Float, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    # Relationships
+    user = relationship("User", backref="llm_usage")
+
+    def __repr__(self):
+        return f"<LLMUsageDaily(user_id={self.user_id}, date={self.usage_date}, intent='{self.intent}')>"
+
+
+class UserStats(Base):
+    """Per-user dashboard counters, kept current by the conversation write paths"""
+    __tablename__ = "user_stats"
+
+    user_id = Column(Integer, ForeignKey(USERS_ID_FK, ondelete="CASCADE"), primary_key=True)
+    total_conversations = Column(Integer, nullable=False, default=0)
+    archived_conversations = Column(Integer, nullable=False, default=0)
+    total_messages = Column(Integer, nullable=False, default=0)
+    total_tokens = Column(Integer, nullable=False, default=0)
+    conversations_today = Column(Integer, nullable=False, default=0)
+    messages_today = Column(Integer, nullable=False, default=0)
+    stats_date = Column(Date, nullable=True)  # Day the *_today counters refer to
+    last_activity = Column(DateTime(timezone=True), nullable=True)
+    reconciled_at = Column(DateTime(timezone=True), nullable=True)
+    version = Column(Integer, nullable=False, default=0)  # +1 on every write; validates in-process caches
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    # Relationships
+    user = relationship("User", backref="stats", uselist=False)
+
+    def __repr__(self):
+        return f"<UserStats(user_id={self.user_id}, conversations={self.total_conversations}, messages={self.total_messages})>"
+
+
+class TicketFeedSignal(Base):
+    """Single-row counter bumped by the GLPI webhook; every worker's ticket feed watches it"""
+    __tablename__ = "ticket_feed_signals"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<TicketFeedSignal(version={self.version})>"
+
+
+class MaterializedReport(Base):
+    __tablename__ = "materialized_reports"
+    __table_args__ = (UniqueConstraint("report_key", "version", name="unique_report_version"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    report_key = Column(String(100), nullable=False, index=True)
+    version = Column(Integer, nullable=False)
+    report_type = Column(String(50), nullable=False)
+    params = Column(JSON, nullable=True)
+    result = Column(JSON, nullable=False)
+    row_count = Column(Integer, nullable=False, default=0)
+    duration_ms = Column(Float, nullable=False, default=0)
+    computed_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+    def __repr__(self):
+        return f"<MaterializedReport(key='{self.report_key}', version={self.version})>"
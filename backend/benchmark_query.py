@@ -0,0 +1,85 @@
+"""
+Prueba de carga del endpoint /api/v1/query
+
+Pensado para usarse con el stub local del LLM (llm_stub.py) y así medir el
+pipeline completo de AgentService con latencia sintética del LLM:
+
+    python llm_stub.py --ttft-ms 300 --tokens-per-sec 250
+    GROQ_BASE_URL=http://localhost:8100 python main.py
+    python benchmark_query.py --requests 200 --concurrency 20
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from collections import Counter
+from typing import List
+
+import httpx
+
+
+DEFAULT_QUERIES = [
+    "¿Cuántos tickets hay abiertos actualmente?",
+    "Muéstrame el ticket 123",
+    "¿Hay tickets parecidos a este problema de impresora?",
+    "Muéstrame las computadoras del inventario",
+    "Dame un reporte de tickets del mes",
+    "¿Qué es GLPI?",
+]
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Percentil simple (valores ordenados)"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+async def run(url: str, total: int, concurrency: int, token: str = None) -> None:
+    """Lanza `total` consultas con `concurrency` peticiones simultáneas"""
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    tokens: List[int] = []
+    semaphore = asyncio.Semaphore(concurrency)
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+
+    async with httpx.AsyncClient(timeout=120) as client:
+        async def one(i: int) -> None:
+            query = DEFAULT_QUERIES[i % len(DEFAULT_QUERIES)]
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    response = await client.post(url, json={"query": query}, headers=headers)
+                    statuses[response.status_code] += 1
+                    if response.status_code == 200:
+                        usage = response.json().get("usage") or {}
+                        tokens.append(usage.get("total_tokens", 0))
+                except httpx.HTTPError as e:
+                    statuses[type(e).__name__] += 1
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - started
+
+    print(f"Peticiones: {total}  Concurrencia: {concurrency}  Duración: {elapsed:.2f}s  ({total / elapsed:.1f} req/s)")
+    print(f"Códigos: {dict(statuses)}")
+    print(
+        f"Latencia ms  p50={percentile(latencies, 0.50):.0f}  p95={percentile(latencies, 0.95):.0f}  "
+        f"p99={percentile(latencies, 0.99):.0f}  max={max(latencies):.0f}"
+    )
+    if tokens:
+        print(f"Tokens por consulta (promedio): {statistics.mean(tokens):.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prueba de carga de /api/v1/query")
+    parser.add_argument("--url", default="http://localhost:8000/api/v1/query")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--token", default=None, help="Bearer token opcional (para medir uso por usuario)")
+    args = parser.parse_args()
+
+    asyncio.run(run(args.url, args.requests, args.concurrency, args.token))
@@ -18,11 +18,38 @@ class Settings(BaseSettings):
     # Groq AI
     groq_api_key: Optional[str] = Field(default=None, env="GROQ_API_KEY")
     groq_model: str = Field(default="llama-3.3-70b-versatile", env="GROQ_MODEL")
+    groq_base_url: Optional[str] = Field(default=None, env="GROQ_BASE_URL")  # p. ej. http://localhost:8100 (llm_stub.py)
+    groq_classifier_model: Optional[str] = Field(default="llama-3.1-8b-instant", env="GROQ_CLASSIFIER_MODEL")
+    groq_generator_model: Optional[str] = Field(default=None, env="GROQ_GENERATOR_MODEL")  # None = groq_model
+    groq_chat_model: Optional[str] = Field(default=None, env="GROQ_CHAT_MODEL")  # None = groq_model
+    classifier_min_confidence: float = Field(default=0.7, env="CLASSIFIER_MIN_CONFIDENCE")
     
     # GLPI
     glpi_url: Optional[str] = Field(default=None, env="GLPI_URL")
     glpi_app_token: Optional[str] = Field(default=None, env="GLPI_APP_TOKEN")
     glpi_user_token: Optional[str] = Field(default=None, env="GLPI_USER_TOKEN")
+    ticket_index_refresh_seconds: int = Field(default=300, env="TICKET_INDEX_REFRESH_SECONDS")
+    ticket_index_reconcile_seconds: int = Field(default=3600, env="TICKET_INDEX_RECONCILE_SECONDS")  # 0 = desactivada
+    ticket_detail_cache_seconds: int = Field(default=60, env="TICKET_DETAIL_CACHE_SECONDS")
+    ticket_feed_poll_seconds: int = Field(default=15, env="TICKET_FEED_POLL_SECONDS")
+    ticket_feed_signal_seconds: int = Field(default=2, env="TICKET_FEED_SIGNAL_SECONDS")
+    glpi_webhook_secret: Optional[str] = Field(default=None, env="GLPI_WEBHOOK_SECRET")
+    inventory_refresh_seconds: int = Field(default=300, env="INVENTORY_REFRESH_SECONDS")
+    inventory_itemtypes: str = Field(
+        default="Computer,Monitor,Printer,NetworkEquipment,Phone,Peripheral",
+        env="INVENTORY_ITEMTYPES"
+    )
+    
+    # Reportes materializados
+    report_scheduler_enabled: bool = Field(default=True, env="REPORT_SCHEDULER_ENABLED")
+    report_scheduler_interval_seconds: int = Field(default=60, env="REPORT_SCHEDULER_INTERVAL_SECONDS")
+    report_versions_kept: int = Field(default=10, env="REPORT_VERSIONS_KEPT")
+    
+    # Estadísticas del dashboard (caché en memoria delante de user_stats)
+    dashboard_cache_seconds: int = Field(default=900, env="DASHBOARD_CACHE_SECONDS")  # 0 = desactivada
+    dashboard_cache_max_entries: int = Field(default=1024, env="DASHBOARD_CACHE_MAX_ENTRIES")
+    dashboard_cache_check_version: bool = Field(default=True, env="DASHBOARD_CACHE_CHECK_VERSION")  # false solo con un worker
+    user_stats_reconcile_seconds: int = Field(default=86400, env="USER_STATS_RECONCILE_SECONDS")  # 0 = desactivada
     
     # Database (MariaDB/MySQL)
     db_host: str = Field(default="localhost", env="DB_HOST")
@@ -51,6 +78,21 @@ class Settings(BaseSettings):
     max_tokens: int = Field(default=1500, env="MAX_TOKENS")
     temperature: float = Field(default=0.7, env="TEMPERATURE")
     
+    # Cola de llamadas al LLM
+    llm_max_concurrency: int = Field(default=4, env="LLM_MAX_CONCURRENCY")
+    llm_tokens_per_minute: int = Field(default=0, env="LLM_TOKENS_PER_MINUTE")  # 0 = sin límite
+    llm_max_queue_size: int = Field(default=32, env="LLM_MAX_QUEUE_SIZE")
+    llm_max_queue_wait: float = Field(default=10.0, env="LLM_MAX_QUEUE_WAIT")
+    response_cache_ttl_seconds: int = Field(default=180, env="RESPONSE_CACHE_TTL_SECONDS")  # 0 = desactivada
+    response_cache_max_entries: int = Field(default=256, env="RESPONSE_CACHE_MAX_ENTRIES")
+    llm_daily_token_quota: int = Field(default=0, env="LLM_DAILY_TOKEN_QUOTA")  # 0 = sin límite
+    
+    # Presupuesto de tiempo de /query (segundos): total y por etapa
+    query_timeout_seconds: float = Field(default=45.0, env="QUERY_TIMEOUT_SECONDS")
+    classify_timeout_seconds: float = Field(default=10.0, env="CLASSIFY_TIMEOUT_SECONDS")
+    glpi_timeout_seconds: float = Field(default=25.0, env="GLPI_TIMEOUT_SECONDS")
+    generate_timeout_seconds: float = Field(default=15.0, env="GENERATE_TIMEOUT_SECONDS")
+    
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -0,0 +1,14 @@
+"""
+Configuración de pytest para el backend.
+
+Los tests importan los módulos como lo hace main.py (services..., api...),
+así que el directorio del backend tiene que estar en sys.path.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Script manual contra Azure AD (hace peticiones al importarse), no es un test
+collect_ignore = ["test_redirect_uris.py"]
@@ -0,0 +1,23 @@
+-- Add LLM token accounting: per-message usage columns and daily rollup table
+USE glpi_sso;
+
+ALTER TABLE messages
+    ADD COLUMN IF NOT EXISTS prompt_tokens INT NULL,
+    ADD COLUMN IF NOT EXISTS completion_tokens INT NULL,
+    ADD COLUMN IF NOT EXISTS latency_ms FLOAT NULL;
+
+CREATE TABLE IF NOT EXISTS llm_usage_daily (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    usage_date DATE NOT NULL,
+    intent VARCHAR(50) NOT NULL DEFAULT 'unknown',
+    request_count INT NOT NULL DEFAULT 0,
+    llm_calls INT NOT NULL DEFAULT 0,
+    prompt_tokens INT NOT NULL DEFAULT 0,
+    completion_tokens INT NOT NULL DEFAULT 0,
+    total_latency_ms FLOAT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    UNIQUE KEY unique_usage (user_id, usage_date, intent),
+    INDEX idx_usage_date (usage_date)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
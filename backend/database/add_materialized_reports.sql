@@ -0,0 +1,17 @@
+-- Add versioned materialized reports (computed by the background report scheduler)
+USE glpi_sso;
+
+CREATE TABLE IF NOT EXISTS materialized_reports (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    report_key VARCHAR(100) NOT NULL,
+    version INT NOT NULL,
+    report_type VARCHAR(50) NOT NULL,
+    params JSON NULL,
+    result JSON NOT NULL,
+    row_count INT NOT NULL DEFAULT 0,
+    duration_ms FLOAT NOT NULL DEFAULT 0,
+    computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY unique_report_version (report_key, version),
+    INDEX idx_report_key (report_key),
+    INDEX idx_computed_at (computed_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -0,0 +1,9 @@
+-- Add the ticket feed signal: the GLPI webhook bumps this counter so that
+-- every backend worker (not only the one that received it) syncs right away
+USE glpi_sso;
+
+CREATE TABLE IF NOT EXISTS ticket_feed_signals (
+    id INT PRIMARY KEY,
+    version INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
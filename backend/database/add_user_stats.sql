@@ -0,0 +1,76 @@
+-- Add per-user dashboard counters (kept current by the conversation write paths,
+-- reconciled periodically by the backend) and backfill them from existing data
+USE glpi_sso;
+
+CREATE TABLE IF NOT EXISTS user_stats (
+    user_id INT PRIMARY KEY,
+    total_conversations INT NOT NULL DEFAULT 0,
+    archived_conversations INT NOT NULL DEFAULT 0,
+    total_messages INT NOT NULL DEFAULT 0,
+    total_tokens INT NOT NULL DEFAULT 0,
+    conversations_today INT NOT NULL DEFAULT 0,
+    messages_today INT NOT NULL DEFAULT 0,
+    stats_date DATE NULL,
+    last_activity TIMESTAMP NULL,
+    reconciled_at TIMESTAMP NULL,
+    version INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Tables created by an earlier version of this script
+ALTER TABLE user_stats ADD COLUMN IF NOT EXISTS version INT NOT NULL DEFAULT 0 AFTER reconciled_at;
+
+INSERT INTO user_stats (
+    user_id, total_conversations, archived_conversations, total_messages, total_tokens,
+    conversations_today, messages_today, stats_date, last_activity, reconciled_at
+)
+SELECT
+    c.user_id,
+    COUNT(DISTINCT c.id),
+    COUNT(DISTINCT CASE WHEN c.is_archived THEN c.id END),
+    COUNT(m.id),
+    COALESCE(SUM(m.tokens_used), 0),
+    COUNT(DISTINCT CASE WHEN c.created_at >= UTC_DATE() THEN c.id END),
+    COALESCE(SUM(CASE WHEN m.created_at >= UTC_DATE() THEN 1 ELSE 0 END), 0),
+    UTC_DATE(),
+    MAX(m.created_at),
+    UTC_TIMESTAMP()
+FROM conversations c
+LEFT JOIN messages m ON m.conversation_id = c.id
+GROUP BY c.user_id
+ON DUPLICATE KEY UPDATE
+    total_conversations = VALUES(total_conversations),
+    archived_conversations = VALUES(archived_conversations),
+    total_messages = VALUES(total_messages),
+    total_tokens = VALUES(total_tokens),
+    conversations_today = VALUES(conversations_today),
+    messages_today = VALUES(messages_today),
+    stats_date = VALUES(stats_date),
+    last_activity = VALUES(last_activity),
+    reconciled_at = VALUES(reconciled_at),
+    version = version + 1;
+
+-- Dashboard procedure with "today" in UTC, the same day boundary as user_stats.stats_date
+DROP PROCEDURE IF EXISTS sp_get_user_dashboard;
+
+DELIMITER //
+
+CREATE PROCEDURE sp_get_user_dashboard(
+    IN p_user_id INT
+)
+BEGIN
+    SELECT 
+        COUNT(DISTINCT c.id) as total_conversations,
+        COUNT(DISTINCT CASE WHEN c.is_archived THEN c.id END) as archived_conversations,
+        COUNT(DISTINCT CASE WHEN c.created_at >= UTC_DATE() THEN c.id END) as today_conversations,
+        COUNT(m.id) as total_messages,
+        COALESCE(SUM(m.tokens_used), 0) as total_tokens,
+        COALESCE(SUM(CASE WHEN m.created_at >= UTC_DATE() THEN 1 ELSE 0 END), 0) as today_messages,
+        MAX(m.created_at) as last_activity
+    FROM conversations c
+    LEFT JOIN messages m ON m.conversation_id = c.id
+    WHERE c.user_id = p_user_id;
+END //
+
+DELIMITER ;
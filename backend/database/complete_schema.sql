@@ -79,6 +79,9 @@ CREATE TABLE messages (
     content TEXT NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     tokens_used INT DEFAULT 0,
+    prompt_tokens INT NULL,
+    completion_tokens INT NULL,
+    latency_ms FLOAT NULL,
     FOREIGN KEY (conversation_id) REFERENCES conversations(id) ON DELETE CASCADE,
     INDEX idx_conversation_id (conversation_id),
     INDEX idx_created_at (created_at)
@@ -155,6 +158,75 @@ CREATE TABLE statistics_cache (
     INDEX idx_expires_at (expires_at)
 ) ENGINE=InnoDB;
 
+-- =====================================================
+-- 7. LLM USAGE ROLLUP (tokens and latency per user/day/intent)
+-- =====================================================
+
+CREATE TABLE llm_usage_daily (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    usage_date DATE NOT NULL,
+    intent VARCHAR(50) NOT NULL DEFAULT 'unknown',
+    request_count INT NOT NULL DEFAULT 0,
+    llm_calls INT NOT NULL DEFAULT 0,
+    prompt_tokens INT NOT NULL DEFAULT 0,
+    completion_tokens INT NOT NULL DEFAULT 0,
+    total_latency_ms FLOAT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    UNIQUE KEY unique_usage (user_id, usage_date, intent),
+    INDEX idx_usage_date (usage_date)
+) ENGINE=InnoDB;
+
+-- =====================================================
+-- 8. MATERIALIZED REPORTS (versioned, refreshed in background)
+-- =====================================================
+
+CREATE TABLE materialized_reports (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    report_key VARCHAR(100) NOT NULL,
+    version INT NOT NULL,
+    report_type VARCHAR(50) NOT NULL,
+    params JSON NULL,
+    result JSON NOT NULL,
+    row_count INT NOT NULL DEFAULT 0,
+    duration_ms FLOAT NOT NULL DEFAULT 0,
+    computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY unique_report_version (report_key, version),
+    INDEX idx_report_key (report_key),
+    INDEX idx_computed_at (computed_at)
+) ENGINE=InnoDB;
+
+-- =====================================================
+-- 9. USER STATS ROLLUP (dashboard counters per user)
+-- =====================================================
+
+CREATE TABLE user_stats (
+    user_id INT PRIMARY KEY,
+    total_conversations INT NOT NULL DEFAULT 0,
+    archived_conversations INT NOT NULL DEFAULT 0,
+    total_messages INT NOT NULL DEFAULT 0,
+    total_tokens INT NOT NULL DEFAULT 0,
+    conversations_today INT NOT NULL DEFAULT 0,
+    messages_today INT NOT NULL DEFAULT 0,
+    stats_date DATE NULL,
+    last_activity TIMESTAMP NULL,
+    reconciled_at TIMESTAMP NULL,
+    version INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+) ENGINE=InnoDB;
+
+-- =====================================================
+-- 10. TICKET FEED SIGNAL (webhook fan-out across workers)
+-- =====================================================
+
+CREATE TABLE ticket_feed_signals (
+    id INT PRIMARY KEY,
+    version INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB;
+
 -- =====================================================
 -- INITIAL DATA
 -- =====================================================
@@ -273,11 +345,18 @@ CREATE PROCEDURE sp_get_user_dashboard(
     IN p_user_id INT
 )
 BEGIN
+    -- Single pass: conversations joined to their messages, conditional aggregation
     SELECT 
-        (SELECT COUNT(*) FROM conversations WHERE user_id = p_user_id) as total_conversations,
-        (SELECT COUNT(*) FROM conversations WHERE user_id = p_user_id AND DATE(created_at) = CURDATE()) as today_conversations,
-        (SELECT COUNT(*) FROM messages WHERE conversation_id IN (SELECT id FROM conversations WHERE user_id = p_user_id)) as total_messages,
-        (SELECT SUM(tokens_used) FROM messages WHERE conversation_id IN (SELECT id FROM conversations WHERE user_id = p_user_id)) as total_tokens;
+        COUNT(DISTINCT c.id) as total_conversations,
+        COUNT(DISTINCT CASE WHEN c.is_archived THEN c.id END) as archived_conversations,
+        COUNT(DISTINCT CASE WHEN c.created_at >= UTC_DATE() THEN c.id END) as today_conversations,
+        COUNT(m.id) as total_messages,
+        COALESCE(SUM(m.tokens_used), 0) as total_tokens,
+        COALESCE(SUM(CASE WHEN m.created_at >= UTC_DATE() THEN 1 ELSE 0 END), 0) as today_messages,
+        MAX(m.created_at) as last_activity
+    FROM conversations c
+    LEFT JOIN messages m ON m.conversation_id = c.id
+    WHERE c.user_id = p_user_id;
 END //
 
 DELIMITER ;
@@ -1,6 +1,6 @@
 """Response domain entity for assistant responses."""
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from typing import Optional, Dict, Any
 
@@ -13,6 +13,19 @@ class ResponseMetadata:
     tokens_used: Optional[int] = None
     model_version: Optional[str] = None
     confidence_score: Optional[float] = None
+    stage_timings_ms: Dict[str, float] = field(default_factory=dict)
+    cache_hit: bool = False
+    
+    def to_dict(self) -> dict:
+        """Convert metadata to dictionary representation."""
+        return {
+            "processing_time_ms": self.processing_time_ms,
+            "tokens_used": self.tokens_used,
+            "model_version": self.model_version,
+            "confidence_score": self.confidence_score,
+            "stage_timings_ms": dict(self.stage_timings_ms),
+            "cache_hit": self.cache_hit,
+        }
 
 
 @dataclass
@@ -49,11 +62,6 @@ class Response:
         }
         
         if self.metadata:
-            result["metadata"] = {
-                "processing_time_ms": self.metadata.processing_time_ms,
-                "tokens_used": self.metadata.tokens_used,
-                "model_version": self.metadata.model_version,
-                "confidence_score": self.metadata.confidence_score,
-            }
+            result["metadata"] = self.metadata.to_dict()
         
         return result
@@ -4,9 +4,35 @@ Maneja autenticación, sesiones y todas las operaciones CRUD.
 """
 
 import requests
-from typing import Dict, List, Optional, Any
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Any
 from loguru import logger
 import json
+import time
+
+
+# Plazo por petición cuando no hay un límite más cercano
+REQUEST_TIMEOUT = 30
+
+
+class GLPIDeadlineExceeded(requests.exceptions.Timeout):
+    """Se agotó el plazo fijado al cliente antes de terminar la operación"""
+
+
+class RequestDeadline:
+    """Instante límite (time.monotonic) de las peticiones de una operación"""
+
+    def __init__(self, at: float):
+        self.at = at
+
+    def expire(self) -> None:
+        """Adelanta el límite a ahora: el hilo que sigue en la operación se detiene en la siguiente petición"""
+        self.at = min(self.at, time.monotonic())
+
+
+# Plazo de la operación en curso en este contexto. A diferencia de `GLPIClient.deadline`,
+# no es del cliente: operaciones en paralelo sobre el mismo cliente tienen cada una el suyo.
+request_deadline: ContextVar[Optional[RequestDeadline]] = ContextVar("glpi_request_deadline", default=None)
 
 
 class GLPIClient:
@@ -25,6 +51,28 @@ class GLPIClient:
         self.app_token = app_token
         self.user_token = user_token
         self.session_token = None
+        # Instante límite (time.monotonic) de todas las peticiones del cliente; None = sin
+        # límite. El plazo de una operación concreta va en `request_deadline`.
+        self.deadline: Optional[float] = None
+    
+    def _timeout(self) -> float:
+        """
+        Plazo de la siguiente petición, acotado por el instante límite del
+        cliente y por el de la operación en curso (`request_deadline`)
+        
+        Raises:
+            GLPIDeadlineExceeded: Si el instante límite ya pasó
+        """
+        deadline = self.deadline
+        scoped = request_deadline.get()
+        if scoped is not None and (deadline is None or scoped.at < deadline):
+            deadline = scoped.at
+        if deadline is None:
+            return REQUEST_TIMEOUT
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise GLPIDeadlineExceeded("Plazo agotado para las peticiones a GLPI")
+        return min(REQUEST_TIMEOUT, remaining)
         
     def _get_headers(self) -> Dict[str, str]:
         """Construye los headers para las peticiones"""
@@ -55,7 +103,7 @@ class GLPIClient:
                 "Authorization": f"user_token {self.user_token}"
             }
             
-            response = requests.get(url, headers=headers)
+            response = requests.get(url, headers=headers, timeout=self._timeout())
             response.raise_for_status()
             
             data = response.json()
@@ -75,7 +123,7 @@ class GLPIClient:
                 return True
                 
             url = f"{self.base_url}/killSession"
-            response = requests.get(url, headers=self._get_headers())
+            response = requests.get(url, headers=self._get_headers(), timeout=REQUEST_TIMEOUT)
             response.raise_for_status()
             
             self.session_token = None
@@ -95,7 +143,7 @@ class GLPIClient:
             limit: Número máximo de tickets a obtener (None = hasta 10,000)
             
         Returns:
-            Diccionario con 'tickets', 'total', 'showing' y 'stats'
+            Diccionario con 'tickets', 'total' y 'showing'
         """
         try:
             if not self.session_token:
@@ -112,7 +160,7 @@ class GLPIClient:
             
             # Obtener primera página para conocer el total
             params["range"] = "0-99"  # 100 items por página para ser más eficiente
-            response = requests.get(url, headers=self._get_headers(), params=params, timeout=30)
+            response = requests.get(url, headers=self._get_headers(), params=params, timeout=self._timeout())
             response.raise_for_status()
             
             # Extraer total de tickets del header Content-Range
@@ -145,7 +193,7 @@ class GLPIClient:
                     logger.info(f"📥 Solicitando tickets {start}-{end}...")
                     
                     try:
-                        response = requests.get(url, headers=self._get_headers(), params=params, timeout=30)
+                        response = requests.get(url, headers=self._get_headers(), params=params, timeout=self._timeout())
                         
                         if response.status_code == 200 or response.status_code == 206:
                             page_tickets = response.json()
@@ -167,16 +215,12 @@ class GLPIClient:
                 
                 tickets = all_tickets
             
-            # Generar estadísticas
-            stats = self._generate_ticket_stats(tickets)
-            
             logger.info(f"✅ Obtenidos {len(tickets)} tickets de {total_tickets} totales")
             
             return {
                 "tickets": tickets,
                 "total": total_tickets,
-                "showing": len(tickets),
-                "stats": stats
+                "showing": len(tickets)
             }
             
         except Exception as e:
@@ -184,62 +228,167 @@ class GLPIClient:
             return {
                 "tickets": [],
                 "total": 0,
-                "showing": 0,
-                "stats": {}
+                "showing": 0
             }
     
-    def _generate_ticket_stats(self, tickets: List[Dict]) -> Dict[str, Any]:
-        """Genera estadísticas de los tickets"""
-        if not tickets:
-            return {}
+    def get_tickets_page(
+        self,
+        start: int = 0,
+        limit: int = 50,
+        sort: str = "date_mod",
+        order: str = "DESC"
+    ) -> Dict[str, Any]:
+        """
+        Obtiene una sola página de tickets ordenada, con el total real
         
-        stats = {
-            "total": len(tickets),
-            "por_estado": {},
-            "por_prioridad": {},
-            "por_tipo": {},
-            "por_urgencia": {},
-            "por_impacto": {},
-        }
+        Args:
+            start: Índice del primer ticket (0 = primero)
+            limit: Tickets por página
+            sort: Campo de ordenamiento de GLPI (date_mod, date, priority, status, id)
+            order: ASC o DESC
+            
+        Returns:
+            Diccionario con 'tickets' y 'total' (del header Content-Range)
+        """
+        if not self.session_token:
+            self.init_session()
         
-        # Mapeos de valores
-        estados = {
-            1: "Nuevo", 2: "En Proceso (Asignado)", 3: "En Proceso (Planificado)",
-            4: "En Espera", 5: "Resuelto", 6: "Cerrado"
+        url = f"{self.base_url}/Ticket"
+        params = {
+            "expand_dropdowns": "true",
+            "range": f"{start}-{start + limit - 1}",
+            "sort": sort,
+            "order": order
         }
-        prioridades = {1: "Muy Baja", 2: "Baja", 3: "Media", 4: "Alta", 5: "Muy Alta", 6: "Mayor"}
-        tipos = {1: "Incidente", 2: "Solicitud"}
-        urgencias = {1: "Muy Baja", 2: "Baja", 3: "Media", 4: "Alta", 5: "Muy Alta"}
-        impactos = {1: "Muy Bajo", 2: "Bajo", 3: "Medio", 4: "Alto", 5: "Muy Alto"}
+        response = requests.get(url, headers=self._get_headers(), params=params, timeout=self._timeout())
+        
+        if response.status_code == 400 and start > 0:
+            # ERROR_RANGE_EXCEED_TOTAL: página fuera de rango; se pide un item solo para conocer el total
+            params["range"] = "0-0"
+            response = requests.get(url, headers=self._get_headers(), params=params, timeout=self._timeout())
+            response.raise_for_status()
+            return {"tickets": [], "total": self._parse_total(response) or 0}
+        
+        response.raise_for_status()
+        tickets = response.json()
+        total = self._parse_total(response)
+        return {"tickets": tickets, "total": total if total is not None else start + len(tickets)}
+    
+    def search_page(
+        self,
+        item_type: str,
+        criteria: Dict[str, Any],
+        forcedisplay: List[int],
+        start: int = 0,
+        limit: int = 50,
+        sort: Optional[int] = None,
+        order: str = "DESC"
+    ) -> Dict[str, Any]:
+        """
+        Obtiene una página del motor de búsqueda de GLPI (/search/<item_type>)
+        
+        A diferencia de /Ticket, el motor de búsqueda filtra en el servidor
+        (criteria) y devuelve el total de items que cumplen los criterios.
+        
+        Args:
+            item_type: Tipo de item (Ticket, Computer, ...)
+            criteria: Parámetros criteria[...] ya construidos
+            forcedisplay: Opciones de búsqueda a devolver en cada fila
+            start: Índice del primer item
+            limit: Items por página
+            sort: Opción de búsqueda por la que ordenar
+            order: ASC o DESC
+            
+        Returns:
+            Diccionario con 'rows' (claves = ids de opción de búsqueda) y 'total'
+        
+        Raises:
+            requests.HTTPError: Si GLPI responde con error
+        """
+        if not self.session_token:
+            self.init_session()
+        
+        url = f"{self.base_url}/search/{item_type}"
+        params = {**criteria, "range": f"{start}-{start + limit - 1}", "order": order}
+        for i, option in enumerate(forcedisplay):
+            params[f"forcedisplay[{i}]"] = option
+        if sort is not None:
+            params["sort"] = sort
         
-        # Contar por categorías
-        for ticket in tickets:
-            # Por estado
-            estado = ticket.get('status', 0)
-            estado_nombre = estados.get(estado, f"Estado {estado}")
-            stats["por_estado"][estado_nombre] = stats["por_estado"].get(estado_nombre, 0) + 1
-            
-            # Por prioridad
-            prioridad = ticket.get('priority', 0)
-            prioridad_nombre = prioridades.get(prioridad, f"Prioridad {prioridad}")
-            stats["por_prioridad"][prioridad_nombre] = stats["por_prioridad"].get(prioridad_nombre, 0) + 1
-            
-            # Por tipo
-            tipo = ticket.get('type', 0)
-            tipo_nombre = tipos.get(tipo, f"Tipo {tipo}")
-            stats["por_tipo"][tipo_nombre] = stats["por_tipo"].get(tipo_nombre, 0) + 1
-            
-            # Por urgencia
-            urgencia = ticket.get('urgency', 0)
-            urgencia_nombre = urgencias.get(urgencia, f"Urgencia {urgencia}")
-            stats["por_urgencia"][urgencia_nombre] = stats["por_urgencia"].get(urgencia_nombre, 0) + 1
-            
-            # Por impacto
-            impacto = ticket.get('impact', 0)
-            impacto_nombre = impactos.get(impacto, f"Impacto {impacto}")
-            stats["por_impacto"][impacto_nombre] = stats["por_impacto"].get(impacto_nombre, 0) + 1
+        response = requests.get(url, headers=self._get_headers(), params=params, timeout=self._timeout())
+        if response.status_code == 400 and start > 0:
+            # ERROR_RANGE_EXCEED_TOTAL: página fuera de rango; se pide un item solo para conocer el total
+            params["range"] = "0-0"
+            response = requests.get(url, headers=self._get_headers(), params=params, timeout=self._timeout())
+            response.raise_for_status()
+            return {"rows": [], "total": int(response.json().get("totalcount") or 0)}
         
-        return stats
+        response.raise_for_status()
+        data = response.json()
+        rows = data.get("data") or []
+        return {"rows": rows, "total": int(data.get("totalcount") or len(rows))}
+    
+    def iter_pages(
+        self,
+        item_type: str,
+        params: Optional[Dict[str, Any]] = None,
+        page_size: int = 100,
+        max_items: Optional[int] = None
+    ) -> Iterator[List[Dict]]:
+        """
+        Itera los items de GLPI página a página, sin acumularlos en memoria
+        
+        Args:
+            item_type: Tipo de item (Ticket, Computer, ...)
+            params: Parámetros adicionales (sort, order, criteria, ...)
+            page_size: Items por página
+            max_items: Máximo de items a recorrer (None = todos)
+            
+        Yields:
+            Listas de items, una por página
+        
+        Raises:
+            GLPIDeadlineExceeded: Si vence `deadline` antes de pedir una página
+        """
+        if not self.session_token:
+            self.init_session()
+        
+        url = f"{self.base_url}/{item_type}"
+        query = {"expand_dropdowns": "true", **(params or {})}
+        start = 0
+        
+        while max_items is None or start < max_items:
+            end = start + page_size - 1
+            if max_items is not None:
+                end = min(end, max_items - 1)
+            query["range"] = f"{start}-{end}"
+            
+            response = requests.get(url, headers=self._get_headers(), params=query, timeout=self._timeout())
+            if response.status_code == 400 and start > 0:
+                # ERROR_RANGE_EXCEED_TOTAL: no quedan más páginas
+                break
+            response.raise_for_status()
+            
+            page = response.json()
+            if not page:
+                break
+            yield page
+            
+            start += len(page)
+            total = self._parse_total(response)
+            if total is not None and start >= total:
+                break
+    
+    @staticmethod
+    def _parse_total(response: requests.Response) -> Optional[int]:
+        """Extrae el total de items del header Content-Range (ej: 0-99/1523)"""
+        content_range = response.headers.get('Content-Range', '')
+        if '/' not in content_range:
+            return None
+        try:
+            return int(content_range.split('/')[-1])
+        except ValueError:
+            return None
     
     def get_ticket_by_id(self, ticket_id: int) -> Optional[Dict]:
         """
@@ -256,7 +405,7 @@ class GLPIClient:
                 self.init_session()
             
             url = f"{self.base_url}/Ticket/{ticket_id}"
-            response = requests.get(url, headers=self._get_headers())
+            response = requests.get(url, headers=self._get_headers(), timeout=self._timeout())
             response.raise_for_status()
             
             data = response.json()
@@ -267,6 +416,33 @@ class GLPIClient:
             logger.error(f"❌ Error al obtener ticket {ticket_id}: {e}")
             return None
     
+    def get_sub_items(self, item_type: str, item_id: int, sub_item_type: str, limit: int = 200) -> List[Dict]:
+        """
+        Obtiene los sub-items de un item (p. ej. Ticket/123/ITILFollowup)
+        
+        Args:
+            item_type: Tipo del item padre (Ticket, Computer, ...)
+            item_id: ID del item padre
+            sub_item_type: Tipo de los sub-items (ITILFollowup, TicketTask, ...)
+            limit: Número máximo de sub-items
+            
+        Returns:
+            Lista de sub-items con los desplegables expandidos
+        
+        Raises:
+            requests.HTTPError: Si GLPI responde con error
+        """
+        if not self.session_token:
+            self.init_session()
+        
+        url = f"{self.base_url}/{item_type}/{item_id}/{sub_item_type}"
+        params = {"expand_dropdowns": "true", "range": f"0-{limit - 1}"}
+        response = requests.get(url, headers=self._get_headers(), params=params, timeout=self._timeout())
+        response.raise_for_status()
+        
+        items = response.json()
+        return items if isinstance(items, list) else []
+    
     def get_computers(self, filters: Optional[Dict] = None) -> List[Dict]:
         """
         Obtiene computadoras del inventario
@@ -289,7 +465,7 @@ class GLPIClient:
                 params["criteria[0][searchtype]"] = "contains"
                 params["criteria[0][value]"] = filters["name"]
             
-            response = requests.get(url, headers=self._get_headers(), params=params)
+            response = requests.get(url, headers=self._get_headers(), params=params, timeout=self._timeout())
             response.raise_for_status()
             
             data = response.json()
@@ -324,7 +500,7 @@ class GLPIClient:
                 params[f"criteria[{i}][searchtype]"] = criterion.get("searchtype", "contains")
                 params[f"criteria[{i}][value]"] = criterion.get("value")
             
-            response = requests.get(url, headers=self._get_headers(), params=params)
+            response = requests.get(url, headers=self._get_headers(), params=params, timeout=self._timeout())
             response.raise_for_status()
             
             data = response.json()
@@ -381,7 +557,7 @@ class GLPIClient:
                 self.init_session()
             
             url = f"{self.base_url}/getFullSession"
-            response = requests.get(url, headers=self._get_headers())
+            response = requests.get(url, headers=self._get_headers(), timeout=self._timeout())
             response.raise_for_status()
             
             return response.json()
@@ -0,0 +1,227 @@
+"""
+Servidor local compatible con la API de chat completions de Groq/OpenAI,
+para pruebas de carga sin consumir cuota de Groq.
+
+Devuelve respuestas deterministas por intención y simula la latencia del LLM
+(tiempo hasta el primer token y tokens por segundo), errores 429/503 y
+streaming SSE.
+
+Uso:
+    python llm_stub.py --port 8100 --ttft-ms 300 --tokens-per-sec 250 --error-rate 0.02
+
+Y en el backend:
+    GROQ_BASE_URL=http://localhost:8100
+"""
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Any, Dict, List, Optional
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import time
+import uuid
+
+
+# Configuración de latencia y errores (variables de entorno o argumentos)
+STUB_CONFIG = {
+    "ttft_ms": float(os.getenv("STUB_TTFT_MS", "300")),
+    "tokens_per_sec": float(os.getenv("STUB_TOKENS_PER_SEC", "250")),
+    "error_rate": float(os.getenv("STUB_ERROR_RATE", "0")),
+    "seed": int(os.getenv("STUB_SEED", "42")),
+}
+
+_rng = random.Random(STUB_CONFIG["seed"])
+
+# Reglas de clasificación por palabras clave (en orden de prioridad)
+INTENT_RULES = [
+    ("buscar_tickets_similares", re.compile(r"parecid|similar", re.I)),
+    ("buscar_ticket", re.compile(r"ticket\s*#?\s*\d+|\b\d{2,}\b", re.I)),
+    ("consultar_tendencia", re.compile(r"evoluci|tendencia|trend|por (d[ií]a|semana)", re.I)),
+    ("generar_reporte", re.compile(r"reporte|report|informe", re.I)),
+    ("buscar_equipo", re.compile(r"(busca|encuentra|find).*(equipo|computador|pc|laptop)", re.I)),
+    ("consultar_inventario", re.compile(r"inventario|inventory|computador|equipos|computers", re.I)),
+    ("consultar_tickets", re.compile(r"ticket", re.I)),
+]
+
+CANNED_RESPONSES = {
+    "consultar_tickets": (
+        "Resumen de tickets\n\n"
+        "- La mayoría de los tickets se encuentran en estado Nuevo o En Proceso.\n"
+        "- La prioridad Media concentra el mayor volumen.\n\n"
+        "Recomendación: revisar los tickets de prioridad Alta sin asignar."
+    ),
+    "buscar_ticket": "Detalle del ticket solicitado: se encuentra en proceso y asignado al equipo de soporte.",
+    "buscar_tickets_similares": "Se encontraron tickets similares al problema descrito; los más relevantes se listan a continuación.",
+    "consultar_tendencia": (
+        "Evolución de tickets: el volumen de apertura se mantuvo estable y el backlog "
+        "se redujo ligeramente al final del periodo."
+    ),
+    "consultar_inventario": "Inventario: la mayoría de los equipos están en uso y una pequeña parte en mantenimiento.",
+    "buscar_equipo": "Se encontró el equipo solicitado con su ubicación y usuario asignado.",
+    "generar_reporte": "Reporte generado: totales de tickets abiertos y cerrados del periodo solicitado.",
+    "consulta_general": "GLPI es un sistema de gestión de servicios de TI y de inventario de activos.",
+}
+
+
+app = FastAPI(title="LLM stub (Groq/OpenAI compatible)")
+
+
+def classify(text: str) -> str:
+    """Intención determinista para un texto de usuario"""
+    for intent, pattern in INTENT_RULES:
+        if pattern.search(text):
+            return intent
+    return "consulta_general"
+
+
+def classify_params(text: str) -> Dict[str, Any]:
+    """Parámetros deterministas para la intención de un texto"""
+    intent = classify(text)
+    ticket_id = re.search(r"\d+", text)
+    if intent == "buscar_ticket" and ticket_id:
+        return {"ticket_id": int(ticket_id.group())}
+    if intent == "buscar_tickets_similares":
+        return {"texto": text}
+    if intent == "consultar_tickets":
+        return {"status": "open"}
+    if intent == "consultar_tendencia":
+        return {"periodo": "semana" if re.search(r"semana|week", text, re.I) else "dia"}
+    return {}
+
+
+def estimate_tokens(text: str) -> int:
+    """Aproximación de ~4 caracteres por token"""
+    return max(1, len(text) // 4)
+
+
+def build_completion(body: Dict[str, Any]) -> str:
+    """Construye el contenido de la respuesta según el tipo de petición"""
+    messages: List[Dict[str, str]] = body.get("messages", [])
+    user_text = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+
+    # Clasificación de intención (formato JSON); cada cláusula unida por "y"/"and" es una intención
+    if (body.get("response_format") or {}).get("type") == "json_object":
+        intents = []
+        for clause in re.split(r"\s+(?:y|and)\s+", user_text):
+            item = {"intencion": classify(clause), "parametros": classify_params(clause)}
+            if item not in intents:
+                intents.append(item)
+        if len(intents) > 1:
+            intents = [i for i in intents if i["intencion"] != "consulta_general"] or intents[:1]
+        return json.dumps({
+            "intencion": intents[0]["intencion"],
+            "parametros": intents[0]["parametros"],
+            "intenciones": intents[:3],
+            "respuesta_usuario": "Procesando tu consulta.",
+            "confianza": 0.95
+        }, ensure_ascii=False)
+
+    # Generación de respuesta con datos de GLPI
+    match = re.search(r"Intent:\s*(\w+)", user_text)
+    if match:
+        intent = match.group(1)
+    elif "STATISTICAL BREAKDOWN" in user_text:
+        intent = "consultar_tickets"
+    elif "combines several requests" in user_text:
+        return "\n\n".join(CANNED_RESPONSES[i] for i in re.findall(r'"intencion": "(\w+)"', user_text) if i in CANNED_RESPONSES)
+    else:
+        intent = classify(user_text)
+    return CANNED_RESPONSES.get(intent, CANNED_RESPONSES["consulta_general"])
+
+
+def error_response() -> Optional[JSONResponse]:
+    """Simula errores de capacidad según la tasa configurada"""
+    if _rng.random() >= STUB_CONFIG["error_rate"]:
+        return None
+    status_code = _rng.choice([429, 503])
+    return JSONResponse(
+        status_code=status_code,
+        content={"error": {"message": "Simulated capacity error", "type": "rate_limit_exceeded"}},
+        headers={"retry-after": "2"}
+    )
+
+
+@app.post("/openai/v1/chat/completions")
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    """Endpoint compatible con chat.completions.create (con y sin streaming)"""
+    body = await request.json()
+    error = error_response()
+    if error is not None:
+        return error
+
+    content = build_completion(body)
+    words = re.findall(r"\S+\s*", content)
+    prompt_tokens = sum(estimate_tokens(m.get("content") or "") for m in body.get("messages", []))
+    usage = {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": len(words),
+        "total_tokens": prompt_tokens + len(words)
+    }
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+    created = int(time.time())
+    model = body.get("model", "stub")
+    token_delay = 1.0 / STUB_CONFIG["tokens_per_sec"] if STUB_CONFIG["tokens_per_sec"] > 0 else 0.0
+
+    if body.get("stream"):
+        async def event_stream():
+            await asyncio.sleep(STUB_CONFIG["ttft_ms"] / 1000)
+            for word in words:
+                chunk = {
+                    "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}]
+                }
+                yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+                await asyncio.sleep(token_delay)
+            final = {
+                "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                "x_groq": {"usage": usage}
+            }
+            yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+    await asyncio.sleep(STUB_CONFIG["ttft_ms"] / 1000 + token_delay * len(words))
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": created,
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": usage
+    }
+
+
+@app.get("/health")
+async def health():
+    """Estado del stub y configuración activa"""
+    return {"status": "ok", **STUB_CONFIG}
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Servidor LLM local compatible con Groq/OpenAI")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--ttft-ms", type=float, default=STUB_CONFIG["ttft_ms"])
+    parser.add_argument("--tokens-per-sec", type=float, default=STUB_CONFIG["tokens_per_sec"])
+    parser.add_argument("--error-rate", type=float, default=STUB_CONFIG["error_rate"])
+    parser.add_argument("--seed", type=int, default=STUB_CONFIG["seed"])
+    args = parser.parse_args()
+
+    STUB_CONFIG.update(
+        ttft_ms=args.ttft_ms,
+        tokens_per_sec=args.tokens_per_sec,
+        error_rate=args.error_rate,
+        seed=args.seed
+    )
+    _rng.seed(args.seed)
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -15,6 +15,10 @@ from api.settings_routes import router as settings_router
 from api.statistics_routes import router as statistics_router
 from api.tickets_routes import router as tickets_router
 from api.inventory_routes import router as inventory_router
+from api.reports_routes import router as reports_router
+from services.report_scheduler import report_scheduler
+from services.user_stats import user_stats_reconciler
+from services.ticket_changes import ticket_change_feed
 from config import settings
 
 
@@ -32,6 +36,15 @@ logger.add(
     format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function} - {message}",
     level="DEBUG"
 )
+# Tiempos por etapa de cada consulta en JSON (una línea por consulta)
+logger.add(
+    "logs/query_metrics.log",
+    rotation="10 MB",
+    retention="7 days",
+    filter=lambda record: record["extra"].get("event") == "query_timings",
+    serialize=True,
+    level="INFO"
+)
 
 
 # Crear aplicación FastAPI
@@ -81,6 +94,7 @@ app.include_router(settings_router)  # Settings routes (already has /api/v1/sett
 app.include_router(statistics_router)  # Statistics routes (already has /api/v1/statistics prefix)
 app.include_router(tickets_router, prefix="/api/v1/tickets", tags=["tickets"])  # Tickets routes
 app.include_router(inventory_router, prefix="/api/v1/inventory", tags=["inventory"])  # Inventory routes
+app.include_router(reports_router)  # Report export routes (already has /api/v1/reports prefix)
 
 
 @app.on_event("startup")
@@ -89,7 +103,12 @@ async def startup_event():
     logger.info("🚀 Iniciando Agente Inteligente GLPI...")
     logger.info(f"📍 GLPI URL: {settings.glpi_url or 'No configurado'}")
     logger.info("🧠 Proveedor de IA: Groq")
-    logger.info(f"🤖 Modelo: {settings.groq_model}")
+    logger.info(f"🤖 Modelo: {settings.groq_model} (clasificador: {settings.groq_classifier_model or settings.groq_model})")
+    if settings.report_scheduler_enabled:
+        report_scheduler.start()
+    ticket_change_feed.start()
+    if settings.user_stats_reconcile_seconds > 0:
+        user_stats_reconciler.start()
     logger.info("✅ Aplicación iniciada correctamente")
 
 
@@ -97,6 +116,9 @@ async def startup_event():
 async def shutdown_event():
     """Evento de cierre de la aplicación"""
     logger.info("👋 Cerrando Agente Inteligente GLPI...")
+    report_scheduler.stop()
+    ticket_change_feed.stop()
+    user_stats_reconciler.stop()
 
 
 if __name__ == "__main__":
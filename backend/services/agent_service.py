@@ -3,43 +3,155 @@ Servicio principal que orquesta la comunicación entre
 el agente IA y el cliente GLPI.
 """
 
-from typing import Dict, Any, Optional
+from collections import Counter
+from datetime import date, timedelta
+from typing import Dict, List, Any, Optional
 from loguru import logger
+import asyncio
+import time
 
-from integrations.glpi_client import GLPIClient
+from integrations.glpi_client import GLPIClient, RequestDeadline, request_deadline
 from ai.agent import AIAgent
+from ai.dispatcher import LLMSaturatedError
+from ai.usage import summarize_usage
+from domain.entities import ResponseMetadata
+from services.ticket_search import ticket_search_index
+from services.ticket_stats import ticket_breakdown
+from services.ticket_timeline import ticket_timeline
+from services.ticket_detail import ticket_detail_service
+from services.inventory_snapshot import inventory_snapshot
+from services.report_scheduler import load_fresh_report, report_key_for, summarize_inventory
+from services.text_analysis import fold_accents
+
+
+# Palabras del usuario (sin acentos, por prefijo) -> valores de tipo y estado del inventario
+INVENTORY_TYPE_ALIASES = {
+    "comput": "computer", "pc": "computer", "escritorio": "computer",
+    "laptop": "laptop", "portatil": "laptop",
+    "servidor": "server", "server": "server",
+    "monitor": "monitor", "pantalla": "monitor",
+    "impresora": "printer", "printer": "printer",
+    "switch": "network", "router": "network", "red": "network", "network": "network",
+    "telefono": "phone", "phone": "phone",
+    "periferico": "peripheral",
+}
+INVENTORY_STATUS_ALIASES = {
+    "en uso": "in_use", "uso": "in_use", "activo": "in_use",
+    "disponible": "available",
+    "mantenimiento": "maintenance", "reparacion": "maintenance",
+    "averiado": "broken", "danado": "broken",
+    "retirado": "retired", "inactivo": "retired", "baja": "retired",
+}
+
+
+def _inventory_value(text: Any, aliases: Dict[str, str]) -> Optional[str]:
+    """Valor del inventario que corresponde a una palabra del usuario (impresoras -> printer)"""
+    if not text:
+        return None
+    folded = fold_accents(str(text)).strip()
+    for alias, value in aliases.items():
+        if folded.startswith(alias) or folded == value:
+            return value
+    return None
 
 
 class AgentService:
     """Servicio que coordina el agente IA y GLPI"""
     
-    def __init__(self, glpi_client: GLPIClient, ai_agent: AIAgent):
+    def __init__(
+        self,
+        glpi_client: GLPIClient,
+        ai_agent: AIAgent,
+        query_timeout: float = 45.0,
+        classify_timeout: float = 10.0,
+        glpi_timeout: float = 25.0,
+        generate_timeout: float = 15.0
+    ):
         """
         Inicializa el servicio
         
         Args:
             glpi_client: Cliente de GLPI
             ai_agent: Agente de IA
+            query_timeout: Presupuesto total de una consulta (segundos)
+            classify_timeout: Tiempo máximo para entender la consulta
+            glpi_timeout: Tiempo máximo para obtener los datos de GLPI
+            generate_timeout: Tiempo máximo para redactar la respuesta
         """
         self.glpi = glpi_client
         self.ai = ai_agent
+        self.query_timeout = query_timeout
+        self.classify_timeout = classify_timeout
+        self.glpi_timeout = glpi_timeout
+        self.generate_timeout = generate_timeout
+        # Hilos de etapas que vencieron o se cancelaron y siguen en marcha
+        self._abandoned: List[asyncio.Future] = []
     
     async def process_query(self, user_query: str, user_id: Optional[int] = None) -> Dict[str, Any]:
         """
         Procesa una consulta del usuario de principio a fin
         
+        Cada etapa (clasificación, GLPI, generación) corre en un hilo con su
+        propio plazo, acotado por el presupuesto total de la consulta. Si la
+        tarea se cancela (p. ej. el cliente se desconectó) se deja de esperar
+        de inmediato.
+        
         Args:
             user_query: Pregunta del usuario
             user_id: ID del usuario (opcional)
             
         Returns:
-            Respuesta completa con datos y mensaje generado
+            Respuesta completa con datos, mensaje generado y tiempos por etapa
         """
+        started = time.perf_counter()
+        timings: Dict[str, float] = {}
+        
+        result = await self._run_pipeline(user_query, user_id, timings)
+        
+        usage = result.get("usage") or {}
+        calls = usage.get("calls") or []
+        metadata = ResponseMetadata(
+            processing_time_ms=round((time.perf_counter() - started) * 1000, 2),
+            tokens_used=usage.get("total_tokens"),
+            model_version=next((c["model"] for c in reversed(calls) if c["operation"] == "generate_response"), None),
+            confidence_score=result.get("confidence"),
+            stage_timings_ms=timings,
+            cache_hit=bool(result.get("cached"))
+        )
+        result["metadata"] = metadata.to_dict()
+        
+        # Registro estructurado (logs/query_metrics.log) para analizar p95 por etapa e intención
+        logger.bind(event="query_timings", intent=result.get("intention"), **metadata.to_dict()).info(
+            f"⏱️ Consulta {result.get('intention')} en {metadata.processing_time_ms:.0f} ms {timings}"
+        )
+        return result
+    
+    async def _run_pipeline(
+        self,
+        user_query: str,
+        user_id: Optional[int],
+        timings: Dict[str, float]
+    ) -> Dict[str, Any]:
+        """Clasificación, consulta a GLPI y generación, registrando la duración de cada etapa"""
+        deadline = asyncio.get_running_loop().time() + self.query_timeout
+        
         try:
             logger.info(f"📨 Nueva consulta: {user_query}")
             
             # Paso 1: Entender la intención del usuario con IA
-            understanding = self.ai.understand_query(user_query)
+            try:
+                understanding = await self._run_stage(
+                    "classification", timings, deadline, self.classify_timeout,
+                    self.ai.understand_query, user_query
+                )
+            except asyncio.TimeoutError:
+                return {
+                    "success": False,
+                    "message": "La consulta está tardando más de lo esperado. Por favor, intenta de nuevo.",
+                    "data": None,
+                    "intention": "timeout",
+                    "usage": self.consume_usage()
+                }
             intention = understanding.get("intencion")
             params = understanding.get("parametros", {})
             confidence = understanding.get("confianza", 0.0)
@@ -50,25 +162,49 @@ class AgentService:
                     "success": False,
                     "message": understanding.get("respuesta_usuario"),
                     "data": None,
-                    "intention": "low_confidence"
+                    "intention": "low_confidence",
+                    "usage": self.consume_usage()
                 }
             
-            # Paso 2: Ejecutar la acción en GLPI según la intención
-            logger.info(f"🔍 Ejecutando acción GLPI con intención: {intention}")
+            # Paso 2: Ejecutar la acción en GLPI según la intención (varias en paralelo si es compuesta)
+            intents = understanding.get("intenciones") or [{"intencion": intention, "parametros": params}]
+            logger.info(f"🔍 Ejecutando acción GLPI con intención: {', '.join(i['intencion'] for i in intents)}")
             logger.debug(f"📋 Parámetros: {params}")
             
-            glpi_data = await self._execute_glpi_action(intention, params, user_id)
+            try:
+                if len(intents) > 1:
+                    intention = self.ai.MULTI_INTENT
+                    glpi_data = await self._execute_glpi_actions(intents, user_id, deadline, timings)
+                else:
+                    glpi_data = await self._run_stage(
+                        "glpi", timings, deadline, self.glpi_timeout,
+                        self._execute_glpi_action, intention, params, user_id,
+                        bounds_glpi=True
+                    )
+            except asyncio.TimeoutError:
+                return {
+                    "success": False,
+                    "message": "GLPI no respondió a tiempo. Por favor, intenta de nuevo en unos momentos.",
+                    "data": None,
+                    "intention": intention,
+                    "confidence": confidence,
+                    "usage": self.consume_usage()
+                }
             
             logger.info(f"📊 Datos de GLPI recibidos: {type(glpi_data)} - {bool(glpi_data)}")
             
             # Paso 3: Generar respuesta en lenguaje natural
+            self.ai.last_response_cached = False
             if glpi_data is not None:
                 # Si hay datos (incluso si está vacío pero no es None)
-                response_message = self.ai.generate_response(
-                    user_query,
-                    glpi_data,
-                    intention
-                )
+                try:
+                    response_message = await self._run_stage(
+                        "generation", timings, deadline, self.generate_timeout,
+                        self.ai.generate_response, user_query, glpi_data, intention
+                    )
+                except asyncio.TimeoutError:
+                    # Sin tiempo para el LLM: resumen de plantilla con los datos ya obtenidos
+                    response_message = self.ai.template_response(glpi_data, intention)
             else:
                 # Si glpi_data es None, hubo un error
                 logger.warning(f"⚠️ No se obtuvieron datos de GLPI para intención: {intention}")
@@ -79,19 +215,162 @@ class AgentService:
                 "message": response_message,
                 "data": glpi_data,
                 "intention": intention,
-                "confidence": confidence
+                "confidence": confidence,
+                "cached": self.ai.last_response_cached,
+                "usage": self.consume_usage()
             }
             
+        except asyncio.CancelledError:
+            logger.info(f"🚫 Consulta cancelada: {user_query}")
+            raise
+        except LLMSaturatedError:
+            raise
         except Exception as e:
             logger.error(f"❌ Error procesando consulta: {e}")
             return {
                 "success": False,
                 "message": "Lo siento, ocurrió un error al procesar tu consulta.",
                 "data": None,
-                "intention": "error"
+                "intention": "error",
+                "usage": self.consume_usage()
             }
     
-    async def _execute_glpi_action(
+    async def _run_stage(
+        self,
+        stage: str,
+        timings: Dict[str, float],
+        deadline: float,
+        timeout: float,
+        func,
+        *args,
+        bounds_glpi: bool = False
+    ) -> Any:
+        """
+        Ejecuta una etapa síncrona en un hilo con plazo propio
+        
+        Un hilo no se puede interrumpir: si la etapa vence o se cancela, se deja
+        de esperar pero el hilo sigue. Las etapas de GLPI fijan además su plazo
+        (`request_deadline`), de modo que el hilo abandonado no hace más peticiones; el
+        resto (llamadas al LLM, acotadas por el timeout del cliente de Groq) se
+        guarda en `_abandoned` para recoger después el uso que registren.
+        
+        Args:
+            stage: Nombre de la etapa (clave en `timings`)
+            timings: Duración de cada etapa en ms (se actualiza aunque venza el plazo)
+            deadline: Instante límite de toda la consulta (reloj del event loop)
+            timeout: Plazo máximo de la etapa en segundos
+            func: Función síncrona a ejecutar
+            bounds_glpi: Aplicar el plazo de la etapa a las peticiones del cliente GLPI
+            
+        Returns:
+            Resultado de la función
+            
+        Raises:
+            asyncio.TimeoutError: Si la etapa no termina dentro de su plazo
+        """
+        budget = min(timeout, deadline - asyncio.get_running_loop().time())
+        if budget <= 0:
+            logger.warning(f"⏱️ Sin presupuesto de tiempo para la etapa {stage}")
+            timings[stage] = 0.0
+            raise asyncio.TimeoutError()
+        
+        stage_deadline = None
+        started = time.perf_counter()
+        if bounds_glpi:
+            # Plazo propio de la etapa, en el contexto que hereda su hilo: las etapas de GLPI
+            # en paralelo comparten cliente, pero la que vence no corta a las demás
+            stage_deadline = RequestDeadline(time.monotonic() + budget)
+            token = request_deadline.set(stage_deadline)
+            try:
+                task = asyncio.ensure_future(asyncio.to_thread(func, *args))
+            finally:
+                request_deadline.reset(token)
+        else:
+            task = asyncio.ensure_future(asyncio.to_thread(func, *args))
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout=budget)
+        except asyncio.TimeoutError:
+            logger.warning(f"⏱️ La etapa {stage} superó su plazo de {budget:.1f}s")
+            self._abandon(task, stage_deadline)
+            raise
+        except asyncio.CancelledError:
+            self._abandon(task, stage_deadline)
+            raise
+        finally:
+            timings[stage] = round((time.perf_counter() - started) * 1000, 2)
+    
+    def _abandon(self, task: asyncio.Future, stage_deadline: Optional[RequestDeadline] = None) -> None:
+        if stage_deadline is not None:
+            # El hilo de esta etapa de GLPI se detiene en la siguiente petición
+            stage_deadline.expire()
+        self._abandoned.append(task)
+    
+    async def _execute_glpi_actions(
+        self,
+        intents: List[Dict[str, Any]],
+        user_id: Optional[int],
+        deadline: float,
+        timings: Dict[str, float]
+    ) -> Dict[str, Any]:
+        """
+        Ejecuta en paralelo las acciones de GLPI de una consulta con varias intenciones
+        
+        Cada acción tiene su propio plazo: la consulta cuesta lo que la más lenta y
+        una parte que no llega a tiempo no invalida las demás.
+        
+        Args:
+            intents: Lista de {"intencion", "parametros"}
+            user_id: ID del usuario
+            deadline: Instante límite de toda la consulta (reloj del event loop)
+            timings: Duración de cada etapa en ms
+            
+        Returns:
+            {"intenciones", "resultados": [{"intencion", "parametros", "data"}]}
+            
+        Raises:
+            asyncio.TimeoutError: Si ninguna de las acciones terminó a tiempo
+        """
+        started = time.perf_counter()
+        
+        # Una sola sesión de GLPI para todos los hilos (cada método abriría la suya)
+        if not self.glpi.session_token:
+            await self._run_stage(
+                "glpi:session", timings, deadline, self.glpi_timeout, self.glpi.init_session,
+                bounds_glpi=True
+            )
+        
+        stage_names = Counter()
+        stages = []
+        for item in intents:
+            name = f"glpi:{item['intencion']}"
+            stage_names[name] += 1
+            if stage_names[name] > 1:
+                name = f"{name}:{stage_names[name]}"
+            stages.append(self._run_stage(
+                name, timings, deadline, self.glpi_timeout,
+                self._execute_glpi_action, item["intencion"], item["parametros"], user_id,
+                bounds_glpi=True
+            ))
+        
+        results = await asyncio.gather(*stages, return_exceptions=True)
+        timings["glpi"] = round((time.perf_counter() - started) * 1000, 2)
+        
+        if all(isinstance(result, asyncio.TimeoutError) for result in results):
+            raise asyncio.TimeoutError()
+        
+        return {
+            "intenciones": [item["intencion"] for item in intents],
+            "resultados": [
+                {
+                    "intencion": item["intencion"],
+                    "parametros": item["parametros"],
+                    "data": None if isinstance(result, BaseException) else result
+                }
+                for item, result in zip(intents, results)
+            ]
+        }
+    
+    def _execute_glpi_action(
         self,
         intention: str,
         params: Dict[str, Any],
@@ -123,6 +402,7 @@ class AgentService:
                 else:
                     # Obtener TODOS los tickets disponibles (hasta 10k) con estadísticas
                     result = self.glpi.get_tickets({"status": status}, limit=None)
+                    result["stats"] = ticket_breakdown(result.get("tickets", []))
                     # Calcular cantidad de tickets
                     count = 0
                     if isinstance(result, dict):
@@ -136,21 +416,85 @@ class AgentService:
             elif intention == "buscar_ticket":
                 ticket_id = params.get("ticket_id")
                 if ticket_id:
-                    return self.glpi.get_ticket_by_id(ticket_id)
+                    # Ticket con su historial (sub-recursos pedidos en paralelo a GLPI)
+                    detail = ticket_detail_service.get(self.glpi, int(ticket_id))
+                    if not detail:
+                        return None
+                    return {
+                        **detail["ticket"],
+                        "seguimientos": detail["followups"][-5:],
+                        "tareas": detail["tasks"],
+                        "solucion": detail["solutions"][-1] if detail["solutions"] else None,
+                        "elementos_vinculados": detail["items"],
+                        "actores": detail["actors"]
+                    }
+            
+            # Buscar tickets parecidos a un problema (índice BM25 local)
+            elif intention == "buscar_tickets_similares":
+                texto = params.get("texto") or params.get("descripcion")
+                if texto:
+                    if not self._refresh_ticket_index():
+                        return {"tickets": [], "total": 0, "showing": 0, "indice_cargando": True}
+                    results = ticket_search_index.search(str(texto), limit=10)
+                    tickets = [{**ticket, "relevancia": score} for ticket, score in results]
+                    logger.info(f"✅ Tickets similares encontrados: {len(tickets)}")
+                    return {
+                        "tickets": tickets,
+                        "total": len(tickets),
+                        "showing": len(tickets)
+                    }
+            
+            # Evolución del volumen de tickets (serie mantenida sobre el espejo local)
+            elif intention == "consultar_tendencia":
+                periodo = str(params.get("periodo") or "dia").lower()
+                period = "week" if periodo.startswith(("sem", "week")) else "day"
+                try:
+                    dias = int(params.get("dias") or (84 if period == "week" else 30))
+                except (TypeError, ValueError):
+                    dias = 30
+                dias = max(1, min(dias, 365))
+                
+                if not self._refresh_ticket_index():
+                    return None
+                date_to = date.today()
+                result = ticket_timeline.series(date_to - timedelta(days=dias - 1), date_to, period)
+                logger.info(f"✅ Evolución de tickets: {len(result['buckets'])} periodos ({period})")
+                return result
             
             # Consultar inventario
             elif intention == "consultar_inventario":
-                return self.glpi.get_computers()
+                view = inventory_snapshot.view()
+                filters = {
+                    "type": _inventory_value(params.get("tipo"), INVENTORY_TYPE_ALIASES),
+                    "status": _inventory_value(params.get("estado"), INVENTORY_STATUS_ALIASES),
+                    "location": params.get("ubicacion"),
+                }
+                equipos = view.filter(**filters)
+                facets = view.facets(limit=20, **filters)["facets"]
+                logger.info(f"✅ Inventario: {len(equipos)} activos con filtros {filters}")
+                return {
+                    "tipo": "inventario",
+                    "total": len(equipos),
+                    "por_tipo": {f["value"]: f["count"] for f in facets["type"]},
+                    "por_estado": {f["value"]: f["count"] for f in facets["status"]},
+                    "equipos": equipos[:20]
+                }
             
-            # Buscar equipo específico
+            # Buscar equipo específico (búsqueda aproximada sobre la instantánea del inventario)
             elif intention == "buscar_equipo":
-                nombre = params.get("nombre")
-                if nombre:
-                    return self.glpi.get_computers({"name": nombre})
+                texto = params.get("nombre") or params.get("texto") or params.get("serial")
+                if texto:
+                    results = inventory_snapshot.view().search(str(texto), limit=10)
+                    equipos = [{**item, "relevancia": score} for item, score in results]
+                    logger.info(f"✅ Equipos encontrados para '{texto}': {len(equipos)}")
+                    return {
+                        "equipos": equipos,
+                        "total": len(equipos)
+                    }
             
             # Generar reporte
             elif intention == "generar_reporte":
-                return await self._generate_report(params)
+                return self._generate_report(params)
             
             # Consulta general (no requiere GLPI)
             elif intention == "consulta_general":
@@ -164,7 +508,24 @@ class AgentService:
             logger.error(f"❌ Error ejecutando acción GLPI: {e}")
             return None
     
-    async def _generate_report(self, params: Dict[str, Any]) -> Dict[str, Any]:
+    def _refresh_ticket_index(self) -> bool:
+        """
+        Sincroniza el espejo de tickets antes de usarlo
+        
+        La carga inicial recorre todo GLPI y no cabe en el plazo de una consulta:
+        se lanza en segundo plano con su propia sesión (sin plazo).
+        
+        Returns:
+            False si el espejo aún no está cargado
+        """
+        if ticket_search_index.is_warm:
+            ticket_search_index.refresh(self.glpi)
+            return True
+        logger.info("🔎 Índice de tickets sin cargar: carga inicial en segundo plano")
+        ticket_search_index.refresh_in_background()
+        return False
+    
+    def _generate_report(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """
         Genera reportes basados en datos de GLPI
         
@@ -177,29 +538,38 @@ class AgentService:
         try:
             tipo_reporte = params.get("tipo", "tickets")
             
+            # Reporte materializado en segundo plano, si es reciente
+            materialized = load_fresh_report(report_key_for(tipo_reporte, params.get("periodo")))
+            if materialized is not None:
+                logger.info(f"🗓️ Reporte servido desde materialización: {materialized['reporte']} v{materialized['version']}")
+                return materialized
+            
             if tipo_reporte == "tickets":
-                tickets = self.glpi.get_tickets()
+                result = self.glpi.get_tickets()
+                tickets = result.get("tickets", [])
                 
-                # Calcular estadísticas
-                total = len(tickets)
+                # Calcular estadísticas (el total viene de GLPI; el desglose, de los tickets descargados)
+                total = result.get("total", len(tickets))
                 abiertos = sum(1 for t in tickets if t.get("status") in [1, 2, 3, 4])
-                cerrados = total - abiertos
+                cerrados = len(tickets) - abiertos
                 
                 return {
                     "tipo": "tickets",
                     "total": total,
+                    "analizados": len(tickets),
                     "abiertos": abiertos,
                     "cerrados": cerrados,
-                    "detalles": tickets[:10]  # Primeros 10
+                    "detalles": tickets[:10],  # Primeros 10
+                    "exportar": "/api/v1/reports/export?type=tickets&format=xlsx"
                 }
             
             elif tipo_reporte == "inventario":
-                computers = self.glpi.get_computers()
-                
+                # Todos los tipos de activo, como la exportación
+                view = inventory_snapshot.view()
                 return {
-                    "tipo": "inventario",
-                    "total_equipos": len(computers),
-                    "detalles": computers[:10]
+                    **summarize_inventory(view),
+                    "detalles": view.items[:10],
+                    "exportar": "/api/v1/reports/export?type=inventario&format=xlsx"
                 }
             
             return None
@@ -219,3 +589,40 @@ class AgentService:
             Respuesta del agente
         """
         return self.ai.chat(message)
+    
+    def consume_usage(self) -> Dict[str, Any]:
+        """
+        Resume el uso de LLM acumulado por el agente desde la última lectura
+        
+        Returns:
+            Tokens de prompt/completion, latencia total y detalle por llamada
+        """
+        return summarize_usage(self.ai.consume_usage())
+    
+    @property
+    def has_abandoned_stages(self) -> bool:
+        """Indica si quedan hilos de etapas abandonadas sin terminar"""
+        return any(not task.done() for task in self._abandoned)
+    
+    async def consume_late_usage(self, timeout: float) -> Dict[str, Any]:
+        """
+        Espera a los hilos de etapas abandonadas y resume el uso que registraron
+        
+        Una llamada al LLM que vence sigue consumiendo tokens en Groq: se
+        espera a que termine para no perder su coste.
+        
+        Args:
+            timeout: Espera máxima en segundos
+            
+        Returns:
+            Resumen como `consume_usage` de lo registrado después de la respuesta
+        """
+        pending = [task for task in self._abandoned if not task.done()]
+        self._abandoned = []
+        if pending:
+            await asyncio.wait(pending, timeout=timeout)
+        for task in pending:
+            if task.done() and not task.cancelled():
+                # Recuperar la excepción para que asyncio no la avise como no leída
+                task.exception()
+        return self.consume_usage()
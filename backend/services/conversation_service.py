@@ -0,0 +1,62 @@
+"""
+Escritura de mensajes de conversación: guarda el mensaje, actualiza la
+conversación y los contadores del dashboard. El uso de LLM de un mensaje
+solo lo registra el servidor, a partir del resultado de /query o /chat.
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from auth.models import Conversation, Message, MessageRole
+from services.dashboard_stats import dashboard_stats_cache
+from services.user_stats import record_message_added
+
+
+def get_user_conversation(db: Session, user_id: int, conversation_id: int) -> Optional[Conversation]:
+    """Conversación del usuario, o None si no existe o es de otro usuario"""
+    return db.query(Conversation).filter(
+        Conversation.id == conversation_id,
+        Conversation.user_id == user_id
+    ).first()
+
+
+def add_conversation_message(
+    db: Session,
+    conversation: Conversation,
+    role: MessageRole,
+    content: str,
+    usage: Optional[Dict[str, Any]] = None
+) -> Message:
+    """
+    Agrega un mensaje a la conversación y hace commit
+
+    Args:
+        db: Sesión de base de datos
+        conversation: Conversación (ya verificada como del usuario)
+        role: Rol del mensaje
+        content: Texto del mensaje
+        usage: Resumen de `summarize_usage` de la petición que generó el mensaje
+
+    Returns:
+        Mensaje guardado
+    """
+    usage = usage or {}
+    message = Message(
+        conversation_id=conversation.id,
+        role=role,
+        content=content,
+        tokens_used=usage.get("total_tokens", 0),
+        prompt_tokens=usage.get("prompt_tokens"),
+        completion_tokens=usage.get("completion_tokens"),
+        latency_ms=usage.get("latency_ms")
+    )
+    db.add(message)
+    conversation.updated_at = datetime.now(timezone.utc)
+
+    record_message_added(db, conversation.user_id, message.tokens_used)
+    db.commit()
+    db.refresh(message)
+    dashboard_stats_cache.on_message_added(conversation.user_id, message.tokens_used, message.created_at)
+    return message
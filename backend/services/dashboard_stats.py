@@ -0,0 +1,195 @@
+"""
+Caché en memoria de las estadísticas del dashboard por usuario, delante de
+la fila del usuario en user_stats.
+
+Las rutas de conversaciones avisan de cada cambio ya confirmado (mensaje
+nuevo, conversación creada, archivada o eliminada): la entrada del usuario
+se actualiza en el sitio cuando el cambio se puede sumar, o se descarta si
+no. Así las cifras no quedan desfasadas hasta que caduque el TTL.
+
+Los avisos solo llegan al proceso que atendió la escritura. Con varios
+workers (gunicorn -w 4) cada acierto se comprueba contra la versión de la
+fila en user_stats, que sube con cada escritura de cualquier proceso: una
+consulta por clave primaria de una sola columna. Con un único proceso la
+comprobación se puede desactivar (DASHBOARD_CACHE_CHECK_VERSION=false) y un
+acierto no cuesta ninguna consulta.
+"""
+
+from collections import OrderedDict
+from datetime import date, datetime, timezone
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple
+import time
+
+from config import settings
+
+
+def utc_today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+class DashboardStatsCache:
+    """Caché LRU con TTL de las estadísticas del dashboard, actualizada por eventos"""
+
+    def __init__(self, ttl_seconds: float = 900, max_entries: int = 1024, check_version: bool = True):
+        """
+        Inicializa la caché
+
+        Args:
+            ttl_seconds: Vida de cada entrada (0 = caché desactivada)
+            max_entries: Máximo de usuarios antes de descartar los menos usados
+            check_version: Validar cada acierto con la versión de la fila en user_stats
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.check_version = check_version
+        # Usuario -> (caducidad, día UTC de las cifras "de hoy", versión de la fila, estadísticas)
+        self._entries: "OrderedDict[int, Tuple[float, date, Optional[int], Dict[str, Any]]]" = OrderedDict()
+        # Reloj de cambios: un cálculo que se solapa con un cambio del usuario no se guarda.
+        # Usuario -> reloj de su último cambio, de más antiguo a más reciente; los más
+        # antiguos se olvidan y los cálculos empezados antes de ellos ya no se aceptan
+        self._clock = 0
+        self._changes: "OrderedDict[int, int]" = OrderedDict()
+        self._forgotten_upto = 0
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # ------------------------------------------------------------------
+    # Lectura y escritura
+    # ------------------------------------------------------------------
+
+    def get(self, user_id: int, version: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Estadísticas cacheadas del usuario, si existen, no han caducado y son de hoy
+
+        Args:
+            version: Versión actual de la fila en user_stats (con check_version)
+        """
+        if self.ttl_seconds <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] < time.monotonic() or entry[1] != utc_today() or (
+                self.check_version and (version is None or entry[2] != version)
+            ):
+                if entry is not None:
+                    del self._entries[user_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return dict(entry[3])
+
+    def generation(self, user_id: int) -> int:
+        """Marca a tomar antes de calcular las estadísticas y pasar después a `set`"""
+        with self._lock:
+            return self._clock
+
+    def set(self, user_id: int, stats: Dict[str, Any], generation: int, version: Optional[int] = None) -> bool:
+        """
+        Guarda las estadísticas calculadas
+
+        Args:
+            version: Versión de la fila de user_stats de la que salen las cifras
+
+        Returns:
+            False si hubo un cambio desde `generation` (las cifras ya no valen)
+        """
+        with self._lock:
+            if generation < self._forgotten_upto or self._changes.get(user_id, 0) > generation:
+                return False
+            if self.ttl_seconds > 0:
+                self._entries[user_id] = (time.monotonic() + self.ttl_seconds, utc_today(), version, dict(stats))
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return True
+
+    def invalidate(self, user_id: int) -> None:
+        """Descarta las estadísticas del usuario"""
+        with self._lock:
+            self._bump(user_id)
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        """Vacía la caché (los cálculos en curso no se guardarán)"""
+        with self._lock:
+            self._clock += 1
+            self._forgotten_upto = self._clock
+            self._changes.clear()
+            self._entries.clear()
+
+    def _bump(self, user_id: int) -> None:
+        self._clock += 1
+        self._changes[user_id] = self._clock
+        self._changes.move_to_end(user_id)
+        while len(self._changes) > self.max_entries:
+            _, changed_at = self._changes.popitem(last=False)
+            self._forgotten_upto = changed_at
+
+    def _update(self, user_id: int, **deltas: int) -> Optional[Dict[str, Any]]:
+        """
+        Suma los incrementos a la entrada del usuario (con el lock tomado)
+
+        Cada evento corresponde a una escritura que subió en uno la versión
+        de la fila: si entretanto escribió otro proceso, la versión de la
+        entrada queda por detrás y el siguiente acierto la descarta.
+        """
+        self._bump(user_id)
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        if entry[1] != utc_today():
+            # Las cifras "de hoy" son de otro día: no se pueden actualizar
+            del self._entries[user_id]
+            return None
+        expires, day, version, stats = entry
+        for field, delta in deltas.items():
+            stats[field] += delta
+        total = stats["total_conversations"]
+        stats["average_messages_per_conversation"] = round(stats["total_messages"] / total, 2) if total > 0 else 0
+        if version is not None:
+            self._entries[user_id] = (expires, day, version + 1, stats)
+        return stats
+
+    # ------------------------------------------------------------------
+    # Eventos de las rutas de conversaciones (después del commit)
+    # ------------------------------------------------------------------
+
+    def on_message_added(self, user_id: int, tokens_used: int, created_at: Optional[datetime]) -> None:
+        with self._lock:
+            stats = self._update(user_id, total_messages=1, total_tokens_used=tokens_used or 0, messages_today=1)
+            if stats is not None and created_at is not None:
+                stats["last_activity"] = created_at.isoformat()
+
+    def on_conversation_created(self, user_id: int) -> None:
+        with self._lock:
+            self._update(user_id, total_conversations=1, active_conversations=1, conversations_today=1)
+
+    def on_conversation_archived(self, user_id: int, archived: bool) -> None:
+        step = 1 if archived else -1
+        with self._lock:
+            self._update(user_id, archived_conversations=step, active_conversations=-step)
+
+    def on_conversation_deleted(self, user_id: int) -> None:
+        # Sus mensajes y tokens no se conocen sin consultarlos: se recalcula en la próxima lectura
+        self.invalidate(user_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Entradas y tasa de aciertos"""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0
+        }
+
+
+# Caché compartida por las rutas de estadísticas y de conversaciones
+dashboard_stats_cache = DashboardStatsCache(
+    ttl_seconds=settings.dashboard_cache_seconds,
+    max_entries=settings.dashboard_cache_max_entries,
+    check_version=settings.dashboard_cache_check_version
+)
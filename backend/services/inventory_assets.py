@@ -0,0 +1,183 @@
+"""
+Activos del inventario de GLPI de varios tipos (computadoras, monitores,
+impresoras, equipos de red, teléfonos y periféricos): descarga concurrente
+por tipo y conversión de cada tipo al formato de inventario del frontend.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+import time
+
+from loguru import logger
+
+from integrations.glpi_client import GLPIClient
+
+
+# Estado de GLPI (expand_dropdowns devuelve nombres de texto) -> estado del frontend
+STATUS_MAP = {
+    "En uso": "in_use",
+    "Disponible": "available",
+    "Mantenimiento": "maintenance",
+    "Averiado": "broken",
+    "Retirado": "retired",
+    "Activo": "in_use",  # Estado común en GLPI
+    "Inactivo": "retired"
+}
+
+
+@dataclass(frozen=True)
+class AssetType:
+    """Cómo leer un tipo de activo de GLPI"""
+
+    itemtype: str
+    frontend_type: str
+    model_field: str
+    type_field: str
+    # Campos propios del tipo para las especificaciones: (etiqueta, campo de GLPI)
+    extra_specs: Tuple[Tuple[str, str], ...] = ()
+
+
+ASSET_TYPES: Dict[str, AssetType] = {
+    asset_type.itemtype: asset_type
+    for asset_type in (
+        AssetType("Computer", "computer", "computermodels_id", "computertypes_id"),
+        AssetType("Monitor", "monitor", "monitormodels_id", "monitortypes_id", (("Tamaño (pulgadas)", "size"),)),
+        AssetType("Printer", "printer", "printermodels_id", "printertypes_id", (("Memoria", "memory_size"),)),
+        AssetType(
+            "NetworkEquipment", "network", "networkequipmentmodels_id", "networkequipmenttypes_id",
+            (("RAM (MB)", "ram"),)
+        ),
+        AssetType("Phone", "phone", "phonemodels_id", "phonetypes_id", (("Número", "number_line"),)),
+        AssetType("Peripheral", "peripheral", "peripheralmodels_id", "peripheraltypes_id"),
+    )
+}
+
+# Consultas de varios tipos en paralelo (una por tipo)
+_executor = ThreadPoolExecutor(max_workers=len(ASSET_TYPES), thread_name_prefix="glpi-assets")
+
+
+def _dropdown(value: Any) -> Any:
+    """Valor de un desplegable expandido, o None si GLPI devolvió 0 o vacío"""
+    return value if value and str(value) != "0" else None
+
+
+def _computer_type(name: str) -> str:
+    """Portátil o servidor según el nombre del equipo"""
+    name = name.lower()
+    if "laptop" in name or "portátil" in name:
+        return "laptop"
+    if "servidor" in name or "server" in name:
+        return "server"
+    return "computer"
+
+
+def map_glpi_asset_to_frontend(itemtype: str, asset: Dict) -> Dict:
+    """
+    Convierte un activo de GLPI al formato de inventario del frontend
+
+    Args:
+        itemtype: Tipo de GLPI (Computer, Monitor, Printer, ...)
+        asset: Activo devuelto por la API con expand_dropdowns
+    """
+    asset_type = ASSET_TYPES[itemtype]
+    if itemtype == "Computer":
+        item_type = _computer_type(asset.get("name") or "")
+    else:
+        item_type = asset_type.frontend_type
+
+    model = _dropdown(asset.get(asset_type.model_field))
+    contact = asset.get("contact")
+    contact_num = asset.get("contact_num")
+
+    # Build specifications dict with all available info
+    specs = {
+        "Modelo": model,
+        "Tipo": _dropdown(asset.get(asset_type.type_field)),
+        "Red": _dropdown(asset.get("networks_id")),
+        "Entidad": _dropdown(asset.get("entities_id")),
+        "Serial Alternativo": asset.get("otherserial"),
+        "UUID": asset.get("uuid"),
+        "Contacto": contact,
+        "Teléfono": contact_num if contact_num != contact else None,
+        "Comentarios": asset.get("comment"),
+        "Última Actualización": asset.get("last_inventory_update"),
+        "Último Reinicio": asset.get("last_boot"),
+    }
+    for label, field in asset_type.extra_specs:
+        specs[label] = _dropdown(asset.get(field))
+    specs = {label: value for label, value in specs.items() if value}
+
+    date_creation = asset.get("date_creation")
+
+    return {
+        "id": asset.get("id"),
+        "itemtype": itemtype,
+        "name": asset.get("name", "Sin nombre"),
+        "type": item_type,
+        "manufacturer": _dropdown(asset.get("manufacturers_id")),
+        "model": model,
+        "serial_number": asset.get("serial"),
+        "status": STATUS_MAP.get(str(asset.get("states_id", "Activo")), "in_use"),
+        "location": _dropdown(asset.get("locations_id")),
+        "assigned_to": _dropdown(asset.get("users_id")),
+        "purchase_date": date_creation,  # Fecha de creación como compra
+        "warranty_expiration": None,  # GLPI no tiene campo directo
+        "specifications": specs or None,
+        "created_at": date_creation,  # Fecha de creación en GLPI
+        "updated_at": asset.get("date_mod")  # Última modificación
+    }
+
+
+def map_glpi_computer_to_frontend(computer: Dict) -> Dict:
+    """Convert GLPI computer format to frontend inventory format"""
+    return map_glpi_asset_to_frontend("Computer", computer)
+
+
+def iter_asset_pages(glpi: GLPIClient, itemtypes: Iterable[str]) -> Iterator[List[Dict[str, Any]]]:
+    """Páginas de activos de GLPI ya convertidas, tipo a tipo y por id ascendente"""
+    for itemtype in itemtypes:
+        for page in glpi.iter_pages(itemtype, {"sort": "id", "order": "ASC"}):
+            yield [map_glpi_asset_to_frontend(itemtype, asset) for asset in page]
+
+
+def fetch_assets_of_type(glpi: GLPIClient, itemtype: str) -> List[Dict[str, Any]]:
+    """Todos los activos de un tipo, paginados y convertidos al formato del frontend"""
+    started = time.perf_counter()
+    records = [record for page in iter_asset_pages(glpi, [itemtype]) for record in page]
+    logger.info(f"💻 {len(records)} activos de tipo {itemtype} ({(time.perf_counter() - started) * 1000:.0f} ms)")
+    return records
+
+
+def fetch_assets(
+    glpi: GLPIClient,
+    itemtypes: Iterable[str]
+) -> Tuple[Dict[str, List[Dict[str, Any]]], Dict[str, Exception]]:
+    """
+    Descarga varios tipos de activos en paralelo con una misma sesión de GLPI
+
+    Args:
+        glpi: Cliente de GLPI
+        itemtypes: Tipos a descargar (claves de ASSET_TYPES)
+
+    Returns:
+        (registros por tipo, error por tipo de los que fallaron)
+    """
+    if not glpi.session_token:
+        glpi.init_session()
+
+    # Cada tipo hereda el contexto (el plazo de la operación que lo pide)
+    futures = {
+        itemtype: _executor.submit(copy_context().run, fetch_assets_of_type, glpi, itemtype)
+        for itemtype in itemtypes
+    }
+    results: Dict[str, List[Dict[str, Any]]] = {}
+    errors: Dict[str, Exception] = {}
+    for itemtype, future in futures.items():
+        try:
+            results[itemtype] = future.result()
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudieron obtener los activos de tipo {itemtype}: {e}")
+            errors[itemtype] = e
+    return results, errors
@@ -0,0 +1,387 @@
+"""
+Instantánea en memoria del inventario de GLPI (computadoras, monitores,
+impresoras, equipos de red, teléfonos y periféricos): los registros ya
+convertidos al formato del frontend, índices por campo (estado, tipo,
+ubicación, fabricante, modelo y entidad) y estadísticas precalculadas.
+
+La instantánea es inmutable; cada sincronización construye una nueva y la
+sustituye de una vez, así que las consultas nunca ven un estado a medias ni
+esperan a GLPI salvo en la carga inicial.
+"""
+
+from collections import Counter
+from threading import Lock, Thread
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import time
+
+from loguru import logger
+
+from integrations.glpi_client import GLPIClient
+from services.inventory_assets import ASSET_TYPES, fetch_assets
+from services.trigram_index import TrigramIndex
+from config import settings
+
+
+STATUSES = ("available", "in_use", "maintenance", "broken", "retired")
+ITEM_TYPES = ("computer", "laptop", "server", "monitor", "printer", "network", "phone", "peripheral")
+
+# Facetas con índice por valor (filtros y conteos)
+FACETS = ("status", "type", "location", "manufacturer", "model", "entity")
+# Combinaciones de filtros con facetas cacheadas por instantánea
+FACET_CACHE_SIZE = 256
+
+
+def search_text(item: Dict[str, Any]) -> str:
+    """Texto del registro para la búsqueda aproximada"""
+    specs = item.get("specifications") or {}
+    values = (
+        item.get("name"), item.get("serial_number"), specs.get("Serial Alternativo"),
+        item.get("manufacturer"), item.get("model"), specs.get("Contacto"),
+        item.get("assigned_to"), specs.get("UUID")
+    )
+    return " ".join(str(value) for value in values if value)
+
+
+def facet_value(item: Dict[str, Any], field: str) -> Any:
+    """Valor de una faceta en un registro del frontend (la entidad va en las especificaciones)"""
+    if field == "entity":
+        return (item.get("specifications") or {}).get("Entidad")
+    return item.get(field)
+
+
+class InventoryView:
+    """Registros mapeados, índices y estadísticas de una sincronización (inmutable)"""
+
+    def __init__(self, items: List[Dict[str, Any]], version: int = 0):
+        self.items = items
+        self.version = version
+        # Los ids de GLPI se repiten entre tipos: la clave es (tipo de GLPI, id)
+        self.by_id: Dict[Tuple[str, Any], Dict[str, Any]] = {(item["itemtype"], item["id"]): item for item in items}
+
+        # faceta -> valor de cada registro (columna) y valor -> posiciones ascendentes
+        self.columns: Dict[str, List[Any]] = {
+            field: [facet_value(item, field) for item in items] for field in FACETS
+        }
+        indexes: Dict[str, Dict[Any, List[int]]] = {field: {} for field in FACETS}
+        for field, column in self.columns.items():
+            index = indexes[field]
+            for position, value in enumerate(column):
+                index.setdefault(value, []).append(position)
+        self.indexes: Dict[str, Dict[Any, Tuple[int, ...]]] = {
+            field: {value: tuple(positions) for value, positions in values.items()}
+            for field, values in indexes.items()
+        }
+        # Ubicación y fabricante se filtran sin distinguir mayúsculas
+        self._folded: Dict[str, Dict[str, List[Any]]] = {}
+        for field in ("location", "manufacturer"):
+            folded: Dict[str, List[Any]] = {}
+            for value in self.indexes[field]:
+                if value is not None:
+                    folded.setdefault(str(value).lower(), []).append(value)
+            self._folded[field] = folded
+
+        # Búsqueda aproximada (trigramas) sobre identificadores, fabricante, modelo y contacto
+        self.search_index = TrigramIndex([search_text(item) for item in items])
+
+        self.stats = self._build_stats()
+        self._facet_cache: Dict[Tuple, Dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def _build_stats(self) -> Dict[str, Any]:
+        by_status = self.indexes["status"]
+        by_type = self.indexes["type"]
+        return {
+            "total": len(self.items),
+            **{status: len(by_status.get(status, ())) for status in STATUSES},
+            "by_type": {f"{item_type}s": len(by_type.get(item_type, ())) for item_type in ITEM_TYPES}
+        }
+
+    # ------------------------------------------------------------------
+    # Filtros
+    # ------------------------------------------------------------------
+
+    def _positions(self, field: str, values: Iterable[Any]) -> List[int]:
+        """Posiciones de los registros cuyo campo toma alguno de los valores"""
+        index = self.indexes[field]
+        matches = [index[value] for value in values if value in index]
+        if len(matches) == 1:
+            return list(matches[0])
+        return sorted(position for positions in matches for position in positions)
+
+    def _matches(
+        self,
+        type: Optional[str] = None,
+        status: Optional[str] = None,
+        location: Optional[str] = None,
+        manufacturer: Optional[str] = None
+    ) -> Dict[str, List[int]]:
+        """Posiciones que cumple cada filtro por valor indicado, por separado"""
+        matches: Dict[str, List[int]] = {}
+        if status:
+            matches["status"] = self._positions("status", [status])
+        if type:
+            matches["type"] = self._positions("type", [type])
+        if manufacturer:
+            matches["manufacturer"] = self._positions(
+                "manufacturer", self._folded["manufacturer"].get(manufacturer.lower(), [])
+            )
+        if location:
+            needle = location.lower()
+            values = [
+                value
+                for folded, originals in self._folded["location"].items() if needle in folded
+                for value in originals
+            ]
+            matches["location"] = self._positions("location", values)
+        return matches
+
+    def _search(self, search: str, scope: Optional[List[int]] = None) -> List[int]:
+        """Posiciones (dentro de `scope`, o de todas) que coinciden con el texto, de más a menos parecidas"""
+        return [position for position, _ in self.search_index.search(search, limit=None, scope=scope)]
+
+    def search(self, query: str, limit: int = 20, **filters: Optional[str]) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        Equipos más parecidos a un texto (admite errores de tecleo y fragmentos de serie)
+
+        Args:
+            query: Nombre, serie, fabricante, modelo, contacto, usuario o UUID
+            limit: Máximo de resultados
+            **filters: Filtros por valor de `filter` (type, status, location, manufacturer)
+
+        Returns:
+            Lista de (registro, puntuación) de mayor a menor puntuación
+        """
+        scope = self._intersect(list(self._matches(**filters).values()))
+        items = self.items
+        return [
+            (items[position], score)
+            for position, score in self.search_index.search(query, limit=limit, scope=scope)
+        ]
+
+    @staticmethod
+    def _intersect(position_lists: List[List[int]]) -> Optional[List[int]]:
+        """Intersección ascendente de listas de posiciones (None = sin filtros, todas)"""
+        if not position_lists:
+            return None
+        ordered = sorted(position_lists, key=len)
+        result = ordered[0]
+        for positions in ordered[1:]:
+            if not result:
+                break
+            allowed = set(positions)
+            result = [position for position in result if position in allowed]
+        return result
+
+    def filter(self, **filters: Optional[str]) -> List[Dict[str, Any]]:
+        """
+        Registros que cumplen todos los filtros, en el orden de GLPI (o por
+        parecido con el texto buscado si se indica `search`)
+
+        Args:
+            type: Tipo exacto (computer, laptop, server)
+            status: Estado exacto (in_use, available, ...)
+            location: Texto contenido en la ubicación (sin distinguir mayúsculas)
+            manufacturer: Fabricante exacto (sin distinguir mayúsculas)
+            search: Búsqueda aproximada (ver `search`)
+        """
+        search = filters.pop("search", None)
+        positions = self._intersect(list(self._matches(**filters).values()))
+        if search:
+            # El texto se busca solo entre los registros que ya pasaron los filtros por valor
+            positions = self._search(search, None if positions is None else set(positions))
+        if positions is None:
+            return self.items
+        items = self.items
+        return [items[position] for position in positions]
+
+    def get(self, item_id: Any, itemtype: str = "Computer") -> Optional[Dict[str, Any]]:
+        return self.by_id.get((itemtype, item_id))
+
+    def items_of(self, itemtype: str) -> List[Dict[str, Any]]:
+        """Registros de un tipo de GLPI"""
+        return [item for item in self.items if item["itemtype"] == itemtype]
+
+    # ------------------------------------------------------------------
+    # Facetas
+    # ------------------------------------------------------------------
+
+    def _count(self, field: str, positions: Optional[List[int]]) -> Counter:
+        if positions is None:
+            return Counter({value: len(rows) for value, rows in self.indexes[field].items()})
+        return Counter(map(self.columns[field].__getitem__, positions))
+
+    def facets(self, limit: int = 50, **filters: Optional[str]) -> Dict[str, Any]:
+        """
+        Conteos por estado, tipo, ubicación, fabricante, modelo y entidad
+
+        Cada faceta se cuenta sobre los registros que cumplen todos los filtros
+        salvo el suyo propio, para que al desplegar un filtro se vea cuántos
+        equipos daría cada alternativa.
+
+        Args:
+            limit: Máximo de valores por faceta (los más frecuentes)
+            **filters: Mismos filtros que `filter`
+
+        Returns:
+            {"total": registros que cumplen todos los filtros,
+             "facets": {faceta: [{"value", "count"}, ...]}}
+        """
+        key = (limit, tuple(sorted((name, value) for name, value in filters.items() if value)))
+        cached = self._facet_cache.get(key)
+        if cached is not None:
+            return cached
+
+        search = filters.pop("search", None)
+        matches: Dict[str, List[int]] = self._matches(**filters)
+        if search:
+            # La búsqueda de texto no es una faceta: se aplica a todas
+            matches["search"] = self._search(search)
+        selected = self._intersect(list(matches.values()))
+        facets = {}
+        for field in FACETS:
+            if field in matches:
+                positions = self._intersect([rows for name, rows in matches.items() if name != field])
+            else:
+                positions = selected
+            counts = self._count(field, positions)
+            counts.pop(None, None)
+            facets[field] = [{"value": value, "count": count} for value, count in counts.most_common(limit)]
+
+        result = {
+            "total": len(self.items) if selected is None else len(selected),
+            "facets": facets
+        }
+        if len(self._facet_cache) >= FACET_CACHE_SIZE:
+            self._facet_cache.clear()
+        self._facet_cache[key] = result
+        return result
+
+
+def default_glpi_client() -> GLPIClient:
+    return GLPIClient(
+        url=settings.glpi_url,
+        app_token=settings.glpi_app_token,
+        user_token=settings.glpi_user_token
+    )
+
+
+class InventorySnapshot:
+    """Mantiene la instantánea del inventario y la sincroniza con GLPI en segundo plano"""
+
+    def __init__(self, refresh_seconds: int = 300, itemtypes: Iterable[str] = ("Computer",)):
+        """
+        Inicializa el servicio sin datos
+
+        Args:
+            refresh_seconds: Antigüedad máxima de la instantánea antes de sincronizar con GLPI
+            itemtypes: Tipos de activo de GLPI que forman el inventario (claves de ASSET_TYPES)
+        """
+        self.refresh_seconds = refresh_seconds
+        self.itemtypes = [itemtype for itemtype in itemtypes if itemtype in ASSET_TYPES]
+        unknown = [itemtype for itemtype in itemtypes if itemtype not in ASSET_TYPES]
+        if unknown:
+            logger.warning(f"⚠️ Tipos de inventario desconocidos ignorados: {', '.join(unknown)}")
+        self._view: Optional[InventoryView] = None
+        self._sync_lock = Lock()
+        self._last_refresh = 0.0
+
+    @property
+    def is_warm(self) -> bool:
+        """Indica si ya se completó la carga inicial"""
+        return self._view is not None
+
+    @property
+    def version(self) -> int:
+        """Contador que aumenta cada vez que cambia el contenido del inventario"""
+        return self._view.version if self._view is not None else 0
+
+    def view(self, glpi_factory: Callable[[], GLPIClient] = None) -> InventoryView:
+        """
+        Instantánea actual para responder una petición
+
+        La primera vez carga el inventario de forma síncrona; después devuelve
+        la instantánea en memoria y, si está caducada, lanza la sincronización
+        en un hilo.
+
+        Args:
+            glpi_factory: Función que crea un cliente de GLPI (solo se llama si hay que
+                sincronizar); por defecto, uno con las credenciales de la configuración
+        """
+        glpi_factory = glpi_factory or default_glpi_client
+        view = self._view
+        if view is None:
+            self.refresh(glpi_factory())
+            return self._view
+        if time.monotonic() - self._last_refresh >= self.refresh_seconds:
+            self.refresh_in_background(glpi_factory)
+        return view
+
+    def refresh(self, glpi: GLPIClient, force: bool = False) -> bool:
+        """
+        Recorre el inventario de GLPI y sustituye la instantánea
+
+        Args:
+            glpi: Cliente de GLPI
+            force: Sincronizar aunque la instantánea sea reciente
+
+        Returns:
+            True si el contenido cambió
+        """
+        with self._sync_lock:
+            if not force and self._view is not None and time.monotonic() - self._last_refresh < self.refresh_seconds:
+                return False
+
+            started = time.perf_counter()
+            current = self._view
+            try:
+                # Todos los tipos en paralelo: la sincronización tarda lo que el tipo más lento
+                results, errors = fetch_assets(glpi, self.itemtypes)
+                if errors and not results:
+                    raise next(iter(errors.values()))
+            except Exception as e:
+                logger.error(f"❌ Error sincronizando la instantánea de inventario: {e}")
+                if current is None:
+                    raise
+                # Se reintenta en el siguiente ciclo; mientras tanto se sirve la instantánea anterior
+                self._last_refresh = time.monotonic()
+                return False
+            finally:
+                glpi.kill_session()
+
+            # Un tipo que falla conserva sus registros anteriores
+            if current is not None:
+                for itemtype in errors:
+                    results[itemtype] = current.items_of(itemtype)
+            items = [item for itemtype in self.itemtypes for item in results.get(itemtype, [])]
+
+            changed = current is None or current.items != items
+            if changed:
+                self._view = InventoryView(items, version=(current.version + 1) if current else 1)
+            self._last_refresh = time.monotonic()
+            logger.info(
+                f"💻 Instantánea de inventario sincronizada: {len(items)} activos de {len(results)} tipos"
+                f"{'' if changed else ' (sin cambios)'} ({(time.perf_counter() - started) * 1000:.0f} ms)"
+            )
+            return changed
+
+    def refresh_in_background(self, glpi_factory) -> None:
+        """Lanza una sincronización en un hilo si no hay otra en curso"""
+        if self._sync_lock.locked():
+            return
+
+        def run():
+            try:
+                self.refresh(glpi_factory())
+            except Exception as e:
+                logger.error(f"❌ Error en la sincronización en segundo plano del inventario: {e}")
+
+        Thread(target=run, name="inventory-snapshot-refresh", daemon=True).start()
+
+
+# Instantánea compartida por las rutas de inventario
+inventory_snapshot = InventorySnapshot(
+    refresh_seconds=settings.inventory_refresh_seconds,
+    itemtypes=[itemtype.strip() for itemtype in settings.inventory_itemtypes.split(",") if itemtype.strip()]
+)
@@ -0,0 +1,333 @@
+"""
+Exportación de reportes de tickets e inventario en CSV o XLSX, generados
+en streaming a partir de las páginas de la API de GLPI (memoria constante
+sin importar el número de filas).
+"""
+
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from xml.sax.saxutils import escape
+import csv
+import heapq
+import io
+import re
+import zipfile
+
+from loguru import logger
+
+from integrations.glpi_client import GLPIClient
+from services.inventory_assets import ASSET_TYPES
+
+
+TICKET_STATUS = {
+    1: "Nuevo", 2: "En Proceso (Asignado)", 3: "En Proceso (Planificado)",
+    4: "En Espera", 5: "Resuelto", 6: "Cerrado"
+}
+TICKET_PRIORITY = {1: "Muy Baja", 2: "Baja", 3: "Media", 4: "Alta", 5: "Muy Alta", 6: "Mayor"}
+TICKET_TYPE = {1: "Incidente", 2: "Solicitud"}
+
+# Columna -> (encabezado, transformación del valor de GLPI)
+TICKET_COLUMNS: Dict[str, Tuple[str, Optional[Callable[[Any], Any]]]] = {
+    "id": ("ID", None),
+    "name": ("Título", None),
+    "status": ("Estado", TICKET_STATUS.get),
+    "priority": ("Prioridad", TICKET_PRIORITY.get),
+    "urgency": ("Urgencia", TICKET_PRIORITY.get),
+    "impact": ("Impacto", TICKET_PRIORITY.get),
+    "type": ("Tipo", TICKET_TYPE.get),
+    "itilcategories_id": ("Categoría", None),
+    "entities_id": ("Entidad", None),
+    "users_id_recipient": ("Solicitante", None),
+    "date": ("Fecha de apertura", None),
+    "date_mod": ("Última modificación", None),
+    "solvedate": ("Fecha de solución", None),
+    "closedate": ("Fecha de cierre", None),
+    "time_to_resolve": ("Vencimiento", None),
+}
+
+# Columnas comunes a todos los tipos de activo; "type" y "model" salen del campo propio de cada tipo
+INVENTORY_COLUMNS: Dict[str, Tuple[str, Optional[Callable[[Any], Any]]]] = {
+    "id": ("ID", None),
+    "itemtype": ("Clase de activo", None),
+    "name": ("Nombre", None),
+    "serial": ("Serial", None),
+    "otherserial": ("Inventario", None),
+    "states_id": ("Estado", None),
+    "type": ("Tipo", None),
+    "manufacturers_id": ("Fabricante", None),
+    "model": ("Modelo", None),
+    "locations_id": ("Ubicación", None),
+    "users_id": ("Usuario", None),
+    "entities_id": ("Entidad", None),
+    "date_creation": ("Fecha de alta", None),
+    "date_mod": ("Última modificación", None),
+}
+
+# Nombres de columna anteriores (solo computadoras) que se siguen aceptando
+COLUMN_ALIASES = {
+    "inventario": {"computertypes_id": "type", "computermodels_id": "model"},
+}
+
+# Tipo de reporte -> (itemtypes de GLPI, columnas, columnas por defecto, campo de fecha)
+REPORT_TYPES = {
+    "tickets": (("Ticket",), TICKET_COLUMNS, ["id", "name", "status", "priority", "type", "itilcategories_id", "date", "closedate"], "date"),
+    "inventario": (tuple(ASSET_TYPES), INVENTORY_COLUMNS, ["id", "itemtype", "name", "serial", "states_id", "type", "locations_id", "users_id"], "date_creation"),
+}
+
+_FLUSH_ROWS = 500
+
+
+def resolve_columns(report_type: str, columns: Optional[str]) -> List[str]:
+    """
+    Valida la lista de columnas pedida (separada por comas)
+
+    Raises:
+        ValueError: Si el tipo de reporte o alguna columna no existe
+    """
+    if report_type not in REPORT_TYPES:
+        raise ValueError(f"Tipo de reporte no soportado: {report_type}")
+    _, available, default, _ = REPORT_TYPES[report_type]
+    if not columns:
+        return list(default)
+
+    aliases = COLUMN_ALIASES.get(report_type, {})
+    selected = [aliases.get(c.strip(), c.strip()) for c in columns.split(",") if c.strip()]
+    unknown = [c for c in selected if c not in available]
+    if unknown:
+        raise ValueError(f"Columnas no válidas: {', '.join(unknown)}. Disponibles: {', '.join(available)}")
+    return selected
+
+
+def _inventory_item(itemtype: str, asset: Dict[str, Any]) -> Dict[str, Any]:
+    """Activo con las columnas comunes del inventario (tipo y modelo según su clase)"""
+    asset_type = ASSET_TYPES[itemtype]
+    return {
+        **asset,
+        "itemtype": itemtype,
+        "type": asset.get(asset_type.type_field),
+        "model": asset.get(asset_type.model_field)
+    }
+
+
+def _iter_items(glpi: GLPIClient, itemtype: str, date_field: str) -> Iterator[Dict[str, Any]]:
+    """Items de un itemtype por fecha descendente, con las columnas del reporte"""
+    for page in glpi.iter_pages(itemtype, {"sort": date_field, "order": "DESC"}):
+        for item in page:
+            yield _inventory_item(itemtype, item) if itemtype in ASSET_TYPES else item
+
+
+def iter_report_rows(
+    glpi: GLPIClient,
+    report_type: str,
+    columns: Sequence[str],
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None
+) -> Iterator[List[Any]]:
+    """
+    Recorre GLPI página a página y produce una fila por item
+
+    Los items se piden ordenados por fecha descendente, de modo que al pasar
+    `date_from` se deja de paginar. El inventario recorre todos los tipos de
+    activo a la vez y los intercala por fecha (una página en memoria por tipo).
+
+    Args:
+        glpi: Cliente de GLPI
+        report_type: "tickets" o "inventario"
+        columns: Columnas a exportar (ya validadas)
+        date_from: Fecha mínima (inclusive)
+        date_to: Fecha máxima (inclusive)
+
+    Yields:
+        Lista de valores en el orden de `columns`
+    """
+    itemtypes, available, _, date_field = REPORT_TYPES[report_type]
+    lower = date_from.isoformat() if date_from else None
+    # Las fechas de GLPI son "YYYY-MM-DD HH:MM:SS": todo el día de date_to es <= "YYYY-MM-DD~"
+    upper = f"{date_to.isoformat()}~" if date_to else None
+    extractors = [(column, available[column][1]) for column in columns]
+
+    items = heapq.merge(
+        *(_iter_items(glpi, itemtype, date_field) for itemtype in itemtypes),
+        key=lambda item: item.get(date_field) or "",
+        reverse=True
+    )
+
+    rows = 0
+    try:
+        for item in items:
+            item_date = item.get(date_field) or ""
+            if upper and item_date > upper:
+                continue
+            if lower and item_date < lower:
+                logger.info(f"📤 Exportación {report_type}: {rows} filas (fin del rango de fechas)")
+                return
+            rows += 1
+            yield [
+                (transform(item.get(column)) or item.get(column)) if transform else item.get(column)
+                for column, transform in extractors
+            ]
+        logger.info(f"📤 Exportación {report_type}: {rows} filas")
+    finally:
+        glpi.kill_session()
+
+
+def stream_csv(header: Sequence[str], rows: Iterator[List[Any]]) -> Iterator[bytes]:
+    """
+    Serializa filas a CSV por bloques
+
+    Args:
+        header: Encabezados de columna
+        rows: Iterador de filas
+
+    Yields:
+        Bloques de bytes UTF-8 (con BOM para que Excel detecte la codificación)
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("\ufeff")
+    writer.writerow(header)
+
+    for count, row in enumerate(rows, start=1):
+        writer.writerow(["" if value is None else value for value in row])
+        if count % _FLUSH_ROWS == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue().encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Destino no posicionable para ZipFile: acumula lo escrito hasta que se drena"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._written = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._written += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._written
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+_XLSX_STATIC = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+_INVALID_XML_RE = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def _column_letter(index: int) -> str:
+    """0 -> A, 25 -> Z, 26 -> AA"""
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _xlsx_row(row_number: int, values: Sequence[Any]) -> str:
+    """Fila de la hoja en SpreadsheetML (números como n, el resto como texto en línea)"""
+    cells = []
+    for index, value in enumerate(values):
+        if value is None or value == "":
+            continue
+        ref = f"{_column_letter(index)}{row_number}"
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            cells.append(f'<c r="{ref}"><v>{value}</v></c>')
+        else:
+            if isinstance(value, datetime):
+                value = value.strftime("%Y-%m-%d %H:%M:%S")
+            text = escape(_INVALID_XML_RE.sub("", str(value)))
+            cells.append(f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+    return f'<row r="{row_number}">{"".join(cells)}</row>'
+
+
+def stream_xlsx(header: Sequence[str], rows: Iterator[List[Any]], sheet_name: str = "Reporte") -> Iterator[bytes]:
+    """
+    Escribe un libro XLSX de una hoja fila a fila
+
+    El ZIP se escribe sobre un destino no posicionable (descriptores de datos),
+    así que cada bloque comprimido se entrega en cuanto está listo.
+
+    Args:
+        header: Encabezados de columna
+        rows: Iterador de filas
+        sheet_name: Nombre de la hoja
+
+    Yields:
+        Bloques de bytes del archivo .xlsx
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_STATIC.items():
+            archive.writestr(name, content)
+        archive.writestr(
+            "xl/workbook.xml",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets><sheet name="{escape(sheet_name[:31])}" sheetId="1" r:id="rId1"/></sheets>'
+            '</workbook>'
+        )
+        yield sink.drain()
+
+        with archive.open("xl/worksheets/sheet1.xml", mode="w", force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            sheet.write(_xlsx_row(1, header).encode("utf-8"))
+
+            batch: List[str] = []
+            for row_number, row in enumerate(rows, start=2):
+                batch.append(_xlsx_row(row_number, row))
+                if len(batch) >= _FLUSH_ROWS:
+                    sheet.write("".join(batch).encode("utf-8"))
+                    batch.clear()
+                    chunk = sink.drain()
+                    if chunk:
+                        yield chunk
+
+            sheet.write("".join(batch).encode("utf-8"))
+            sheet.write(b"</sheetData></worksheet>")
+
+    yield sink.drain()
@@ -0,0 +1,419 @@
+"""
+Reportes materializados: definiciones (tipo, periodo, frecuencia), cálculo
+en segundo plano a partir de GLPI y almacenamiento versionado en la base de
+datos para servirlos al instante.
+"""
+
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from threading import Event, Lock, Thread
+from typing import Any, Dict, Iterator, List, Optional
+import time
+
+from loguru import logger
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from auth.database import advisory_lock, get_db_session
+from auth.models import MaterializedReport
+from integrations.glpi_client import GLPIClient
+from services.inventory_assets import ASSET_TYPES, fetch_assets
+from services.inventory_snapshot import InventoryView
+from services.report_export import TICKET_PRIORITY, TICKET_STATUS, TICKET_TYPE
+from config import settings
+
+
+@dataclass(frozen=True)
+class ReportDefinition:
+    """Reporte que se recalcula periódicamente"""
+
+    key: str
+    report_type: str                # "tickets" o "inventario"
+    period_days: Optional[int]      # Ventana de fechas (None = todo)
+    refresh_minutes: int            # Cada cuánto se recalcula
+    description: str
+
+    @property
+    def max_age_minutes(self) -> int:
+        """Antigüedad máxima para que el agente use la materialización"""
+        return self.refresh_minutes * 2
+
+    def params(self) -> Dict[str, Any]:
+        return {"report_type": self.report_type, "period_days": self.period_days}
+
+
+REPORT_DEFINITIONS: Dict[str, ReportDefinition] = {
+    definition.key: definition
+    for definition in (
+        ReportDefinition("tickets_semanal", "tickets", 7, 60, "Tickets abiertos en los últimos 7 días"),
+        ReportDefinition("tickets_mensual", "tickets", 30, 360, "Tickets abiertos en los últimos 30 días"),
+        ReportDefinition("inventario", "inventario", None, 360, "Estado del inventario (todos los tipos de activo)"),
+    )
+}
+
+_TOP_N = 10
+
+# Intentos de guardar una versión si otro proceso guarda la misma a la vez
+_STORE_ATTEMPTS = 3
+
+# Espera máxima por el lock de guardado (otro proceso solo lo tiene mientras guarda)
+_STORE_LOCK_WAIT_SECONDS = 10
+
+
+def report_key_for(tipo: Optional[str], periodo: Optional[str] = None) -> Optional[str]:
+    """
+    Definición que corresponde a los parámetros de generar_reporte
+
+    Args:
+        tipo: "tickets" o "inventario"
+        periodo: "semanal", "mensual", ... (por defecto mensual para tickets)
+
+    Returns:
+        Clave del reporte o None si no hay materialización equivalente
+    """
+    tipo = (tipo or "tickets").lower()
+    if tipo.startswith("invent"):
+        return "inventario"
+    if tipo != "tickets":
+        return None
+    periodo = (periodo or "mensual").lower()
+    if periodo.startswith(("seman", "week")):
+        return "tickets_semanal"
+    if periodo.startswith(("mens", "month")):
+        return "tickets_mensual"
+    return None
+
+
+# ----------------------------------------------------------------------
+# Cálculo
+# ----------------------------------------------------------------------
+
+def _iter_since(glpi: GLPIClient, item_type: str, date_field: str, since: Optional[str]) -> Iterator[Dict]:
+    """Items de GLPI del más reciente al más antiguo, hasta `since`"""
+    for page in glpi.iter_pages(item_type, {"sort": date_field, "order": "DESC"}):
+        for item in page:
+            if since and (item.get(date_field) or "") < since:
+                return
+            yield item
+
+
+def _label(value: Any, default: str) -> str:
+    """Nombre de un desplegable expandido por GLPI (o el valor por defecto)"""
+    return value if isinstance(value, str) and value else default
+
+
+def compute_ticket_report(glpi: GLPIClient, period_days: Optional[int]) -> Dict[str, Any]:
+    """Totales y distribuciones de los tickets abiertos en el periodo"""
+    since = None
+    if period_days:
+        since = (datetime.now() - timedelta(days=period_days)).strftime("%Y-%m-%d %H:%M:%S")
+
+    por_estado, por_prioridad, por_tipo, por_categoria = Counter(), Counter(), Counter(), Counter()
+    resolution_hours: List[float] = []
+    total = 0
+
+    for ticket in _iter_since(glpi, "Ticket", "date", since):
+        total += 1
+        por_estado[TICKET_STATUS.get(ticket.get("status"), f"Estado {ticket.get('status')}")] += 1
+        por_prioridad[TICKET_PRIORITY.get(ticket.get("priority"), f"Prioridad {ticket.get('priority')}")] += 1
+        por_tipo[TICKET_TYPE.get(ticket.get("type"), f"Tipo {ticket.get('type')}")] += 1
+        por_categoria[_label(ticket.get("itilcategories_id"), "Sin categoría")] += 1
+
+        opened, solved = ticket.get("date"), ticket.get("solvedate")
+        if opened and solved:
+            try:
+                delta = datetime.fromisoformat(solved) - datetime.fromisoformat(opened)
+                resolution_hours.append(delta.total_seconds() / 3600)
+            except ValueError:
+                pass
+
+    cerrados = por_estado.get("Resuelto", 0) + por_estado.get("Cerrado", 0)
+    return {
+        "tipo": "tickets",
+        "periodo_dias": period_days,
+        "desde": since,
+        "total": total,
+        "abiertos": total - cerrados,
+        "cerrados": cerrados,
+        "por_estado": dict(por_estado),
+        "por_prioridad": dict(por_prioridad),
+        "por_tipo": dict(por_tipo),
+        "top_categorias": dict(por_categoria.most_common(_TOP_N)),
+        "tiempo_medio_resolucion_horas": (
+            round(sum(resolution_hours) / len(resolution_hours), 1) if resolution_hours else None
+        ),
+    }
+
+
+def summarize_inventory(view: InventoryView) -> Dict[str, Any]:
+    """
+    Totales de una instantánea del inventario (todos los tipos de activo)
+
+    Es el contenido del reporte de inventario, tanto materializado como
+    generado al momento por el agente.
+    """
+    def counts(field: str) -> Counter:
+        return Counter({value: len(rows) for value, rows in view.indexes[field].items() if value is not None})
+
+    return {
+        "tipo": "inventario",
+        "total_equipos": len(view),
+        "por_tipo_activo": dict(Counter(item["itemtype"] for item in view.items)),
+        "por_estado": dict(counts("status")),
+        "por_tipo": dict(counts("type")),
+        "top_ubicaciones": dict(counts("location").most_common(_TOP_N)),
+        "top_fabricantes": dict(counts("manufacturer").most_common(_TOP_N)),
+    }
+
+
+def compute_inventory_report(glpi: GLPIClient) -> Dict[str, Any]:
+    """Totales del inventario de todos los tipos de activo (ver summarize_inventory)"""
+    results, errors = fetch_assets(glpi, ASSET_TYPES)
+    if errors:
+        # Un reporte sin alguno de los tipos daría totales engañosos: mejor no guardarlo
+        raise next(iter(errors.values()))
+    items = [item for itemtype in ASSET_TYPES for item in results[itemtype]]
+    return summarize_inventory(InventoryView(items))
+
+
+def compute_report(glpi: GLPIClient, definition: ReportDefinition) -> Dict[str, Any]:
+    """Calcula el contenido de un reporte a partir de GLPI"""
+    if definition.report_type == "inventario":
+        return compute_inventory_report(glpi)
+    return compute_ticket_report(glpi, definition.period_days)
+
+
+# ----------------------------------------------------------------------
+# Almacenamiento
+# ----------------------------------------------------------------------
+
+def store_report(
+    db: Session,
+    definition: ReportDefinition,
+    result: Dict[str, Any],
+    duration_ms: float,
+    versions_kept: int = 10
+) -> Optional[MaterializedReport]:
+    """
+    Guarda una nueva versión del reporte y descarta las más antiguas
+
+    Si otro proceso guarda la misma versión a la vez (unique_report_version),
+    se vuelve a numerar con la última versión guardada.
+
+    Returns:
+        Versión guardada, o None si no se pudo numerar tras varios intentos
+    """
+    for _ in range(_STORE_ATTEMPTS):
+        latest = db.query(func.max(MaterializedReport.version)).filter(
+            MaterializedReport.report_key == definition.key
+        ).scalar() or 0
+
+        report = MaterializedReport(
+            report_key=definition.key,
+            version=latest + 1,
+            report_type=definition.report_type,
+            params=definition.params(),
+            result=result,
+            row_count=result.get("total", result.get("total_equipos", 0)),
+            duration_ms=round(duration_ms, 2),
+            computed_at=datetime.now(timezone.utc)
+        )
+        db.add(report)
+        try:
+            db.flush()
+        except IntegrityError:
+            db.rollback()
+            logger.warning(f"⚠️ La versión {latest + 1} del reporte {definition.key} ya existe, se renumera")
+            continue
+
+        if versions_kept > 0:
+            db.query(MaterializedReport).filter(
+                MaterializedReport.report_key == definition.key,
+                MaterializedReport.version <= latest + 1 - versions_kept
+            ).delete(synchronize_session=False)
+
+        db.commit()
+        return report
+    return None
+
+
+def get_latest_report(
+    db: Session,
+    key: str,
+    max_age_minutes: Optional[int] = None,
+    version: Optional[int] = None
+) -> Optional[MaterializedReport]:
+    """
+    Última versión materializada de un reporte
+
+    Args:
+        db: Sesión de base de datos
+        key: Clave del reporte
+        max_age_minutes: Descartar si es más antigua (None = cualquier antigüedad)
+        version: Versión concreta (None = la más reciente)
+    """
+    query = db.query(MaterializedReport).filter(MaterializedReport.report_key == key)
+    if version is not None:
+        query = query.filter(MaterializedReport.version == version)
+    if max_age_minutes is not None:
+        query = query.filter(
+            MaterializedReport.computed_at >= datetime.now(timezone.utc) - timedelta(minutes=max_age_minutes)
+        )
+    return query.order_by(MaterializedReport.version.desc()).first()
+
+
+def load_fresh_report(key: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    Contenido del reporte materializado si está dentro de su antigüedad máxima
+
+    Returns:
+        Resultado con la fecha de cálculo, o None si no hay versión reciente
+    """
+    definition = REPORT_DEFINITIONS.get(key or "")
+    if definition is None:
+        return None
+    try:
+        with get_db_session() as db:
+            report = get_latest_report(db, key, max_age_minutes=definition.max_age_minutes)
+            if report is None:
+                return None
+            return {
+                **report.result,
+                "reporte": key,
+                "version": report.version,
+                "calculado_en": report.computed_at.isoformat() if report.computed_at else None
+            }
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo leer el reporte materializado {key}: {e}")
+        return None
+
+
+# ----------------------------------------------------------------------
+# Planificador
+# ----------------------------------------------------------------------
+
+class ReportScheduler:
+    """Hilo en segundo plano que recalcula los reportes cuando les toca"""
+
+    # Lock de MariaDB que serializa entre procesos la comprobación y el guardado de cada reporte
+    LOCK_NAME = "tooli_report_scheduler"
+
+    def __init__(self, interval_seconds: int = 60, versions_kept: int = 10):
+        """
+        Inicializa el planificador
+
+        Args:
+            interval_seconds: Cada cuánto se revisa qué reportes están vencidos
+            versions_kept: Versiones conservadas por reporte
+        """
+        self.interval_seconds = interval_seconds
+        self.versions_kept = versions_kept
+        self._stop = Event()
+        self._run_lock = Lock()
+        self._thread: Optional[Thread] = None
+
+    def start(self) -> None:
+        """Arranca el hilo del planificador (idempotente)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = Thread(target=self._loop, name="report-scheduler", daemon=True)
+        self._thread.start()
+        logger.info(f"🗓️ Planificador de reportes iniciado ({len(REPORT_DEFINITIONS)} definiciones)")
+
+    def stop(self) -> None:
+        """Detiene el hilo al terminar la iteración en curso"""
+        self._stop.set()
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_due()
+            except Exception as e:
+                logger.error(f"❌ Error en el planificador de reportes: {e}")
+            self._stop.wait(self.interval_seconds)
+
+    def run_due(self) -> int:
+        """
+        Recalcula los reportes cuya última versión es más antigua que su frecuencia
+
+        Cada worker de la aplicación tiene su planificador. El cálculo (el
+        recorrido de GLPI) se hace sin lock; el lock de MariaDB solo cubre la
+        comprobación de que otro proceso no guardó ya una versión reciente y el
+        guardado, así que nunca se retiene una conexión durante el recorrido.
+
+        Returns:
+            Reportes recalculados y guardados
+        """
+        with get_db_session() as db:
+            due = [
+                definition for definition in REPORT_DEFINITIONS.values()
+                if get_latest_report(db, definition.key, max_age_minutes=definition.refresh_minutes) is None
+            ]
+        stored = 0
+        for definition in due:
+            if self._stop.is_set():
+                break
+            if self.refresh(definition.key, only_if_due=True) is not None:
+                stored += 1
+        return stored
+
+    def refresh(self, key: str, only_if_due: bool = False) -> Optional[int]:
+        """
+        Calcula y guarda una nueva versión de un reporte
+
+        Args:
+            key: Clave del reporte
+            only_if_due: No guardar si otro proceso guardó una versión reciente
+                mientras se calculaba (pasadas del planificador)
+
+        Returns:
+            Número de versión guardada, o None si falló o ya estaba al día
+        """
+        definition = REPORT_DEFINITIONS[key]
+        with self._run_lock:
+            started = time.perf_counter()
+            glpi = GLPIClient(
+                url=settings.glpi_url,
+                app_token=settings.glpi_app_token,
+                user_token=settings.glpi_user_token
+            )
+            try:
+                result = compute_report(glpi, definition)
+            except Exception as e:
+                logger.error(f"❌ Error calculando reporte {key}: {e}")
+                return None
+            finally:
+                glpi.kill_session()
+
+            duration_ms = (time.perf_counter() - started) * 1000
+            try:
+                with advisory_lock(self.LOCK_NAME, timeout=_STORE_LOCK_WAIT_SECONDS) as acquired:
+                    if not acquired:
+                        logger.warning(f"⚠️ Reporte {key} no guardado: otro proceso retiene el lock de guardado")
+                        return None
+                    with get_db_session() as db:
+                        if only_if_due and get_latest_report(
+                            db, key, max_age_minutes=definition.refresh_minutes
+                        ) is not None:
+                            logger.info(f"🗓️ Reporte {key} ya guardado por otro proceso, se descarta el cálculo")
+                            return None
+                        report = store_report(db, definition, result, duration_ms, self.versions_kept)
+                        version = report.version if report is not None else None
+            except Exception as e:
+                logger.error(f"❌ Error guardando reporte {key}: {e}")
+                return None
+            if version is None:
+                logger.error(f"❌ No se pudo guardar el reporte {key}: versiones en conflicto")
+                return None
+            logger.info(f"🗓️ Reporte {key} v{version} materializado en {duration_ms:.0f} ms")
+            return version
+
+
+# Planificador compartido (se arranca en el evento de inicio de la aplicación)
+report_scheduler = ReportScheduler(
+    interval_seconds=settings.report_scheduler_interval_seconds,
+    versions_kept=settings.report_versions_kept
+)
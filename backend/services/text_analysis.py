@@ -0,0 +1,71 @@
+"""
+Utilidades de análisis de texto para los índices de búsqueda locales:
+limpieza de HTML, eliminación de acentos, tokenización y stemming ligero
+para español e inglés.
+"""
+
+from functools import lru_cache
+from typing import List
+import html
+import re
+import unicodedata
+
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a al algo algun alguna algunas alguno algunos ante antes como con contra cual cuando de del desde donde
+durante e el ella ellas ellos en entre era es esa esas ese eso esos esta estan estas este esto estos
+fue ha hay la las le les lo los mas me mi mis muy no nos o para pero por que se sea ser si sin sobre
+son su sus tambien te tiene tu un una uno unos y ya yo hola favor gracias tengo tiene
+about an and are as at be been but by can do does for from has have how i if in into is it its me my
+of on or our please so than that the their them then there these they this to was we were what when
+where which who why will with you your
+""".split())
+
+# Sufijos ordenados de mayor a menor longitud; se elimina solo el primero que coincida
+_SUFFIXES = sorted("""
+amientos imientos amiento imiento aciones uciones adoras adores ancias idades iones mente
+acion ucion adora ador ancia idad ismo ista able ible anza ando iendo ados idas idos ado ada ido ida
+ion ar er ir as es os
+ations ation ings ing ness ment ers ies ied ed ly er s a o e
+""".split(), key=len, reverse=True)
+
+_MIN_STEM = 3
+
+
+def fold_accents(text: str) -> str:
+    """Pasa a minúsculas y elimina acentos/diacríticos (impresión -> impresion)"""
+    normalized = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in normalized if not unicodedata.combining(c))
+
+
+def strip_html(text: str) -> str:
+    """Elimina etiquetas HTML (GLPI guarda el contenido escapado)"""
+    return _TAG_RE.sub(" ", html.unescape(html.unescape(text)))
+
+
+@lru_cache(maxsize=100_000)
+def stem(token: str) -> str:
+    """Stemming ligero por sufijos, compartido para español e inglés"""
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= _MIN_STEM:
+            return token[:-len(suffix)]
+    return token
+
+
+def analyze(text: str) -> List[str]:
+    """
+    Convierte un texto en la lista de términos indexables
+
+    Args:
+        text: Texto libre (puede contener HTML)
+
+    Returns:
+        Términos sin acentos, sin palabras vacías y con stemming
+    """
+    if not text:
+        return []
+    tokens = _TOKEN_RE.findall(fold_accents(strip_html(str(text))))
+    return [stem(t) for t in tokens if t not in STOPWORDS and len(t) > 1]
@@ -0,0 +1,259 @@
+"""
+Feed de cambios de tickets: un único sondeo de GLPI por date_mod (o un
+aviso por webhook) sincroniza el espejo local, y cada ticket que cambia se
+publica como evento numerado a los clientes suscritos (SSE).
+
+Con varios workers cada proceso tiene su espejo, su sondeo y sus
+suscriptores; los números de evento son de cada proceso (un Last-Event-ID
+de otro worker recibe "reset"). El aviso del webhook llega a un solo
+worker, así que se reparte a todos a través de un contador en la BD
+(ticket_feed_signals) que cada feed lee cada pocos segundos mientras tiene
+suscriptores.
+"""
+
+from collections import deque
+from dataclasses import dataclass
+from threading import Event, Lock, Thread
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+import asyncio
+import time
+import uuid
+
+from loguru import logger
+from sqlalchemy.dialects.mysql import insert
+
+from auth.database import get_db_session
+from auth.models import TicketFeedSignal
+from integrations.glpi_client import GLPIClient
+from services.ticket_search import ticket_search_index
+from config import settings
+
+
+@dataclass(frozen=True)
+class TicketChange:
+    """Cambio de un ticket del espejo (None = no existía / se eliminó)"""
+
+    seq: int
+    ticket_id: Any
+    old: Optional[Dict[str, Any]]
+    new: Optional[Dict[str, Any]]
+
+    @property
+    def op(self) -> str:
+        if self.old is None:
+            return "created"
+        if self.new is None:
+            return "deleted"
+        return "updated"
+
+
+# Marca que recibe un suscriptor cuando su cola se desborda y debe recargar
+RESET = None
+
+# Fila única de ticket_feed_signals
+_SIGNAL_ROW = 1
+
+Subscriber = Tuple[asyncio.AbstractEventLoop, "asyncio.Queue[Optional[TicketChange]]"]
+
+
+class TicketChangeFeed:
+    """Publica los cambios del espejo de tickets y mantiene un único sondeo a GLPI"""
+
+    def __init__(self, poll_seconds: int = 15, signal_seconds: int = 2, history: int = 1000, queue_size: int = 500):
+        """
+        Inicializa el feed
+
+        Args:
+            poll_seconds: Cada cuánto se consulta GLPI mientras haya suscriptores
+            signal_seconds: Cada cuánto se lee la señal del webhook en la BD mientras haya
+                suscriptores (0 = no leerla)
+            history: Eventos recientes conservados para reanudar con Last-Event-ID
+            queue_size: Eventos pendientes por suscriptor antes de pedirle recargar
+        """
+        self.poll_seconds = poll_seconds
+        self.signal_seconds = signal_seconds
+        self.queue_size = queue_size
+        # Identifica esta instancia en los ids de evento: un Last-Event-ID de otro proceso obliga a recargar
+        self.epoch = uuid.uuid4().hex[:8]
+        self._seq = 0
+        self._history: Deque[TicketChange] = deque(maxlen=history)
+        self._subscribers: Set[Subscriber] = set()
+        self._lock = Lock()
+        self._wake = Event()
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+        # Última versión vista de la señal del webhook (None = aún no leída)
+        self._signal_version: Optional[int] = None
+        self._signal_failing = False
+
+    @property
+    def last_seq(self) -> int:
+        return self._seq
+
+    # ------------------------------------------------------------------
+    # Publicación (llamado por el espejo, con su lock tomado)
+    # ------------------------------------------------------------------
+
+    def on_change(self, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> None:
+        """Observador del espejo: numera el cambio y lo entrega a cada suscriptor"""
+        # La carga inicial del espejo no son cambios: los clientes ya leen esos datos de GLPI
+        if not ticket_search_index.is_warm:
+            return
+        with self._lock:
+            self._seq += 1
+            change = TicketChange(self._seq, (new or old or {}).get("id"), old, new)
+            self._history.append(change)
+            subscribers = list(self._subscribers)
+
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, loop, queue, change)
+            except RuntimeError:
+                # El bucle del suscriptor ya se cerró
+                self.unsubscribe((loop, queue))
+
+    def _deliver(self, loop: asyncio.AbstractEventLoop, queue: asyncio.Queue, change: TicketChange) -> None:
+        try:
+            queue.put_nowait(change)
+        except asyncio.QueueFull:
+            # Cliente demasiado lento: se le pide recargar y deja de recibir eventos
+            self.unsubscribe((loop, queue))
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(RESET)
+
+    # ------------------------------------------------------------------
+    # Suscripción
+    # ------------------------------------------------------------------
+
+    def subscribe(self, last_seq: Optional[int] = None) -> Tuple[Subscriber, Optional[List[TicketChange]]]:
+        """
+        Registra un suscriptor en el bucle de eventos actual
+
+        Args:
+            last_seq: Último evento recibido por el cliente (Last-Event-ID)
+
+        Returns:
+            (suscriptor, eventos a reenviar); los eventos son None si ya no están
+            en el historial y el cliente debe recargar
+        """
+        subscriber: Subscriber = (asyncio.get_running_loop(), asyncio.Queue(maxsize=self.queue_size))
+        with self._lock:
+            first = not self._subscribers
+            self._subscribers.add(subscriber)
+            replay: Optional[List[TicketChange]] = []
+            if last_seq is not None and last_seq > self._seq:
+                replay = None
+            elif last_seq is not None and last_seq < self._seq:
+                oldest = self._history[0].seq if self._history else self._seq + 1
+                if last_seq + 1 < oldest:
+                    replay = None
+                else:
+                    replay = [change for change in self._history if change.seq > last_seq]
+        if first:
+            # Primer suscriptor: sincronizar ya en lugar de esperar al siguiente ciclo
+            self._wake.set()
+        return subscriber, replay
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    # ------------------------------------------------------------------
+    # Sondeo de GLPI
+    # ------------------------------------------------------------------
+
+    def poke(self) -> None:
+        """Fuerza una sincronización inmediata en este proceso"""
+        self._wake.set()
+
+    def signal(self) -> None:
+        """
+        Aviso del webhook de GLPI: sincroniza este proceso y, a través de la
+        BD, los demás workers con suscriptores en su siguiente lectura de la señal
+        """
+        self._wake.set()
+        try:
+            with get_db_session() as db:
+                stmt = insert(TicketFeedSignal).values(id=_SIGNAL_ROW, version=1)
+                db.execute(stmt.on_duplicate_key_update(version=TicketFeedSignal.version + 1))
+                version = db.query(TicketFeedSignal.version).filter(TicketFeedSignal.id == _SIGNAL_ROW).scalar()
+            # Este proceso ya está avisado: no volver a sincronizar al leer su propia señal
+            self._signal_version = version
+        except Exception as e:
+            logger.error(f"❌ No se pudo avisar del webhook a los demás workers: {e}")
+
+    def _signalled(self) -> bool:
+        """Indica si otro worker recibió un aviso del webhook desde la última lectura"""
+        if not self.signal_seconds:
+            return False
+        try:
+            with get_db_session() as db:
+                version = db.query(TicketFeedSignal.version).filter(TicketFeedSignal.id == _SIGNAL_ROW).scalar() or 0
+        except Exception as e:
+            if not self._signal_failing:
+                logger.warning(f"⚠️ No se pudo leer la señal del feed de tickets: {e}")
+            self._signal_failing = True
+            return False
+        self._signal_failing = False
+        previous, self._signal_version = self._signal_version, version
+        return previous is not None and version != previous
+
+    def start(self) -> None:
+        """Arranca el hilo de sondeo (idempotente)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = Thread(target=self._loop, name="ticket-change-feed", daemon=True)
+        self._thread.start()
+        logger.info(f"📡 Feed de cambios de tickets iniciado (sondeo cada {self.poll_seconds} s)")
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def _loop(self) -> None:
+        poked = False
+        next_poll = 0.0
+        while not self._stop.is_set():
+            watching = bool(self._subscribers)
+            if watching:
+                signalled = self._signalled()
+            else:
+                # Sin suscriptores no se lee la señal (ninguna consulta a la BD) ni se sondea GLPI
+                # salvo por un aviso a este worker; el espejo se pone al día en la siguiente petición
+                signalled = False
+                self._signal_version = None
+            if poked or signalled or (watching and time.monotonic() >= next_poll):
+                self.poll()
+                next_poll = time.monotonic() + self.poll_seconds
+            interval = min(self.signal_seconds or self.poll_seconds, self.poll_seconds) if watching else self.poll_seconds
+            poked = self._wake.wait(interval)
+            self._wake.clear()
+
+    def poll(self) -> int:
+        """Sincroniza el espejo con GLPI; los cambios salen por on_change"""
+        glpi = GLPIClient(
+            url=settings.glpi_url,
+            app_token=settings.glpi_app_token,
+            user_token=settings.glpi_user_token
+        )
+        try:
+            return ticket_search_index.refresh(glpi, force=True)
+        except Exception as e:
+            logger.error(f"❌ Error sondeando cambios de tickets: {e}")
+            return 0
+        finally:
+            glpi.kill_session()
+
+
+# Feed compartido (el sondeo se arranca en el evento de inicio de la aplicación)
+ticket_change_feed = TicketChangeFeed(
+    poll_seconds=settings.ticket_feed_poll_seconds,
+    signal_seconds=settings.ticket_feed_signal_seconds
+)
+ticket_search_index.add_listener(ticket_change_feed.on_change)
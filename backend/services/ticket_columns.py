@@ -0,0 +1,208 @@
+"""
+Almacén columnar en memoria de tickets de GLPI para estadísticas.
+
+Cada campo se guarda en una columna compacta (bytes para los códigos de
+estado/prioridad/tipo/urgencia/impacto, array de enteros para ids y fechas,
+códigos internados para categoría y técnico). Las filas se ordenan por fecha
+de apertura, así que un rango de fechas es un corte por bisección y los
+conteos se resuelven con operaciones en C (Counter sobre bytes y array)
+sin recorrer diccionarios; los conteos del almacén completo se calculan una
+sola vez, porque el almacén no cambia después de construirse.
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from datetime import date, datetime, timezone
+from itertools import chain, compress
+from operator import sub
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+import statistics
+
+
+# Columnas de códigos pequeños (0 = sin valor)
+CODE_COLUMNS = ("status", "priority", "type", "urgency", "impact")
+# Columnas de fecha, en segundos (0 = sin valor)
+DATE_COLUMNS = ("date", "solvedate", "closedate", "date_mod")
+# Columnas de texto internadas: columna -> campos de GLPI en orden de preferencia
+LABEL_COLUMNS = {
+    "category": ("itilcategories_id_friendlyname", "itilcategories_id"),
+    "assignee": ("users_id_assign_friendlyname",),
+}
+
+DateBound = Optional[Union[str, date, datetime]]
+
+
+def to_epoch(value: Any) -> int:
+    """
+    Fecha de GLPI ("YYYY-MM-DD HH:MM:SS") a segundos
+
+    La hora local de GLPI se trata como UTC: los valores solo se comparan
+    entre sí, nunca con el reloj del servidor.
+    """
+    if not value:
+        return 0
+    try:
+        if isinstance(value, datetime):
+            parsed = value
+        elif isinstance(value, date):
+            parsed = datetime(value.year, value.month, value.day)
+        else:
+            parsed = datetime.fromisoformat(str(value))
+    except ValueError:
+        return 0
+    return int(parsed.replace(tzinfo=timezone.utc).timestamp())
+
+
+def _code(value: Any) -> int:
+    return value if isinstance(value, int) and 0 <= value < 256 else 0
+
+
+def _label(ticket: Dict[str, Any], fields: Tuple[str, ...]) -> str:
+    for field in fields:
+        value = ticket.get(field)
+        if isinstance(value, str) and value:
+            return value
+    return ""
+
+
+class TicketColumns:
+    """Proyección columnar e inmutable de un conjunto de tickets"""
+
+    def __init__(self):
+        self.ids = array("q")
+        self.codes: Dict[str, bytes] = {column: b"" for column in CODE_COLUMNS}
+        self.dates: Dict[str, array] = {column: array("q") for column in DATE_COLUMNS}
+        self.labels: Dict[str, array] = {column: array("I") for column in LABEL_COLUMNS}
+        self.vocabularies: Dict[str, List[str]] = {column: [""] for column in LABEL_COLUMNS}
+        # Valores de las columnas de códigos que no son un código (texto, None, > 255), del
+        # almacén completo: en las columnas cuentan como vacíos (0)
+        self.unusual: Dict[str, Counter] = {column: Counter() for column in CODE_COLUMNS}
+        self._totals: Dict[str, Counter] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_tickets(cls, tickets: Iterable[Dict[str, Any]]) -> "TicketColumns":
+        """Construye el almacén a partir de tickets de GLPI (o de las filas del espejo)"""
+        store = cls()
+        ids = array("q")
+        codes = {column: bytearray() for column in CODE_COLUMNS}
+        dates = {column: array("q") for column in DATE_COLUMNS}
+        labels = {column: array("I") for column in LABEL_COLUMNS}
+        lookups = {column: {"": 0} for column in LABEL_COLUMNS}
+        unusual = {column: Counter() for column in CODE_COLUMNS}
+
+        for ticket in tickets:
+            ids.append(ticket.get("id") or 0)
+            for column in CODE_COLUMNS:
+                value = ticket.get(column, 0)
+                code = _code(value)
+                if not code and value != 0:
+                    unusual[column][str(value)] += 1
+                codes[column].append(code)
+            for column in DATE_COLUMNS:
+                dates[column].append(to_epoch(ticket.get(column)))
+            for column, fields in LABEL_COLUMNS.items():
+                text = _label(ticket, fields)
+                lookup = lookups[column]
+                code = lookup.get(text)
+                if code is None:
+                    code = lookup[text] = len(lookup)
+                labels[column].append(code)
+
+        # Orden por fecha de apertura: los rangos de fechas pasan a ser cortes contiguos
+        opened = dates["date"]
+        order = sorted(range(len(ids)), key=opened.__getitem__)
+        store.ids = array("q", map(ids.__getitem__, order))
+        store.codes = {column: bytes(map(values.__getitem__, order)) for column, values in codes.items()}
+        store.dates = {column: array("q", map(values.__getitem__, order)) for column, values in dates.items()}
+        store.labels = {column: array("I", map(values.__getitem__, order)) for column, values in labels.items()}
+        store.vocabularies = {column: list(lookup) for column, lookup in lookups.items()}
+        store.unusual = unusual
+        return store
+
+    @classmethod
+    def from_pages(cls, pages: Iterable[List[Dict[str, Any]]]) -> "TicketColumns":
+        """Construye el almacén consumiendo páginas de la API de GLPI"""
+        return cls.from_tickets(chain.from_iterable(pages))
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+
+    def date_range(self, date_from: DateBound = None, date_to: DateBound = None) -> slice:
+        """
+        Filas abiertas entre dos fechas (inclusive) como corte contiguo
+
+        Una fecha sin hora en `date_to` incluye todo ese día.
+        """
+        opened = self.dates["date"]
+        lower = bisect_left(opened, to_epoch(date_from)) if date_from else 0
+        if date_to:
+            upper_epoch = to_epoch(date_to)
+            if not isinstance(date_to, datetime) and len(str(date_to)) <= 10:
+                upper_epoch += 86399
+            upper = bisect_right(opened, upper_epoch)
+        else:
+            upper = len(opened)
+        return slice(lower, max(lower, upper))
+
+    def _counts(self, column: str, rows: slice) -> Counter:
+        """Conteo por código; el del almacén completo se calcula una sola vez"""
+        if rows == slice(None):
+            totals = self._totals.get(column)
+            if totals is None:
+                values = self.codes[column] if column in self.codes else self.labels[column]
+                totals = self._totals[column] = Counter(values)
+            return totals
+        values = self.codes[column] if column in self.codes else self.labels[column]
+        return Counter(values[rows])
+
+    def count_by(self, column: str, rows: slice = slice(None)) -> Dict[Any, int]:
+        """
+        Conteo por valor de una columna
+
+        Args:
+            column: Columna de códigos (status, priority, ...) o de texto (category, assignee)
+            rows: Corte de filas (por ejemplo, el de date_range)
+
+        Returns:
+            {código o texto: número de tickets}, sin los valores vacíos
+        """
+        counts = self._counts(column, rows)
+        if column in self.codes:
+            return {code: counts[code] for code in sorted(counts) if code}
+        vocabulary = self.vocabularies[column]
+        return {vocabulary[code]: count for code, count in counts.most_common() if code}
+
+    def count(self, column: str, codes: Iterable[int], rows: slice = slice(None)) -> int:
+        """Tickets cuyo código en `column` está en `codes`"""
+        counts = self._counts(column, rows)
+        return sum(counts[code] for code in set(codes))
+
+    def resolution_hours(self, rows: slice = slice(None)) -> List[float]:
+        """Horas entre apertura y solución de los tickets resueltos del corte"""
+        opened = self.dates["date"][rows]
+        solved = self.dates["solvedate"][rows]
+        deltas = compress(map(sub, solved, opened), map(bool, map(min, opened, solved)))
+        return [seconds / 3600 for seconds in deltas if seconds >= 0]
+
+    def resolution_summary(self, rows: slice = slice(None)) -> Dict[str, Optional[float]]:
+        """Media y mediana del tiempo de resolución (horas)"""
+        hours = self.resolution_hours(rows)
+        if not hours:
+            return {"mean_hours": None, "median_hours": None}
+        return {
+            "mean_hours": round(sum(hours) / len(hours), 1),
+            "median_hours": round(statistics.median(hours), 1)
+        }
+
+    def memory_bytes(self) -> int:
+        """Tamaño aproximado de las columnas (sin el vocabulario)"""
+        size = self.ids.itemsize * len(self.ids)
+        size += sum(len(values) for values in self.codes.values())
+        size += sum(values.itemsize * len(values) for values in self.dates.values())
+        size += sum(values.itemsize * len(values) for values in self.labels.values())
+        return size
@@ -0,0 +1,204 @@
+"""
+Detalle enriquecido de un ticket: el ticket base y sus sub-recursos de GLPI
+(seguimientos, tareas, soluciones, elementos vinculados y actores) pedidos
+en paralelo, con una caché por ticket que se invalida cuando el espejo local
+detecta un cambio.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
+import re
+import time
+
+from loguru import logger
+
+from integrations.glpi_client import GLPIClient
+from services.text_analysis import strip_html
+from services.ticket_search import ticket_search_index
+from config import settings
+
+
+# Clave en el detalle -> sub-recurso de Ticket en la API de GLPI
+SUB_RESOURCES = {
+    "followups": "ITILFollowup",
+    "tasks": "TicketTask",
+    "solutions": "ITILSolution",
+    "items": "Item_Ticket",
+    "actors": "Ticket_User",
+}
+
+TASK_STATES = {0: "info", 1: "todo", 2: "done"}
+SOLUTION_STATES = {1: "none", 2: "waiting", 3: "accepted", 4: "refused"}
+ACTOR_ROLES = {1: "requesters", 2: "assigned", 3: "observers"}
+
+_SPACES_RE = re.compile(r"\s+")
+
+# Peticiones a GLPI en curso como máximo (ticket base + sub-recursos de varios detalles)
+_executor = ThreadPoolExecutor(max_workers=12, thread_name_prefix="glpi-detail")
+
+
+def plain_text(value: Any) -> str:
+    """Contenido de GLPI (HTML escapado) como texto plano"""
+    return _SPACES_RE.sub(" ", strip_html(str(value or ""))).strip()
+
+
+def _name(value: Any) -> Optional[str]:
+    """Nombre de un desplegable expandido (None si GLPI devolvió 0 o vacío)"""
+    return value if isinstance(value, str) and value else None
+
+
+def map_followup(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": row.get("id"),
+        "content": plain_text(row.get("content")),
+        "created_by": _name(row.get("users_id")),
+        "created_at": row.get("date") or row.get("date_creation"),
+        "is_private": bool(row.get("is_private")),
+    }
+
+
+def map_task(row: Dict[str, Any]) -> Dict[str, Any]:
+    actiontime = row.get("actiontime") or 0
+    return {
+        "id": row.get("id"),
+        "content": plain_text(row.get("content")),
+        "state": TASK_STATES.get(row.get("state"), "info"),
+        "created_by": _name(row.get("users_id")),
+        "assigned_to": _name(row.get("users_id_tech")),
+        "created_at": row.get("date") or row.get("date_creation"),
+        "duration_minutes": int(actiontime) // 60 if isinstance(actiontime, (int, float)) else None,
+        "is_private": bool(row.get("is_private")),
+    }
+
+
+def map_solution(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": row.get("id"),
+        "content": plain_text(row.get("content")),
+        "status": SOLUTION_STATES.get(row.get("status"), "none"),
+        "created_by": _name(row.get("users_id")),
+        "created_at": row.get("date_creation"),
+    }
+
+
+def map_item(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {"itemtype": row.get("itemtype"), "id": row.get("items_id")}
+
+
+def map_actors(rows: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+    actors: Dict[str, List[str]] = {role: [] for role in ACTOR_ROLES.values()}
+    for row in rows:
+        role = ACTOR_ROLES.get(row.get("type"))
+        name = _name(row.get("users_id")) or row.get("alternative_email")
+        if role and name:
+            actors[role].append(name)
+    return actors
+
+
+class TicketDetailService:
+    """Obtiene y cachea el detalle enriquecido de los tickets"""
+
+    def __init__(self, ttl_seconds: float = 60, max_entries: int = 500):
+        """
+        Inicializa el servicio
+
+        Args:
+            ttl_seconds: Vida de cada detalle en caché (0 = sin caché)
+            max_entries: Máximo de tickets en caché
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: Dict[int, Tuple[float, Dict[str, Any]]] = {}
+        self._lock = Lock()
+
+    def get(self, glpi: GLPIClient, ticket_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Detalle enriquecido de un ticket
+
+        Returns:
+            {"ticket": ticket de GLPI, "followups", "tasks", "solutions", "items",
+            "actors", "partial"} o None si el ticket no existe
+        """
+        cached = self._cached(ticket_id)
+        if cached is not None:
+            return cached
+
+        detail = self.fetch(glpi, ticket_id)
+        if detail is not None and not detail["partial"] and self.ttl_seconds > 0:
+            with self._lock:
+                if len(self._entries) >= self.max_entries:
+                    oldest = min(self._entries, key=lambda key: self._entries[key][0])
+                    del self._entries[oldest]
+                self._entries[ticket_id] = (time.monotonic() + self.ttl_seconds, detail)
+        return detail
+
+    def fetch(self, glpi: GLPIClient, ticket_id: int) -> Optional[Dict[str, Any]]:
+        """Pide el ticket y sus sub-recursos a GLPI en paralelo (una sola ronda de latencia)"""
+        started = time.perf_counter()
+        if not glpi.session_token:
+            glpi.init_session()
+
+        # Cada petición hereda el contexto (el plazo de la etapa del agente que la pide)
+        base = _executor.submit(copy_context().run, glpi.get_ticket_by_id, ticket_id)
+        subs = {
+            key: _executor.submit(copy_context().run, glpi.get_sub_items, "Ticket", ticket_id, sub_item_type)
+            for key, sub_item_type in SUB_RESOURCES.items()
+        }
+
+        ticket = base.result()
+        rows: Dict[str, List[Dict[str, Any]]] = {}
+        partial = False
+        for key, future in subs.items():
+            try:
+                rows[key] = future.result()
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudo obtener {SUB_RESOURCES[key]} del ticket {ticket_id}: {e}")
+                rows[key] = []
+                partial = True
+
+        if not ticket:
+            return None
+
+        followups = sorted((map_followup(r) for r in rows["followups"]), key=lambda f: f["created_at"] or "")
+        tasks = sorted((map_task(r) for r in rows["tasks"]), key=lambda t: t["created_at"] or "")
+        solutions = sorted((map_solution(r) for r in rows["solutions"]), key=lambda s: s["created_at"] or "")
+
+        logger.info(
+            f"🧾 Detalle del ticket {ticket_id}: {len(followups)} seguimientos, {len(tasks)} tareas, "
+            f"{len(solutions)} soluciones ({(time.perf_counter() - started) * 1000:.0f} ms)"
+        )
+        return {
+            "ticket": ticket,
+            "followups": followups,
+            "tasks": tasks,
+            "solutions": solutions,
+            "items": [map_item(r) for r in rows["items"]],
+            "actors": map_actors(rows["actors"]),
+            "partial": partial,
+        }
+
+    def _cached(self, ticket_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(ticket_id)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[ticket_id]
+                return None
+            return entry[1]
+
+    def invalidate(self, ticket_id: Any) -> None:
+        """Descarta el detalle cacheado de un ticket"""
+        with self._lock:
+            self._entries.pop(ticket_id, None)
+
+    def on_change(self, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> None:
+        """Observador del espejo: un ticket modificado (date_mod) invalida su detalle"""
+        self.invalidate((new or old or {}).get("id"))
+
+
+# Servicio compartido por la ruta de detalle y el agente
+ticket_detail_service = TicketDetailService(ttl_seconds=settings.ticket_detail_cache_seconds)
+ticket_search_index.add_listener(ticket_detail_service.on_change)
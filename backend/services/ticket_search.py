@@ -0,0 +1,507 @@
+"""
+Índice invertido BM25 en memoria sobre los tickets de GLPI (título,
+contenido y categoría), construido de forma incremental a partir de las
+páginas de la API.
+"""
+
+from bisect import bisect_left, insort
+from collections import Counter
+from itertools import chain, islice
+from threading import Lock, Thread
+from typing import Callable, Dict, List, Optional, Any, Set, Tuple
+from loguru import logger
+import heapq
+import math
+import time
+
+from integrations.glpi_client import GLPIClient
+from services.text_analysis import analyze, fold_accents, strip_html
+from services.ticket_columns import TicketColumns
+from config import settings
+
+
+# Campos que se conservan por ticket para devolver resultados sin volver a GLPI
+_STORED_FIELDS = (
+    "id", "name", "status", "priority", "type", "urgency", "impact", "date", "date_creation",
+    "date_mod", "solvedate", "closedate", "time_to_resolve", "itilcategories_id",
+    "itilcategories_id_friendlyname", "users_id_recipient", "users_id_recipient_friendlyname",
+    "users_id_assign_friendlyname"
+)
+
+# Recibe (versión anterior, versión nueva) de un ticket del espejo; None si no existía / se eliminó
+ChangeListener = Callable[[Optional[Dict[str, Any]], Optional[Dict[str, Any]]], None]
+# Filtro de tickets del espejo para los listados
+TicketFilter = Callable[[Dict[str, Any]], bool]
+
+
+class TicketSearchIndex:
+    """Índice BM25 de tickets con actualización incremental por date_mod"""
+
+    # Peso de cada campo (repeticiones del término en el documento)
+    NAME_WEIGHT = 3
+    CATEGORY_WEIGHT = 2
+    CONTENT_WEIGHT = 1
+
+    def __init__(self, refresh_seconds: int = 300, reconcile_seconds: int = 3600, k1: float = 1.2, b: float = 0.75):
+        """
+        Inicializa el índice vacío
+
+        Args:
+            refresh_seconds: Antigüedad máxima antes de sincronizar con GLPI
+            reconcile_seconds: Cada cuánto se comparan los ids con GLPI para quitar los eliminados (0 = nunca)
+            k1: Saturación de frecuencia de término (BM25)
+            b: Normalización por longitud de documento (BM25)
+        """
+        self.refresh_seconds = refresh_seconds
+        self.reconcile_seconds = reconcile_seconds
+        self.k1 = k1
+        self.b = b
+
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._doc_terms: Dict[int, Tuple[str, ...]] = {}
+        self._doc_lengths: Dict[int, int] = {}
+        self._docs: Dict[int, Dict[str, Any]] = {}
+        # Título, categoría y contenido sin acentos ni HTML, para el filtro por subcadena
+        self._doc_text: Dict[int, str] = {}
+        self._total_length = 0
+
+        self._lock = Lock()
+        self._sync_lock = Lock()
+        self._reconcile_lock = Lock()
+        self._last_reconcile = time.monotonic()
+        self._watermark: Optional[str] = None
+        self._last_refresh = 0.0
+        self._version = 0
+        self._columns: Optional[Tuple[int, TicketColumns]] = None
+        # Campo -> ([(valor, id)] ordenado, sus ids en el mismo orden, [id] ordenado de los que
+        # no tienen valor); se construye en el primer listado y después se actualiza ticket a ticket
+        self._orders: Dict[str, Tuple[List[Tuple[Any, int]], List[int], List[int]]] = {}
+        self._listeners: List[ChangeListener] = []
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    # ------------------------------------------------------------------
+    # Indexación
+    # ------------------------------------------------------------------
+
+    def add_tickets(self, tickets: List[Dict[str, Any]]) -> None:
+        """Indexa (o re-indexa) una página de tickets de GLPI"""
+        with self._lock:
+            changed = sum(self._index_ticket(ticket) for ticket in tickets)
+            if changed:
+                self._version += 1
+
+    def remove_ticket(self, ticket_id: int) -> None:
+        """Elimina un ticket del índice"""
+        with self._lock:
+            old = self._docs.get(ticket_id)
+            if old is not None:
+                self._remove(ticket_id)
+                self._version += 1
+                self._notify(old, None)
+
+    def add_listener(self, listener: ChangeListener) -> None:
+        """
+        Registra una función que se llama por cada ticket que cambia en el espejo
+
+        Se invoca con el lock del índice tomado: debe ser rápida y no llamar al índice.
+        """
+        self._listeners.append(listener)
+
+    def _notify(self, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> None:
+        for listener in self._listeners:
+            try:
+                listener(old, new)
+            except Exception as e:
+                logger.error(f"❌ Error en un observador del índice de tickets: {e}")
+
+    def _index_ticket(self, ticket: Dict[str, Any]) -> bool:
+        """Indexa un ticket; devuelve False si ya estaba indexado sin cambios"""
+        ticket_id = ticket.get("id")
+        if ticket_id is None:
+            return False
+
+        # El contenido se guarda completo: los listados lo devuelven como descripción,
+        # igual que GLPI, y la búsqueda por subcadena lo recorre entero
+        stored = {field: ticket.get(field) for field in _STORED_FIELDS if field in ticket}
+        stored["content"] = ticket.get("content") or ""
+        old = self._docs.get(ticket_id)
+        if old == stored:
+            return False
+        self._remove(ticket_id)
+
+        category = ticket.get("itilcategories_id_friendlyname") or ticket.get("itilcategories_id")
+        category = category if isinstance(category, str) else ""
+
+        counts = Counter()
+        for term in analyze(ticket.get("name", "")):
+            counts[term] += self.NAME_WEIGHT
+        for term in analyze(category):
+            counts[term] += self.CATEGORY_WEIGHT
+        for term in analyze(ticket.get("content", "")):
+            counts[term] += self.CONTENT_WEIGHT
+
+        for term, tf in counts.items():
+            self._postings.setdefault(term, {})[ticket_id] = tf
+
+        length = sum(counts.values())
+        self._doc_text[ticket_id] = fold_accents(
+            " ".join((str(ticket.get("name") or ""), category, strip_html(stored["content"])))
+        )
+        self._doc_terms[ticket_id] = tuple(counts)
+        self._doc_lengths[ticket_id] = length
+        self._total_length += length
+        self._docs[ticket_id] = stored
+        for field, (present, present_ids, missing) in self._orders.items():
+            value = stored.get(field)
+            if value is None:
+                insort(missing, ticket_id)
+            else:
+                position = bisect_left(present, (value, ticket_id))
+                present.insert(position, (value, ticket_id))
+                present_ids.insert(position, ticket_id)
+        self._notify(old, stored)
+        return True
+
+    def _remove(self, ticket_id: int) -> None:
+        terms = self._doc_terms.pop(ticket_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(ticket_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= self._doc_lengths.pop(ticket_id, 0)
+        old = self._docs.pop(ticket_id, None)
+        if old is not None:
+            for field, (present, present_ids, missing) in self._orders.items():
+                value = old.get(field)
+                if value is None:
+                    position = bisect_left(missing, ticket_id)
+                    if position < len(missing) and missing[position] == ticket_id:
+                        del missing[position]
+                    continue
+                position = bisect_left(present, (value, ticket_id))
+                if position < len(present) and present[position] == (value, ticket_id):
+                    del present[position]
+                    del present_ids[position]
+        self._doc_text.pop(ticket_id, None)
+
+    # ------------------------------------------------------------------
+    # Búsqueda
+    # ------------------------------------------------------------------
+
+    def search(self, query: str, limit: Optional[int] = 20) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        Busca los tickets más relevantes para el texto dado
+
+        Args:
+            query: Texto libre en español o inglés
+            limit: Número máximo de resultados (None = todos los que coincidan)
+
+        Returns:
+            Lista de (ticket almacenado, puntuación BM25) ordenada por relevancia
+        """
+        terms = set(analyze(query))
+        if not terms:
+            return []
+
+        with self._lock:
+            n_docs = len(self._docs)
+            if n_docs == 0:
+                return []
+            avg_length = self._total_length / n_docs or 1.0
+
+            # norm(doc) = k1 * (1 - b + b * len(doc) / avg_len), precalculando las constantes
+            norm_base = self.k1 * (1 - self.b)
+            norm_scale = self.k1 * self.b / avg_length
+            doc_lengths = self._doc_lengths
+
+            scores: Dict[int, float] = {}
+            get_score = scores.get
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                df = len(postings)
+                weight = math.log(1 + (n_docs - df + 0.5) / (df + 0.5)) * (self.k1 + 1)
+                for doc_id, tf in postings.items():
+                    scores[doc_id] = get_score(doc_id, 0.0) + weight * tf / (tf + norm_base + norm_scale * doc_lengths[doc_id])
+
+            if limit is None:
+                ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+            else:
+                ranked = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            return [(self._docs[doc_id], round(score, 4)) for doc_id, score in ranked]
+
+    def search_substring(self, text: str, exclude: Optional[Set[int]] = None) -> List[Dict[str, Any]]:
+        """
+        Tickets cuyo título, categoría o contenido contienen el texto
+
+        BM25 compara palabras completas (con stemming): prefijos y fragmentos
+        como "impre" o "PC-00" solo se encuentran así. Sin distinguir
+        mayúsculas ni acentos; el contenido se recorre completo.
+
+        Args:
+            text: Texto buscado
+            exclude: Ids a omitir (p. ej. los ya encontrados por BM25)
+        """
+        needle = fold_accents(text.strip())
+        if not needle:
+            return []
+        exclude = exclude or set()
+        with self._lock:
+            return [
+                self._docs[doc_id] for doc_id, haystack in self._doc_text.items()
+                if needle in haystack and doc_id not in exclude
+            ]
+
+    # ------------------------------------------------------------------
+    # Sincronización con GLPI
+    # ------------------------------------------------------------------
+
+    def refresh(self, glpi: GLPIClient, force: bool = False) -> int:
+        """
+        Sincroniza el índice con GLPI si está desactualizado
+
+        La primera vez recorre todos los tickets; después solo pide las páginas
+        ordenadas por date_mod descendente hasta alcanzar la última marca vista.
+
+        Args:
+            glpi: Cliente de GLPI
+            force: Sincronizar aunque el índice sea reciente
+
+        Returns:
+            Número de tickets indexados en esta sincronización
+        """
+        if not force and time.monotonic() - self._last_refresh < self.refresh_seconds and self._watermark:
+            return 0
+
+        with self._sync_lock:
+            if not force and time.monotonic() - self._last_refresh < self.refresh_seconds and self._watermark:
+                return 0
+
+            started = time.perf_counter()
+            indexed = 0
+            watermark = self._watermark
+            newest = watermark
+
+            try:
+                if watermark is None:
+                    pages = glpi.iter_pages("Ticket", {"sort": "id", "order": "ASC"})
+                else:
+                    pages = glpi.iter_pages("Ticket", {"sort": "date_mod", "order": "DESC"})
+
+                for page in pages:
+                    fresh = page
+                    if watermark is not None:
+                        fresh = [t for t in page if (t.get("date_mod") or "") >= watermark]
+                    self.add_tickets(fresh)
+                    indexed += len(fresh)
+
+                    for ticket in fresh:
+                        date_mod = ticket.get("date_mod") or ""
+                        if newest is None or date_mod > newest:
+                            newest = date_mod
+
+                    # En modo incremental, al alcanzar tickets anteriores a la marca ya no hay más cambios
+                    if len(fresh) < len(page):
+                        break
+            except Exception as e:
+                logger.error(f"❌ Error sincronizando índice de tickets: {e}")
+                if not self._docs:
+                    raise
+                # Recorrido incompleto: las páginas más antiguas no se leyeron, así que la
+                # marca no avanza (carga inicial: se repetirá completa; incremental: desde
+                # la marca anterior)
+                newest = watermark
+
+            self._watermark = newest
+            self._last_refresh = time.monotonic()
+            logger.info(
+                f"🔎 Índice de tickets sincronizado: {indexed} actualizados, "
+                f"{len(self._docs)} en total ({(time.perf_counter() - started) * 1000:.0f} ms)"
+            )
+
+        if self.reconcile_seconds > 0 and self.is_warm and time.monotonic() - self._last_reconcile >= self.reconcile_seconds:
+            self.reconcile_in_background()
+        return indexed
+
+    def reconcile_ids(self, glpi: GLPIClient) -> int:
+        """
+        Quita del espejo los tickets eliminados o enviados a la papelera en GLPI
+
+        La sincronización por date_mod no los ve (GLPI deja de listarlos), así
+        que se recorren solo los ids de GLPI y se eliminan los que faltan. Las
+        páginas van por posición: un borrado durante el recorrido puede hacer
+        saltar un ticket, por eso los que faltan se confirman con un segundo
+        recorrido. Los tickets añadidos durante el recorrido no se tocan.
+
+        Returns:
+            Número de tickets eliminados del espejo
+        """
+        started = time.perf_counter()
+        with self._lock:
+            known = set(self._docs)
+        missing = known - self._glpi_ids(glpi)
+        if missing:
+            missing -= self._glpi_ids(glpi)
+        for ticket_id in missing:
+            self.remove_ticket(ticket_id)
+        self._last_reconcile = time.monotonic()
+        logger.info(
+            f"🔎 Ids de tickets conciliados con GLPI: {len(missing)} eliminados del espejo "
+            f"({(time.perf_counter() - started) * 1000:.0f} ms)"
+        )
+        return len(missing)
+
+    @staticmethod
+    def _glpi_ids(glpi: GLPIClient) -> Set[int]:
+        """Ids de todos los tickets de GLPI (sin papelera), sin el resto de campos"""
+        ids: Set[int] = set()
+        params = {"only_id": "true", "expand_dropdowns": "false", "sort": "id", "order": "ASC"}
+        for page in glpi.iter_pages("Ticket", params, page_size=1000):
+            ids.update(ticket["id"] for ticket in page)
+        return ids
+
+    def reconcile_in_background(self) -> None:
+        """Lanza una conciliación de ids en un hilo si no hay otra en curso"""
+        if not self._reconcile_lock.acquire(blocking=False):
+            return
+        self._last_reconcile = time.monotonic()
+
+        def run():
+            glpi = GLPIClient(
+                url=settings.glpi_url,
+                app_token=settings.glpi_app_token,
+                user_token=settings.glpi_user_token
+            )
+            try:
+                self.reconcile_ids(glpi)
+            except Exception as e:
+                logger.error(f"❌ Error conciliando ids de tickets con GLPI: {e}")
+            finally:
+                glpi.kill_session()
+                self._reconcile_lock.release()
+
+        Thread(target=run, name="ticket-index-reconcile", daemon=True).start()
+
+    @property
+    def version(self) -> int:
+        """Contador que aumenta cada vez que cambia el contenido del espejo"""
+        return self._version
+
+    @property
+    def is_warm(self) -> bool:
+        """Indica si ya se completó la carga inicial"""
+        return self._watermark is not None
+    
+    def documents(self) -> List[Dict[str, Any]]:
+        """Copia de la lista de tickets almacenados (espejo local para listados)"""
+        with self._lock:
+            return list(self._docs.values())
+
+    def page(
+        self,
+        field: str,
+        descending: bool = True,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        matches: Optional[TicketFilter] = None
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Una página del espejo ordenada por un campo, sin copiar ni ordenar el espejo
+
+        Los tickets sin valor en el campo van al final, por id. Sin filtro la
+        página es un corte del orden; con filtro se evalúa el filtro una vez
+        por ticket y la página se toma del orden hasta completarla.
+
+        Args:
+            field: Campo guardado del ticket (date, date_mod, priority, status, id)
+            descending: Orden descendente
+            offset: Posición del primer ticket
+            limit: Tickets de la página (None = todos desde offset)
+            matches: Filtro de tickets (None = todos)
+
+        Returns:
+            (tickets de la página, total de tickets que cumplen el filtro)
+        """
+        with self._lock:
+            _, present_ids, missing = self._order(field)
+            docs = self._docs
+            ids = chain(reversed(present_ids) if descending else present_ids, missing)
+            stop = None if limit is None else offset + limit
+            total = len(docs)
+            if matches is not None:
+                selected = {doc_id for doc_id, doc in docs.items() if matches(doc)}
+                ids = filter(selected.__contains__, ids)
+                total = len(selected)
+            return [docs[doc_id] for doc_id in islice(ids, offset, stop)], total
+
+    def _order(self, field: str) -> Tuple[List[Tuple[Any, int]], List[int], List[int]]:
+        """Orden del espejo por un campo (con el lock tomado); se construye la primera vez"""
+        order = self._orders.get(field)
+        if order is None:
+            present = sorted(
+                (doc[field], doc_id) for doc_id, doc in self._docs.items() if doc.get(field) is not None
+            )
+            missing = sorted(doc_id for doc_id, doc in self._docs.items() if doc.get(field) is None)
+            order = self._orders[field] = (present, [doc_id for _, doc_id in present], missing)
+        return order
+    
+    def columns(self) -> TicketColumns:
+        """Proyección columnar del espejo para estadísticas (se reconstruye al cambiar la versión)"""
+        cached = self._columns
+        if cached is not None and cached[0] == self._version:
+            return cached[1]
+        with self._lock:
+            version = self._version
+            docs = list(self._docs.values())
+        columns = TicketColumns.from_tickets(docs)
+        self._columns = (version, columns)
+        return columns
+    
+    def refresh_in_background(self, glpi: Optional[GLPIClient] = None) -> None:
+        """
+        Lanza una sincronización en un hilo si no hay otra en curso
+
+        Args:
+            glpi: Cliente de GLPI; sin él se abre una sesión propia que se cierra al terminar
+        """
+        if self._sync_lock.locked():
+            return
+        
+        def run():
+            client = glpi or GLPIClient(
+                url=settings.glpi_url,
+                app_token=settings.glpi_app_token,
+                user_token=settings.glpi_user_token
+            )
+            try:
+                self.refresh(client)
+            except Exception as e:
+                logger.error(f"❌ Error en la carga en segundo plano del índice de tickets: {e}")
+            finally:
+                if glpi is None:
+                    client.kill_session()
+        
+        Thread(target=run, name="ticket-index-refresh", daemon=True).start()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Tamaño del índice y marca de sincronización"""
+        return {
+            "documents": len(self._docs),
+            "terms": len(self._postings),
+            "watermark": self._watermark,
+            "version": self._version
+        }
+
+
+# Índice compartido por las rutas de tickets y el agente
+ticket_search_index = TicketSearchIndex(
+    refresh_seconds=settings.ticket_index_refresh_seconds,
+    reconcile_seconds=settings.ticket_index_reconcile_seconds
+)
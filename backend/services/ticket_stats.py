@@ -0,0 +1,62 @@
+"""
+Desglose de tickets por estado, prioridad, tipo, urgencia e impacto con
+nombres legibles, para el agente y los reportes.
+
+Los conteos se hacen sobre el almacén columnar (un conteo en C por columna);
+los valores que no son un código válido se etiquetan como antes ("Estado X").
+"""
+
+from typing import Any, Dict, List
+
+from services.ticket_columns import TicketColumns
+
+
+ESTADOS = {
+    1: "Nuevo", 2: "En Proceso (Asignado)", 3: "En Proceso (Planificado)",
+    4: "En Espera", 5: "Resuelto", 6: "Cerrado"
+}
+PRIORIDADES = {1: "Muy Baja", 2: "Baja", 3: "Media", 4: "Alta", 5: "Muy Alta", 6: "Mayor"}
+TIPOS = {1: "Incidente", 2: "Solicitud"}
+URGENCIAS = {1: "Muy Baja", 2: "Baja", 3: "Media", 4: "Alta", 5: "Muy Alta"}
+IMPACTOS = {1: "Muy Bajo", 2: "Bajo", 3: "Medio", 4: "Alto", 5: "Muy Alto"}
+
+# Clave del desglose, columna del almacén, nombres por código y prefijo para códigos desconocidos
+BREAKDOWN_GROUPS = (
+    ("por_estado", "status", ESTADOS, "Estado"),
+    ("por_prioridad", "priority", PRIORIDADES, "Prioridad"),
+    ("por_tipo", "type", TIPOS, "Tipo"),
+    ("por_urgencia", "urgency", URGENCIAS, "Urgencia"),
+    ("por_impacto", "impact", IMPACTOS, "Impacto"),
+)
+
+
+def ticket_breakdown(tickets: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Genera las estadísticas de una lista de tickets de GLPI
+
+    Args:
+        tickets: Tickets tal como los devuelve la API
+
+    Returns:
+        {"total", "por_estado", "por_prioridad", ...} o {} si no hay tickets
+    """
+    if not tickets:
+        return {}
+
+    columns = TicketColumns.from_tickets(tickets)
+    stats: Dict[str, Any] = {"total": len(columns)}
+    for key, column, nombres, prefijo in BREAKDOWN_GROUPS:
+        counts = columns.count_by(column)
+        unusual = columns.unusual[column]
+        group: Dict[str, int] = {}
+        for code, count in counts.items():
+            nombre = nombres.get(code, f"{prefijo} {code}")
+            group[nombre] = group.get(nombre, 0) + count
+        for value, count in unusual.items():
+            nombre = f"{prefijo} {value}"
+            group[nombre] = group.get(nombre, 0) + count
+        sin_valor = len(columns) - sum(counts.values()) - sum(unusual.values())
+        if sin_valor:
+            group[f"{prefijo} 0"] = sin_valor
+        stats[key] = group
+    return stats
@@ -0,0 +1,157 @@
+"""
+Series temporales de tickets (abiertos, resueltos y cerrados por día o
+semana, backlog y tiempo de resolución), mantenidas de forma incremental a
+partir de los cambios del espejo local de tickets.
+
+Cada cambio de un ticket resta su aportación anterior y suma la nueva, así
+que consultar la serie nunca recorre todos los tickets ni vuelve a GLPI.
+"""
+
+from bisect import bisect_left, insort
+from datetime import date, datetime, timedelta
+from threading import Lock
+from typing import Any, Dict, List, Optional
+import statistics
+
+from services.ticket_search import ticket_search_index
+
+
+# Posiciones de los contadores diarios
+OPENED, SOLVED, CLOSED, DONE = range(4)
+
+PERIODS = ("day", "week")
+
+
+def _parse(value: Any) -> Optional[datetime]:
+    """Fecha de GLPI ("YYYY-MM-DD HH:MM:SS") o None"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+def bucket_start(day: date, period: str) -> date:
+    """Primer día del periodo (los periodos semanales empiezan en lunes)"""
+    return day - timedelta(days=day.weekday()) if period == "week" else day
+
+
+class TicketTimeline:
+    """Contadores diarios de tickets actualizados con cada cambio del espejo"""
+
+    def __init__(self):
+        # día -> [abiertos, resueltos, cerrados, terminados (resueltos o cerrados)]
+        self._days: Dict[date, List[int]] = {}
+        # día de solución -> horas de resolución ordenadas
+        self._resolution: Dict[date, List[float]] = {}
+        self._lock = Lock()
+
+    def apply(self, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> None:
+        """Sustituye la aportación de la versión anterior de un ticket por la nueva"""
+        with self._lock:
+            if old is not None:
+                self._account(old, -1)
+            if new is not None:
+                self._account(new, 1)
+
+    def _account(self, ticket: Dict[str, Any], sign: int) -> None:
+        opened = _parse(ticket.get("date"))
+        solved = _parse(ticket.get("solvedate"))
+        closed = _parse(ticket.get("closedate"))
+
+        if opened:
+            self._bump(opened.date(), OPENED, sign)
+        if solved:
+            self._bump(solved.date(), SOLVED, sign)
+        if closed:
+            self._bump(closed.date(), CLOSED, sign)
+        done = min(d for d in (solved, closed) if d) if (solved or closed) else None
+        if done:
+            self._bump(done.date(), DONE, sign)
+
+        if opened and solved and solved >= opened:
+            hours = (solved - opened).total_seconds() / 3600
+            values = self._resolution.setdefault(solved.date(), [])
+            if sign > 0:
+                insort(values, hours)
+            else:
+                index = bisect_left(values, hours)
+                if index < len(values) and values[index] == hours:
+                    values.pop(index)
+                if not values:
+                    del self._resolution[solved.date()]
+
+    def _bump(self, day: date, slot: int, sign: int) -> None:
+        counters = self._days.get(day)
+        if counters is None:
+            counters = self._days[day] = [0, 0, 0, 0]
+        counters[slot] += sign
+        if not any(counters):
+            del self._days[day]
+
+    def series(self, date_from: date, date_to: date, period: str = "day") -> Dict[str, Any]:
+        """
+        Serie de tickets entre dos fechas (inclusive)
+
+        Args:
+            date_from: Primer día
+            date_to: Último día
+            period: "day" o "week"
+
+        Returns:
+            Buckets con abiertos/resueltos/cerrados y backlog al final de cada uno,
+            totales del rango y tiempo medio/mediano de resolución
+        """
+        first = bucket_start(date_from, period)
+        step = timedelta(days=7 if period == "week" else 1)
+
+        with self._lock:
+            # Backlog al inicio: abiertos menos terminados antes del primer día
+            backlog = sum(c[OPENED] - c[DONE] for day, c in self._days.items() if day < first)
+            in_range = {day: list(c) for day, c in self._days.items() if first <= day <= date_to}
+            hours = [h for day, values in self._resolution.items() if first <= day <= date_to for h in values]
+
+        backlog_start = backlog
+        buckets = []
+        totals = [0, 0, 0, 0]
+        start = first
+        while start <= date_to:
+            counts = [0, 0, 0, 0]
+            day = start
+            while day < start + step and day <= date_to:
+                for slot, value in enumerate(in_range.get(day, ())):
+                    counts[slot] += value
+                day += timedelta(days=1)
+            backlog += counts[OPENED] - counts[DONE]
+            for slot in range(4):
+                totals[slot] += counts[slot]
+            buckets.append({
+                "start": start.isoformat(),
+                "opened": counts[OPENED],
+                "solved": counts[SOLVED],
+                "closed": counts[CLOSED],
+                "backlog": backlog
+            })
+            start += step
+
+        return {
+            "tipo": "tendencia",
+            "period": period,
+            "date_from": first.isoformat(),
+            "date_to": date_to.isoformat(),
+            "buckets": buckets,
+            "totals": {"opened": totals[OPENED], "solved": totals[SOLVED], "closed": totals[CLOSED]},
+            "backlog_start": backlog_start,
+            "backlog_end": backlog,
+            "time_to_resolve": {
+                "count": len(hours),
+                "mean_hours": round(sum(hours) / len(hours), 1) if hours else None,
+                "median_hours": round(statistics.median(hours), 1) if hours else None
+            }
+        }
+
+
+# Serie compartida, alimentada por los cambios del espejo de tickets
+ticket_timeline = TicketTimeline()
+ticket_search_index.add_listener(ticket_timeline.apply)
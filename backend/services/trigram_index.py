@@ -0,0 +1,373 @@
+"""
+Índice de trigramas en memoria para búsqueda aproximada (errores de
+tecleo, fragmentos de números de serie) sobre textos cortos.
+
+El índice trabaja en dos niveles: trigramas -> palabras distintas del
+vocabulario y palabras -> documentos. Cada palabra de la consulta se
+compara primero con el vocabulario (mucho más pequeño que los documentos:
+fabricantes, modelos y nombres se repiten) y después se combinan los
+documentos de las palabras parecidas. Cada palabra se rellena como en
+pg_trgm ("  lenovo ") antes de partirla en trigramas.
+"""
+
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from itertools import groupby
+from threading import Lock
+from math import ceil
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import heapq
+import re
+import unicodedata
+
+
+# Los guiones internos se conservan en la palabra: UUID, PC-0123, INV-2024-045
+_WORD_RE = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+
+_EMPTY = array("I")
+
+
+def normalize(text: str) -> str:
+    """Minúsculas sin acentos; palabras de letras y dígitos (sin guiones) separadas por espacios"""
+    text = text.lower()
+    if not text.isascii():
+        # Quita los diacríticos; el resto de caracteres no ASCII no forma parte de las palabras
+        text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    return " ".join(_WORD_RE.findall(text)).replace("-", "")
+
+
+def word_trigrams(word: str) -> set:
+    """Trigramas de una palabra normalizada, con el relleno de pg_trgm"""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """Índice inmutable de trigramas sobre una lista de documentos de texto"""
+
+    # Puntuación extra de una palabra idéntica a la de la consulta, o que la contiene
+    EXACT_BONUS = 1.0
+    SUBSTRING_BONUS = 0.5
+    # Palabras del vocabulario revisadas como candidatas por cada palabra de la consulta
+    SEED_BUDGET = 512
+    # Palabras del vocabulario por palabra de la consulta en las búsquedas con límite
+    MAX_WORD_MATCHES = 32
+    # Posiciones guardadas en los conjuntos de documentos por palabra
+    DOC_SET_BUDGET = 250_000
+
+    def __init__(self, documents: Sequence[str]):
+        """
+        Construye el índice
+
+        Args:
+            documents: Texto de cada documento; la posición en la lista es su identificador
+        """
+        word_ids: Dict[str, int] = {}
+        word_docs: List[List[int]] = []
+        doc_words: List[Tuple[int, ...]] = []
+        for position, text in enumerate(documents):
+            ids = []
+            for word in set(normalize(text).split()):
+                word_id = word_ids.get(word)
+                if word_id is None:
+                    word_id = word_ids[word] = len(word_docs)
+                    word_docs.append([])
+                word_docs[word_id].append(position)
+                ids.append(word_id)
+            doc_words.append(tuple(ids))
+
+        gram_words: Dict[str, List[int]] = {}
+        for word, word_id in word_ids.items():
+            for gram in word_trigrams(word):
+                gram_words.setdefault(gram, []).append(word_id)
+
+        self.words: List[str] = list(word_ids)
+        # Palabra -> documentos (ascendentes); documento -> palabras; trigrama -> palabras (ascendentes)
+        self._word_docs: List[array] = [array("I", positions) for positions in word_docs]
+        self._doc_words = doc_words
+        self._gram_words: Dict[str, array] = {gram: array("I", ids) for gram, ids in gram_words.items()}
+        # Vocabulario ordenado, y con cada palabra al revés, para buscar prefijos y sufijos por bisección
+        by_word = sorted(range(len(self.words)), key=self.words.__getitem__)
+        self._sorted_words = [self.words[word_id] for word_id in by_word]
+        self._sorted_ids = array("I", by_word)
+        reversed_words = [word[::-1] for word in self.words]
+        by_reversed = sorted(range(len(self.words)), key=reversed_words.__getitem__)
+        self._reversed_words = [reversed_words[word_id] for word_id in by_reversed]
+        self._reversed_ids = array("I", by_reversed)
+        self._doc_sets: "OrderedDict[int, frozenset]" = OrderedDict()
+        self._doc_sets_size = 0
+        self._doc_sets_lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._doc_words)
+
+    def match_words(self, word: str, threshold: float = 0.5, max_words: Optional[int] = None) -> Dict[int, float]:
+        """
+        Palabras del vocabulario parecidas a una palabra de la consulta
+
+        Una palabra coincide si contiene al menos la fracción `threshold` de
+        los trigramas de la consulta. Primero se buscan por bisección las
+        palabras que empiezan o terminan por la de la consulta (siempre
+        puntúan más que las demás); si con ellas no se llega a `max_words`,
+        se añaden las parecidas por trigramas, tomando como candidatas las
+        palabras de los trigramas menos frecuentes.
+
+        Los candidatos se limitan a SEED_BUDGET: con trigramas muy comunes
+        (dígitos de inventarios y números de serie) solo se revisan los de
+        los trigramas más raros, lo que equivale a exigir más trigramas en
+        común, y si ni el más raro cabe no se buscan parecidas. Así el coste
+        no depende del tamaño del vocabulario.
+
+        Args:
+            max_words: Máximo de palabras devueltas, las más parecidas (None = sin límite)
+
+        Returns:
+            {id de palabra: similitud}
+        """
+        grams = word_trigrams(word)
+        matches = self._affix_matches(word, grams, max_words)
+        if max_words is not None and len(matches) >= max_words:
+            return matches
+
+        required = max(1, ceil(threshold * len(grams)))
+        postings_by_gram = sorted((self._gram_words.get(gram, _EMPTY) for gram in grams), key=len)
+        # Una palabra con `required` trigramas en común tiene al menos uno de los `seeds` menos frecuentes
+        seeds = len(grams) - required + 1
+        while seeds > 1 and sum(len(postings) for postings in postings_by_gram[:seeds]) > self.SEED_BUDGET:
+            seeds -= 1
+        if len(postings_by_gram[0]) > self.SEED_BUDGET:
+            # Ni el trigrama más raro es selectivo: solo cuentan las coincidencias por prefijo o sufijo
+            return matches
+        candidates = set().union(*postings_by_gram[:seeds])
+
+        words = self.words
+        for word_id in candidates:
+            if word_id in matches:
+                continue
+            similarity = self._similarity(word, grams, words[word_id], required)
+            if similarity is not None:
+                matches[word_id] = similarity
+
+        if max_words is not None and len(matches) > max_words:
+            top = heapq.nsmallest(max_words, matches.items(), key=lambda item: (-item[1], item[0]))
+            matches = dict(top)
+        return matches
+
+    def _affix_matches(self, word: str, grams: set, max_words: Optional[int]) -> Dict[int, float]:
+        """Palabras idénticas a la de la consulta, o que empiezan o terminan por ella"""
+        matches: Dict[int, float] = {}
+        for vocabulary, ids, key in (
+            (self._sorted_words, self._sorted_ids, word),
+            (self._reversed_words, self._reversed_ids, word[::-1])
+        ):
+            index = bisect_left(vocabulary, key)
+            while index < len(vocabulary) and vocabulary[index].startswith(key):
+                if max_words is not None and len(matches) >= max_words:
+                    return matches
+                word_id = ids[index]
+                if word_id not in matches:
+                    matches[word_id] = self._similarity(word, grams, self.words[word_id], 1)
+                index += 1
+        return matches
+
+    def _similarity(self, word: str, grams: set, candidate: str, required: int) -> Optional[float]:
+        """Fracción de trigramas de la consulta presentes en `candidate` (más la bonificación), o None"""
+        padded = f"  {candidate} "
+        count = len([gram for gram in grams if gram in padded])
+        if count < required:
+            return None
+        similarity = count / len(grams)
+        if candidate == word:
+            similarity += self.EXACT_BONUS
+        elif word in candidate:
+            similarity += self.SUBSTRING_BONUS
+        return similarity
+
+    def search(
+        self,
+        query: str,
+        limit: Optional[int] = 20,
+        threshold: float = 0.5,
+        scope: Optional[Iterable[int]] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        Documentos que contienen todas las palabras de la consulta (de forma aproximada)
+
+        Con `limit`, cada palabra de la consulta se compara como mucho con
+        MAX_WORD_MATCHES palabras del vocabulario (las más parecidas).
+
+        Args:
+            query: Texto buscado (admite errores de tecleo y fragmentos)
+            limit: Máximo de resultados (None = todos)
+            threshold: Fracción mínima de trigramas de cada palabra de la consulta
+            scope: Limitar la búsqueda a estas posiciones (p. ej. las que pasan otros filtros)
+
+        Returns:
+            Lista de (posición, puntuación) de mayor a menor puntuación y, a
+            igual puntuación, en el orden original. La puntuación suma, por
+            cada palabra de la consulta, la similitud de su mejor coincidencia
+            en el documento (más una bonificación si es idéntica o la contiene)
+        """
+        query_words = list(dict.fromkeys(normalize(query).split()))
+        if not query_words:
+            return []
+        max_words = self.MAX_WORD_MATCHES if limit is not None else None
+        matched = [self.match_words(word, threshold, max_words) for word in query_words]
+        if not all(matched):
+            return []
+        allowed = scope if scope is None or isinstance(scope, (set, frozenset)) else set(scope)
+        if len(matched) == 1:
+            return self._single_word(matched[0], limit, allowed)
+
+        groups = [list(self._similarity_groups(words)) for words in matched]
+        if limit is not None:
+            best = self._best_documents(groups, limit, allowed)
+            if best is not None:
+                return best
+
+        # Se parte de la palabra de la consulta cuyo grupo más parecido tiene menos documentos:
+        # sus documentos son los que se comprueban contra las demás palabras
+        first = min(
+            range(len(groups)),
+            key=lambda index: sum(len(self._word_docs[word_id]) for word_id, _ in groups[index][0][1])
+        )
+        others = matched[:first] + matched[first + 1:]
+
+        # Cota: la primera palabra en su grupo más las mejores coincidencias de las demás. Se para
+        # al tener `limit` resultados con la cota del grupo (los siguientes no pueden superarlos)
+        # o cuando ni la cota del grupo entra en el top
+        others_max = sum(max(words.values()) for words in others)
+        doc_words = self._doc_words
+        results: List[Tuple[int, float]] = []
+        seen = set()
+        kth_best = None
+        for similarity, group in groups[first]:
+            ceiling = similarity + others_max - 1e-9
+            if kth_best is not None and ceiling < kth_best:
+                break
+            at_ceiling = sum(1 for _, score in results if score >= ceiling)
+            for position in heapq.merge(*(self._word_docs[word_id] for word_id, _ in group)):
+                if position in seen:
+                    continue
+                seen.add(position)
+                if allowed is not None and position not in allowed:
+                    continue
+                score = similarity
+                for words in others:
+                    best = max((words[word_id] for word_id in doc_words[position] if word_id in words), default=None)
+                    if best is None:
+                        break
+                    score += best
+                else:
+                    results.append((position, score))
+                    if score >= ceiling:
+                        at_ceiling += 1
+                if limit is not None and at_ceiling >= limit:
+                    break
+            if limit is not None and at_ceiling >= limit:
+                break
+            if limit is not None and len(results) >= limit:
+                kth_best = heapq.nlargest(limit, (score for _, score in results))[-1]
+
+        key = lambda match: (-match[1], match[0])
+        ranked = sorted(results, key=key) if limit is None else heapq.nsmallest(limit, results, key=key)
+        return [(position, round(score, 4)) for position, score in ranked]
+
+    def _best_documents(
+        self,
+        groups: List[List[Tuple[float, list]]],
+        limit: int,
+        allowed: Optional[Iterable[int]]
+    ) -> Optional[List[Tuple[int, float]]]:
+        """
+        Atajo de las consultas de varias palabras: los documentos que tienen
+        la mejor coincidencia de cada palabra logran la puntuación máxima.
+        Se intersecan en C sus listas de documentos, de la más corta a la más
+        larga; si quedan al menos `limit`, son el resultado (los de menor
+        posición). Si no, None y se hace la búsqueda completa.
+        """
+        tops = sorted(
+            (self._group_documents([word_id for word_id, _ in word_groups[0][1]]) for word_groups in groups),
+            key=len
+        )
+        common = tops[0].intersection(*tops[1:])
+        if allowed is not None:
+            common.intersection_update(allowed)
+        if len(common) < limit:
+            return None
+        score = round(sum(word_groups[0][0] for word_groups in groups), 4)
+        return [(position, score) for position in heapq.nsmallest(limit, common)]
+
+    def _group_documents(self, word_ids: List[int]) -> frozenset:
+        """Documentos que contienen alguna de las palabras"""
+        if len(word_ids) == 1:
+            return self._document_set(word_ids[0])
+        return frozenset().union(*(self._document_set(word_id) for word_id in word_ids))
+
+    def _document_set(self, word_id: int) -> frozenset:
+        """
+        Documentos de una palabra como conjunto, para intersecarlos en C
+
+        Convertir una lista de miles de posiciones crea un entero por
+        posición: los conjuntos de las palabras consultadas se guardan (los
+        menos usados se descartan al pasar de DOC_SET_BUDGET posiciones).
+        """
+        with self._doc_sets_lock:
+            cached = self._doc_sets.get(word_id)
+            if cached is not None:
+                self._doc_sets.move_to_end(word_id)
+                return cached
+        documents = frozenset(self._word_docs[word_id])
+        with self._doc_sets_lock:
+            if word_id not in self._doc_sets:
+                self._doc_sets[word_id] = documents
+                self._doc_sets_size += len(documents)
+                while self._doc_sets_size > self.DOC_SET_BUDGET and len(self._doc_sets) > 1:
+                    _, evicted = self._doc_sets.popitem(last=False)
+                    self._doc_sets_size -= len(evicted)
+        return documents
+
+    @staticmethod
+    def _similarity_groups(matches: Dict[int, float]):
+        """(similitud, [(id de palabra, similitud), ...]) de mayor a menor similitud"""
+        ranked = sorted(matches.items(), key=lambda item: item[1], reverse=True)
+        for similarity, group in groupby(ranked, key=lambda item: item[1]):
+            yield similarity, list(group)
+
+    def _single_word(
+        self,
+        matches: Dict[int, float],
+        limit: Optional[int],
+        allowed: Optional[Iterable[int]]
+    ) -> List[Tuple[int, float]]:
+        """
+        Resultados de una consulta de una sola palabra
+
+        Se recorren las palabras por similitud descendente, fusionando sus
+        listas de documentos ya ordenadas: al llegar a `limit` resultados se
+        puede parar, porque el resto tiene igual o menor puntuación.
+        """
+        results: List[Tuple[int, float]] = []
+        seen = set()
+        for similarity, group in self._similarity_groups(matches):
+            score = round(similarity, 4)
+            previous = None
+            for position in heapq.merge(*(self._word_docs[word_id] for word_id, _ in group)):
+                if position == previous or position in seen:
+                    continue
+                previous = position
+                if allowed is not None and position not in allowed:
+                    continue
+                seen.add(position)
+                results.append((position, score))
+                if limit is not None and len(results) >= limit:
+                    return results
+        return results
+
+    def memory_bytes(self) -> int:
+        """Tamaño aproximado de las listas de posiciones"""
+        size = sum(postings.itemsize * len(postings) for postings in self._word_docs)
+        size += sum(postings.itemsize * len(postings) for postings in self._gram_words.values())
+        size += sum(8 * len(words) for words in self._doc_words)
+        return size
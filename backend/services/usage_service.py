@@ -0,0 +1,107 @@
+"""
+Servicio de medición de uso de LLM: persiste los agregados diarios por
+usuario e intención y mantiene los contadores en memoria para cuotas.
+"""
+
+from datetime import date
+from typing import Dict, Any, Optional
+from loguru import logger
+from sqlalchemy import func
+from sqlalchemy.dialects.mysql import insert
+from sqlalchemy.orm import Session
+
+from ai.usage import usage_meter
+from auth.models import LLMUsageDaily
+
+
+def load_daily_tokens(db: Session, user_id: int) -> int:
+    """
+    Carga en memoria los tokens consumidos hoy por el usuario (si aún no están)
+
+    Args:
+        db: Sesión de base de datos
+        user_id: ID del usuario
+
+    Returns:
+        Tokens consumidos hoy
+    """
+    if not usage_meter.is_loaded(user_id):
+        total = db.query(
+            func.sum(LLMUsageDaily.prompt_tokens + LLMUsageDaily.completion_tokens)
+        ).filter(
+            LLMUsageDaily.user_id == user_id,
+            LLMUsageDaily.usage_date == date.today()
+        ).scalar() or 0
+        usage_meter.load(user_id, total)
+
+    return usage_meter.get(user_id)
+
+
+def check_token_quota(db: Session, user_id: int, daily_quota: int) -> bool:
+    """
+    Comprueba la cuota diaria de tokens usando los contadores en memoria
+
+    Args:
+        db: Sesión de base de datos (solo se usa la primera vez del día)
+        user_id: ID del usuario
+        daily_quota: Cuota diaria (0 = sin límite)
+
+    Returns:
+        True si el usuario puede seguir consumiendo tokens
+    """
+    if daily_quota <= 0:
+        return True
+
+    try:
+        load_daily_tokens(db, user_id)
+    except Exception as e:
+        logger.error(f"❌ Error cargando uso diario de tokens: {e}")
+
+    return usage_meter.has_quota(user_id, daily_quota)
+
+
+def record_llm_usage(
+    db: Session,
+    user_id: int,
+    intent: Optional[str],
+    usage: Dict[str, Any],
+    count_request: bool = True
+) -> None:
+    """
+    Acumula el uso de una petición en el agregado diario y en memoria
+
+    Args:
+        db: Sesión de base de datos
+        user_id: ID del usuario
+        intent: Intención identificada para la petición
+        usage: Resumen generado por `summarize_usage`
+        count_request: Contar una petición más (False para el uso tardío de una ya contada)
+    """
+    prompt_tokens = usage.get("prompt_tokens", 0)
+    completion_tokens = usage.get("completion_tokens", 0)
+
+    usage_meter.add(user_id, prompt_tokens + completion_tokens)
+
+    try:
+        stmt = insert(LLMUsageDaily).values(
+            user_id=user_id,
+            usage_date=date.today(),
+            intent=(intent or "unknown")[:50],
+            request_count=1 if count_request else 0,
+            llm_calls=len(usage.get("calls", [])),
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            total_latency_ms=usage.get("latency_ms", 0.0)
+        )
+        stmt = stmt.on_duplicate_key_update(
+            request_count=LLMUsageDaily.request_count + stmt.inserted.request_count,
+            llm_calls=LLMUsageDaily.llm_calls + stmt.inserted.llm_calls,
+            prompt_tokens=LLMUsageDaily.prompt_tokens + stmt.inserted.prompt_tokens,
+            completion_tokens=LLMUsageDaily.completion_tokens + stmt.inserted.completion_tokens,
+            total_latency_ms=LLMUsageDaily.total_latency_ms + stmt.inserted.total_latency_ms
+        )
+        db.execute(stmt)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ Error registrando uso de LLM: {e}")
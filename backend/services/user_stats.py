@@ -0,0 +1,304 @@
+"""
+Contadores del dashboard por usuario (tabla user_stats): las rutas de
+conversaciones los actualizan en la misma transacción que cada escritura,
+el dashboard lee una sola fila y un proceso de conciliación periódico los
+recalcula desde conversations/messages para corregir cualquier desvío.
+"""
+
+from datetime import date, datetime, timezone
+from threading import Event, Lock, Thread
+from typing import Any, Dict, Optional, Tuple
+import time
+
+from loguru import logger
+from sqlalchemy import case, distinct, func, null, update
+from sqlalchemy.dialects.mysql import insert
+from sqlalchemy.orm import Session
+
+from auth.database import get_db_session
+from auth.models import Conversation, Message, UserStats
+from config import settings
+
+
+# Columnas de user_stats que se obtienen agregando conversations y messages
+COUNTER_FIELDS = (
+    "total_conversations", "archived_conversations", "conversations_today",
+    "total_messages", "total_tokens", "messages_today",
+)
+
+
+def today_start() -> datetime:
+    """Inicio del día UTC (límite de las cifras "de hoy")"""
+    return datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def aggregate_stats(db: Session, since: datetime, *criteria) -> Any:
+    """
+    Agregados de conversaciones y mensajes en una sola consulta
+
+    Las conversaciones se unen a sus mensajes, así que cada conversación
+    aparece una vez por mensaje: las cifras de conversaciones cuentan ids
+    distintos y las de mensajes usan agregación condicional.
+
+    Args:
+        since: Inicio del día para las cifras "de hoy"
+        criteria: Filtros sobre Conversation (usuario, conversación concreta)
+
+    Returns:
+        Fila con COUNTER_FIELDS, last_activity y, agrupando por usuario, user_id
+    """
+    return db.query(
+        func.count(distinct(Conversation.id)).label("total_conversations"),
+        func.count(distinct(case((Conversation.is_archived == True, Conversation.id)))).label("archived_conversations"),
+        func.count(distinct(case((Conversation.created_at >= since, Conversation.id)))).label("conversations_today"),
+        func.count(Message.id).label("total_messages"),
+        func.coalesce(func.sum(Message.tokens_used), 0).label("total_tokens"),
+        func.coalesce(func.sum(case((Message.created_at >= since, 1), else_=0)), 0).label("messages_today"),
+        func.max(Message.created_at).label("last_activity")
+    ).select_from(Conversation).outerjoin(
+        Message, Message.conversation_id == Conversation.id
+    ).filter(*criteria)
+
+
+def _counters(row: Any) -> Dict[str, int]:
+    return {field: int(getattr(row, field) or 0) for field in COUNTER_FIELDS}
+
+
+def _upsert(db: Session, user_id: int, values: Dict[str, Any]) -> None:
+    """Escribe la fila completa del usuario (la crea si no existe)"""
+    stmt = insert(UserStats).values(user_id=user_id, **values)
+    db.execute(stmt.on_duplicate_key_update(**values, version=UserStats.version + 1))
+
+
+# ----------------------------------------------------------------------
+# Escritura (dentro de la transacción de cada ruta, antes del commit)
+# ----------------------------------------------------------------------
+
+def _apply(db: Session, user_id: int, last_activity: Any = None, **deltas: int) -> bool:
+    """
+    Suma los incrementos a la fila del usuario con un único UPDATE
+
+    Los contadores "de hoy" se reinician si la fila es de otro día.
+
+    Returns:
+        False si el usuario aún no tiene fila (no se modificó nada)
+    """
+    today = today_start().date()
+    same_day = UserStats.stats_date == today
+    values = [
+        (getattr(UserStats, field), getattr(UserStats, field) + delta)
+        for field, delta in deltas.items() if not field.endswith("_today")
+    ]
+    for field in ("conversations_today", "messages_today"):
+        delta = deltas.get(field, 0)
+        column = getattr(UserStats, field)
+        values.append((column, case((same_day, column + delta), else_=max(delta, 0))))
+    if last_activity is not None:
+        values.append((UserStats.last_activity, last_activity))
+    values.append((UserStats.version, UserStats.version + 1))
+    # Al final: MySQL evalúa las asignaciones en orden y los CASE anteriores deben ver la fecha antigua
+    values.append((UserStats.stats_date, today))
+
+    result = db.execute(update(UserStats).where(UserStats.user_id == user_id).ordered_values(*values))
+    return result.rowcount > 0
+
+
+def _apply_or_reconcile(db: Session, user_id: int, last_activity: Any = None, **deltas: int) -> None:
+    """Aplica los incrementos; sin fila, la construye con la escritura en curso ya incluida"""
+    if not _apply(db, user_id, last_activity, **deltas):
+        db.flush()
+        reconcile_user(db, user_id)
+
+
+def record_conversation_created(db: Session, user_id: int) -> None:
+    _apply_or_reconcile(db, user_id, total_conversations=1, conversations_today=1)
+
+
+def record_message_added(db: Session, user_id: int, tokens_used: Optional[int]) -> None:
+    # NOW() del servidor, igual que el created_at por defecto del mensaje
+    _apply_or_reconcile(
+        db, user_id, last_activity=func.now(),
+        total_messages=1, total_tokens=tokens_used or 0, messages_today=1
+    )
+
+
+def record_conversation_archived(db: Session, user_id: int, archived: bool) -> None:
+    _apply_or_reconcile(db, user_id, archived_conversations=1 if archived else -1)
+
+
+def record_conversation_deleted(db: Session, conversation: Conversation) -> None:
+    """
+    Resta la conversación y sus mensajes (llamar antes de `db.delete`)
+
+    Solo se agregan los mensajes de esa conversación; la última actividad
+    se recalcula únicamente si el último mensaje del usuario era de ella.
+    Si el usuario no tiene fila no se hace nada: se construirá al leerla.
+    """
+    user_id = conversation.user_id
+    stored_last = db.query(UserStats.last_activity).filter(UserStats.user_id == user_id).first()
+    if stored_last is None:
+        return
+    stored_last = stored_last[0]
+    removed = aggregate_stats(db, today_start(), Conversation.id == conversation.id).one()
+
+    last_activity = None
+    if removed.last_activity is not None and (stored_last is None or removed.last_activity >= stored_last):
+        remaining_last = db.query(func.max(Message.created_at)).join(Conversation).filter(
+            Conversation.user_id == user_id,
+            Conversation.id != conversation.id
+        ).scalar()
+        # Sin más mensajes la última actividad queda vacía
+        last_activity = remaining_last if remaining_last is not None else null()
+
+    _apply(db, user_id, last_activity, **{field: -value for field, value in _counters(removed).items()})
+
+
+# ----------------------------------------------------------------------
+# Lectura
+# ----------------------------------------------------------------------
+
+def stats_version(db: Session, user_id: int) -> Optional[int]:
+    """Versión de la fila del usuario (sube con cada escritura), o None si no tiene"""
+    return db.query(UserStats.version).filter(UserStats.user_id == user_id).scalar()
+
+
+def get_dashboard_stats(db: Session, user_id: int) -> Tuple[Dict[str, Any], int]:
+    """
+    Cifras del dashboard a partir de la fila del usuario (se crea si falta)
+
+    Returns:
+        (cifras, versión de la fila de la que salen)
+    """
+    row = db.query(UserStats).filter(UserStats.user_id == user_id).first()
+    if row is None:
+        reconcile_user(db, user_id)
+        db.commit()
+        row = db.query(UserStats).filter(UserStats.user_id == user_id).first()
+
+    is_today = row.stats_date == today_start().date()
+    total_conversations = row.total_conversations
+    avg_messages = row.total_messages / total_conversations if total_conversations > 0 else 0
+    return {
+        "total_conversations": total_conversations,
+        "active_conversations": total_conversations - row.archived_conversations,
+        "archived_conversations": row.archived_conversations,
+        "total_messages": row.total_messages,
+        "total_tokens_used": row.total_tokens,
+        "conversations_today": row.conversations_today if is_today else 0,
+        "messages_today": row.messages_today if is_today else 0,
+        "average_messages_per_conversation": round(avg_messages, 2),
+        "last_activity": row.last_activity.isoformat() if row.last_activity else "Never"
+    }, row.version
+
+
+# ----------------------------------------------------------------------
+# Conciliación
+# ----------------------------------------------------------------------
+
+def reconcile_user(db: Session, user_id: int) -> None:
+    """Recalcula la fila de un usuario desde conversations y messages (sin commit)"""
+    since = today_start()
+    row = aggregate_stats(db, since, Conversation.user_id == user_id).one()
+    _upsert(db, user_id, {
+        **_counters(row),
+        "stats_date": since.date(),
+        "last_activity": row.last_activity,
+        "reconciled_at": datetime.now(timezone.utc)
+    })
+
+
+def _stored_counters(row: Optional[UserStats], today: date) -> Optional[Dict[str, int]]:
+    """Contadores guardados, con los "de hoy" a cero si son de otro día"""
+    if row is None:
+        return None
+    counters = {field: getattr(row, field) for field in COUNTER_FIELDS}
+    if row.stats_date != today:
+        counters.update(conversations_today=0, messages_today=0)
+    return counters
+
+
+def reconcile_all(db: Session) -> int:
+    """
+    Recalcula todas las filas con una consulta agrupada por usuario
+
+    Returns:
+        Número de usuarios cuyos contadores estaban desviados
+    """
+    since = today_start()
+    now = datetime.now(timezone.utc)
+    stored = {row.user_id: row for row in db.query(UserStats).all()}
+    drifted = 0
+    for row in aggregate_stats(db, since).add_columns(Conversation.user_id).group_by(Conversation.user_id):
+        counters = _counters(row)
+        if _stored_counters(stored.pop(row.user_id, None), since.date()) != counters:
+            drifted += 1
+        _upsert(db, row.user_id, {**counters, "stats_date": since.date(), "last_activity": row.last_activity, "reconciled_at": now})
+
+    # Usuarios con fila pero ya sin conversaciones
+    for user_id, current in stored.items():
+        if any(_stored_counters(current, since.date()).values()):
+            drifted += 1
+        _upsert(db, user_id, {
+            **{field: 0 for field in COUNTER_FIELDS},
+            "stats_date": since.date(), "last_activity": None, "reconciled_at": now
+        })
+    return drifted
+
+
+class UserStatsReconciler:
+    """Hilo en segundo plano que concilia user_stats periódicamente"""
+
+    def __init__(self, interval_seconds: int = 86400):
+        """
+        Inicializa el conciliador
+
+        Args:
+            interval_seconds: Cada cuánto se recalculan todos los contadores
+        """
+        self.interval_seconds = interval_seconds
+        self._stop = Event()
+        self._run_lock = Lock()
+        self._thread: Optional[Thread] = None
+
+    def start(self) -> None:
+        """Arranca el hilo del conciliador (idempotente)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = Thread(target=self._loop, name="user-stats-reconciler", daemon=True)
+        self._thread.start()
+        logger.info(f"🧮 Conciliación de estadísticas de usuario iniciada (cada {self.interval_seconds} s)")
+
+    def stop(self) -> None:
+        """Detiene el hilo al terminar la iteración en curso"""
+        self._stop.set()
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            self.run()
+
+    def run(self) -> Optional[int]:
+        """
+        Concilia todos los usuarios
+
+        Returns:
+            Usuarios corregidos, o None si falló
+        """
+        with self._run_lock:
+            started = time.perf_counter()
+            try:
+                with get_db_session() as db:
+                    drifted = reconcile_all(db)
+            except Exception as e:
+                logger.error(f"❌ Error conciliando estadísticas de usuario: {e}")
+                return None
+            duration_ms = (time.perf_counter() - started) * 1000
+            if drifted:
+                logger.warning(f"⚠️ Estadísticas de {drifted} usuarios corregidas en la conciliación ({duration_ms:.0f} ms)")
+            else:
+                logger.info(f"🧮 Estadísticas de usuario conciliadas sin desvíos ({duration_ms:.0f} ms)")
+            return drifted
+
+
+# Conciliador compartido (se arranca en el evento de inicio de la aplicación)
+user_stats_reconciler = UserStatsReconciler(interval_seconds=settings.user_stats_reconcile_seconds)
@@ -0,0 +1,213 @@
+"""
+Pruebas de los plazos del agente: las etapas que vencen dejan de pedir
+páginas a GLPI y el uso de LLM de un hilo abandonado no se pierde.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from ai.usage import LLMCallUsage
+from integrations import glpi_client as glpi_module
+from integrations.glpi_client import GLPIClient, GLPIDeadlineExceeded
+from services.agent_service import AgentService
+
+
+class FakeResponse:
+    def __init__(self, items, start, total):
+        self.status_code = 206
+        self.headers = {"Content-Range": f"{start}-{start + len(items) - 1}/{total}"}
+        self._items = items
+
+    def json(self):
+        return self._items
+
+    def raise_for_status(self):
+        pass
+
+
+class SlowGLPI:
+    """Sustituye a requests.get: cada página tarda `delay` segundos"""
+
+    def __init__(self, total=10_000, delay=0.03):
+        self.total = total
+        self.delay = delay
+        self.requests = 0
+        self.timeouts = []
+
+    def get(self, url, headers=None, params=None, timeout=None):
+        self.requests += 1
+        self.timeouts.append(timeout)
+        if url.endswith("/initSession"):
+            return FakeResponse({"session_token": "abc"}, 0, 1)
+        time.sleep(self.delay)
+        start, end = (int(x) for x in params["range"].split("-"))
+        end = min(end, self.total - 1)
+        return FakeResponse([{"id": i, "status": 1} for i in range(start, end + 1)], start, self.total)
+
+
+@pytest.fixture
+def slow_glpi(monkeypatch):
+    fake = SlowGLPI()
+    monkeypatch.setattr(glpi_module.requests, "get", fake.get)
+    return fake
+
+
+def make_client():
+    client = GLPIClient("http://glpi.test/apirest.php", "app", "user")
+    client.session_token = "abc"
+    return client
+
+
+class FakeAI:
+    MULTI_INTENT = "multiple"
+
+    def __init__(self, generate_seconds=0.0):
+        self.generate_seconds = generate_seconds
+        self.usage = []
+        self.last_response_cached = False
+
+    def understand_query(self, query):
+        self.usage.append(LLMCallUsage("understand_query", "small", 100, 20))
+        return {"intencion": "consulta_general", "parametros": {}, "confianza": 0.9}
+
+    def generate_response(self, query, data, intention):
+        time.sleep(self.generate_seconds)
+        self.usage.append(LLMCallUsage("generate_response", "big", 800, 300))
+        return "respuesta generada"
+
+    def template_response(self, data, intention):
+        return "respuesta de plantilla"
+
+    def consume_usage(self):
+        calls, self.usage = self.usage, []
+        return calls
+
+
+def test_iter_pages_stops_at_deadline(slow_glpi):
+    """Cada página comprueba el plazo: el recorrido se corta sin llegar al final"""
+    client = make_client()
+    client.deadline = time.monotonic() + 0.1
+
+    pages = []
+    with pytest.raises(GLPIDeadlineExceeded):
+        for page in client.iter_pages("Ticket", page_size=100):
+            pages.append(page)
+
+    assert 1 <= len(pages) < 10
+    # El plazo de cada petición no pasa del tiempo que queda
+    assert all(timeout <= 0.1 for timeout in slow_glpi.timeouts)
+
+
+def test_without_deadline_uses_request_timeout(slow_glpi):
+    slow_glpi.total = 150
+    client = make_client()
+
+    pages = list(client.iter_pages("Ticket", page_size=100))
+
+    assert [len(page) for page in pages] == [100, 50]
+    assert slow_glpi.timeouts == [glpi_module.REQUEST_TIMEOUT] * 2
+
+
+def test_abandoned_glpi_stage_stops_crawling(slow_glpi):
+    """Al vencer la etapa de GLPI el hilo abandonado deja de pedir páginas"""
+    service = AgentService(make_client(), FakeAI(), glpi_timeout=0.1)
+
+    async def run():
+        timings = {}
+        deadline = asyncio.get_running_loop().time() + 10
+        with pytest.raises(asyncio.TimeoutError):
+            await service._run_stage(
+                "glpi", timings, deadline, service.glpi_timeout,
+                service.glpi.get_tickets, None, None, bounds_glpi=True
+            )
+        assert service.has_abandoned_stages
+        await service.consume_late_usage(timeout=2)
+
+    asyncio.run(run())
+
+    # 100 páginas sin plazo; con él, las que caben en 0,1 s más la que estaba en curso
+    assert slow_glpi.requests <= 6
+
+
+def test_abandoned_stage_does_not_cut_off_parallel_stages(slow_glpi):
+    """El plazo es de cada etapa: la que vence deja de pedir páginas, la de al lado termina"""
+    service = AgentService(make_client(), FakeAI())
+
+    def crawl(max_items):
+        return sum(len(page) for page in service.glpi.iter_pages("Ticket", page_size=100, max_items=max_items))
+
+    async def run():
+        timings = {}
+        deadline = asyncio.get_running_loop().time() + 10
+        results = await asyncio.gather(
+            service._run_stage("glpi:a", timings, deadline, 0.1, crawl, None, bounds_glpi=True),
+            service._run_stage("glpi:b", timings, deadline, 5, crawl, 1500, bounds_glpi=True),
+            return_exceptions=True
+        )
+        await service.consume_late_usage(timeout=2)
+        return results
+
+    abandoned, finished = asyncio.run(run())
+
+    assert isinstance(abandoned, asyncio.TimeoutError)
+    assert finished == 1500
+    # El cliente compartido no queda con un plazo
+    assert service.glpi.deadline is None
+
+
+def test_late_generation_usage_is_kept():
+    """La generación que vence se sustituye por la plantilla, pero su uso se recoge después"""
+    service = AgentService(make_client(), FakeAI(generate_seconds=0.2), generate_timeout=0.05)
+
+    async def run():
+        result = await service.process_query("hola")
+        late = await service.consume_late_usage(timeout=2)
+        return result, late
+
+    result, late = asyncio.run(run())
+
+    assert result["message"] == "respuesta de plantilla"
+    assert [c["operation"] for c in result["usage"]["calls"]] == ["understand_query"]
+    assert [c["operation"] for c in late["calls"]] == ["generate_response"]
+    assert late["total_tokens"] == 1100
+    assert not service.has_abandoned_stages
+
+
+def test_no_late_usage_when_every_stage_finishes():
+    service = AgentService(make_client(), FakeAI())
+
+    async def run():
+        result = await service.process_query("hola")
+        return result, await service.consume_late_usage(timeout=1)
+
+    result, late = asyncio.run(run())
+
+    assert result["message"] == "respuesta generada"
+    assert late["calls"] == []
+
+
+def test_inventory_report_covers_every_asset_type(monkeypatch):
+    """El reporte de inventario sale de la instantánea con todos los tipos, no solo de las computadoras"""
+    from services import agent_service
+    from services.inventory_snapshot import InventoryView
+
+    items = [
+        {"id": 1, "itemtype": "Computer", "type": "laptop", "status": "in_use", "location": "Sede A"},
+        {"id": 1, "itemtype": "Monitor", "type": "monitor", "status": "available", "location": "Sede A"},
+        {"id": 2, "itemtype": "Printer", "type": "printer", "status": "in_use", "location": None},
+    ]
+    view = InventoryView(items, version=1)
+    monkeypatch.setattr(agent_service, "load_fresh_report", lambda key: None)
+    monkeypatch.setattr(agent_service.inventory_snapshot, "view", lambda: view)
+    service = AgentService(make_client(), FakeAI())
+    service.glpi.get_computers = lambda: pytest.fail("el reporte no debe consultar solo las computadoras")
+
+    report = service._generate_report({"tipo": "inventario"})
+
+    assert report["total_equipos"] == 3
+    assert report["por_tipo_activo"] == {"Computer": 1, "Monitor": 1, "Printer": 1}
+    assert report["por_estado"] == {"in_use": 2, "available": 1}
+    assert report["top_ubicaciones"] == {"Sede A": 2}
+    assert len(report["detalles"]) == 3
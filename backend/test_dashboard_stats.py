@@ -0,0 +1,105 @@
+"""
+Tests de la caché de estadísticas del dashboard: carreras entre un cálculo
+y los eventos de escritura, validación por versión y límite de memoria.
+"""
+
+from services.dashboard_stats import DashboardStatsCache
+
+
+def make_stats(**overrides):
+    stats = {
+        "total_conversations": 2, "active_conversations": 2, "archived_conversations": 0,
+        "total_messages": 4, "total_tokens_used": 100, "conversations_today": 1, "messages_today": 3,
+        "average_messages_per_conversation": 2.0, "last_activity": "Never",
+    }
+    stats.update(overrides)
+    return stats
+
+
+def test_hit_after_set():
+    cache = DashboardStatsCache(check_version=False)
+    generation = cache.generation(1)
+    assert cache.set(1, make_stats(), generation)
+    assert cache.get(1) == make_stats()
+    assert cache.stats()["hits"] == 1
+
+
+def test_computation_overlapping_a_write_is_not_stored():
+    cache = DashboardStatsCache(check_version=False)
+    generation = cache.generation(1)
+    # Llega un mensaje mientras se calculaban las cifras: el cálculo ya no vale
+    cache.on_message_added(1, 10, None)
+    assert not cache.set(1, make_stats(), generation)
+    assert cache.get(1) is None
+
+
+def test_write_of_another_user_does_not_discard_computation():
+    cache = DashboardStatsCache(check_version=False)
+    generation = cache.generation(1)
+    cache.on_message_added(2, 10, None)
+    assert cache.set(1, make_stats(), generation)
+
+
+def test_events_update_entry_in_place():
+    cache = DashboardStatsCache(check_version=False)
+    cache.set(1, make_stats(), cache.generation(1))
+    cache.on_message_added(1, 25, None)
+    cache.on_conversation_created(1)
+    cache.on_conversation_archived(1, True)
+    stats = cache.get(1)
+    assert stats["total_messages"] == 5
+    assert stats["total_tokens_used"] == 125
+    assert stats["messages_today"] == 4
+    assert stats["total_conversations"] == 3
+    assert stats["archived_conversations"] == 1
+    assert stats["active_conversations"] == 2
+    assert stats["average_messages_per_conversation"] == round(5 / 3, 2)
+
+
+def test_delete_invalidates():
+    cache = DashboardStatsCache(check_version=False)
+    cache.set(1, make_stats(), cache.generation(1))
+    cache.on_conversation_deleted(1)
+    assert cache.get(1) is None
+
+
+def test_version_mismatch_is_a_miss():
+    cache = DashboardStatsCache()
+    cache.set(1, make_stats(), cache.generation(1), version=7)
+    assert cache.get(1, version=7) is not None
+    # Otro worker escribió: la versión de la fila subió
+    assert cache.get(1, version=8) is None
+    assert cache.get(1, version=7) is None
+
+
+def test_local_write_advances_entry_version():
+    cache = DashboardStatsCache()
+    cache.set(1, make_stats(), cache.generation(1), version=7)
+    cache.on_message_added(1, 0, None)
+    assert cache.get(1, version=8)["total_messages"] == 5
+
+
+def test_local_and_foreign_writes_miss():
+    cache = DashboardStatsCache()
+    cache.set(1, make_stats(), cache.generation(1), version=7)
+    # Escritura propia (7 -> 8 según la caché) y otra de otro worker: la fila está en 9
+    cache.on_message_added(1, 0, None)
+    assert cache.get(1, version=9) is None
+
+
+def test_change_records_are_bounded():
+    cache = DashboardStatsCache(max_entries=10, check_version=False)
+    old_generation = cache.generation(1)
+    for user_id in range(1000):
+        cache.invalidate(user_id)
+    assert len(cache._changes) == 10
+    # El cambio del usuario 1 se olvidó, pero un cálculo empezado antes no se acepta
+    assert not cache.set(1, make_stats(), old_generation)
+    assert cache.set(1, make_stats(), cache.generation(1))
+
+
+def test_clear_rejects_running_computations():
+    cache = DashboardStatsCache(check_version=False)
+    generation = cache.generation(1)
+    cache.clear()
+    assert not cache.set(1, make_stats(), generation)
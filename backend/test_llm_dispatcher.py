@@ -0,0 +1,157 @@
+"""
+Pruebas del despachador de llamadas al LLM: carriles de prioridad y
+rechazo rápido con la cola saturada.
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from ai.dispatcher import LLMDispatcher, LLMPriority, LLMSaturatedError
+
+
+def wait_until(condition, timeout=2.0):
+    limit = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < limit, "condición no alcanzada"
+        time.sleep(0.005)
+
+
+def test_interactive_calls_go_ahead_of_background():
+    """Una llamada interactiva que llega después adelanta a las de segundo plano en espera"""
+    dispatcher = LLMDispatcher(max_concurrency=1, max_wait_seconds=5)
+    order = []
+    release = threading.Event()
+
+    def call(name, priority):
+        with dispatcher.slot(priority):
+            order.append(name)
+            if name == "busy":
+                release.wait()
+
+    busy = threading.Thread(target=call, args=("busy", LLMPriority.INTERACTIVE))
+    busy.start()
+    wait_until(lambda: dispatcher.metrics()["in_flight"] == 1)
+
+    threads = []
+    for name, priority in (
+        ("background-1", LLMPriority.BACKGROUND),
+        ("background-2", LLMPriority.BACKGROUND),
+        ("interactive", LLMPriority.INTERACTIVE),
+    ):
+        thread = threading.Thread(target=call, args=(name, priority))
+        thread.start()
+        threads.append(thread)
+        wait_until(lambda: dispatcher.metrics()["queued"] == len(threads))
+
+    release.set()
+    for thread in [busy, *threads]:
+        thread.join(timeout=2)
+
+    assert order == ["busy", "interactive", "background-1", "background-2"]
+
+
+def test_full_queue_rejects_with_retry_after():
+    dispatcher = LLMDispatcher(max_concurrency=1, max_queue_size=1, max_wait_seconds=5)
+    release = threading.Event()
+
+    def hold(priority):
+        with dispatcher.slot(priority):
+            release.wait()
+
+    threads = [threading.Thread(target=hold, args=(LLMPriority.BACKGROUND,)) for _ in range(2)]
+    threads[0].start()
+    wait_until(lambda: dispatcher.metrics()["in_flight"] == 1)
+    threads[1].start()
+    wait_until(lambda: dispatcher.metrics()["queued"] == 1)
+
+    with pytest.raises(LLMSaturatedError) as error:
+        with dispatcher.slot(LLMPriority.INTERACTIVE):
+            pass
+    assert error.value.retry_after >= 1
+    assert dispatcher.metrics()["rejected"] == 1
+
+    release.set()
+    for thread in threads:
+        thread.join(timeout=2)
+
+
+class SlowModels:
+    """Sustituye al cliente de Groq en la sonda: listar modelos tarda `delay`"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.models = self
+
+    def list(self):
+        time.sleep(self.delay)
+        return []
+
+
+class SlowGLPIProbe:
+    deadline = None
+
+    def init_session(self):
+        time.sleep(0.2)
+        return True
+
+    def kill_session(self):
+        return True
+
+
+def test_health_does_not_block_the_event_loop_while_saturated():
+    """Con la cola de LLM llena, /health responde sin esperar turno y el bucle sigue atendiendo"""
+    from ai.agent import AIAgent
+    from api.routes import health_check
+
+    dispatcher = LLMDispatcher(max_concurrency=1, max_queue_size=1, max_wait_seconds=5)
+    agent = AIAgent("clave", dispatcher=dispatcher)
+    agent.client.with_options = lambda **options: SlowModels(0.2)
+    release = threading.Event()
+
+    def hold():
+        with dispatcher.slot(LLMPriority.INTERACTIVE):
+            release.wait()
+
+    threads = [threading.Thread(target=hold) for _ in range(2)]
+    threads[0].start()
+    wait_until(lambda: dispatcher.metrics()["in_flight"] == 1)
+    threads[1].start()
+    wait_until(lambda: dispatcher.metrics()["queued"] == 1)
+
+    async def run():
+        gaps = []
+
+        async def ticker(stop):
+            last = time.monotonic()
+            while not stop.is_set():
+                await asyncio.sleep(0.01)
+                now = time.monotonic()
+                gaps.append(now - last)
+                last = now
+
+        stop = asyncio.Event()
+        ticks = asyncio.create_task(ticker(stop))
+        started = time.monotonic()
+        result = await health_check(glpi_client=SlowGLPIProbe(), ai_agent=agent)
+        elapsed = time.monotonic() - started
+        stop.set()
+        await ticks
+        return result, elapsed, max(gaps)
+
+    try:
+        result, elapsed, max_gap = asyncio.run(run())
+    finally:
+        release.set()
+        for thread in threads:
+            thread.join(timeout=2)
+
+    assert result.status == "healthy"
+    assert result.groq_ai_available
+    # Las dos sondas en paralelo, sin los 5 s de espera en cola
+    assert elapsed < 1
+    assert max_gap < 0.1
+    assert dispatcher.metrics()["dispatched"] == 2
+    assert agent.consume_usage() == []
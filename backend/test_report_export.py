@@ -0,0 +1,139 @@
+"""
+Pruebas de la exportación de reportes: el XLSX generado en streaming se
+abre con openpyxl con los mismos valores, el inventario recorre todos los
+tipos de activo y la sesión de GLPI se cierra.
+"""
+
+from datetime import date
+import csv
+import io
+
+import openpyxl
+
+from services.inventory_assets import ASSET_TYPES
+from services.report_export import (
+    INVENTORY_COLUMNS, TICKET_COLUMNS, TICKET_STATUS, iter_report_rows, resolve_columns, stream_csv, stream_xlsx
+)
+
+
+class FakeGLPI:
+    """Items en memoria por itemtype, paginados y ordenados como la API REST"""
+
+    def __init__(self, items_by_type):
+        self.items_by_type = items_by_type
+        self.pages_read = []
+        self.killed = 0
+
+    def iter_pages(self, item_type, params=None, page_size=100, max_items=None):
+        params = params or {}
+        field = params["sort"]
+        items = sorted(
+            self.items_by_type.get(item_type, []),
+            key=lambda item: item.get(field) or "",
+            reverse=params.get("order") == "DESC"
+        )
+        for start in range(0, len(items), page_size):
+            self.pages_read.append(item_type)
+            yield items[start:start + page_size]
+
+    def kill_session(self):
+        self.killed += 1
+
+
+def make_tickets(count):
+    return [
+        {
+            "id": i, "name": f"Ticket <{i}> & \"comillas\"", "status": i % 6 + 1, "priority": i % 5 + 1,
+            "type": i % 2 + 1, "itilcategories_id": "Hardware > Impresoras" if i % 3 else None,
+            "date": f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d} 10:{i % 60:02d}:00", "closedate": None
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def read_xlsx(chunks):
+    """Título y filas de la primera hoja (openpyxl omite las celdas vacías del final de la fila)"""
+    workbook = openpyxl.load_workbook(io.BytesIO(b"".join(chunks)), read_only=True)
+    sheet = workbook.worksheets[0]
+    rows = [list(row) for row in sheet.iter_rows(values_only=True)]
+    width = len(rows[0])
+    return sheet.title, [row + [None] * (width - len(row)) for row in rows]
+
+
+def test_xlsx_round_trip_through_openpyxl():
+    """Más filas que un bloque de escritura: cabecera, números, texto con XML y vacíos"""
+    tickets = make_tickets(1_234)
+    glpi = FakeGLPI({"Ticket": tickets})
+    columns = resolve_columns("tickets", None)
+    header = [TICKET_COLUMNS[column][0] for column in columns]
+
+    title, rows = read_xlsx(stream_xlsx(header, iter_report_rows(glpi, "tickets", columns), sheet_name="Tickets"))
+
+    expected = [header] + [
+        list(row) for row in iter_report_rows(FakeGLPI({"Ticket": tickets}), "tickets", columns)
+    ]
+    assert title == "Tickets"
+    assert len(rows) == 1_235
+    assert rows == expected
+    # Los códigos se exportan con su nombre y las fechas, de la más reciente a la más antigua
+    first = dict(zip(columns, rows[1]))
+    assert first["status"] in TICKET_STATUS.values()
+    dates = [row[columns.index("date")] for row in rows[1:]]
+    assert dates == sorted(dates, reverse=True)
+    assert glpi.killed == 1
+
+
+def test_csv_matches_xlsx_values():
+    tickets = make_tickets(50)
+    columns = ["id", "name", "itilcategories_id"]
+    header = [TICKET_COLUMNS[column][0] for column in columns]
+
+    body = b"".join(stream_csv(header, iter_report_rows(FakeGLPI({"Ticket": tickets}), "tickets", columns)))
+    csv_rows = list(csv.reader(io.StringIO(body.decode("utf-8-sig"))))
+    _, xlsx_rows = read_xlsx(stream_xlsx(header, iter_report_rows(FakeGLPI({"Ticket": tickets}), "tickets", columns)))
+
+    assert csv_rows[0] == header
+    assert [[str(value) if value is not None else "" for value in row] for row in xlsx_rows[1:]] == csv_rows[1:]
+
+
+def test_inventory_covers_every_asset_type():
+    """El inventario intercala todos los tipos de activo por fecha de alta, con su tipo y modelo"""
+    items_by_type = {}
+    for n, (itemtype, asset_type) in enumerate(ASSET_TYPES.items()):
+        items_by_type[itemtype] = [
+            {
+                "id": n * 100 + i, "name": f"{itemtype}-{i}", "serial": f"SN{n}{i:03d}",
+                asset_type.type_field: f"Tipo {itemtype}", asset_type.model_field: f"Modelo {itemtype}",
+                "date_creation": f"2024-0{i + 1}-1{n} 09:00:00"
+            }
+            for i in range(3)
+        ]
+    glpi = FakeGLPI(items_by_type)
+    columns = resolve_columns("inventario", "id,itemtype,computertypes_id,model,date_creation")
+    header = [INVENTORY_COLUMNS[column][0] for column in columns]
+
+    _, rows = read_xlsx(stream_xlsx(header, iter_report_rows(glpi, "inventario", columns)))
+
+    assert columns == ["id", "itemtype", "type", "model", "date_creation"]
+    assert rows[0] == ["ID", "Clase de activo", "Tipo", "Modelo", "Fecha de alta"]
+    body = rows[1:]
+    assert len(body) == 3 * len(ASSET_TYPES)
+    assert {row[1] for row in body} == set(ASSET_TYPES)
+    assert all(row[2] == f"Tipo {row[1]}" and row[3] == f"Modelo {row[1]}" for row in body)
+    assert [row[4] for row in body] == sorted((row[4] for row in body), reverse=True)
+    assert glpi.killed == 1
+
+
+def test_date_range_stops_paging():
+    """Con date_from se deja de leer en cuanto los items son anteriores (orden descendente)"""
+    tickets = [
+        {"id": i, "name": f"T{i}", "date": "2024-01-01 00:00:00" if i <= 900 else "2024-06-01 00:00:00"}
+        for i in range(1, 1001)
+    ]
+    glpi = FakeGLPI({"Ticket": tickets})
+
+    rows = list(iter_report_rows(glpi, "tickets", ["id"], date_from=date(2024, 5, 1)))
+
+    assert sorted(row[0] for row in rows) == list(range(901, 1001))
+    assert len(glpi.pages_read) <= 2
+    assert glpi.killed == 1
@@ -0,0 +1,162 @@
+"""
+Tests del almacenamiento de reportes materializados y de la elección del
+proceso que hace cada pasada del planificador.
+"""
+
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from auth.models import MaterializedReport
+from services import report_scheduler
+from services.report_scheduler import REPORT_DEFINITIONS, ReportScheduler, store_report
+
+
+DEFINITION = REPORT_DEFINITIONS["tickets_semanal"]
+
+
+@pytest.fixture
+def sessions(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'reports.db'}")
+    MaterializedReport.__table__.create(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def test_versions_increase_and_old_ones_are_pruned(sessions):
+    with sessions() as db:
+        versions = [store_report(db, DEFINITION, {"total": n}, 1.0, versions_kept=2).version for n in range(4)]
+        assert versions == [1, 2, 3, 4]
+        kept = [report.version for report in db.query(MaterializedReport).order_by(MaterializedReport.version)]
+        assert kept == [3, 4]
+
+
+def test_concurrent_writer_collision_is_renumbered(sessions):
+    with sessions() as db:
+        store_report(db, DEFINITION, {"total": 1}, 1.0)
+
+    with sessions() as db:
+        collided = []
+
+        @event.listens_for(db, "before_flush")
+        def other_worker_stores_first(session, flush_context, instances):
+            # Otro worker guarda la misma versión entre la lectura del máximo y el INSERT
+            if not collided:
+                collided.append(True)
+                with sessions() as other:
+                    store_report(other, DEFINITION, {"total": 2}, 1.0)
+
+        report = store_report(db, DEFINITION, {"total": 3}, 1.0)
+        assert collided
+        assert report.version == 3
+        assert report.result == {"total": 3}
+
+
+class FakeGLPI:
+    def __init__(self, **kwargs):
+        pass
+
+    def kill_session(self):
+        pass
+
+
+@pytest.fixture
+def scheduler_db(monkeypatch, sessions):
+    """Planificador con la BD de la prueba, GLPI falso y un lock que registra si está tomado"""
+    lock = {"held": False, "available": True, "acquired": 0}
+
+    @contextmanager
+    def fake_lock(name, timeout=0):
+        if not lock["available"]:
+            yield False
+            return
+        lock["held"] = True
+        lock["acquired"] += 1
+        try:
+            yield True
+        finally:
+            lock["held"] = False
+
+    @contextmanager
+    def session():
+        db = sessions()
+        try:
+            yield db
+            db.commit()
+        finally:
+            db.close()
+
+    monkeypatch.setattr(report_scheduler, "advisory_lock", fake_lock)
+    monkeypatch.setattr(report_scheduler, "get_db_session", session)
+    monkeypatch.setattr(report_scheduler, "GLPIClient", FakeGLPI)
+    return lock
+
+
+def test_lock_is_only_held_to_store(monkeypatch, scheduler_db):
+    """El recorrido de GLPI se hace sin el lock; solo el guardado lo toma"""
+    def compute(glpi, definition):
+        assert not scheduler_db["held"]
+        return {"total": 1}
+
+    monkeypatch.setattr(report_scheduler, "compute_report", compute)
+
+    assert ReportScheduler().run_due() == len(REPORT_DEFINITIONS)
+    assert scheduler_db["acquired"] == len(REPORT_DEFINITIONS)
+    # Todos al día: la siguiente pasada no calcula nada
+    assert ReportScheduler().run_due() == 0
+
+
+def test_version_stored_meanwhile_is_not_duplicated(monkeypatch, sessions, scheduler_db):
+    """Si otro proceso guarda el reporte mientras se calcula, la pasada descarta su cálculo"""
+    def compute(glpi, definition):
+        with sessions() as other:
+            store_report(other, definition, {"total": 2}, 1.0)
+        return {"total": 3}
+
+    monkeypatch.setattr(report_scheduler, "compute_report", compute)
+
+    assert ReportScheduler().run_due() == 0
+    with sessions() as db:
+        assert [report.result for report in db.query(MaterializedReport)] == [{"total": 2}] * len(REPORT_DEFINITIONS)
+
+
+def test_report_is_not_stored_without_the_lock(monkeypatch, sessions, scheduler_db):
+    scheduler_db["available"] = False
+    monkeypatch.setattr(report_scheduler, "compute_report", lambda glpi, definition: {"total": 1})
+
+    assert ReportScheduler().refresh("tickets_semanal") is None
+    with sessions() as db:
+        assert db.query(MaterializedReport).count() == 0
+
+
+def test_inventory_report_covers_every_asset_type(monkeypatch):
+    """El reporte materializado de inventario recorre todos los tipos de ASSET_TYPES"""
+    requested = []
+
+    def fetch(glpi, itemtypes):
+        requested.extend(itemtypes)
+        return {
+            itemtype: [{"id": 1, "itemtype": itemtype, "type": itemtype.lower(), "status": "in_use"}]
+            for itemtype in itemtypes
+        }, {}
+
+    monkeypatch.setattr(report_scheduler, "fetch_assets", fetch)
+
+    report = report_scheduler.compute_inventory_report(None)
+
+    assert list(requested) == list(report_scheduler.ASSET_TYPES)
+    assert report["total_equipos"] == len(report_scheduler.ASSET_TYPES)
+    assert report["por_tipo_activo"] == {itemtype: 1 for itemtype in report_scheduler.ASSET_TYPES}
+    assert report["por_estado"] == {"in_use": len(report_scheduler.ASSET_TYPES)}
+
+
+def test_inventory_report_fails_if_a_type_fails(monkeypatch):
+    """Sin alguno de los tipos el reporte no se guarda (los totales serían engañosos)"""
+    monkeypatch.setattr(
+        report_scheduler, "fetch_assets",
+        lambda glpi, itemtypes: ({"Computer": []}, {"Printer": RuntimeError("GLPI caído")})
+    )
+    with pytest.raises(RuntimeError):
+        report_scheduler.compute_inventory_report(None)
@@ -0,0 +1,105 @@
+"""
+Pruebas del reparto del aviso del webhook entre workers: cada feed detecta
+la señal que sube otro proceso en la BD.
+"""
+
+from contextlib import contextmanager
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from auth.models import TicketFeedSignal
+from services import ticket_changes
+from services.ticket_changes import TicketChangeFeed
+
+
+@pytest.fixture
+def signal_db(monkeypatch):
+    """get_db_session del feed sobre SQLite en memoria, compartida por los "workers" de la prueba"""
+    engine = create_engine("sqlite://")
+    TicketFeedSignal.__table__.create(engine)
+    factory = sessionmaker(bind=engine)
+
+    @contextmanager
+    def session():
+        db = factory()
+        try:
+            yield db
+            db.commit()
+        finally:
+            db.close()
+
+    monkeypatch.setattr(ticket_changes, "get_db_session", session)
+    return session
+
+
+def bump(session):
+    """Lo que hace signal() en MySQL (upsert de la fila única)"""
+    with session() as db:
+        row = db.get(TicketFeedSignal, 1)
+        if row is None:
+            db.add(TicketFeedSignal(id=1, version=1))
+        else:
+            row.version += 1
+
+
+def test_webhook_signal_reaches_other_workers(signal_db):
+    worker_a, worker_b = TicketChangeFeed(), TicketChangeFeed()
+    # Primera lectura: solo toma la versión actual como referencia
+    assert not worker_a._signalled()
+    assert not worker_b._signalled()
+
+    bump(signal_db)
+
+    assert worker_a._signalled()
+    assert worker_b._signalled()
+    assert not worker_a._signalled()
+
+
+def test_unreadable_signal_is_ignored(monkeypatch):
+    @contextmanager
+    def broken():
+        raise RuntimeError("sin base de datos")
+        yield
+
+    monkeypatch.setattr(ticket_changes, "get_db_session", broken)
+    feed = TicketChangeFeed()
+
+    assert not feed._signalled()
+    assert not feed._signalled()
+    assert feed._signal_failing
+
+
+def test_signal_disabled():
+    assert not TicketChangeFeed(signal_seconds=0)._signalled()
+
+
+def test_no_signal_query_without_subscribers(monkeypatch):
+    """Un worker sin suscriptores no consulta la señal; con suscriptores la lee cada signal_seconds"""
+    reads = []
+
+    @contextmanager
+    def counting():
+        reads.append(time.monotonic())
+        raise RuntimeError("sin base de datos")
+        yield
+
+    monkeypatch.setattr(ticket_changes, "get_db_session", counting)
+    feed = TicketChangeFeed(poll_seconds=0.05, signal_seconds=0.01)
+    polls = []
+    monkeypatch.setattr(feed, "poll", lambda: polls.append(True))
+    feed.start()
+    try:
+        time.sleep(0.3)
+        assert reads == []
+        assert polls == []
+
+        feed._subscribers.add(("bucle", "cola"))
+        feed.poke()
+        time.sleep(0.3)
+        assert len(reads) >= 5
+    finally:
+        feed.stop()
+        feed._thread.join(timeout=1)
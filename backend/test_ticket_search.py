@@ -0,0 +1,293 @@
+"""
+Tests del índice BM25 de tickets: sincronización incremental por
+date_mod, conciliación de ids eliminados en GLPI y filtro por subcadena.
+"""
+
+from datetime import datetime, timedelta
+
+from services.ticket_search import TicketSearchIndex
+
+
+def ticket(ticket_id, name, date_mod, content="", category=""):
+    return {
+        "id": ticket_id, "name": name, "content": content, "status": 1, "priority": 3,
+        "date_mod": date_mod, "itilcategories_id": category,
+    }
+
+
+class FakeGLPI:
+    """Ticket de GLPI en memoria con paginación por rango como la API REST"""
+
+    def __init__(self, tickets):
+        self.tickets = {t["id"]: t for t in tickets}
+        self.requests = []
+
+    def iter_pages(self, item_type, params=None, page_size=100, max_items=None):
+        params = params or {}
+        self.requests.append(params)
+        field = params.get("sort", "id")
+        items = sorted(self.tickets.values(), key=lambda t: t[field], reverse=params.get("order") == "DESC")
+        if params.get("only_id") == "true":
+            items = [{"id": t["id"]} for t in items]
+        for start in range(0, len(items), page_size):
+            yield [dict(t) for t in items[start:start + page_size]]
+
+
+def make_index(glpi):
+    index = TicketSearchIndex(refresh_seconds=0, reconcile_seconds=0)
+    index.refresh(glpi, force=True)
+    return index
+
+
+def test_initial_load_and_search():
+    glpi = FakeGLPI([
+        ticket(1, "Impresora no imprime", "2024-01-01 10:00:00", category="Impresoras"),
+        ticket(2, "Sin acceso al correo", "2024-01-02 10:00:00"),
+    ])
+    index = make_index(glpi)
+    assert index.is_warm
+    assert [doc["id"] for doc, _ in index.search("impresoras")] == [1]
+
+
+def test_incremental_refresh_reads_only_changed_pages():
+    start = datetime(2024, 1, 1, 10, 0, 0)
+    tickets = [ticket(i, f"Ticket {i}", str(start + timedelta(minutes=i))) for i in range(1, 251)]
+    glpi = FakeGLPI(tickets)
+    index = make_index(glpi)
+    version = index.version
+
+    glpi.tickets[7] = ticket(7, "Monitor parpadea", "2024-02-01 09:00:00")
+    glpi.tickets[300] = ticket(300, "Teclado roto", "2024-02-01 09:05:00")
+    pages_read = []
+    original = glpi.iter_pages
+
+    def counting_pages(*args, **kwargs):
+        for page in original(*args, **kwargs):
+            pages_read.append(page)
+            yield page
+
+    glpi.iter_pages = counting_pages
+    # Los dos cambios y el ticket de la marca (date_mod tiene resolución de segundos y se relee)
+    assert index.refresh(glpi, force=True) == 3
+    # Solo la primera página por date_mod DESC: tras ella ya hay tickets anteriores a la marca
+    assert len(pages_read) == 1
+    assert glpi.requests[-1]["sort"] == "date_mod"
+    assert index.version > version
+    assert len(index) == 251
+    assert [doc["id"] for doc, _ in index.search("monitor")] == [7]
+    assert index.search("ticket 7") and all(doc["id"] != 7 for doc, _ in index.search("ticket"))
+
+
+def test_unchanged_refresh_keeps_version():
+    glpi = FakeGLPI([ticket(1, "Impresora", "2024-01-01 10:00:00")])
+    index = make_index(glpi)
+    version = index.version
+    index.refresh(glpi, force=True)
+    assert index.version == version
+
+
+def test_reconcile_removes_tickets_deleted_in_glpi():
+    glpi = FakeGLPI([ticket(i, f"Ticket {i}", "2024-01-01 10:00:00") for i in range(1, 6)])
+    index = make_index(glpi)
+    changes = []
+    index.add_listener(lambda old, new: changes.append((old and old["id"], new)))
+
+    del glpi.tickets[2]
+    del glpi.tickets[4]
+    assert index.reconcile_ids(glpi) == 2
+    assert sorted(doc["id"] for doc in index.documents()) == [1, 3, 5]
+    assert sorted(changes) == [(2, None), (4, None)]
+    assert glpi.requests[-1]["only_id"] == "true"
+
+
+def test_reconcile_keeps_ticket_skipped_by_one_crawl():
+    glpi = FakeGLPI([ticket(i, f"Ticket {i}", "2024-01-01 10:00:00") for i in range(1, 6)])
+    index = make_index(glpi)
+    original = glpi.iter_pages
+    crawls = []
+
+    def shifted_first_crawl(item_type, params=None, **kwargs):
+        # Un borrado durante el primer recorrido desplaza las páginas y el ticket 3 no aparece
+        crawls.append(params)
+        for page in original(item_type, params, **kwargs):
+            yield [t for t in page if len(crawls) > 1 or t["id"] != 3]
+
+    glpi.iter_pages = shifted_first_crawl
+    assert index.reconcile_ids(glpi) == 0
+    assert len(crawls) == 2
+    assert len(index) == 5
+
+
+def test_substring_fallback_finds_prefixes_and_fragments():
+    glpi = FakeGLPI([
+        ticket(1, "Impresora atascada", "2024-01-01 10:00:00"),
+        ticket(2, "Equipo PC-0042 no arranca", "2024-01-02 10:00:00"),
+        ticket(3, "Cambio de tóner", "2024-01-03 10:00:00", content="<p>Toner de la impresión</p>"),
+    ])
+    index = make_index(glpi)
+    assert index.search("impre") == []
+    assert [doc["id"] for doc in index.search_substring("impre")] == [1, 3]
+    assert [doc["id"] for doc in index.search_substring("pc-00")] == [2]
+    assert [doc["id"] for doc in index.search_substring("TONER")] == [3]
+    assert [doc["id"] for doc in index.search_substring("impre", exclude={1})] == [3]
+
+
+def test_full_content_is_stored_and_searched():
+    """La descripción del espejo es la misma que la de GLPI, y una coincidencia al final también cuenta"""
+    content = "<p>" + "El usuario informa de un fallo intermitente. " * 20 + "Código de error 0x80070005</p>"
+    assert content.index("0x80070005") > 300
+    index = make_index(FakeGLPI([ticket(1, "Fallo de actualización", "2024-01-01 10:00:00", content=content)]))
+
+    assert [doc["id"] for doc in index.search_substring("0x8007")] == [1]
+    assert index.search_substring("0x8007")[0]["content"] == content
+
+
+def naive_page(docs, field, descending, matches=None):
+    """Orden de referencia: valor e id, los tickets sin valor al final por id"""
+    docs = [d for d in docs if matches is None or matches(d)]
+    present = sorted((d for d in docs if d.get(field) is not None), key=lambda d: (d[field], d["id"]), reverse=descending)
+    missing = sorted((d for d in docs if d.get(field) is None), key=lambda d: d["id"])
+    return [d["id"] for d in present + missing]
+
+
+def test_page_orders_follow_mirror_changes():
+    """Los órdenes presorted se mantienen al añadir, cambiar y eliminar tickets"""
+    import random
+    rng = random.Random(37)
+
+    def random_ticket(ticket_id):
+        doc = ticket(ticket_id, f"Ticket {ticket_id}", f"2024-0{rng.randint(1, 9)}-1{rng.randint(0, 9)} 10:00:00")
+        doc["priority"] = rng.choice([1, 2, 3, 4, 5, 6, None])
+        doc["date"] = rng.choice([None, doc["date_mod"]])
+        return doc
+
+    index = make_index(FakeGLPI([random_ticket(i) for i in range(1, 301)]))
+    for field in ("date_mod", "priority", "date", "id"):
+        index.page(field)
+
+    for step in range(400):
+        ticket_id = rng.randint(1, 350)
+        if rng.random() < 0.2:
+            index.remove_ticket(ticket_id)
+        else:
+            index.add_tickets([random_ticket(ticket_id)])
+
+    docs = index.documents()
+    for field in ("date_mod", "priority", "date", "id"):
+        for descending in (True, False):
+            expected = naive_page(docs, field, descending)
+            page, total = index.page(field, descending)
+            assert [d["id"] for d in page] == expected
+            assert total == len(docs)
+            page, total = index.page(field, descending, offset=40, limit=25)
+            assert [d["id"] for d in page] == expected[40:65]
+
+
+def test_page_with_filter_counts_all_matches():
+    tickets = [ticket(i, f"Ticket {i}", f"2024-01-01 10:{i:02d}:00") for i in range(1, 41)]
+    for t in tickets:
+        t["priority"] = 5 if t["id"] % 4 == 0 else 3
+    index = make_index(FakeGLPI(tickets))
+
+    def high(doc):
+        return doc["priority"] == 5
+
+    page, total = index.page("date_mod", descending=True, offset=2, limit=3, matches=high)
+
+    assert total == 10
+    assert [d["id"] for d in page] == [32, 28, 24]
+
+
+def test_glpi_search_criteria_for_cold_filtered_lists():
+    """Con el espejo vacío los filtros se envían al motor de búsqueda de GLPI"""
+    from api.tickets_routes import glpi_ticket_criteria, page_from_glpi_search
+
+    criteria = glpi_ticket_criteria("new", "very_high", None, "impresora")
+    assert criteria == {
+        "criteria[0][field]": 12, "criteria[0][searchtype]": "equals", "criteria[0][value]": 1,
+        "criteria[1][link]": "AND",
+        "criteria[1][field]": 3, "criteria[1][searchtype]": "equals", "criteria[1][value]": -5,
+        "criteria[2][link]": "AND",
+        "criteria[2][criteria][0][field]": 1, "criteria[2][criteria][0][searchtype]": "contains",
+        "criteria[2][criteria][0][value]": "impresora",
+        "criteria[2][criteria][1][link]": "OR",
+        "criteria[2][criteria][1][field]": 21, "criteria[2][criteria][1][searchtype]": "contains",
+        "criteria[2][criteria][1][value]": "impresora",
+    }
+
+    class SearchGLPI:
+        def search_page(self, item_type, criteria, forcedisplay, start, limit, sort, order):
+            self.call = (item_type, start, limit, sort, order)
+            return {"rows": [{"2": 9, "1": "Impresora atascada", "12": "1", "3": 6}], "total": 31}
+
+    glpi = SearchGLPI()
+    page, total = page_from_glpi_search(glpi, criteria, None, True, 20, 10)
+
+    assert glpi.call == ("Ticket", 20, 10, 19, "DESC")
+    assert total == 31
+    assert page[0]["id"] == 9 and page[0]["status"] == 1 and page[0]["priority"] == 6
+    assert page[0]["name"] == "Impresora atascada"
+
+
+class ColdRouteGLPI:
+    """GLPI para las rutas con el espejo vacío: responde al motor de búsqueda y falla si se recorre"""
+
+    def __init__(self):
+        self.searches = []
+        self.killed = 0
+
+    def search_page(self, item_type, criteria, forcedisplay, start, limit, sort, order):
+        self.searches.append((criteria, start, limit, sort, order))
+        return {"rows": [{"2": 9, "1": "Impresora atascada", "12": "1", "3": 3}], "total": 1}
+
+    def iter_pages(self, *args, **kwargs):
+        raise AssertionError("la petición no debe recorrer GLPI")
+
+    def kill_session(self):
+        self.killed += 1
+
+
+def cold_routes(monkeypatch):
+    """Rutas de tickets con un espejo vacío cuya carga en segundo plano solo se anota"""
+    from api import tickets_routes
+
+    index = TicketSearchIndex(refresh_seconds=0, reconcile_seconds=0)
+    background = []
+    monkeypatch.setattr(index, "refresh_in_background", lambda glpi=None: background.append(glpi))
+    monkeypatch.setattr(tickets_routes, "ticket_search_index", index)
+    monkeypatch.setattr(tickets_routes, "get_user_from_token", lambda authorization, db: None)
+    glpi = ColdRouteGLPI()
+    monkeypatch.setattr(tickets_routes, "get_glpi_client", lambda: glpi)
+    return tickets_routes, glpi, background
+
+
+def test_search_with_cold_mirror_uses_glpi_search(monkeypatch):
+    """Con el espejo vacío /search no carga el espejo dentro de la petición"""
+    tickets_routes, glpi, background = cold_routes(monkeypatch)
+
+    result = tickets_routes.search_tickets(q="impresora", limit=5, authorization="Bearer x", db=None)
+
+    assert result["source"] == "glpi"
+    assert [(r["id"], r["score"]) for r in result["results"]] == [(9, None)]
+    criteria, start, limit, sort, order = glpi.searches[0]
+    assert (start, limit, sort, order) == (0, 5, 19, "DESC")
+    assert "impresora" in criteria.values()
+    assert background == [None]
+    assert glpi.killed == 1
+
+
+def test_timeline_with_cold_mirror_answers_503(monkeypatch):
+    """Sin espejo la evolución no se calcula en la petición: 503 con Retry-After y carga en segundo plano"""
+    import pytest
+    from fastapi import HTTPException
+
+    tickets_routes, glpi, background = cold_routes(monkeypatch)
+
+    with pytest.raises(HTTPException) as error:
+        tickets_routes.get_ticket_timeline(
+            period="day", date_from=None, date_to=None, authorization="Bearer x", if_none_match=None, db=None
+        )
+
+    assert error.value.status_code == 503
+    assert error.value.headers["Retry-After"] == str(tickets_routes.MIRROR_LOADING_RETRY_AFTER)
+    assert background == [None]
@@ -0,0 +1,68 @@
+"""
+Pruebas del desglose de tickets: mismo resultado que el recorrido ticket a
+ticket original, incluidos los valores que no son un código ("Estado X").
+"""
+
+import random
+
+from services.ticket_stats import BREAKDOWN_GROUPS, ticket_breakdown
+
+
+def reference_breakdown(tickets):
+    """Recorrido ticket a ticket que hacía GLPIClient antes del almacén columnar"""
+    if not tickets:
+        return {}
+    stats = {"total": len(tickets)}
+    for key, column, nombres, prefijo in BREAKDOWN_GROUPS:
+        group = stats[key] = {}
+        for ticket in tickets:
+            value = ticket.get(column, 0)
+            nombre = nombres.get(value, f"{prefijo} {value}")
+            group[nombre] = group.get(nombre, 0) + 1
+    return stats
+
+
+def test_known_codes_are_named():
+    tickets = [
+        {"id": 1, "status": 1, "priority": 5, "type": 1, "urgency": 2, "impact": 3},
+        {"id": 2, "status": 6, "priority": 5, "type": 2, "urgency": 2, "impact": 3},
+    ]
+
+    stats = ticket_breakdown(tickets)
+
+    assert stats["por_estado"] == {"Nuevo": 1, "Cerrado": 1}
+    assert stats["por_prioridad"] == {"Muy Alta": 2}
+    assert stats["por_tipo"] == {"Incidente": 1, "Solicitud": 1}
+
+
+def test_unusual_values_keep_their_label():
+    """Un estado en texto, None, fuera de rango o ausente no desaparece del desglose"""
+    tickets = [
+        {"id": 1, "status": "2", "priority": "Alta"},
+        {"id": 2, "status": None, "priority": 3},
+        {"id": 3, "status": 300, "priority": 3},
+        {"id": 4, "status": 7},
+        {"id": 5},
+    ]
+
+    stats = ticket_breakdown(tickets)
+
+    assert stats["por_estado"] == {"Estado 2": 1, "Estado None": 1, "Estado 300": 1, "Estado 7": 1, "Estado 0": 1}
+    assert stats["por_prioridad"] == {"Prioridad Alta": 1, "Media": 2, "Prioridad 0": 2}
+    assert sum(stats["por_estado"].values()) == len(tickets)
+    assert stats == reference_breakdown(tickets)
+
+
+def test_matches_reference_on_random_tickets():
+    rng = random.Random(39)
+    values = [1, 2, 3, 4, 5, 6, 7, 0, None, "3", "Nuevo", 999]
+    tickets = [
+        {"id": i, **{column: rng.choice(values) for _, column, _, _ in BREAKDOWN_GROUPS if rng.random() < 0.9}}
+        for i in range(2_000)
+    ]
+
+    assert ticket_breakdown(tickets) == reference_breakdown(tickets)
+
+
+def test_empty_list():
+    assert ticket_breakdown([]) == {}
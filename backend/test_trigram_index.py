@@ -0,0 +1,111 @@
+"""
+Tests del índice de trigramas: ranking de los resultados y presupuesto de
+latencia de las búsquedas con límite sobre un inventario sintético grande.
+"""
+
+import random
+import timeit
+import uuid
+
+import pytest
+
+from services.trigram_index import TrigramIndex, normalize
+
+
+DOCUMENTS = [
+    "PC-00123 5CG1234XYZ Lenovo ThinkPad T14 Juan Pérez",
+    "PC-00124 5CG9999ABC Dell Latitude 5420 María Gómez",
+    "PC-01230 CN0ABC123 HP EliteBook 840 Juan Gómez",
+    "Impresora HP LaserJet Sala 3",
+    "Monitor Dell P2419H Recepción",
+]
+
+# Una búsqueda con límite debe responder por debajo de esto (mejor de varias repeticiones)
+LATENCY_BUDGET_MS = 1.0
+
+
+def make_inventory(count: int, seed: int = 7):
+    """Inventario con identificadores únicos (los que hacen crecer el vocabulario)"""
+    rnd = random.Random(seed)
+    makers = ["Dell", "Lenovo", "HP", "Acer", "Asus", "Apple", "Samsung", "Brother", "Cisco", "Epson"]
+    first = ["Juan", "Maria", "Pedro", "Ana", "Luis", "Carla", "Jose", "Sofia", "Diego", "Laura"]
+    last = ["Perez", "Gomez", "Rodriguez", "Martinez", "Lopez", "Diaz", "Torres", "Ramirez"]
+    documents = []
+    for i in range(count):
+        maker = rnd.choice(makers)
+        documents.append(" ".join([
+            f"PC-{i:05d}",
+            f"{rnd.choice('ABCDEFGH')}{rnd.randint(0, 9)}{rnd.choice('XYZ')}{rnd.randint(100000, 999999)}",
+            f"INV-2024-{i:05d}", maker, f"{maker} model{rnd.randint(1, 60)}",
+            f"{rnd.choice(first)} {rnd.choice(last)}", str(uuid.UUID(int=rnd.getrandbits(128))),
+        ]))
+    return documents
+
+
+@pytest.fixture(scope="module")
+def index():
+    return TrigramIndex(DOCUMENTS)
+
+
+@pytest.fixture(scope="module")
+def large_index():
+    documents = make_inventory(50000)
+    return documents, TrigramIndex(documents)
+
+
+def test_normalize_strips_accents_and_internal_hyphens():
+    assert normalize("PC-00123 María  Gómez!") == "pc00123 maria gomez"
+
+
+def test_exact_word_ranks_first(index):
+    positions = [position for position, _ in index.search("pc-00123")]
+    assert positions[0] == 0
+
+
+def test_typo_matches(index):
+    assert [position for position, _ in index.search("lenvo")] == [0]
+    assert index.search("latitud")[0][0] == 1
+
+
+def test_serial_prefix_and_suffix(index):
+    assert index.search("5CG123")[0][0] == 0
+    assert index.search("1234xyz")[0][0] == 0
+
+
+def test_all_query_words_must_match(index):
+    assert [position for position, _ in index.search("juan gomez")] == [2]
+    assert index.search("juan recepcion") == []
+
+
+def test_scope_limits_results(index):
+    assert [position for position, _ in index.search("dell", scope=[4])] == [4]
+
+
+def test_ties_keep_original_order(index):
+    results = index.search("hp")
+    assert [position for position, _ in results] == [2, 3]
+    assert results[0][1] == results[1][1]
+
+
+def test_limit_matches_unlimited_ranking(large_index):
+    documents, idx = large_index
+    for query in ("dell model12", "juan perez", "maria gomez dell", "lnovo model3"):
+        assert idx.search(query, limit=20) == idx.search(query, limit=None)[:20]
+
+
+def test_identifier_lookups_on_large_inventory(large_index):
+    documents, idx = large_index
+    assert documents[idx.search("pc-00123")[0][0]].startswith("PC-00123 ")
+    assert documents[idx.search("inv-2024-00777")[0][0]].startswith("PC-00777 ")
+    serial = documents[4321].split()[1]
+    assert idx.search(serial[-6:])[0][0] == 4321
+
+
+@pytest.mark.parametrize("query", [
+    "dell model12", "lnovo model3", "pc-00123", "inv-2024-0012", "juan perez", "maria gomez dell", "00123", "lenvo",
+])
+def test_latency_budget(large_index, query):
+    _, idx = large_index
+    # timeit desactiva el recolector de basura durante la medida
+    best = min(timeit.repeat(lambda: idx.search(query, limit=20), repeat=9, number=1)) * 1000
+    assert best < LATENCY_BUDGET_MS, f"{query!r}: {best:.3f} ms"
@@ -0,0 +1,166 @@
+"""
+Pruebas de los contadores de user_stats sobre SQLite: los incrementos de
+cada escritura, el cambio de día de las cifras "de hoy" y la resta al
+borrar una conversación coinciden con recalcular desde cero.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import sessionmaker
+
+from auth.models import Base, Conversation, Message, MessageRole, User, UserStats
+from services import user_stats
+from services.user_stats import (
+    COUNTER_FIELDS, aggregate_stats, record_conversation_archived, record_conversation_created,
+    record_conversation_deleted, record_message_added, today_start
+)
+
+
+def sqlite_upsert(db, user_id, values):
+    """_upsert con el ON CONFLICT de SQLite en lugar del ON DUPLICATE KEY de MySQL"""
+    stmt = insert(UserStats).values(user_id=user_id, **values)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[UserStats.user_id], set_={**values, "version": UserStats.version + 1}
+    ))
+
+
+@pytest.fixture
+def db(monkeypatch):
+    monkeypatch.setattr(user_stats, "_upsert", sqlite_upsert)
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(
+        engine, tables=[User.__table__, Conversation.__table__, Message.__table__, UserStats.__table__]
+    )
+    session = sessionmaker(bind=engine)()
+    session.add(User(id=1, username="ana", email="ana@test", password_hash="x", full_name="Ana"))
+    session.commit()
+    yield session
+    session.close()
+
+
+def create_conversation(db, created_at=None):
+    conversation = Conversation(user_id=1, title="Consulta", created_at=created_at)
+    db.add(conversation)
+    db.flush()
+    record_conversation_created(db, 1)
+    db.commit()
+    return conversation
+
+
+def add_message(db, conversation, tokens, created_at=None):
+    db.add(Message(
+        conversation_id=conversation.id, role=MessageRole.user, content="hola",
+        tokens_used=tokens, created_at=created_at
+    ))
+    db.flush()
+    record_message_added(db, 1, tokens)
+    db.commit()
+
+
+def stored(db):
+    db.expire_all()
+    row = db.query(UserStats).filter(UserStats.user_id == 1).one()
+    return {field: getattr(row, field) for field in COUNTER_FIELDS}
+
+
+def recomputed(db):
+    row = aggregate_stats(db, today_start(), Conversation.user_id == 1).one()
+    return {field: int(getattr(row, field) or 0) for field in COUNTER_FIELDS}
+
+
+def test_deltas_match_recomputed_counters(db):
+    """La primera escritura construye la fila; las siguientes suman sobre ella"""
+    first = create_conversation(db)
+    version = db.query(UserStats.version).scalar()
+    add_message(db, first, 120)
+    add_message(db, first, 30)
+    second = create_conversation(db)
+    add_message(db, second, 0)
+    second.is_archived = True
+    record_conversation_archived(db, 1, True)
+    db.commit()
+
+    assert stored(db) == recomputed(db) == {
+        "total_conversations": 2, "archived_conversations": 1, "conversations_today": 2,
+        "total_messages": 3, "total_tokens": 150, "messages_today": 3,
+    }
+    # Cada escritura sube la versión (invalida las cachés del dashboard en otros procesos)
+    assert db.query(UserStats.version).scalar() == version + 5
+
+
+def test_today_counters_roll_over(db):
+    """Una fila de ayer reinicia las cifras de hoy en la siguiente escritura, sin tocar los totales"""
+    conversation = create_conversation(db)
+    add_message(db, conversation, 10)
+    yesterday = today_start().date() - timedelta(days=1)
+    db.query(UserStats).update({"stats_date": yesterday, "conversations_today": 4, "messages_today": 9})
+    db.commit()
+
+    add_message(db, conversation, 5)
+
+    counters = stored(db)
+    assert counters["messages_today"] == 1
+    assert counters["conversations_today"] == 0
+    assert counters["total_messages"] == 2
+    assert counters["total_tokens"] == 15
+    assert db.query(UserStats.stats_date).scalar() == today_start().date()
+
+
+def test_delete_subtracts_only_that_conversation(db):
+    """Se restan la conversación y sus mensajes; la última actividad pasa a la conversación restante"""
+    yesterday = datetime.now(timezone.utc) - timedelta(days=1)
+    kept = create_conversation(db, created_at=yesterday)
+    add_message(db, kept, 40, created_at=yesterday)
+    removed = create_conversation(db)
+    add_message(db, removed, 25)
+    add_message(db, removed, 15)
+    user_stats.reconcile_user(db, 1)
+    db.commit()
+
+    record_conversation_deleted(db, removed)
+    db.delete(removed)
+    db.commit()
+
+    assert stored(db) == recomputed(db) == {
+        "total_conversations": 1, "archived_conversations": 0, "conversations_today": 0,
+        "total_messages": 1, "total_tokens": 40, "messages_today": 0,
+    }
+    last_activity = db.query(UserStats.last_activity).scalar()
+    assert last_activity.replace(tzinfo=None) == yesterday.replace(tzinfo=None)
+
+
+def test_delete_of_old_conversation_on_a_new_day(db):
+    """Con la fila de otro día, restar no deja cifras de hoy negativas"""
+    conversation = create_conversation(db)
+    add_message(db, conversation, 10)
+    db.query(UserStats).update({"stats_date": today_start().date() - timedelta(days=1)})
+    db.commit()
+
+    record_conversation_deleted(db, conversation)
+    db.delete(conversation)
+    db.commit()
+
+    assert stored(db) == {field: 0 for field in COUNTER_FIELDS}
+    assert db.query(UserStats.last_activity).scalar() is None
+
+
+def test_assistant_reply_counts_server_measured_tokens(db):
+    """La respuesta de /query o /chat se guarda con el uso medido; el de otra conversación no se guarda"""
+    from api.routes import store_assistant_message
+
+    conversation = create_conversation(db)
+    user = db.get(User, 1)
+    usage = {"prompt_tokens": 300, "completion_tokens": 120, "total_tokens": 420, "latency_ms": 812.5, "calls": []}
+
+    message_id = store_assistant_message(db, user, conversation.id, "Tienes 5 tickets abiertos", usage)
+    foreign = store_assistant_message(db, user, conversation.id + 1, "otra", usage)
+
+    message = db.get(Message, message_id)
+    assert (message.role, message.tokens_used, message.prompt_tokens, message.latency_ms) == (
+        MessageRole.assistant, 420, 300, 812.5
+    )
+    assert foreign is None
+    assert stored(db)["total_tokens"] == recomputed(db)["total_tokens"] == 420
@@ -1,5 +1,6 @@
 class InventoryItem {
   final int id;
+  final String itemtype; // Tipo de GLPI (Computer, Monitor, Printer...); los ids se repiten entre tipos
   final String name;
   final String type;
   final String? manufacturer;
@@ -14,6 +15,7 @@ class InventoryItem {
 
   InventoryItem({
     required this.id,
+    this.itemtype = 'Computer',
     required this.name,
     required this.type,
     this.manufacturer,
@@ -30,6 +32,7 @@ class InventoryItem {
   factory InventoryItem.fromJson(Map<String, dynamic> json) {
     return InventoryItem(
       id: json['id'],
+      itemtype: json['itemtype'] ?? 'Computer',
       name: json['name'] ?? 'Sin nombre',
       type: json['type'] ?? 'other',
       manufacturer: json['manufacturer'],
@@ -60,6 +63,8 @@ class InventoryItem {
         return 'Equipo de Red';
       case 'phone':
         return 'Teléfono';
+      case 'peripheral':
+        return 'Periférico';
       case 'other':
         return 'Otro';
       default:
@@ -4,6 +4,9 @@ class Message {
   final DateTime timestamp;
   final String? intention;
   final double? confidence;
+  final Map<String, dynamic>? usage;
+  // ID del mensaje si el backend ya lo guardó en la conversación
+  final int? messageId;
 
   Message({
     required this.text,
@@ -11,5 +14,7 @@ class Message {
     DateTime? timestamp,
     this.intention,
     this.confidence,
+    this.usage,
+    this.messageId,
   }) : timestamp = timestamp ?? DateTime.now();
 }
@@ -10,6 +10,9 @@ class Ticket {
   final DateTime createdAt;
   final DateTime? updatedAt;
   final DateTime? dueDate;
+  // Solo en el detalle enriquecido (expand=true)
+  final List<TicketActivity> activity;
+  final List<String> linkedItems;
 
   Ticket({
     required this.id,
@@ -23,9 +26,20 @@ class Ticket {
     required this.createdAt,
     this.updatedAt,
     this.dueDate,
+    this.activity = const [],
+    this.linkedItems = const [],
   });
 
   factory Ticket.fromJson(Map<String, dynamic> json) {
+    // Seguimientos, tareas y solución en un único historial ordenado por fecha
+    final activity = <TicketActivity>[
+      ...((json['followups'] as List<dynamic>?) ?? [])
+          .map((item) => TicketActivity.fromJson(item, 'followup')),
+      ...((json['tasks'] as List<dynamic>?) ?? [])
+          .map((item) => TicketActivity.fromJson(item, 'task')),
+      if (json['solution'] != null) TicketActivity.fromJson(json['solution'], 'solution'),
+    ]..sort((a, b) => (a.createdAt ?? DateTime(0)).compareTo(b.createdAt ?? DateTime(0)));
+
     return Ticket(
       id: json['id'],
       title: json['title'] ?? 'Sin título',
@@ -38,9 +52,34 @@ class Ticket {
       createdAt: DateTime.parse(json['created_at']),
       updatedAt: json['updated_at'] != null ? DateTime.parse(json['updated_at']) : null,
       dueDate: json['due_date'] != null ? DateTime.parse(json['due_date']) : null,
+      activity: activity,
+      linkedItems: ((json['linked_items'] as List<dynamic>?) ?? [])
+          .map((item) => '${item['itemtype']} #${item['id']}')
+          .toList(),
     );
   }
 
+  Map<String, dynamic> toJson() {
+    return {
+      'id': id,
+      'title': title,
+      'description': description,
+      'status': status,
+      'priority': priority,
+      'category': category,
+      'requester_name': requesterName,
+      'assigned_to': assignedTo,
+      'created_at': createdAt.toIso8601String(),
+      'updated_at': updatedAt?.toIso8601String(),
+      'due_date': dueDate?.toIso8601String(),
+    };
+  }
+
+  /// Copia del ticket con los campos recibidos en un evento de cambio
+  Ticket patch(Map<String, dynamic> fields) {
+    return Ticket.fromJson({...toJson(), ...fields});
+  }
+
   String get statusLabel {
     switch (status) {
       case 'new':
@@ -77,3 +116,91 @@ class Ticket {
     }
   }
 }
+
+/// Entrada del historial de un ticket (seguimiento, tarea o solución)
+class TicketActivity {
+  final String kind; // followup, task o solution
+  final String content;
+  final String? author;
+  final DateTime? createdAt;
+  final String? state;
+
+  TicketActivity({
+    required this.kind,
+    required this.content,
+    this.author,
+    this.createdAt,
+    this.state,
+  });
+
+  factory TicketActivity.fromJson(Map<String, dynamic> json, String kind) {
+    return TicketActivity(
+      kind: kind,
+      content: json['content'] ?? '',
+      author: json['assigned_to'] ?? json['created_by'],
+      createdAt: json['created_at'] != null ? DateTime.tryParse(json['created_at']) : null,
+      state: json['state'] ?? json['status'],
+    );
+  }
+
+  String get kindLabel {
+    switch (kind) {
+      case 'task':
+        return 'Tarea';
+      case 'solution':
+        return 'Solución';
+      default:
+        return 'Seguimiento';
+    }
+  }
+}
+
+/// Una página de tickets devuelta por el backend
+class TicketPage {
+  final List<Ticket> items;
+  final int total;
+  final int page;
+  final int pageSize;
+
+  TicketPage({
+    required this.items,
+    required this.total,
+    required this.page,
+    required this.pageSize,
+  });
+
+  bool get hasMore => page * pageSize < total;
+
+  factory TicketPage.fromJson(Map<String, dynamic> json) {
+    return TicketPage(
+      items: (json['items'] as List<dynamic>).map((item) => Ticket.fromJson(item)).toList(),
+      total: json['total'] ?? 0,
+      page: json['page'] ?? 1,
+      pageSize: json['page_size'] ?? 50,
+    );
+  }
+}
+
+/// Evento del feed de cambios de tickets (SSE)
+class TicketChange {
+  final String event; // ready, ticket o reset
+  final String? op; // created, updated o deleted
+  final int? id;
+  final Map<String, dynamic> fields;
+
+  TicketChange({
+    required this.event,
+    this.op,
+    this.id,
+    this.fields = const {},
+  });
+
+  factory TicketChange.fromEvent(String event, Map<String, dynamic> data) {
+    return TicketChange(
+      event: event,
+      op: data['op'],
+      id: data['id'],
+      fields: (data['fields'] as Map<String, dynamic>?) ?? const {},
+    );
+  }
+}
@@ -93,16 +93,17 @@ class ChatProvider extends ChangeNotifier {
       Message response;
       if (isQuery) {
         // Consulta que accede a GLPI
-        response = await _apiService.sendQuery(text, 1);
+        response = await _apiService.sendQuery(text, 1, conversationId: _currentConversationId);
       } else {
         // Chat conversacional simple
-        response = await _apiService.sendChat(text);
+        response = await _apiService.sendChat(text, conversationId: _currentConversationId);
       }
       
       _messages.add(response);
 
-      // Guardar respuesta del asistente en la base de datos
-      if (_currentConversationId != null) {
+      // Guardar respuesta del asistente (el backend la guarda con su uso de tokens
+      // cuando recibe la conversación; solo se guarda aquí si no lo hizo)
+      if (_currentConversationId != null && response.messageId == null) {
         await ConversationService.addMessage(
           conversationId: _currentConversationId!,
           role: 'assistant',
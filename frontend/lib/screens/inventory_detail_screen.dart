@@ -4,8 +4,9 @@ import '../services/inventory_service.dart';
 
 class InventoryDetailScreen extends StatefulWidget {
   final int itemId;
+  final String itemtype;
 
-  const InventoryDetailScreen({super.key, required this.itemId});
+  const InventoryDetailScreen({super.key, required this.itemId, this.itemtype = 'Computer'});
 
   @override
   State<InventoryDetailScreen> createState() => _InventoryDetailScreenState();
@@ -29,7 +30,7 @@ class _InventoryDetailScreenState extends State<InventoryDetailScreen> {
     });
 
     try {
-      final item = await InventoryService.getInventoryItem(widget.itemId);
+      final item = await InventoryService.getInventoryItem(widget.itemId, itemtype: widget.itemtype);
       setState(() {
         _item = item;
         _isLoading = false;
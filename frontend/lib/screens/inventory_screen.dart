@@ -19,7 +19,12 @@ class _InventoryScreenState extends State<InventoryScreen> {
   // Filters
   String? _selectedType;
   String? _selectedStatus;
+  String? _selectedLocation;
+  String? _selectedManufacturer;
   String _searchQuery = '';
+  static const int _maxFacetChips = 12;
+  // Conteos por faceta para los filtros (faceta -> valor -> equipos)
+  Map<String, Map<String, int>> _facets = {};
   String _sortBy = 'name'; // name, type, status
 
   @override
@@ -35,14 +40,26 @@ class _InventoryScreenState extends State<InventoryScreen> {
     });
 
     try {
+      final search = _searchQuery.isEmpty ? null : _searchQuery;
+      final facetsFuture = InventoryService.getFacets(
+        type: _selectedType,
+        status: _selectedStatus,
+        location: _selectedLocation,
+        manufacturer: _selectedManufacturer,
+        search: search,
+      ).catchError((_) => <String, Map<String, int>>{});
       final items = await InventoryService.getInventory(
         type: _selectedType,
         status: _selectedStatus,
-        search: _searchQuery.isEmpty ? null : _searchQuery,
+        location: _selectedLocation,
+        manufacturer: _selectedManufacturer,
+        search: search,
       );
+      final facets = await facetsFuture;
 
       setState(() {
         _items = items;
+        _facets = facets;
         _applyFiltersAndSort();
         _isLoading = false;
       });
@@ -162,7 +179,10 @@ class _InventoryScreenState extends State<InventoryScreen> {
           ),
 
           // Active filters chips
-          if (_selectedType != null || _selectedStatus != null)
+          if (_selectedType != null ||
+              _selectedStatus != null ||
+              _selectedLocation != null ||
+              _selectedManufacturer != null)
             Padding(
               padding: const EdgeInsets.symmetric(horizontal: 16),
               child: Wrap(
@@ -188,6 +208,26 @@ class _InventoryScreenState extends State<InventoryScreen> {
                         _loadInventory();
                       },
                     ),
+                  if (_selectedLocation != null)
+                    Chip(
+                      label: Text('Ubicación: $_selectedLocation'),
+                      onDeleted: () {
+                        setState(() {
+                          _selectedLocation = null;
+                        });
+                        _loadInventory();
+                      },
+                    ),
+                  if (_selectedManufacturer != null)
+                    Chip(
+                      label: Text('Fabricante: $_selectedManufacturer'),
+                      onDeleted: () {
+                        setState(() {
+                          _selectedManufacturer = null;
+                        });
+                        _loadInventory();
+                      },
+                    ),
                 ],
               ),
             ),
@@ -266,7 +306,7 @@ class _InventoryScreenState extends State<InventoryScreen> {
           Navigator.push(
             context,
             MaterialPageRoute(
-              builder: (context) => InventoryDetailScreen(itemId: item.id),
+              builder: (context) => InventoryDetailScreen(itemId: item.id, itemtype: item.itemtype),
             ),
           );
         },
@@ -462,116 +502,114 @@ class _InventoryScreenState extends State<InventoryScreen> {
   void _showFilterDialog() {
     showDialog(
       context: context,
-      builder: (context) => AlertDialog(
-        title: const Text('Filtros'),
-        content: SingleChildScrollView(
-          child: Column(
-            mainAxisSize: MainAxisSize.min,
-            crossAxisAlignment: CrossAxisAlignment.start,
-            children: [
-              const Text('Tipo', style: TextStyle(fontWeight: FontWeight.bold)),
-              Wrap(
-                spacing: 8,
+      builder: (context) => StatefulBuilder(
+        builder: (context, setDialogState) {
+          void select(VoidCallback change) {
+            setState(change);
+            setDialogState(() {});
+          }
+
+          return AlertDialog(
+            title: const Text('Filtros'),
+            content: SingleChildScrollView(
+              child: Column(
+                mainAxisSize: MainAxisSize.min,
+                crossAxisAlignment: CrossAxisAlignment.start,
                 children: [
-                  FilterChip(
-                    label: const Text('Computadora'),
-                    selected: _selectedType == 'computer',
-                    onSelected: (selected) {
-                      setState(() {
-                        _selectedType = selected ? 'computer' : null;
-                      });
-                    },
-                  ),
-                  FilterChip(
-                    label: const Text('Laptop'),
-                    selected: _selectedType == 'laptop',
-                    onSelected: (selected) {
-                      setState(() {
-                        _selectedType = selected ? 'laptop' : null;
-                      });
-                    },
-                  ),
-                  FilterChip(
-                    label: const Text('Monitor'),
-                    selected: _selectedType == 'monitor',
-                    onSelected: (selected) {
-                      setState(() {
-                        _selectedType = selected ? 'monitor' : null;
-                      });
-                    },
+                  const Text('Tipo', style: TextStyle(fontWeight: FontWeight.bold)),
+                  _buildFacetChips(
+                    'type',
+                    const ['computer', 'laptop', 'monitor', 'printer', 'network', 'phone', 'peripheral'],
+                    _selectedType,
+                    _getTypeLabel,
+                    (value) => select(() => _selectedType = value),
                   ),
-                  FilterChip(
-                    label: const Text('Impresora'),
-                    selected: _selectedType == 'printer',
-                    onSelected: (selected) {
-                      setState(() {
-                        _selectedType = selected ? 'printer' : null;
-                      });
-                    },
+                  const SizedBox(height: 16),
+                  const Text('Estado', style: TextStyle(fontWeight: FontWeight.bold)),
+                  _buildFacetChips(
+                    'status',
+                    const ['available', 'in_use', 'maintenance'],
+                    _selectedStatus,
+                    _getStatusLabel,
+                    (value) => select(() => _selectedStatus = value),
                   ),
+                  if ((_facets['location'] ?? {}).isNotEmpty) ...[
+                    const SizedBox(height: 16),
+                    const Text('Ubicación', style: TextStyle(fontWeight: FontWeight.bold)),
+                    _buildFacetChips(
+                      'location',
+                      const [],
+                      _selectedLocation,
+                      (value) => value,
+                      (value) => select(() => _selectedLocation = value),
+                    ),
+                  ],
+                  if ((_facets['manufacturer'] ?? {}).isNotEmpty) ...[
+                    const SizedBox(height: 16),
+                    const Text('Fabricante', style: TextStyle(fontWeight: FontWeight.bold)),
+                    _buildFacetChips(
+                      'manufacturer',
+                      const [],
+                      _selectedManufacturer,
+                      (value) => value,
+                      (value) => select(() => _selectedManufacturer = value),
+                    ),
+                  ],
                 ],
               ),
-              const SizedBox(height: 16),
-              const Text('Estado', style: TextStyle(fontWeight: FontWeight.bold)),
-              Wrap(
-                spacing: 8,
-                children: [
-                  FilterChip(
-                    label: const Text('Disponible'),
-                    selected: _selectedStatus == 'available',
-                    onSelected: (selected) {
-                      setState(() {
-                        _selectedStatus = selected ? 'available' : null;
-                      });
-                    },
-                  ),
-                  FilterChip(
-                    label: const Text('En Uso'),
-                    selected: _selectedStatus == 'in_use',
-                    onSelected: (selected) {
-                      setState(() {
-                        _selectedStatus = selected ? 'in_use' : null;
-                      });
-                    },
-                  ),
-                  FilterChip(
-                    label: const Text('Mantenimiento'),
-                    selected: _selectedStatus == 'maintenance',
-                    onSelected: (selected) {
-                      setState(() {
-                        _selectedStatus = selected ? 'maintenance' : null;
-                      });
-                    },
-                  ),
-                ],
+            ),
+            actions: [
+              TextButton(
+                onPressed: () {
+                  setState(() {
+                    _selectedType = null;
+                    _selectedStatus = null;
+                    _selectedLocation = null;
+                    _selectedManufacturer = null;
+                  });
+                  Navigator.pop(context);
+                  _loadInventory();
+                },
+                child: const Text('Limpiar'),
+              ),
+              FilledButton(
+                onPressed: () {
+                  Navigator.pop(context);
+                  _loadInventory();
+                },
+                child: const Text('Aplicar'),
               ),
             ],
-          ),
-        ),
-        actions: [
-          TextButton(
-            onPressed: () {
-              setState(() {
-                _selectedType = null;
-                _selectedStatus = null;
-              });
-              Navigator.pop(context);
-              _loadInventory();
-            },
-            child: const Text('Limpiar'),
-          ),
-          FilledButton(
-            onPressed: () {
-              Navigator.pop(context);
-              _loadInventory();
-            },
-            child: const Text('Aplicar'),
-          ),
-        ],
+          );
+        },
       ),
     );
   }
 
+  /// Chips de una faceta con su conteo; sin facetas cargadas se muestran las opciones por defecto
+  Widget _buildFacetChips(
+    String facet,
+    List<String> defaults,
+    String? selected,
+    String Function(String) label,
+    void Function(String?) onSelect,
+  ) {
+    final counts = _facets[facet] ?? {};
+    final values = counts.isNotEmpty ? counts.keys.take(_maxFacetChips).toList() : defaults;
+
+    return Wrap(
+      spacing: 8,
+      children: [
+        for (final value in values)
+          FilterChip(
+            label: Text(counts.containsKey(value) ? '${label(value)} (${counts[value]})' : label(value)),
+            selected: selected == value,
+            onSelected: (isSelected) => onSelect(isSelected ? value : null),
+          ),
+      ],
+    );
+  }
+
   String _getTypeLabel(String type) {
     switch (type) {
       case 'computer':
@@ -588,6 +626,8 @@ class _InventoryScreenState extends State<InventoryScreen> {
         return 'Equipo de Red';
       case 'phone':
         return 'Teléfono';
+      case 'peripheral':
+        return 'Periférico';
       case 'other':
         return 'Otro';
       default:
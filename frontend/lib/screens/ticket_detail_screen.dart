@@ -29,7 +29,7 @@ class _TicketDetailScreenState extends State<TicketDetailScreen> {
     });
 
     try {
-      final ticket = await TicketService.getTicket(widget.ticketId);
+      final ticket = await TicketService.getTicket(widget.ticketId, expand: true);
       setState(() {
         _ticket = ticket;
         _isLoading = false;
@@ -101,6 +101,14 @@ class _TicketDetailScreenState extends State<TicketDetailScreen> {
               const SizedBox(height: 24),
               _buildDueDateSection(theme),
             ],
+            if (_ticket!.linkedItems.isNotEmpty) ...[
+              const SizedBox(height: 24),
+              _buildLinkedItemsSection(theme),
+            ],
+            if (_ticket!.activity.isNotEmpty) ...[
+              const SizedBox(height: 24),
+              _buildActivitySection(theme),
+            ],
           ],
         ),
       ),
@@ -418,6 +426,97 @@ class _TicketDetailScreenState extends State<TicketDetailScreen> {
     );
   }
 
+  Widget _buildLinkedItemsSection(ThemeData theme) {
+    return Card(
+      child: Padding(
+        padding: const EdgeInsets.all(16),
+        child: Column(
+          crossAxisAlignment: CrossAxisAlignment.start,
+          children: [
+            Row(
+              children: [
+                Icon(
+                  Icons.devices,
+                  size: 20,
+                  color: theme.colorScheme.primary,
+                ),
+                const SizedBox(width: 8),
+                Text(
+                  'Elementos Vinculados',
+                  style: theme.textTheme.titleMedium?.copyWith(
+                    fontWeight: FontWeight.bold,
+                  ),
+                ),
+              ],
+            ),
+            const SizedBox(height: 12),
+            Wrap(
+              spacing: 8,
+              runSpacing: 8,
+              children: _ticket!.linkedItems.map((item) => Chip(label: Text(item))).toList(),
+            ),
+          ],
+        ),
+      ),
+    );
+  }
+
+  Widget _buildActivitySection(ThemeData theme) {
+    return Card(
+      child: Padding(
+        padding: const EdgeInsets.all(16),
+        child: Column(
+          crossAxisAlignment: CrossAxisAlignment.start,
+          children: [
+            Row(
+              children: [
+                Icon(
+                  Icons.history,
+                  size: 20,
+                  color: theme.colorScheme.primary,
+                ),
+                const SizedBox(width: 8),
+                Text(
+                  'Historial',
+                  style: theme.textTheme.titleMedium?.copyWith(
+                    fontWeight: FontWeight.bold,
+                  ),
+                ),
+              ],
+            ),
+            const SizedBox(height: 12),
+            for (final entry in _ticket!.activity) ...[
+              _buildActivityEntry(entry, theme),
+              if (entry != _ticket!.activity.last) const Divider(height: 24),
+            ],
+          ],
+        ),
+      ),
+    );
+  }
+
+  Widget _buildActivityEntry(TicketActivity entry, ThemeData theme) {
+    IconData icon;
+    switch (entry.kind) {
+      case 'task':
+        icon = entry.state == 'done' ? Icons.task_alt : Icons.task;
+        break;
+      case 'solution':
+        icon = Icons.check_circle;
+        break;
+      default:
+        icon = Icons.chat_bubble_outline;
+    }
+
+    final subtitle = [
+      entry.kindLabel,
+      if (entry.author != null) entry.author!,
+      if (entry.createdAt != null) _formatDateTime(entry.createdAt!),
+    ].join(' · ');
+
+    return _buildDetailRow(subtitle, entry.content, icon, theme);
+  }
+
   Widget _buildDetailRow(String label, String value, IconData icon, ThemeData theme) {
     return Row(
       crossAxisAlignment: CrossAxisAlignment.start,
@@ -1,3 +1,4 @@
+import 'dart:async';
 import 'package:flutter/material.dart';
 import '../models/ticket.dart';
 import '../services/ticket_service.dart';
@@ -11,12 +12,22 @@ class TicketsScreen extends StatefulWidget {
 }
 
 class _TicketsScreenState extends State<TicketsScreen> {
+  static const int _pageSize = 50;
+  static const Duration _searchDebounce = Duration(milliseconds: 400);
+
   List<Ticket> _tickets = [];
-  List<Ticket> _filteredTickets = [];
   bool _isLoading = true;
+  bool _isLoadingMore = false;
+  bool _hasMore = false;
+  int _page = 1;
+  int _total = 0;
   String? _error;
+  final ScrollController _scrollController = ScrollController();
+  Timer? _reloadTimer;
+  StreamSubscription<TicketChange>? _changesSubscription;
+  Timer? _reconnectTimer;
   
-  // Filters
+  // Filters (se aplican en el servidor)
   String? _selectedStatus;
   String? _selectedPriority;
   String _searchQuery = '';
@@ -26,25 +37,53 @@ class _TicketsScreenState extends State<TicketsScreen> {
   @override
   void initState() {
     super.initState();
+    _scrollController.addListener(_onScroll);
     _loadTickets();
+    _listenForChanges();
+  }
+
+  @override
+  void dispose() {
+    _reloadTimer?.cancel();
+    _reconnectTimer?.cancel();
+    _changesSubscription?.cancel();
+    _scrollController.dispose();
+    super.dispose();
   }
 
+  Future<TicketPage> _fetchPage(int page) {
+    return TicketService.getTickets(
+      status: _selectedStatus,
+      priority: _selectedPriority,
+      search: _searchQuery,
+      page: page,
+      pageSize: _pageSize,
+      sort: _sortBy,
+      ascending: _sortAscending,
+    );
+  }
+
+  /// Carga la primera página con los filtros y el orden actuales
   Future<void> _loadTickets() async {
+    _reloadTimer?.cancel();
     setState(() {
       _isLoading = true;
       _error = null;
     });
 
     try {
-      // Cargar TODOS los tickets sin filtros del servidor
-      final tickets = await TicketService.getTickets();
+      final ticketPage = await _fetchPage(1);
+      if (!mounted) return;
 
       setState(() {
-        _tickets = tickets;
-        _applyFiltersAndSort();
+        _tickets = ticketPage.items;
+        _page = 1;
+        _total = ticketPage.total;
+        _hasMore = ticketPage.hasMore;
         _isLoading = false;
       });
     } catch (e) {
+      if (!mounted) return;
       setState(() {
         _error = e.toString();
         _isLoading = false;
@@ -52,61 +91,89 @@ class _TicketsScreenState extends State<TicketsScreen> {
     }
   }
 
-  void _applyFiltersAndSort() {
-    // Empezar con todos los tickets
-    _filteredTickets = List.from(_tickets);
-
-    // Aplicar filtro de búsqueda
-    if (_searchQuery.isNotEmpty) {
-      final query = _searchQuery.toLowerCase();
-      _filteredTickets = _filteredTickets.where((ticket) {
-        return ticket.title.toLowerCase().contains(query) ||
-               ticket.description.toLowerCase().contains(query) ||
-               ticket.id.toString().contains(query);
-      }).toList();
-    }
+  /// Añade la siguiente página al final de la lista (scroll infinito)
+  Future<void> _loadMore() async {
+    if (_isLoading || _isLoadingMore || !_hasMore) return;
+    setState(() => _isLoadingMore = true);
 
-    // Aplicar filtro de estado
-    if (_selectedStatus != null) {
-      _filteredTickets = _filteredTickets.where((ticket) {
-        return ticket.status == _selectedStatus;
-      }).toList();
+    try {
+      final ticketPage = await _fetchPage(_page + 1);
+      if (!mounted) return;
+
+      setState(() {
+        _tickets.addAll(ticketPage.items);
+        _page = ticketPage.page;
+        _total = ticketPage.total;
+        _hasMore = ticketPage.hasMore;
+        _isLoadingMore = false;
+      });
+    } catch (e) {
+      if (!mounted) return;
+      setState(() => _isLoadingMore = false);
+      ScaffoldMessenger.of(context).showSnackBar(
+        SnackBar(content: Text('Error cargando más tickets: $e')),
+      );
     }
+  }
 
-    // Aplicar filtro de prioridad
-    if (_selectedPriority != null) {
-      _filteredTickets = _filteredTickets.where((ticket) {
-        return ticket.priority == _selectedPriority;
-      }).toList();
+  void _onScroll() {
+    if (_scrollController.position.pixels >= _scrollController.position.maxScrollExtent - 300) {
+      _loadMore();
     }
+  }
 
-    // Ordenar
-    switch (_sortBy) {
-      case 'date':
-        _filteredTickets.sort((a, b) => 
-          _sortAscending 
-            ? a.createdAt.compareTo(b.createdAt)
-            : b.createdAt.compareTo(a.createdAt)
-        );
-        break;
-      case 'priority':
-        final priorityOrder = {'very_high': 5, 'high': 4, 'medium': 3, 'low': 2, 'very_low': 1};
-        _filteredTickets.sort((a, b) {
-          final aPriority = priorityOrder[a.priority] ?? 0;
-          final bPriority = priorityOrder[b.priority] ?? 0;
-          return _sortAscending 
-            ? aPriority.compareTo(bPriority)
-            : bPriority.compareTo(aPriority);
-        });
-        break;
-      case 'status':
-        _filteredTickets.sort((a, b) => 
-          _sortAscending
-            ? a.status.compareTo(b.status)
-            : b.status.compareTo(a.status)
-        );
-        break;
+  /// Aplica en la lista los cambios que publica el servidor (sin volver a descargarla)
+  void _listenForChanges() {
+    _changesSubscription = TicketService.watchChanges().listen(
+      _applyChange,
+      onError: (_) => _scheduleReconnect(),
+      onDone: _scheduleReconnect,
+      cancelOnError: true,
+    );
+  }
+
+  void _scheduleReconnect() {
+    if (!mounted) return;
+    _reconnectTimer?.cancel();
+    _reconnectTimer = Timer(const Duration(seconds: 5), _listenForChanges);
+  }
+
+  void _applyChange(TicketChange change) {
+    if (!mounted) return;
+    if (change.event == 'reset') {
+      _loadTickets();
+      return;
     }
+    if (change.event != 'ticket' || change.id == null) return;
+
+    final index = _tickets.indexWhere((ticket) => ticket.id == change.id);
+    setState(() {
+      if (change.op == 'deleted') {
+        if (index >= 0) {
+          _tickets.removeAt(index);
+          _total--;
+        }
+      } else if (index >= 0) {
+        _tickets[index] = _tickets[index].patch(change.fields);
+      } else if (change.op == 'created' && _showsNewestFirst) {
+        _tickets.insert(0, Ticket.fromJson({'description': '', ...change.fields}));
+        _total++;
+      }
+    });
+  }
+
+  // Los tickets nuevos solo se insertan arriba si la lista no está filtrada y va de más reciente a más antiguo
+  bool get _showsNewestFirst =>
+      _selectedStatus == null &&
+      _selectedPriority == null &&
+      _searchQuery.isEmpty &&
+      _sortBy == 'date' &&
+      !_sortAscending;
+
+  /// Vuelve a pedir la primera página tras cambiar filtros, orden o búsqueda
+  void _applyFiltersAndSort({Duration delay = Duration.zero}) {
+    _reloadTimer?.cancel();
+    _reloadTimer = Timer(delay, _loadTickets);
   }
 
   @override
@@ -200,12 +267,12 @@ class _TicketsScreenState extends State<TicketsScreen> {
                 border: OutlineInputBorder(
                   borderRadius: BorderRadius.circular(12),
                 ),
-                helperText: 'La búsqueda se aplica en tiempo real',
+                helperText: _isLoading ? 'Buscando...' : '$_total tickets',
               ),
               onChanged: (value) {
                 setState(() {
                   _searchQuery = value;
-                  _applyFiltersAndSort(); // Aplicar búsqueda en tiempo real
+                  _applyFiltersAndSort(delay: _searchDebounce);
                 });
               },
             ),
@@ -274,7 +341,7 @@ class _TicketsScreenState extends State<TicketsScreen> {
       );
     }
 
-    if (_filteredTickets.isEmpty) {
+    if (_tickets.isEmpty) {
       return Center(
         child: Column(
           mainAxisAlignment: MainAxisAlignment.center,
@@ -293,10 +360,18 @@ class _TicketsScreenState extends State<TicketsScreen> {
     return RefreshIndicator(
       onRefresh: _loadTickets,
       child: ListView.builder(
+        controller: _scrollController,
+        physics: const AlwaysScrollableScrollPhysics(),
         padding: const EdgeInsets.all(16),
-        itemCount: _filteredTickets.length,
+        itemCount: _tickets.length + (_hasMore ? 1 : 0),
         itemBuilder: (context, index) {
-          final ticket = _filteredTickets[index];
+          if (index >= _tickets.length) {
+            return const Padding(
+              padding: EdgeInsets.symmetric(vertical: 16),
+              child: Center(child: CircularProgressIndicator()),
+            );
+          }
+          final ticket = _tickets[index];
           return _buildTicketCard(ticket, theme);
         },
       ),
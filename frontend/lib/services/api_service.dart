@@ -1,9 +1,20 @@
 import 'dart:convert';
 import 'package:http/http.dart' as http;
+import 'package:shared_preferences/shared_preferences.dart';
 import '../config/api_config.dart';
 import '../models/message.dart';
 
 class ApiService {
+  // Headers con el token de sesión (para medir el uso de IA por usuario)
+  Future<Map<String, String>> _getHeaders() async {
+    final prefs = await SharedPreferences.getInstance();
+    final token = prefs.getString('access_token');
+    return {
+      'Content-Type': 'application/json',
+      if (token != null) 'Authorization': 'Bearer $token',
+    };
+  }
+
   // Verificar estado del servidor
   Future<Map<String, dynamic>> checkHealth() async {
     try {
@@ -22,14 +33,15 @@ class ApiService {
   }
 
   // Enviar consulta al agente IA
-  Future<Message> sendQuery(String query, int userId) async {
+  Future<Message> sendQuery(String query, int userId, {int? conversationId}) async {
     try {
       final response = await http.post(
         Uri.parse('${ApiConfig.baseUrl}${ApiConfig.queryEndpoint}'),
-        headers: {'Content-Type': 'application/json'},
+        headers: await _getHeaders(),
         body: json.encode({
           'query': query,
           'user_id': userId,
+          if (conversationId != null) 'conversation_id': conversationId,
         }),
       );
 
@@ -42,11 +54,15 @@ class ApiService {
             isUser: false,
             intention: data['intention'],
             confidence: (data['confidence'] as num?)?.toDouble(),
+            usage: data['usage'] as Map<String, dynamic>?,
+            messageId: data['message_id'] as int?,
           );
         } else {
           return Message(
             text: data['message'] ?? 'Error al procesar la consulta',
             isUser: false,
+            usage: data['usage'] as Map<String, dynamic>?,
+            messageId: data['message_id'] as int?,
           );
         }
       } else {
@@ -58,13 +74,14 @@ class ApiService {
   }
 
   // Chat conversacional (sin consultar GLPI)
-  Future<Message> sendChat(String message) async {
+  Future<Message> sendChat(String message, {int? conversationId}) async {
     try {
       final response = await http.post(
         Uri.parse('${ApiConfig.baseUrl}${ApiConfig.chatEndpoint}'),
-        headers: {'Content-Type': 'application/json'},
+        headers: await _getHeaders(),
         body: json.encode({
           'message': message,
+          if (conversationId != null) 'conversation_id': conversationId,
         }),
       );
 
@@ -73,6 +90,8 @@ class ApiService {
         return Message(
           text: data['response'] ?? 'Sin respuesta',
           isUser: false,
+          usage: data['usage'] as Map<String, dynamic>?,
+          messageId: data['message_id'] as int?,
         );
       } else {
         throw Exception('Error en el chat: ${response.statusCode}');
@@ -1,6 +1,7 @@
 import 'dart:convert';
 import 'package:http/http.dart' as http;
 import 'package:shared_preferences/shared_preferences.dart';
+import 'http_cache.dart';
 
 class AuthService {
   static const String baseUrl = 'http://localhost:8000/api/v1/auth';
@@ -193,6 +194,7 @@ class AuthService {
       _token = null;
       _refreshToken = null;
       _currentUser = null;
+      HttpCache.clear();
       await _clearTokens();
     }
   }
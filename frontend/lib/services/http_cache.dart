@@ -0,0 +1,42 @@
+import 'package:http/http.dart' as http;
+
+/// GET condicional: reenvía el último ETag recibido y, si el servidor
+/// responde 304, devuelve el cuerpo guardado como si fuera un 200.
+class HttpCache {
+  static final Map<String, _CachedResponse> _entries = {};
+  static const int _maxEntries = 64;
+
+  static Future<http.Response> get(Uri uri, {Map<String, String>? headers}) async {
+    final key = uri.toString();
+    final cached = _entries[key];
+    final requestHeaders = {
+      ...?headers,
+      if (cached != null) 'If-None-Match': cached.etag,
+    };
+
+    final response = await http.get(uri, headers: requestHeaders);
+
+    if (response.statusCode == 304 && cached != null) {
+      return http.Response.bytes(cached.bodyBytes, 200, headers: response.headers);
+    }
+
+    final etag = response.headers['etag'];
+    if (response.statusCode == 200 && etag != null) {
+      _entries.remove(key);
+      if (_entries.length >= _maxEntries) {
+        _entries.remove(_entries.keys.first);
+      }
+      _entries[key] = _CachedResponse(etag, response.bodyBytes);
+    }
+    return response;
+  }
+
+  static void clear() => _entries.clear();
+}
+
+class _CachedResponse {
+  final String etag;
+  final List<int> bodyBytes;
+
+  _CachedResponse(this.etag, this.bodyBytes);
+}
@@ -2,6 +2,7 @@ import 'dart:convert';
 import 'package:http/http.dart' as http;
 import 'package:shared_preferences/shared_preferences.dart';
 import '../models/inventory_item.dart';
+import 'http_cache.dart';
 
 class InventoryService {
   static const String baseUrl = 'http://localhost:8000';
@@ -24,21 +25,23 @@ class InventoryService {
     String? type,
     String? status,
     String? location,
+    String? manufacturer,
     String? search,
   }) async {
     try {
       final headers = await _getHeaders();
-      final queryParams = <String, String>{};
-      
-      if (type != null) queryParams['type'] = type;
-      if (status != null) queryParams['status'] = status;
-      if (location != null) queryParams['location'] = location;
-      if (search != null) queryParams['search'] = search;
+      final queryParams = _filterParams(
+        type: type,
+        status: status,
+        location: location,
+        manufacturer: manufacturer,
+        search: search,
+      );
 
       final uri = Uri.parse('$baseUrl/api/v1/inventory/')
           .replace(queryParameters: queryParams.isNotEmpty ? queryParams : null);
 
-      final response = await http.get(uri, headers: headers);
+      final response = await HttpCache.get(uri, headers: headers);
 
       if (response.statusCode == 200) {
         final List<dynamic> data = jsonDecode(response.body);
@@ -51,12 +54,69 @@ class InventoryService {
     }
   }
 
-  /// Get a specific inventory item by ID
-  static Future<InventoryItem> getInventoryItem(int itemId) async {
+  static Map<String, String> _filterParams({
+    String? type,
+    String? status,
+    String? location,
+    String? manufacturer,
+    String? search,
+  }) {
+    return {
+      if (type != null) 'type': type,
+      if (status != null) 'status': status,
+      if (location != null) 'location': location,
+      if (manufacturer != null) 'manufacturer': manufacturer,
+      if (search != null) 'search': search,
+    };
+  }
+
+  /// Get facet counts (facet -> value -> count) for the same filters as the list.
+  /// Each facet ignores its own filter, so it shows how many items every choice would return.
+  static Future<Map<String, Map<String, int>>> getFacets({
+    String? type,
+    String? status,
+    String? location,
+    String? manufacturer,
+    String? search,
+  }) async {
+    try {
+      final headers = await _getHeaders();
+      final queryParams = _filterParams(
+        type: type,
+        status: status,
+        location: location,
+        manufacturer: manufacturer,
+        search: search,
+      );
+
+      final uri = Uri.parse('$baseUrl/api/v1/inventory/facets')
+          .replace(queryParameters: queryParams.isNotEmpty ? queryParams : null);
+
+      final response = await HttpCache.get(uri, headers: headers);
+
+      if (response.statusCode == 200) {
+        final Map<String, dynamic> facets = jsonDecode(response.body)['facets'];
+        return facets.map((facet, values) => MapEntry(
+              facet,
+              {
+                for (final entry in values as List<dynamic>)
+                  entry['value'].toString(): entry['count'] as int,
+              },
+            ));
+      } else {
+        throw Exception('Failed to load facets: ${response.body}');
+      }
+    } catch (e) {
+      throw Exception('Error loading facets: $e');
+    }
+  }
+
+  /// Get a specific inventory item by GLPI itemtype and ID
+  static Future<InventoryItem> getInventoryItem(int itemId, {String itemtype = 'Computer'}) async {
     try {
       final headers = await _getHeaders();
       final response = await http.get(
-        Uri.parse('$baseUrl/api/v1/inventory/$itemId'),
+        Uri.parse('$baseUrl/api/v1/inventory/$itemId?itemtype=$itemtype'),
         headers: headers,
       );
 
@@ -76,8 +136,8 @@ class InventoryService {
   static Future<Map<String, dynamic>> getInventoryStats() async {
     try {
       final headers = await _getHeaders();
-      final response = await http.get(
-        Uri.parse('$baseUrl/api/v1/inventory/stats'),
+      final response = await HttpCache.get(
+        Uri.parse('$baseUrl/api/v1/inventory/stats/summary'),
         headers: headers,
       );
 
@@ -2,10 +2,14 @@ import 'dart:convert';
 import 'package:http/http.dart' as http;
 import 'package:shared_preferences/shared_preferences.dart';
 import '../models/ticket.dart';
+import 'http_cache.dart';
 
 class TicketService {
   static const String baseUrl = 'http://localhost:8000';
 
+  // Último evento recibido del feed, para reanudar sin perder cambios
+  static String? _lastEventId;
+
   static Future<String?> _getToken() async {
     final prefs = await SharedPreferences.getInstance();
     return prefs.getString('access_token');
@@ -19,37 +23,44 @@ class TicketService {
     };
   }
 
-  /// Get all tickets with optional filters
-  static Future<List<Ticket>> getTickets({
+  /// Get one page of tickets with optional filters and sorting
+  static Future<TicketPage> getTickets({
     String? status,
     String? priority,
     String? category,
     String? search,
+    int page = 1,
+    int pageSize = 50,
+    String? sort,
+    bool ascending = false,
   }) async {
     try {
       final headers = await _getHeaders();
-      final queryParams = <String, String>{};
+      final queryParams = <String, String>{
+        'page': page.toString(),
+        'page_size': pageSize.toString(),
+        'order': ascending ? 'asc' : 'desc',
+      };
       
       if (status != null) queryParams['status'] = status;
       if (priority != null) queryParams['priority'] = priority;
       if (category != null) queryParams['category'] = category;
-      if (search != null) queryParams['search'] = search;
+      if (search != null && search.isNotEmpty) queryParams['search'] = search;
+      if (sort != null) queryParams['sort'] = sort;
 
       final uri = Uri.parse('$baseUrl/api/v1/tickets/')
-          .replace(queryParameters: queryParams.isNotEmpty ? queryParams : null);
+          .replace(queryParameters: queryParams);
 
       print('🔍 Fetching tickets from: $uri');
-      print('📋 Headers: ${headers.keys.join(", ")}');
 
-      final response = await http.get(uri, headers: headers);
+      final response = await HttpCache.get(uri, headers: headers);
 
       print('📡 Response status: ${response.statusCode}');
-      print('📦 Response body length: ${response.body.length}');
 
       if (response.statusCode == 200) {
-        final List<dynamic> data = jsonDecode(response.body);
-        print('✅ Parsed ${data.length} tickets from response');
-        return data.map((json) => Ticket.fromJson(json)).toList();
+        final ticketPage = TicketPage.fromJson(jsonDecode(response.body));
+        print('✅ Parsed ${ticketPage.items.length} of ${ticketPage.total} tickets');
+        return ticketPage;
       } else {
         print('❌ Error response: ${response.body}');
         throw Exception('Failed to load tickets: ${response.body}');
@@ -60,12 +71,12 @@ class TicketService {
     }
   }
 
-  /// Get a specific ticket by ID
-  static Future<Ticket> getTicket(int ticketId) async {
+  /// Get a specific ticket by ID (with followups, tasks, solution and linked items if expand)
+  static Future<Ticket> getTicket(int ticketId, {bool expand = false}) async {
     try {
       final headers = await _getHeaders();
       final response = await http.get(
-        Uri.parse('$baseUrl/api/v1/tickets/$ticketId'),
+        Uri.parse('$baseUrl/api/v1/tickets/$ticketId${expand ? '?expand=true' : ''}'),
         headers: headers,
       );
 
@@ -85,7 +96,7 @@ class TicketService {
   static Future<Map<String, dynamic>> getTicketStats() async {
     try {
       final headers = await _getHeaders();
-      final response = await http.get(
+      final response = await HttpCache.get(
         Uri.parse('$baseUrl/api/v1/tickets/stats/summary'),
         headers: headers,
       );
@@ -99,4 +110,41 @@ class TicketService {
       throw Exception('Error loading stats: $e');
     }
   }
+
+  /// Subscribe to the ticket change feed (Server-Sent Events)
+  static Stream<TicketChange> watchChanges() async* {
+    final client = http.Client();
+    try {
+      final request = http.Request('GET', Uri.parse('$baseUrl/api/v1/tickets/changes'));
+      request.headers.addAll(await _getHeaders());
+      request.headers['Accept'] = 'text/event-stream';
+      if (_lastEventId != null) request.headers['Last-Event-ID'] = _lastEventId!;
+
+      final response = await client.send(request);
+      if (response.statusCode != 200) {
+        throw Exception('Failed to subscribe to ticket changes: ${response.statusCode}');
+      }
+
+      var event = 'message';
+      final data = StringBuffer();
+      final lines = response.stream.transform(utf8.decoder).transform(const LineSplitter());
+      await for (final line in lines) {
+        if (line.isEmpty) {
+          if (data.isNotEmpty) {
+            yield TicketChange.fromEvent(event, jsonDecode(data.toString()));
+          }
+          event = 'message';
+          data.clear();
+        } else if (line.startsWith('id:')) {
+          _lastEventId = line.substring(3).trim();
+        } else if (line.startsWith('event:')) {
+          event = line.substring(6).trim();
+        } else if (line.startsWith('data:')) {
+          data.write(line.substring(5).trim());
+        }
+      }
+    } finally {
+      client.close();
+    }
+  }
 }